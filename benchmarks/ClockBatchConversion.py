@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark comparing the conversion of many tick values between a timeline clock
+and the wall clock using :func:`~dvbcss.clock.ClockBase.toOtherClockTicks` one
+value at a time, and using :func:`~dvbcss.clock.ClockBase.toOtherClockTicksBatch`
+with a :class:`list` and (if numpy is installed) a :class:`numpy.ndarray`.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+
+    import argparse
+    import timeit
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of converting many tick values between clocks.")
+    parser.add_argument("--count", dest="count", type=int, default=20000, help="Number of tick values in the batch (default=20000)")
+    parser.add_argument("--repeats", dest="repeats", type=int, default=10, help="Number of times to repeat the conversion (default=10)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+    wallClock = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(0, 12345678))
+    timelineClock = CorrelatedClock(wallClock, tickRate=90000, correlation=Correlation(wallClock.ticks, 0))
+    subtitleClock = CorrelatedClock(timelineClock, tickRate=1000, correlation=Correlation(9000, 0))
+
+    values = [ i * 40 for i in range(0, args.count) ]
+
+    def single():
+        return [ subtitleClock.toOtherClockTicks(wallClock, t) for t in values ]
+
+    def batchList():
+        return subtitleClock.toOtherClockTicksBatch(wallClock, values)
+
+    runs = [ ("one at a time", single), ("batch (list)", batchList) ]
+    if numpy is not None:
+        valuesArray = numpy.array(values)
+        runs.append( ("batch (numpy)", lambda : subtitleClock.toOtherClockTicksBatch(wallClock, valuesArray)) )
+
+    print "%15s %20s" % ("method", "ns per value")
+    for name, func in runs:
+        secs = min(timeit.repeat(func, number=1, repeat=args.repeats))
+        print "%15s %20.1f" % (name, secs * 1000000000.0 / args.count)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the cost of calling
+:func:`~dvbcss.clock.ClockBase.dispersionAtTime` on a clock at the bottom of a
+chain of :class:`~dvbcss.clock.CorrelatedClock` objects of different depths.
+
+This uses the cached error model. It is compared against walking the hierarchy
+one clock at a time, which is what :func:`~dvbcss.clock.ClockBase.dispersionAtTime`
+used to do. The cost per value of
+:func:`~dvbcss.clock.ClockBase.dispersionAtTimeBatch` is also shown.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+
+    import argparse
+    import timeit
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of calculating dispersion for clock hierarchies of different depths.")
+    parser.add_argument("--calls", dest="calls", type=int, default=20000, help="Number of calls per measurement (default=20000)")
+    parser.add_argument("--batch", dest="batch", type=int, default=10000, help="Number of values in each batch (default=10000)")
+    parser.add_argument("depths", type=int, nargs="*", default=[1, 4, 16], help="Depths of clock hierarchy to try (default= 1 4 16)")
+    args = parser.parse_args()
+
+    root = SysClock(tickRate=1000000000)
+
+    def walked(clock, t):
+        disp = clock._errorAtTime(t)
+        if clock.getParent() is not None:
+            disp += walked(clock.getParent(), clock.toParentTicks(t))
+        return disp
+
+    def measure(func, number):
+        secs = min(timeit.repeat(func, number=number, repeat=3))
+        return secs * 1000000000.0 / number
+
+    print "%8s %18s %18s %18s %18s" % ("depth", "cached ns/call", "walked ns/call", "list ns/value", "numpy ns/value")
+    for depth in args.depths:
+        clock = root
+        for i in range(0, depth):
+            corr = Correlation(clock.ticks, i*1000.0, initialError=0.001, errorGrowthRate=0.00001)
+            clock = CorrelatedClock(clock, tickRate=1000000 + i, correlation=corr, speed=1.0 + i*0.01)
+
+        t = clock.ticks
+        values = [ t + i for i in range(0, args.batch) ]
+        cached = measure(lambda : clock.dispersionAtTime(t), args.calls)
+        walk = measure(lambda : walked(clock, t), args.calls)
+        listed = measure(lambda : clock.dispersionAtTimeBatch(values), 1) / args.batch
+        if numpy is not None:
+            array = numpy.array(values)
+            arrayed = "%18.1f" % (measure(lambda : clock.dispersionAtTimeBatch(array), 1) / args.batch)
+        else:
+            arrayed = "%18s" % "n/a"
+        print "%8d %18.1f %18.1f %18.1f %s" % (depth, cached, walk, listed, arrayed)
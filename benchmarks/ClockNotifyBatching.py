@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the cost of the change notifications that result from a
+timeline clock being updated, with and without
+:func:`~dvbcss.clock.batchUpdates`.
+
+A timeline clock has a number of :class:`~dvbcss.clock.OffsetClock` children,
+each bound to a (not running) :class:`~dvbcss.task.Scheduler`, as it would be
+if tasks were scheduled on it. Each timeline update changes the correlation and
+speed and then the availability of the timeline clock (as a CSS-TS client
+might do on receiving a message). This is repeated several times within each
+batch.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, OffsetClock, Correlation, batchUpdates
+    from dvbcss.task import Scheduler
+
+    import argparse
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of clock change notifications with and without batching.")
+    parser.add_argument("--updates", dest="updates", type=int, default=4, help="Timeline updates per batch (default=4)")
+    parser.add_argument("--batches", dest="batches", type=int, default=200, help="Number of batches per measurement (default=200)")
+    parser.add_argument("fanouts", type=int, nargs="*", default=[1, 10, 100], help="Numbers of offset clocks to try (default= 1 10 100)")
+    args = parser.parse_args()
+
+    class CountingScheduler(Scheduler):
+        def __init__(self):
+            super(CountingScheduler,self).__init__()
+            self.count = 0
+        def notify(self, cause):
+            self.count += 1
+            super(CountingScheduler,self).notify(cause)
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    print "%8s %20s %20s %20s %20s" % ("fanout", "unbatched us/batch", "batched us/batch", "unbatched notifs", "batched notifs")
+    for fanout in args.fanouts:
+        timeline = CorrelatedClock(sysClock, tickRate=90000)
+        dependents = []
+        for i in range(0, fanout):
+            dependent = CountingScheduler()
+            OffsetClock(timeline, offset=0.001*i).bind(dependent)
+            dependents.append(dependent)
+
+        def update():
+            for i in range(0, args.updates):
+                timeline.setCorrelationAndSpeed(Correlation(sysClock.ticks, i), 1.0)
+                timeline.setAvailability(i % 2 == 0)
+
+        def batchedUpdate():
+            with batchUpdates():
+                update()
+
+        results = []
+        for func in [update, batchedUpdate]:
+            for dependent in dependents:
+                dependent.count = 0
+            secs = min(timeit.repeat(func, number=args.batches, repeat=3))
+            notifs = sum(dependent.count for dependent in dependents) / (3.0 * args.batches)
+            results.append((secs * 1000000.0 / args.batches, notifs))
+
+        print "%8d %20.1f %20.1f %20.0f %20.0f" % (fanout, results[0][0], results[1][0], results[0][1], results[1][1])
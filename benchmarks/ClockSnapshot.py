@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark comparing :func:`~dvbcss.clock.sampleAll` against reading the
+ticks, effective speed, availability and dispersion of each clock separately,
+for a typical set of clocks: a wall clock, a timeline clock, and clocks
+representing the earliest and latest presentation timings.
+
+Also reports how far apart (in root clock ticks) the separate reads were.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, OffsetClock, Correlation, sampleAll
+
+    import argparse
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of reading several clocks with and without sampleAll().")
+    parser.add_argument("--calls", dest="calls", type=int, default=20000, help="Number of calls per measurement (default=20000)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+    wallClock = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(sysClock.ticks, 0.0, 0.001, 0.0001))
+    timelineClock = CorrelatedClock(wallClock, tickRate=90000, correlation=Correlation(wallClock.ticks, 0.0))
+    earliestClock = OffsetClock(timelineClock, offset=-0.05)
+    latestClock = OffsetClock(timelineClock, offset=0.05)
+    clocks = [wallClock, timelineClock, earliestClock, latestClock]
+
+    def separately():
+        result = []
+        for clock in clocks:
+            ticks = clock.ticks
+            result.append((ticks, clock.getEffectiveSpeed(), clock.isAvailable(), clock.dispersionAtTime(ticks)))
+        return result
+
+    def together():
+        return sampleAll(clocks)
+
+    def measure(func):
+        secs = min(timeit.repeat(func, number=args.calls, repeat=3))
+        return secs * 1000000000.0 / args.calls
+
+    # spread of instants sampled by separate reads, expressed in root clock ticks
+    spreads = []
+    for i in range(0, 1000):
+        rootTicks = [ clock.toRootTicks(clock.ticks) for clock in clocks ]
+        spreads.append(max(rootTicks) - min(rootTicks))
+    spreads.sort()
+
+    print "%d clocks" % len(clocks)
+    print "    separate reads: %10.1f ns" % measure(separately)
+    print "    sampleAll:      %10.1f ns" % measure(together)
+    print "    median spread of separate reads: %10.0f ns (sampleAll: 0 ns)" % spreads[len(spreads)//2]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the cost of reading the :data:`~dvbcss.clock.ClockBase.ticks`
+property of a clock at the bottom of a chain of
+:class:`~dvbcss.clock.CorrelatedClock` objects of different depths.
+
+Reading the ticks property uses the cached transform from the root clock.
+This is compared against walking the hierarchy one clock at a time (by calling
+:func:`~dvbcss.clock.ClockBase.fromRootTicks`), which is what reading the
+ticks property used to do.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+
+    import argparse
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of reading ticks from clock hierarchies of different depths.")
+    parser.add_argument("--reads", dest="reads", type=int, default=100000, help="Number of reads per measurement (default=100000)")
+    parser.add_argument("--repeats", dest="repeats", type=int, default=5, help="Number of times to repeat each measurement (default=5)")
+    parser.add_argument("depths", type=int, nargs="*", default=[1, 4, 16], help="Depths of clock hierarchy to try (default= 1 4 16)")
+    args = parser.parse_args()
+
+    root = SysClock(tickRate=1000000000)
+
+    def measure(func):
+        secs = min(timeit.repeat(func, number=args.reads, repeat=args.repeats))
+        return secs * 1000000000.0 / args.reads
+
+    print "%8s %20s %20s" % ("depth", "ticks ns/read", "hierarchy ns/read")
+    for depth in args.depths:
+        clock = root
+        for i in range(0, depth):
+            clock = CorrelatedClock(clock, tickRate=1000000 + i, correlation=Correlation(clock.ticks, i*1000), speed=1.0 + i*0.01)
+
+        cached = measure(lambda : clock.ticks)
+        walked = measure(lambda : clock.fromRootTicks(root.ticks))
+        print "%8d %20.1f %20.1f" % (depth, cached, walked)
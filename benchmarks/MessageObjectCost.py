@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the memory used by, and time taken to create, the value
+objects created for each Wall Clock and CSS-TS message:
+:class:`~dvbcss.protocol.wc.WCMessage`, :class:`~dvbcss.protocol.wc.Candidate`,
+:class:`~dvbcss.clock.Correlation`, :class:`~dvbcss.protocol.ts.Timestamp`
+and :class:`~dvbcss.protocol.ts.ControlTimestamp`.
+
+These classes use `__slots__` and a logger shared by the class. They are
+compared against subclasses that, like the classes used to, have a
+`__dict__` and look up a logger for every instance.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import Correlation
+    from dvbcss.protocol.wc import WCMessage, Candidate
+    from dvbcss.protocol.ts import Timestamp, ControlTimestamp
+
+    import argparse
+    import logging
+    import sys
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the per message memory and CPU cost of message value objects.")
+    parser.add_argument("--rate", dest="rate", type=int, default=10000, help="Message rate used to calculate per second costs (default=10000)")
+    parser.add_argument("--number", dest="number", type=int, default=100000, help="Number of objects created per measurement (default=100000)")
+    args = parser.parse_args()
+
+    # equivalents of how the classes used to be: with a __dict__ and a logger looked up per instance
+
+    class DictWCMessage(WCMessage):
+        def __init__(self, *args):
+            super(DictWCMessage,self).__init__(*args)
+            self.log = logging.getLogger("dvbcss.protocol.wc.WCMessage")
+
+    class DictCandidate(Candidate):
+        def __init__(self, *args):
+            super(DictCandidate,self).__init__(*args)
+            self.log = logging.getLogger("dvbcss.protocol.wc.Candidate")
+
+    class DictCorrelation(Correlation):
+        pass
+
+    class DictTimestamp(Timestamp):
+        def __init__(self, *args):
+            super(DictTimestamp,self).__init__(*args)
+            self.log = logging.getLogger("dvbcss.protocol.ts.Timestamp")
+
+    class DictControlTimestamp(ControlTimestamp):
+        def __init__(self, *args):
+            super(DictControlTimestamp,self).__init__(*args)
+            self.log = logging.getLogger("dvbcss.protocol.ts.ControlTimestamp")
+
+    response = WCMessage(WCMessage.TYPE_RESPONSE, -10, 12800, 1000, 2000, 3000)
+
+    cases = [
+        ("WCMessage",        lambda : WCMessage(1, -10, 12800, 1000, 2000, 3000),       lambda : DictWCMessage(1, -10, 12800, 1000, 2000, 3000)),
+        ("Candidate",        lambda : Candidate(response, 4000),                         lambda : DictCandidate(response, 4000)),
+        ("Correlation",      lambda : Correlation(1000, 2000, 0.001, 0.0001),            lambda : DictCorrelation(1000, 2000, 0.001, 0.0001)),
+        ("Timestamp",        lambda : Timestamp(1000, 2000),                             lambda : DictTimestamp(1000, 2000)),
+        ("ControlTimestamp", lambda : ControlTimestamp(None, 1.0),                       lambda : DictControlTimestamp(None, 1.0)),
+    ]
+
+    def size(obj):
+        s = sys.getsizeof(obj)
+        if hasattr(obj, "__dict__"):
+            s += sys.getsizeof(obj.__dict__)
+        return s
+
+    def cost(factory):
+        secs = min(timeit.repeat(factory, number=args.number, repeat=3))
+        return secs * 1000000000.0 / args.number
+
+    totals = [0, 0, 0, 0]
+    print "%18s %12s %12s %12s %12s" % ("", "bytes", "bytes", "ns/create", "ns/create")
+    print "%18s %12s %12s %12s %12s" % ("class", "before", "after", "before", "after")
+    for name, new, old in cases:
+        row = (size(old()), size(new()), cost(old), cost(new))
+        totals = [ t+r for t,r in zip(totals, row) ]
+        print "%18s %12d %12d %12.0f %12.0f" % ((name,) + row)
+    print "%18s %12d %12d %12.0f %12.0f" % (("all",) + tuple(totals))
+
+    print
+    print "At %d messages/sec (one of each object per message):" % args.rate
+    print "    allocated: %8.0f KB/sec before, %8.0f KB/sec after" % (totals[0]*args.rate/1024.0, totals[1]*args.rate/1024.0)
+    print "    CPU time:  %8.1f ms/sec before, %8.1f ms/sec after" % (totals[2]*args.rate/1000000.0, totals[3]*args.rate/1000000.0)
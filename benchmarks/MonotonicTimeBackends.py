@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the number of calls per second that can be made to
+:func:`~dvbcss.monotonic_time.time` and :func:`~dvbcss.monotonic_time.timeNanos`
+for each implementation (backend) available on this platform, and of the cost
+of reading the :data:`~dvbcss.clock.ClockBase.ticks` of a :class:`~dvbcss.clock.SysClock`.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    import dvbcss.monotonic_time as monotonic_time
+    from dvbcss.clock import SysClock
+
+    import argparse
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure calls per second for each available monotonic time implementation.")
+    parser.add_argument("--calls", dest="calls", type=int, default=200000, help="Number of calls per measurement (default=200000)")
+    args = parser.parse_args()
+
+    def measure(func):
+        secs = min(timeit.repeat(func, number=args.calls, repeat=3))
+        return args.calls / secs
+
+    print "Backend in use: %s" % monotonic_time.backend
+    print
+    print "%25s %15s %15s" % ("backend", "time()/sec", "timeNanos()/sec")
+    for name, (time, timeNanos, _) in sorted(monotonic_time._backends.items()):
+        print "%25s %15d %15d" % (name, measure(time), measure(timeNanos))
+
+    sysClock = SysClock(tickRate=1000000000)
+    print
+    print "%25s %15d" % ("SysClock.ticks reads/sec", measure(lambda : sysClock.ticks))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Microbenchmark of the cost of reading the :data:`~dvbcss.clock.ClockBase.ticks`
+property of a :class:`~dvbcss.sharedclock.SharedClock`, compared with reading the
+:class:`~dvbcss.clock.CorrelatedClock` that it follows. Also measures the cost of
+reading it just after the published clock has changed.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+    from dvbcss.sharedclock import SharedClockPublisher, SharedClock
+
+    import argparse
+    import os
+    import shutil
+    import tempfile
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of reading a clock shared through memory mapped file.")
+    parser.add_argument("--reads", dest="reads", type=int, default=100000, help="Number of reads per measurement (default=100000)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        sysClock = SysClock(tickRate=1000000000)
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(sysClock.ticks, 0.0, 0.001, 0.0001))
+        publisher = SharedClockPublisher(wallClock, os.path.join(tmpdir, "wallclock"))
+        shared = SharedClock(sysClock, publisher.path)
+
+        def measure(func, number):
+            secs = min(timeit.repeat(func, number=number, repeat=3))
+            return secs * 1000000000.0 / number
+
+        def changeThenRead():
+            wallClock.speed = 1.0
+            shared.ticks
+
+        changeCost = measure(lambda : setattr(wallClock, "speed", 1.0), args.reads // 10)
+
+        print "%40s %10.1f ns" % ("CorrelatedClock ticks", measure(lambda : wallClock.ticks, args.reads))
+        print "%40s %10.1f ns" % ("SharedClock ticks", measure(lambda : shared.ticks, args.reads))
+        print "%40s %10.1f ns" % ("SharedClock ticks after a change", measure(changeThenRead, args.reads // 10) - changeCost)
+
+        shared.close()
+        publisher.close()
+    finally:
+        shutil.rmtree(tmpdir)
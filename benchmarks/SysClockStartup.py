@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Measures the time taken to create a :class:`~dvbcss.clock.SysClock` at various tick rates,
+compared with estimating its precision using :func:`~dvbcss.clock.measurePrecision` (as
+was done before :mod:`dvbcss.calibration` existed). Also measures the time taken to
+calibrate the monotonic time source when there are no saved measurements.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, measurePrecision
+    import dvbcss.calibration as calibration
+
+    import argparse
+    import os
+    import shutil
+    import tempfile
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure the time taken to create a SysClock.")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5, help="Number of repetitions of each measurement (default=5)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "calibration.json")
+        def uncached():
+            calibration.getCalibration(path, recalibrate=True)
+        secs = min(timeit.repeat(uncached, number=1, repeat=args.repeat))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print "Calibration (no saved measurements): %8.2f ms" % (secs*1000)
+    print calibration.getCalibration()
+    print
+    print "%12s %22s %22s" % ("tickRate", "SysClock() ms", "measurePrecision() ms")
+    for tickRate in (1000, 1000000, 1000000000):
+        clock = SysClock(tickRate=tickRate)
+        sampleSize = min(10000,max(10,tickRate/10))
+        create = min(timeit.repeat(lambda : SysClock(tickRate=tickRate), number=1, repeat=args.repeat))
+        old = min(timeit.repeat(lambda : measurePrecision(clock, sampleSize), number=1, repeat=args.repeat))
+        print "%12d %22.3f %22.3f" % (tickRate, create*1000, old*1000)
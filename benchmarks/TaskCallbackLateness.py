@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of how late :mod:`dvbcss.task` callbacks happen when some of the
+callbacks are slow (e.g. rendering or network I/O), with callbacks called
+on the scheduler thread and with callbacks dispatched to a
+:class:`~dvbcss.task.CallbackThreadPool`.
+
+Cues are scheduled at regular intervals. Every Nth cue sleeps for a while
+to simulate a slow callback. The lateness of the callbacks, as recorded by the
+scheduler, is reported.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+    from dvbcss.task import Scheduler, CallbackThreadPool
+    import dvbcss.monotonic_time as time
+
+    import argparse
+    import threading
+
+    parser=argparse.ArgumentParser(
+        description="Measure task callback lateness when some callbacks are slow.")
+    parser.add_argument("--cues", dest="cues", type=int, default=500, help="Number of cues (default=500)")
+    parser.add_argument("--interval", dest="interval", type=float, default=0.005, help="Interval between cues in seconds (default=0.005)")
+    parser.add_argument("--slowEvery", dest="slowEvery", type=int, default=20, help="Every Nth cue is slow (default=20)")
+    parser.add_argument("--slowSecs", dest="slowSecs", type=float, default=0.03, help="Duration of a slow cue in seconds (default=0.03)")
+    parser.add_argument("--threads", dest="threads", type=int, default=4, help="Number of threads in the pool (default=4)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    def fast():
+        pass
+
+    def slow():
+        time.sleep(args.slowSecs)
+
+    print "%12s %10s %10s %10s %10s" % ("executor", "mean ms", "50% ms", "99% ms", "max ms")
+    for name in [ "none", "pool" ]:
+        pool = CallbackThreadPool(args.threads) if name == "pool" else None
+        scheduler = Scheduler(executor=pool)
+        clock = CorrelatedClock(sysClock, tickRate=1000, correlation=Correlation(sysClock.ticks, 0))
+
+        done = threading.Event()
+        start = clock.ticks + 100
+        for i in range(0, args.cues):
+            callback = slow if i % args.slowEvery == args.slowEvery-1 else fast
+            scheduler.schedule(clock, start + i*args.interval*1000, callback, (), {})
+        scheduler.schedule(clock, start + args.cues*args.interval*1000, done.set, (), {})
+        done.wait()
+        time.sleep(args.slowSecs * 2)
+
+        h = scheduler.callbackLateness
+        print "%12s %10.3f %10.3f %10.3f %10.3f" % (name, h.mean*1000, h.percentile(50)*1000, h.percentile(99)*1000, h.max*1000)
+
+        scheduler.stop()
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of how accurately :mod:`dvbcss.task` callbacks fire at the time they
+are due, for each of the ways the scheduler can wait:
+
+ * **event** -- waiting only on a :class:`threading.Event` (the default)
+ * **sleep** -- event wait, then :func:`dvbcss.monotonic_time.sleep` for the final stretch
+ * **hybrid** -- event wait, then sleep, then spin for the last part of the final stretch
+ * **spin** -- event wait, then spin for the whole final stretch
+
+The firing error is the time at which the callback was called minus the time it was due.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+    from dvbcss.task import Scheduler
+    from _wcflood import percentile
+    import dvbcss.monotonic_time as time
+
+    import argparse
+    import random
+    import threading
+
+    parser=argparse.ArgumentParser(
+        description="Measure the firing error of task callbacks for different scheduler wait modes.")
+    parser.add_argument("--cues", dest="cues", type=int, default=200, help="Number of cues per mode (default=200)")
+    parser.add_argument("--interval", dest="interval", type=float, default=0.01, help="Mean interval between cues in seconds (default=0.01)")
+    parser.add_argument("--preciseWait", dest="preciseWait", type=float, default=0.005, help="Precise wait duration in seconds (default=0.005)")
+    parser.add_argument("--spin", dest="spin", type=float, default=0.0005, help="Spin duration in seconds for the hybrid mode (default=0.0005)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    modes = [
+        ("event",  0, 0),
+        ("sleep",  args.preciseWait, 0),
+        ("hybrid", args.preciseWait, args.spin),
+        ("spin",   args.preciseWait, args.preciseWait),
+    ]
+
+    print "%8s %10s %10s %10s %10s %10s" % ("mode", "min us", "mean us", "50% us", "99% us", "max us")
+    for name, preciseWaitSecs, spinSecs in modes:
+        scheduler = Scheduler(preciseWaitSecs=preciseWaitSecs, spinSecs=spinSecs)
+        clock = CorrelatedClock(sysClock, tickRate=1000000, correlation=Correlation(sysClock.ticks, 0))
+
+        errors = []
+        def callback(due):
+            errors.append(time.time() - due)
+
+        done = threading.Event()
+        whenTicks = clock.ticks + 100000
+        for i in range(0, args.cues):
+            whenTicks += int(random.uniform(0.5, 1.5) * args.interval * 1000000)
+            scheduler.schedule(clock, whenTicks, callback, (clock.calcWhen(whenTicks),), {})
+        scheduler.schedule(clock, whenTicks + 1000, done.set, (), {})
+        done.wait()
+        scheduler.stop()
+
+        errors.sort()
+        mean = sum(errors) / len(errors)
+        print "%8s %10.1f %10.1f %10.1f %10.1f %10.1f" % (name, errors[0]*1000000, mean*1000000, percentile(errors, 50)*1000000, percentile(errors, 99)*1000000, errors[-1]*1000000)
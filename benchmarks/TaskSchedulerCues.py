@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of the :mod:`dvbcss.task` scheduler with many pending cues (scheduled
+callbacks) on a timeline clock that is repeatedly adjusted, as happens when a
+companion app schedules many events against a timeline that is kept in sync
+using CSS-TS.
+
+For each number of cues, the cues are scheduled against the timeline clock
+(and optionally also some cues against a different, unrelated clock).
+The timeline clock is then adjusted repeatedly. The time taken for the scheduler
+to process each adjustment, and the size of its priority queue afterwards,
+are reported.
+
+The scheduler only reschedules tasks due within its horizon immediately.
+Use ``--horizon none`` to make it reschedule all tasks immediately.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+    from dvbcss.task import Scheduler
+    import dvbcss.monotonic_time as time
+
+    import argparse
+    import threading
+
+    parser=argparse.ArgumentParser(
+        description="Measure the cost of rescheduling many pending tasks when a clock is adjusted.")
+    parser.add_argument("--adjustments", dest="adjustments", type=int, default=50, help="Number of adjustments to the timeline clock (default=50)")
+    parser.add_argument("--other", dest="other", type=int, default=0, help="Number of additional cues scheduled against a different clock (default=0)")
+    parser.add_argument("--horizon", dest="horizon", type=lambda s : None if s.lower()=="none" else float(s), default=1.0, help="Scheduler horizon in seconds, or 'none' (default=1)")
+    parser.add_argument("numCues", type=int, nargs="*", default=[100, 1000, 10000], help="Numbers of cues to try (default= 100 1000 10000)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    def noop():
+        pass
+
+    print "%8s %8s %22s %12s" % ("cues", "other", "ms per adjustment", "queue size")
+    for numCues in args.numCues:
+        scheduler = Scheduler(horizonSecs=args.horizon)
+
+        def sync():
+            done = threading.Event()
+            scheduler.schedule(sysClock, 0, done.set, (), {})
+            done.wait()
+
+        timeline = CorrelatedClock(sysClock, tickRate=90000, correlation=Correlation(sysClock.ticks, 0))
+        other = CorrelatedClock(sysClock, tickRate=1000, correlation=Correlation(sysClock.ticks, 0))
+
+        # cues every 40ms from 1 hour in the future
+        for i in range(0, numCues):
+            scheduler.schedule(timeline, 3600*90000 + i*3600, noop, (), {})
+        for i in range(0, args.other):
+            scheduler.schedule(other, 3600*1000 + i*40, noop, (), {})
+        sync()
+
+        t = time.time()
+        for i in range(0, args.adjustments):
+            timeline.correlation = timeline.correlation.butWith(childTicks=i)
+            sync()
+        duration = time.time() - t
+
+        print "%8d %8d %22.3f %12d" % (numCues, args.other, duration * 1000.0 / args.adjustments, len(scheduler.taskheap))
+        scheduler.stop()
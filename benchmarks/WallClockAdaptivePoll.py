@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Compares the number of Wall Clock protocol requests sent by the
+:class:`~dvbcss.protocol.client.wc.algorithm.KalmanFilterAdaptivePoll` algorithm with
+the number sent by the :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionCandidate`
+algorithm, and the resulting accuracy of the Wall Clock.
+
+The algorithms are run against a simulated server, in simulated time, so an hour passes
+in a few seconds. The server's clock runs at a different frequency to the local clock,
+and the difference wanders randomly. Requests and responses have random delays, and some are lost.
+
+The actual error of the client's Wall Clock, and the dispersion it reports, are sampled once
+every simulated second. The final dispersion is reported, and also the final estimated error
+for algorithms that provide a statistical estimate as well as a strict bound.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock
+    from dvbcss.protocol.wc import WCMessage, Candidate
+    from dvbcss.protocol.client.wc.algorithm import LowestDispersionCandidate, KalmanFilterAdaptivePoll
+    import dvbcss.monotonic_time as monotonic_time
+
+    import argparse
+    import math
+    import random
+
+    parser=argparse.ArgumentParser(
+        description="Compare Wall Clock request rates and accuracy in simulated time.")
+    parser.add_argument("--duration", dest="duration", type=float, default=3600.0, help="Simulated duration in seconds (default=3600)")
+    parser.add_argument("--drift", dest="drift", type=float, default=40.0, help="Initial frequency difference between the clocks in ppm (default=40)")
+    parser.add_argument("--wander", dest="wander", type=float, default=0.01, help="Random wander of the frequency difference in ppm per square root of a second (default=0.01)")
+    parser.add_argument("--rtt", dest="rtt", type=float, nargs=2, default=[0.5, 5.0], help="Range of round-trip times in milliseconds (default=0.5 5.0)")
+    parser.add_argument("--loss", dest="loss", type=float, default=0.05, help="Proportion of requests lost (default=0.05)")
+    parser.add_argument("--seed", dest="seed", type=int, default=1, help="Random number seed (default=1)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    class Simulation(object):
+        """\
+        Simulated passage of time at the client and at the server.
+        """
+        def __init__(self):
+            self.now = 1000.0
+            self.serverSecs = 123456.0
+            self.skew = args.drift / 1000000.0
+            monotonic_time.time = lambda : self.now
+
+        def advance(self, secs):
+            self.skew += random.gauss(0, args.wander / 1000000.0 * math.sqrt(secs))
+            self.serverSecs += secs * (1 + self.skew)
+            self.now += secs
+
+        def measure(self):
+            """\
+            :returns: Candidate, or None if lost. Time advances by the round-trip time.
+            """
+            rtt = random.uniform(*args.rtt) / 1000.0
+            if random.random() < args.loss:
+                return None
+            t1 = sysClock.ticks
+            there = random.uniform(0, rtt)
+            self.advance(there)
+            t2 = int(self.serverSecs * 1000000000)
+            self.advance(rtt - there)
+            msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+            return Candidate(msg, sysClock.ticks)
+
+    def run(createAlgorithm):
+        random.seed(args.seed)
+        sim = Simulation()
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+        alg = createAlgorithm(wallClock)
+        gen = alg.algorithm()
+        requests = 0
+        errors = []
+        outside = 0
+        action = gen.next()
+        start = sim.now
+        while sim.now - start < args.duration:
+            if isinstance(action, (int, float)):
+                requests += 1
+                candidate = sim.measure()
+                if candidate is None:
+                    sim.advance(action)
+                action = gen.send(candidate)
+            else:
+                # sleeping, so sample the error each second
+                remaining = action.secs
+                while remaining > 0:
+                    step = min(1.0, remaining)
+                    sim.advance(step)
+                    remaining -= step
+                    if sim.now - start > 60:    # ignore the first minute, while synchronising
+                        error = abs(wallClock.ticks / 1000000000.0 - sim.serverSecs)
+                        errors.append(error)
+                        if error > wallClock.dispersionAtTime(wallClock.ticks):
+                            outside += 1
+                action = gen.next()
+        errors.sort()
+        if hasattr(alg, "getEstimatedError"):
+            estimated = "%.3f" % (alg.getEstimatedError() / 1000000.0)
+        else:
+            estimated = "-"
+        return requests, errors[len(errors)//2], errors[-1], 100.0 * outside / len(errors), alg.getCurrentDispersion() / 1000000.0, estimated
+
+    algorithms = [
+        ("LowestDispersionCandidate", lambda clock : LowestDispersionCandidate(clock, repeatSecs=1.0, timeoutSecs=0.2)),
+        ("KalmanFilterAdaptivePoll", lambda clock : KalmanFilterAdaptivePoll(clock, minRepeatSecs=1.0, maxRepeatSecs=64.0, timeoutSecs=0.2)),
+    ]
+
+    print "%.0f secs simulated. Drift %.1f ppm, wander %.3f ppm/sqrt(sec), round-trip times %.1f to %.1f ms, %.0f%% loss" % \
+        (args.duration, args.drift, args.wander, args.rtt[0], args.rtt[1], args.loss*100)
+    print
+    print "%26s %10s %16s %14s %18s %16s %14s" % ("algorithm", "requests", "median error ms", "max error ms", "error>dispersion", "dispersion ms", "estimated ms")
+    for name, create in algorithms:
+        requests, median, worst, outside, dispersion, estimated = run(create)
+        print "%26s %10d %16.3f %14.3f %17.1f%% %16.3f %14s" % (name, requests, median*1000, worst*1000, outside, dispersion, estimated)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Compares the candidate filters that can be used with
+:func:`~dvbcss.protocol.client.wc.algorithm.FilterAndPredict` on a simulated congested network,
+where round-trip times are usually short but sometimes spike, and the delays in each direction
+are sometimes very unequal.
+
+For each filter, this reports the proportion of candidates accepted, the error in the offsets
+measured by the accepted candidates, and the time taken to check a candidate.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.protocol.wc import WCMessage, Candidate
+    from dvbcss.protocol.client.wc.algorithm import FilterRttThreshold, FilterRttPercentile, FilterOffsetMedian
+
+    import argparse
+    import random
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Compare Wall Clock candidate filters on a simulated congested network.")
+    parser.add_argument("--rtt", dest="rtt", type=float, nargs=2, default=[2.0, 6.0], help="Range of usual round-trip times in milliseconds (default=2 6)")
+    parser.add_argument("--spikes", dest="spikes", type=float, default=0.15, help="Proportion of candidates whose round-trip time spikes by up to 200ms (default=0.15)")
+    parser.add_argument("--candidates", dest="candidates", type=int, default=10000, help="Number of candidates (default=10000)")
+    args = parser.parse_args()
+
+    random.seed(1)
+    candidates = []
+    for i in range(0, args.candidates):
+        t1 = 5000000000000 + i * 1000000000
+        rtt = int(random.uniform(*args.rtt) * 1000000)
+        if random.random() < args.spikes:
+            rtt += int(random.uniform(0, 200) * 1000000)
+        there = random.randint(0, rtt)  # true offset is zero, so error in measured offset is (there - rtt/2)
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t1+there, t1+there)
+        candidates.append(Candidate(msg, t1 + rtt))
+
+    class Both(object):
+        def __init__(self, *filters):
+            self.filters = filters
+        def checkCandidate(self, candidate):
+            return all([f.checkCandidate(candidate) for f in self.filters])
+
+    filters = [
+        ("FilterRttThreshold(5)", lambda : FilterRttThreshold(thresholdMillis=5)),
+        ("FilterRttThreshold(50)", lambda : FilterRttThreshold(thresholdMillis=50)),
+        ("FilterRttPercentile(50)", lambda : FilterRttPercentile(percentile=50)),
+        ("FilterOffsetMedian()", lambda : FilterOffsetMedian()),
+        ("percentile + median", lambda : Both(FilterRttPercentile(percentile=50), FilterOffsetMedian())),
+    ]
+
+    print "Round-trip times %.1f to %.1f ms, %.0f%% spiking by up to 200 ms" % (args.rtt[0], args.rtt[1], args.spikes*100)
+    print
+    print "%26s %10s %18s %16s %14s" % ("filter", "accepted", "median error ms", "max error ms", "usecs/cand")
+    for name, create in filters:
+        f = create()
+        accepted = [ c for c in candidates if f.checkCandidate(c) ]
+        errors = sorted(abs(c.offset) / 1000000.0 for c in accepted)
+        def run():
+            f = create()
+            for c in candidates:
+                f.checkCandidate(c)
+        secs = min(timeit.repeat(run, number=1, repeat=3))
+        if errors:
+            print "%26s %9.1f%% %18.3f %16.3f %14.2f" % (name, 100.0*len(accepted)/len(candidates), errors[len(errors)//2], errors[-1], secs*1000000/len(candidates))
+        else:
+            print "%26s %9.1f%% %18s %16s %14.2f" % (name, 0.0, "-", "-", secs*1000000/len(candidates))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Measurement harness comparing the round-trip time and dispersion of Wall Clock
+protocol measurements taken over the loopback interface with and without
+kernel receive timestamps (the `kernelTimestamps` option of
+:class:`~dvbcss.protocol.server.wc.WallClockServer` and
+:class:`~dvbcss.protocol.client.wc.WallClockClient`).
+
+Background threads that busy-loop in python can be added to simulate a
+process that is doing other work. They compete with the server and client for
+the global interpreter lock, delaying the reading of the clock after a packet
+is received.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+class _Collector(object):
+    """\
+    Wall clock client algorithm that just collects a fixed number of candidates.
+    """
+    def __init__(self, count, intervalSecs):
+        self.count = count
+        self.intervalSecs = intervalSecs
+        self.candidates = []
+
+    def algorithm(self):
+        from dvbcss.protocol.client.wc.algorithm import Sleep
+        for i in range(0, self.count):
+            candidate = yield 0.5
+            if candidate is not None:
+                self.candidates.append(candidate)
+            yield Sleep(self.intervalSecs)
+
+
+def _busy(flag):
+    while flag:
+        pass
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock
+    from dvbcss.protocol.server.wc import WallClockServer
+    from dvbcss.protocol.client.wc import WallClockClient
+    from _wcflood import percentile
+
+    import argparse
+    import logging
+    import threading
+
+    parser=argparse.ArgumentParser(
+        description="Compare Wall Clock measurement rtt and dispersion with and without kernel receive timestamps.")
+    parser.add_argument("--count", dest="count", type=int, default=500, help="Number of measurements for each run (default=500)")
+    parser.add_argument("--interval", dest="interval", type=float, default=0.01, help="Interval between measurements in seconds (default=0.01)")
+    parser.add_argument("--busy", dest="busy", type=int, default=2, help="Number of background busy threads (default=2)")
+    parser.add_argument("--port", dest="port", type=int, default=6677, help="Port number for the server to bind to (default=6677)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    sysClock = SysClock(tickRate=1000000000)
+
+    busyFlag = [True]
+    for i in range(0, args.busy):
+        t = threading.Thread(target=_busy, args=(busyFlag,))
+        t.daemon = True
+        t.start()
+
+    print "%12s %15s %15s %15s %15s" % ("timestamps", "median rtt us", "99th% rtt us", "median disp us", "99th% disp us")
+    for kernelTimestamps in [False, True]:
+        server = WallClockServer(sysClock, bindaddr="127.0.0.1", bindport=args.port, kernelTimestamps=kernelTimestamps)
+        server.start()
+
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+        collector = _Collector(args.count, args.interval)
+        client = WallClockClient(("127.0.0.1", 0), ("127.0.0.1", args.port), wallClock, collector, kernelTimestamps=kernelTimestamps)
+        client.start()
+        client.thread.join()
+        client.stop()
+        server.stop()
+        client.socket.close()
+        server.socket.close()
+
+        rtts = sorted(c.rtt / 1000.0 for c in collector.candidates)
+        dispersions = sorted(c.calcCorrelationFor(wallClock).initialError * 1000000.0 for c in collector.candidates)
+        print "%12s %15.1f %15.1f %15.1f %15.1f" % (kernelTimestamps,
+            percentile(rtts, 50), percentile(rtts, 99), percentile(dispersions, 50), percentile(dispersions, 99))
+
+    busyFlag.pop()
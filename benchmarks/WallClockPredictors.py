@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Compares the Wall Clock predictors that can be used with
+:func:`~dvbcss.protocol.client.wc.algorithm.FilterAndPredict`, when the server's clock
+runs at a different frequency to the local clock.
+
+Simulated measurement candidates (with random round-trip times) are fed to each predictor.
+For each predictor, this reports the time taken to add a candidate, and both the actual
+error and the reported dispersion of the clock some time after the last candidate.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock
+    from dvbcss.protocol.wc import WCMessage, Candidate
+    from dvbcss.protocol.client.wc.algorithm import PredictSimple, PredictLinearRegression
+
+    import argparse
+    import random
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Compare Wall Clock predictors against a server whose clock drifts relative to the local clock.")
+    parser.add_argument("--drift", dest="drift", type=float, default=40.0, help="Frequency difference between the clocks in ppm (default=40)")
+    parser.add_argument("--rtt", dest="rtt", type=float, nargs=2, default=[0.5, 5.0], help="Range of round-trip times of the candidates in milliseconds (default=0.5 5.0)")
+    parser.add_argument("--candidates", dest="candidates", type=int, default=200, help="Number of candidates, one per second (default=200)")
+    parser.add_argument("--after", dest="after", type=float, default=10.0, help="Seconds after the last candidate to measure error and dispersion (default=10)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+    wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+
+    def serverNanos(localNanos):
+        return 123456789000 + int(localNanos * (1 + args.drift / 1000000.0))
+
+    random.seed(1)
+    candidates = []
+    for i in range(0, args.candidates):
+        t1 = i * 1000000000
+        rtt = int(random.uniform(*args.rtt) * 1000000)
+        t2 = serverNanos(t1 + random.randint(0, rtt))     # true one-way delays are unknown to the client
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+        candidates.append(Candidate(msg, t1 + rtt))
+
+    predictors = [ ("PredictSimple", lambda : PredictSimple(wallClock)) ]
+    for windowSize in (8, 32, 128):
+        predictors.append(("PredictLinearRegression(%d)" % windowSize, lambda windowSize=windowSize : PredictLinearRegression(wallClock, windowSize=windowSize)))
+
+    print "Drift %.1f ppm, round-trip times %.1f to %.1f ms, measured %.0f secs after last of %d candidates" % (args.drift, args.rtt[0], args.rtt[1], args.after, args.candidates)
+    print
+    print "%28s %14s %12s %16s" % ("predictor", "usecs/cand", "error ms", "dispersion ms")
+    for name, create in predictors:
+        def run():
+            predictor = create()
+            for c in candidates:
+                predictor.addCandidate(c)
+            return predictor
+        secs = min(timeit.repeat(run, number=1, repeat=5))
+        predictor = run()
+        speed = getattr(predictor, "predictSpeed", lambda : 1.0)()
+        wallClock.setCorrelationAndSpeed(predictor.predictCorrelation(), speed)
+
+        local = candidates[-1].t4 + int(args.after * 1000000000)
+        error = abs(wallClock.fromParentTicks(local) - serverNanos(local)) / 1000000.0
+        dispersion = wallClock.dispersionAtTime(wallClock.fromParentTicks(local)) * 1000.0
+        print "%28s %14.2f %12.3f %16.3f" % (name, secs * 1000000 / len(candidates), error, dispersion)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of the CPU cost, per request, of building and sending responses in
+:class:`~dvbcss.protocol.server.wc.WallClockServerHandler`.
+
+The responses are "sent" to a socket object that discards them, so that only
+the cost of the handler itself is measured.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+class _DiscardingSocket(object):
+    def sendto(self, data, dest):
+        pass
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock
+    from dvbcss.protocol.wc import WCMessage
+    from dvbcss.protocol.server.wc import WallClockServerHandler
+
+    import argparse
+    import logging
+    import timeit
+
+    parser=argparse.ArgumentParser(
+        description="Measure CPU time per request for the Wall Clock server handler.")
+    parser.add_argument("--count", dest="count", type=int, default=200000, help="Number of requests to handle (default=200000)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    clock = SysClock(tickRate=1000000000)
+    sock = _DiscardingSocket()
+    request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 1234567890, 0, 0).pack()
+    src = ("127.0.0.1", 12345)
+
+    print "%10s %15s" % ("followup", "us/request")
+    for followup in [False, True]:
+        handler = WallClockServerHandler(clock, followup=followup)
+        secs = timeit.timeit(lambda: handler.handle(sock, request, src), number=args.count)
+        print "%10s %15.2f" % (followup, secs * 1000000.0 / args.count)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Load test of a :class:`~dvbcss.protocol.server.wc.WallClockServerPool`, showing
+how the sustained request rate changes as worker processes are added.
+
+The pool is run with each of the numbers of workers specified on the command
+line. Scaling can only be expected while there are spare CPU cores for both the
+workers and the flood clients.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.protocol.server.wc import WallClockServerPool
+    from _wcflood import flood, percentile
+
+    import argparse
+    import logging
+    import multiprocessing
+
+    parser=argparse.ArgumentParser(
+        description="Measure Wall Clock server pool request throughput as the number of workers is increased.")
+    parser.add_argument("--duration", dest="duration", type=float, default=5.0, help="Duration of each run in seconds (default=5)")
+    parser.add_argument("--clients", dest="clients", type=int, default=4, help="Number of flood client processes (default=4)")
+    parser.add_argument("--window", dest="window", type=int, default=16, help="Requests kept in flight by each client (default=16)")
+    parser.add_argument("--port", dest="port", type=int, default=6677, help="Port number for the server to bind to (default=6677)")
+    parser.add_argument("--batch", dest="batchSize", type=int, default=64, help="Batch size used by each worker (default=64)")
+    parser.add_argument("numWorkers", type=int, nargs="*", default=[1, 2, 4], help="Numbers of workers to try (default= 1 2 4)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print "CPU cores: %d" % multiprocessing.cpu_count()
+    print "%10s %15s %15s %15s" % ("workers", "requests/sec", "median rtt us", "99th% rtt us")
+    for numWorkers in args.numWorkers:
+        pool = WallClockServerPool(numWorkers, bindaddr="127.0.0.1", bindport=args.port, batchSize=args.batchSize)
+        pool.start()
+        rate, latencies = flood(("127.0.0.1", args.port), args.duration, args.clients, args.window)
+        pool.stop()
+        print "%10d %15.0f %15.1f %15.1f" % (numWorkers, rate, percentile(latencies, 50)/1000.0, percentile(latencies, 99)/1000.0)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of the sustained request rate of a
+:class:`~dvbcss.protocol.server.wc.WallClockServer` when flooded with requests
+by local clients, and of the round-trip latency those clients observe.
+
+The server is run with each of the batch sizes specified on the command line.
+A batch size of 1 means that batching is not used.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock
+    from dvbcss.protocol.server.wc import WallClockServer
+    from _wcflood import flood, percentile
+
+    import argparse
+    import logging
+
+    parser=argparse.ArgumentParser(
+        description="Measure Wall Clock server request throughput and latency under a local flood of requests.")
+    parser.add_argument("--duration", dest="duration", type=float, default=5.0, help="Duration of each run in seconds (default=5)")
+    parser.add_argument("--clients", dest="clients", type=int, default=2, help="Number of flood client processes (default=2)")
+    parser.add_argument("--window", dest="window", type=int, default=16, help="Requests kept in flight by each client (default=16)")
+    parser.add_argument("--port", dest="port", type=int, default=6677, help="Port number for the server to bind to (default=6677)")
+    parser.add_argument("batchSizes", type=int, nargs="*", default=[1, 64], help="Server batch sizes to try (default= 1 64)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    clock = SysClock(tickRate=1000000000)
+
+    print "%10s %15s %15s %15s" % ("batchSize", "requests/sec", "median rtt us", "99th% rtt us")
+    for batchSize in args.batchSizes:
+        server = WallClockServer(clock, bindaddr="127.0.0.1", bindport=args.port, batchSize=batchSize)
+        server.start()
+        rate, latencies = flood(("127.0.0.1", args.port), args.duration, args.clients, args.window)
+        server.stop()
+        server.socket.close()
+        print "%10d %15.0f %15.1f %15.1f" % (batchSize, rate, percentile(latencies, 50)/1000.0, percentile(latencies, 99)/1000.0)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Benchmark of how long a :class:`~dvbcss.protocol.client.wc.WallClockClient` using the
+:class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionCandidate` algorithm takes
+to reach a target dispersion ("time to lock") after it starts, with and without
+bursts of pipelined requests.
+
+The server is a local stand-in for a Wall Clock server on a poor network: it drops
+a proportion of requests, and delays each request and response by a random amount.
+
+Use the ``--help`` command line option for usage information.
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+
+if __name__ == "__main__":
+    from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+    from dvbcss.protocol.wc import WCMessage
+    from dvbcss.protocol.client.wc import WallClockClient
+    from dvbcss.protocol.client.wc.algorithm import LowestDispersionCandidate
+    import dvbcss.monotonic_time as time
+
+    import argparse
+    import random
+    import socket
+    import threading
+
+    parser=argparse.ArgumentParser(
+        description="Measure Wall Clock client time to lock against a lossy, jittery server.")
+    parser.add_argument("--loss", dest="loss", type=float, default=0.2, help="Proportion of requests the server drops (default=0.2)")
+    parser.add_argument("--jitter", dest="jitter", type=float, default=0.02, help="Maximum random delay added to the round trip of each request and response in seconds (default=0.02)")
+    parser.add_argument("--target", dest="target", type=float, default=0.002, help="Target dispersion in seconds (default=0.002)")
+    parser.add_argument("--bursts", dest="bursts", type=int, nargs="+", default=[1, 4, 8], help="Burst sizes to compare, 1 meaning no bursts (default=1 4 8)")
+    parser.add_argument("--trials", dest="trials", type=int, default=5, help="Number of trials for each burst size (default=5)")
+    parser.add_argument("--maxSecs", dest="maxSecs", type=float, default=30.0, help="Give up on a trial after this many seconds (default=30)")
+    args = parser.parse_args()
+
+    sysClock = SysClock(tickRate=1000000000)
+    serverClock = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(sysClock.ticks, 123456789000))
+
+    class LossyJitteryServer(threading.Thread):
+        """\
+        Responds to Wall Clock requests, dropping some, and delaying the response to others by a random amount.
+        """
+        def __init__(self):
+            super(LossyJitteryServer,self).__init__()
+            self.daemon = True
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind(("127.0.0.1", 0))
+            self.sendLock = threading.Lock()
+
+        def respond(self, msg, src):
+            # the request has now "arrived" after its network delay
+            msg.receiveNanos = serverClock.nanos
+            msg.transmitNanos = serverClock.nanos
+            # then the response takes a network delay too
+            time.sleep(random.random() * args.jitter / 2)
+            with self.sendLock:
+                self.sock.sendto(msg.pack(), src)
+
+        def run(self):
+            while True:
+                data, src = self.sock.recvfrom(WCMessage.MSG_SIZE)
+                if random.random() < args.loss:
+                    continue
+                msg = WCMessage.unpack(data)
+                msg.msgtype = WCMessage.TYPE_RESPONSE
+                msg.setPrecision(0.0001)
+                msg.setMaxFreqError(50)
+                timer = threading.Timer(random.random() * args.jitter / 2, self.respond, (msg, src))
+                timer.daemon = True
+                timer.start()
+
+    server = LossyJitteryServer()
+    server.start()
+
+    def timeToLock(burstSize):
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+        alg = LowestDispersionCandidate(wallClock, repeatSecs=1.0, timeoutSecs=0.2, burstSize=burstSize, burstIntervalSecs=0.005, targetDispersionSecs=args.target)
+        client = WallClockClient(("127.0.0.1", 0), server.sock.getsockname(), wallClock, alg)
+        start = time.time()
+        client.start()
+        try:
+            while alg.getCurrentDispersion() > args.target * 1000000000:
+                if time.time() - start > args.maxSecs:
+                    return float("+inf")
+                time.sleep(0.001)
+            return time.time() - start
+        finally:
+            client.stop()
+            client.socket.close()
+
+    print "Loss %.0f%%, jitter up to %.1f ms, target dispersion %.1f ms" % (args.loss*100, args.jitter*1000, args.target*1000)
+    print
+    print "%10s %12s %12s %12s" % ("burst", "min secs", "median secs", "max secs")
+    for burstSize in args.bursts:
+        times = sorted(timeToLock(burstSize) for _ in range(0, args.trials))
+        print "%10d %12.2f %12.2f %12.2f" % (burstSize, times[0], times[len(times)//2], times[-1])
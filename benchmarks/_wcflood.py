@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Support code for benchmarks: a "flood" client for a Wall Clock server.
+
+Each flood client runs in its own process and keeps a fixed number of requests
+in flight. Whenever a response arrives, another request is sent. The round-trip
+latency of each request-response is recorded (as measured by the client).
+"""
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+import socket
+import multiprocessing
+
+import dvbcss.monotonic_time as time
+from dvbcss.protocol.wc import WCMessage
+
+
+def _floodProcess(dest, durationSecs, window, results):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("127.0.0.1", 0))
+    s.settimeout(0.2)
+
+    def sendRequest():
+        msg = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, time.timeNanos(), 0, 0)
+        s.sendto(msg.pack(), dest)
+
+    latencies = []
+    count = 0
+    endTime = time.time() + durationSecs
+
+    for i in range(0, window):
+        sendRequest()
+
+    while time.time() < endTime:
+        try:
+            data, _ = s.recvfrom(WCMessage.MSG_SIZE)
+        except socket.timeout:
+            # assume responses were lost; refill the window
+            for i in range(0, window):
+                sendRequest()
+            continue
+        now = time.timeNanos()
+        msg = WCMessage.unpack(data)
+        count += 1
+        if count % 16 == 0:
+            latencies.append(now - msg.originateNanos)
+        sendRequest()
+
+    s.close()
+    results.put((count, latencies))
+
+
+def flood(dest, durationSecs, numClients=1, window=8):
+    """\
+    Flood a Wall Clock server with requests.
+
+    :param dest: (host, port) of the server
+    :param durationSecs: How long to run for (in seconds)
+    :param numClients: Number of client processes to run concurrently
+    :param window: Number of requests each client keeps in flight
+
+    :returns: tuple (requestsPerSec, latencies) where latencies is a sorted list of sampled round-trip times in nanoseconds
+    """
+    results = multiprocessing.Queue()
+    procs = [ multiprocessing.Process(target=_floodProcess, args=(dest, durationSecs, window, results)) for i in range(0, numClients) ]
+    for p in procs:
+        p.start()
+
+    total = 0
+    latencies = []
+    for p in procs:
+        count, lats = results.get()
+        total += count
+        latencies.extend(lats)
+    for p in procs:
+        p.join()
+
+    latencies.sort()
+    return float(total) / durationSecs, latencies
+
+
+def percentile(sortedValues, pc):
+    """\
+    :returns: the value at the specified percentile (0 to 100) of a sorted list of values, or nan if the list is empty.
+    """
+    if not sortedValues:
+        return float("nan")
+    i = min(len(sortedValues)-1, int(len(sortedValues) * pc / 100.0))
+    return sortedValues[i]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+The dvbcss.calibration module measures how the :mod:`dvbcss.monotonic_time` clock
+behaves on this host: how long it takes to read, the smallest difference that can be
+seen between two readings (its resolution), and how much the time between consecutive
+readings varies (its jitter).
+
+:class:`~dvbcss.clock.SysClock` uses these measurements as its precision, which is in turn
+reported in its dispersion and by a :doc:`Wall Clock server <wc-server>` that uses it.
+
+Because the measurements depend only on the host and the :data:`~dvbcss.monotonic_time.backend`
+in use, they are made once, and then saved in a small file so that they do not need
+to be made again each time a program starts. The saved measurements are keyed by the
+host name, operating system kernel release and :data:`~dvbcss.monotonic_time.backend`, so a
+file that is shared between hosts (e.g. in a networked home directory) or survives a
+kernel upgrade will not be used mistakenly.
+
+The file used is :data:`DEFAULT_CACHE_PATH` unless the environment variable `DVBCSS_CALIBRATION_FILE`
+specifies a different one. If it is set to an empty string, then no file is used: the measurements
+are made once per process and are not saved. If the file cannot be read or written, the measurements are
+simply made again.
+
+Example
+-------
+
+.. code-block:: python
+
+    >>> from dvbcss.calibration import getCalibration
+    >>> cal = getCalibration()
+    >>> print cal
+    Calibration(backend='ctypes', readCost=9.31e-07, resolution=7.52e-07, jitter=2.05e-07)
+    >>> print cal.resolution
+    7.52e-07
+
+.. versionadded:: 0.6
+"""
+
+import json
+import logging
+import math
+import os
+import platform
+import threading
+
+import dvbcss.monotonic_time as monotonic_time
+
+
+#: Default path of the file that measurements are saved in.
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".dvbcss", "calibration.json")
+
+_CACHE_PATH_ENV = "DVBCSS_CALIBRATION_FILE"
+
+_lock = threading.Lock()
+_calibrations = {}    # cache path -> Calibration, so each file is only consulted once per process
+
+
+class Calibration(object):
+    """\
+    Immutable object representing the measured behaviour of the :mod:`dvbcss.monotonic_time` clock.
+
+    All times are in units of seconds.
+
+    :param backend: The :data:`~dvbcss.monotonic_time.backend` that was measured.
+    :param readCost: Average time taken to read the clock.
+    :param resolution: Smallest difference observed between consecutive readings of the clock.
+    :param jitter: Standard deviation of the difference between consecutive readings of the clock.
+    """
+
+    __slots__ = ("_backend", "_readCost", "_resolution", "_jitter")
+
+    def __init__(self, backend, readCost, resolution, jitter):
+        super(Calibration,self).__init__()
+        self._backend = backend
+        self._readCost = float(readCost)
+        self._resolution = float(resolution)
+        self._jitter = float(jitter)
+
+    @property
+    def backend(self):
+        """(read only) Name of the :data:`~dvbcss.monotonic_time.backend` that was measured."""
+        return self._backend
+
+    @property
+    def readCost(self):
+        """(read only) Average time taken to read the clock (in seconds)."""
+        return self._readCost
+
+    @property
+    def resolution(self):
+        """(read only) Smallest difference observed between consecutive readings of the clock (in seconds)."""
+        return self._resolution
+
+    @property
+    def jitter(self):
+        """(read only) Standard deviation of the difference between consecutive readings of the clock (in seconds)."""
+        return self._jitter
+
+    def _toDict(self):
+        return { "readCost" : self._readCost, "resolution" : self._resolution, "jitter" : self._jitter }
+
+    def __reduce__(self):
+        return (Calibration, (self._backend, self._readCost, self._resolution, self._jitter))
+
+    def __eq__(self, other):
+        return isinstance(other, Calibration) and \
+            self._backend == other._backend and \
+            self._readCost == other._readCost and \
+            self._resolution == other._resolution and \
+            self._jitter == other._jitter
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "Calibration(backend=%s, readCost=%.3g, resolution=%.3g, jitter=%.3g)" % \
+            (repr(self._backend), self._readCost, self._resolution, self._jitter)
+
+
+def measure(sampleSize=10000):
+    """\
+    Measure the behaviour of the :mod:`dvbcss.monotonic_time` clock now, by reading it repeatedly.
+
+    :param sampleSize: (int) Number of consecutive readings to take.
+    :returns: A :class:`Calibration` object.
+
+    Takes roughly `sampleSize` times the cost of reading the clock. If the clock
+    does not change during those readings, then it keeps reading until it does.
+    """
+    if sampleSize < 2:
+        raise ValueError("sampleSize must be at least 2")
+    timeNanos = monotonic_time.timeNanos
+    readings = [timeNanos() for _ in xrange(sampleSize)]
+    while readings[-1] == readings[0]:    # clock is coarser than the time taken to take the readings
+        readings.append(timeNanos())
+
+    diffs = [b-a for a,b in zip(readings, readings[1:])]
+    n = len(diffs)
+    mean = float(readings[-1] - readings[0]) / n
+    variance = sum((d-mean)**2 for d in diffs) / n
+
+    return Calibration(
+        monotonic_time.backend,
+        readCost = mean / 1e9,
+        resolution = min(d for d in diffs if d > 0) / 1e9,
+        jitter = math.sqrt(variance) / 1e9
+    )
+
+
+def _cacheKey():
+    """\
+    :returns: The key under which measurements for this host, kernel and backend are saved.
+    """
+    return "%s %s %s %s" % (platform.node(), platform.system(), platform.release(), monotonic_time.backend)
+
+
+def _loadCache(path):
+    """\
+    :returns: dict of saved measurements from the file, or an empty dict if it cannot be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except (IOError, OSError, ValueError):
+        pass
+    return {}
+
+
+def _saveCache(path, cache):
+    """\
+    Write the dict of measurements to the file. Written to a temporary file first, then renamed, so
+    other processes never see a partially written file. Failure is logged, but otherwise ignored.
+    """
+    tmpPath = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(tmpPath, "wb") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.rename(tmpPath, path)
+    except (IOError, OSError), e:
+        logging.getLogger("dvbcss.calibration").warning("Could not save clock calibration to %s : %s" % (path, str(e)))
+
+
+def getCalibration(cachePath=None, recalibrate=False, sampleSize=10000):
+    """\
+    Get the measurements of the behaviour of the :mod:`dvbcss.monotonic_time` clock for this host.
+
+    The first call reads them from the file, or measures them (using :func:`measure`) and
+    saves them if the file does not contain measurements for this host, kernel and backend.
+    Subsequent calls return the same :class:`Calibration` object.
+
+    :param cachePath: Optional. Path of the file the measurements are saved in, or an empty string to not use a file. If not specified, uses the path in the environment variable `DVBCSS_CALIBRATION_FILE`, or :data:`DEFAULT_CACHE_PATH` if that is not set.
+    :param recalibrate: Optional (default=False). If True, then measure again and replace the saved measurements.
+    :param sampleSize: Optional (default=10000). Number of readings to use if measurements are made. See :func:`measure`.
+    :returns: A :class:`Calibration` object.
+    """
+    if cachePath is None:
+        cachePath = os.environ.get(_CACHE_PATH_ENV, DEFAULT_CACHE_PATH)
+
+    with _lock:
+        if not recalibrate and cachePath in _calibrations:
+            return _calibrations[cachePath]
+
+        key = _cacheKey()
+        cache = _loadCache(cachePath) if cachePath else {}
+        calibration = None
+        if not recalibrate:
+            try:
+                saved = cache[key]
+                calibration = Calibration(monotonic_time.backend, saved["readCost"], saved["resolution"], saved["jitter"])
+                if not calibration.resolution > 0:
+                    calibration = None
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        if calibration is None:
+            calibration = measure(sampleSize)
+            if cachePath:
+                cache[key] = calibration._toDict()
+                _saveCache(cachePath, cache)
+
+        _calibrations[cachePath] = calibration
+        return calibration
+
+
+__all__ = [
+    "DEFAULT_CACHE_PATH",
+    "Calibration",
+    "measure",
+    "getCalibration",
+]
@@ -111,6 +111,31 @@ that you can provide in a :class:`Correlation` - the *initial error* and the
 is calculated as the initial error plus the growth rate multiplied by how much
 time has passed since the point of correlation.
 
+Clocks combine the error contributions of themselves and their ancestors into a
+single model that is cached until the clock (or an ancestor) changes. To
+calculate dispersion for many times at once, use :func:`~ClockBase.dispersionAtTimeBatch`.
+
+
+Change notifications
+--------------------
+
+Objects can register to be notified when a clock changes by calling its :func:`~ClockBase.bind` method.
+When a clock is adjusted, its dependents are notified, and so are the dependents of
+every clock that descends from it. By default this happens immediately, on the thread that
+made the adjustment, once for every change.
+
+To make several adjustments (possibly to several clocks) and notify each dependent only once,
+make them within a :func:`batchUpdates` block:
+
+.. code-block:: python
+
+    with timelineClock.batchUpdates():
+        timelineClock.setCorrelationAndSpeed(Correlation(w, t), 1.0)
+        timelineClock.setAvailability(True)
+
+The :class:`~dvbcss.protocol.eventloop.EventLoop` does this automatically for the callbacks
+it runs in each pass of the loop.
+
 
 Usage examples
 --------------
@@ -351,8 +376,216 @@ When doing this, you must decide whether to allow the speed to be adjusted. If y
 
 
 import dvbcss.monotonic_time as time
+import dvbcss.calibration as calibration
 import dvbcss
+import logging
 import numbers
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _isArray(ticksSeq):
+    """\
+    :returns: True if the sequence of tick values is a :class:`numpy.ndarray`
+    """
+    return numpy is not None and isinstance(ticksSeq, numpy.ndarray)
+
+
+def _asFloatArray(ticksArray):
+    """\
+    :returns: A :class:`numpy.ndarray` of :class:`float` tick values. Avoids the risk of overflow from integer arithmetic.
+    """
+    return numpy.asarray(ticksArray, dtype=float)
+
+
+def _mapTicks(ticksSeq, func):
+    """\
+    Apply a single tick value conversion function to every tick value in a sequence.
+
+    :returns: a :class:`numpy.ndarray` if `ticksSeq` is a :class:`numpy.ndarray`, otherwise a :class:`list`
+    """
+    result = [func(t) for t in ticksSeq]
+    if _isArray(ticksSeq):
+        return numpy.array(result, dtype=float)
+    return result
+
+
+def _anyFloat(*values):
+    """\
+    :returns: True if any of the values is a :class:`float`
+    """
+    for v in values:
+        if isinstance(v, float):
+            return True
+    return False
+
+
+def _definingClass(cls, name):
+    """\
+    :returns: The class, out of `cls` and its base classes, from which `cls` inherits the attribute `name`.
+    """
+    for c in cls.__mro__:
+        if name in c.__dict__:
+            return c
+    return None
+
+
+def _copyTicks(ticksSeq):
+    """\
+    :returns: a copy of the sequence of tick values. A :class:`numpy.ndarray` if `ticksSeq` is a :class:`numpy.ndarray`, otherwise a :class:`list`
+    """
+    if _isArray(ticksSeq):
+        return numpy.array(ticksSeq)
+    return list(ticksSeq)
+
+
+_batchState = threading.local()
+
+
+class _NotificationBatch(object):
+    """\
+    Collects the clocks changed by a thread within :func:`batchUpdates` so that
+    each notifies its dependents only once, when the batch ends.
+    """
+    def __init__(self):
+        super(_NotificationBatch,self).__init__()
+        self.pending = []
+        self.queued = set()
+
+    def changed(self, clock, cause):
+        """\
+        Record that a clock has changed.
+
+        If the clock itself was changed (rather than being notified of a change by its parent)
+        then cached transforms of its descendants are discarded immediately, so that reading
+        them within the batch gives up to date values.
+        """
+        if clock not in self.queued:
+            self.queued.add(clock)
+            self.pending.append(clock)
+        if cause is clock:
+            for dependent in clock.dependents:
+                if isinstance(dependent, ClockBase):
+                    dependent._invalidate()
+
+    def flush(self):
+        """\
+        Notify the dependents of every changed clock.
+
+        A changed clock that has a changed ancestor is skipped, because it will be reached when
+        the change of its ancestor is passed on. Dependents that are themselves clocks are not
+        notified directly. They are queued (once) as changed clocks, so each clock passes the
+        change on only once, and ancestors are always dealt with before their descendants.
+
+        If a dependent raises an exception when notified, it is logged, and the remaining
+        dependents are still notified.
+        """
+        while self.pending:
+            changed = self.queued
+            pending = [ clock for clock in self.pending if not any(a in changed for a in clock.getAncestry()[1:]) ]
+            self.pending = []
+            self.queued = set()
+            for clock in pending:
+                for dependent in list(clock.dependents):
+                    try:
+                        dependent.notify(clock)
+                    except Exception:
+                        logging.getLogger("dvbcss.clock").exception("Exception while notifying %s of a change to %s" % (repr(dependent), repr(clock)))
+
+
+class _BatchUpdates(object):
+    """\
+    Context manager returned by :func:`batchUpdates`.
+    """
+    def __enter__(self):
+        if getattr(_batchState, "batch", None) is None:
+            _batchState.batch = _NotificationBatch()
+            self._outermost = True
+        else:
+            self._outermost = False
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if self._outermost:
+            try:
+                _batchState.batch.flush()
+            finally:
+                _batchState.batch = None
+        return False
+
+
+def batchUpdates():
+    """\
+    Coalesce the change notifications that clocks send to their dependents.
+
+    Use with a `with` statement. Changes made to any clock by the calling thread within the
+    block are not passed on to dependents straight away. Instead, when the
+    (outermost) block ends, each dependent is notified once for each clock it is bound
+    to that changed, or that has an ancestor that changed.
+
+    .. code-block:: python
+
+        with dvbcss.clock.batchUpdates():
+            timelineClock.setCorrelationAndSpeed(corr, speed)
+            timelineClock.setAvailability(True)
+        # dependents of timelineClock (and of its descendants) are notified here
+
+    Tick values read within the block are already up to date. Only the notifications are deferred.
+
+    Blocks can be nested. Changes made by other threads are not batched.
+
+    .. versionadded:: 0.6
+    """
+    return _BatchUpdates()
+
+
+def sampleAll(clocks):
+    """\
+    Read the ticks, effective speed, availability and dispersion of several clocks, all at the same instant.
+
+    The root clock (of each clock hierarchy involved) is only read once, so the values are consistent
+    with each other. This is also cheaper than reading the same properties from each clock separately.
+
+    :param clocks: A sequence of clocks. They do not need to share the same root clock.
+    :returns: A :class:`list` of :class:`ClockSnapshot` objects, one for each clock, in the same order as `clocks`.
+
+    .. code-block:: python
+
+        wallSnap, timelineSnap = sampleAll([wallClock, timelineClock])
+        print "Timeline at", timelineSnap.ticks, "when wall clock at", wallSnap.ticks
+
+    .. versionadded:: 0.6
+    """
+    rootTicks = {}
+    snapshots = []
+    for clock in clocks:
+        xform = clock._rootTransform()
+        if xform:
+            root = xform[0]
+        else:
+            root = clock.getAncestry()[-1]
+        r = rootTicks.get(root, None)
+        if r is None:
+            r = rootTicks[root] = root.ticks
+        if xform:
+            ticks = xform[2] + (r - xform[1])*xform[3]
+        elif clock is root:
+            ticks = r
+        else:
+            ticks = clock.fromRootTicks(r)
+        snapshots.append(ClockSnapshot(
+            clock,
+            ticks,
+            clock.getEffectiveSpeed(),
+            clock.isAvailable(),
+            clock.dispersionAtTime(ticks)
+        ))
+    return snapshots
+
 
 class NoCommonClock(Exception):
     """\
@@ -393,6 +626,11 @@ class ClockBase(object):
         super(ClockBase,self).__init__(**kwargs)
         self.dependents = {}
         self._availability = True
+        self._xform = None
+        self._errModel = None
+        self._effSpeed = None
+        self._xformEpoch = 0
+        self._ancestry = None
         
     @property    
     def ticks(self):
@@ -422,12 +660,20 @@ class ClockBase(object):
         Returns the 'effective speed' of this clock.
         
         This is equal to multiplying together the speed properties of this clock and all of the parents up to the root clock.
+
+        .. versionchanged:: 0.6
+           The result is cached until this clock is next notified of a change (see :func:`notify`).
         """
-        s = 1.0
-        clock = self
-        while clock is not None:
-            s = s*clock.speed;
-            clock = clock.getParent()
+        s = self._effSpeed
+        if s is None:
+            epoch = self._xformEpoch
+            s = 1.0
+            clock = self
+            while clock is not None:
+                s = s*clock.speed;
+                clock = clock.getParent()
+            if epoch == self._xformEpoch:
+                self._effSpeed = s
         return s
 
     @property
@@ -494,9 +740,64 @@ class ClockBase(object):
         :param cause: The clock that is calling this method.
         
         Will notify all dependents of this clock (entities that have registered themselves by calling :func:`bind`).
+        If called within a :func:`batchUpdates` block then dependents are instead notified when the block ends.
+        """
+        batch = getattr(_batchState, "batch", None)
+        if batch is not None:
+            self._discardCache()
+            batch.changed(self, cause)
+        else:
+            if cause is self:
+                # discard cached transforms of all descendants first, so a dependent that
+                # reads a descendant clock when notified does not get a stale value
+                self._invalidate()
+            else:
+                # the changed ancestor has already done this for all its descendants
+                self._discardCache()
+            for dependent in self.dependents:
+                dependent.notify(self)
+
+    def _discardCache(self):
+        """\
+        Discard any cached transform to the root clock, for this clock only.
+        """
+        self._xform = None
+        self._errModel = None
+        self._effSpeed = None
+        self._xformEpoch += 1
+        self._ancestry = None
+
+    def _invalidate(self):
+        """\
+        Discard any cached transform to the root clock, for this clock and its descendants.
         """
+        self._discardCache()
         for dependent in self.dependents:
-            dependent.notify(self)
+            if isinstance(dependent, ClockBase):
+                dependent._invalidate()
+
+    def snapshot(self):
+        """\
+        Read the ticks, effective speed, availability and dispersion of this clock, all at the same instant.
+
+        Use the module function :func:`dvbcss.clock.sampleAll` to do this for several clocks at the same instant.
+
+        :returns: A :class:`ClockSnapshot`
+
+        .. versionadded:: 0.6
+        """
+        return sampleAll((self,))[0]
+
+    def batchUpdates(self):
+        """\
+        Equivalent to the module function :func:`dvbcss.clock.batchUpdates`.
+
+        Note that the batch covers changes to *any* clock made by the calling thread within
+        the block, not just changes to this clock.
+
+        .. versionadded:: 0.6
+        """
+        return batchUpdates()
         
     def bind(self,dependent):
         """\
@@ -583,6 +884,27 @@ class ClockBase(object):
         
         :throws NoCommonClock: if there is no common ancestor clock (meaning it is not possible to convert
         """
+        selfPath, otherPath = self._pathTo(otherClock)
+
+        # 1) walk the path to the common ancestor converting tick values
+        for c in selfPath:
+            ticks = c.toParentTicks(ticks)
+        
+        # 2) walk the path back up from the common ancestor to the other clock, converting tick values
+        for c in otherPath:
+            ticks = c.fromParentTicks(ticks)
+            
+        return ticks
+
+    def _pathTo(self, otherClock):
+        """\
+        Find the path between this clock and another clock, via their common ancestor.
+
+        :returns: tuple (selfPath, otherPath). `selfPath` is a list of clocks from this clock to the common ancestor.
+            `otherPath` is a list of clocks from the common ancestor to `otherClock`. Neither list includes the common ancestor itself.
+
+        :throws NoCommonClock: if there is no common ancestor clock
+        """
         # establish the ancestry of both clocks up to a root
         selfAncestry = self.getAncestry()
         otherAncestry = otherClock.getAncestry()
@@ -598,17 +920,82 @@ class ClockBase(object):
         
         # now we have a path from both clocks to a common ancestor.
         # note that the lists do NOT include the common ancestor itself
-        
-        # 1) walk the path to the common ancestor converting tick values
-        for c in selfAncestry:
-            ticks = c.toParentTicks(ticks)
-        
-        # 2) walk the path back up from the common ancestor to the other clock, converting tick values
         otherAncestry.reverse()
-        for c in otherAncestry:
-            ticks = c.fromParentTicks(ticks)
-            
-        return ticks
+        return selfAncestry, otherAncestry
+
+    def toParentTicksBatch(self, ticksSeq):
+        """\
+        Convert many tick values for this clock to the equivalent tick values for the parent clock.
+
+        Equivalent to calling :func:`toParentTicks` for each tick value. Subclasses override this to convert all values in a single step.
+
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for this clock.
+        :returns: A :class:`list` of the corresponding tick values of the parent clock. Or a :class:`numpy.ndarray` (of floats) if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        .. versionadded:: 0.6
+        """
+        return _mapTicks(ticksSeq, self.toParentTicks)
+
+    def fromParentTicksBatch(self, ticksSeq):
+        """\
+        Convert many tick values for the parent clock to the equivalent tick values for this clock.
+
+        Equivalent to calling :func:`fromParentTicks` for each tick value. Subclasses override this to convert all values in a single step.
+
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for the parent clock.
+        :returns: A :class:`list` of the corresponding tick values of this clock. Or a :class:`numpy.ndarray` (of floats) if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        .. versionadded:: 0.6
+        """
+        return _mapTicks(ticksSeq, self.fromParentTicks)
+
+    def toRootTicksBatch(self, ticksSeq):
+        """\
+        Batch equivalent of :func:`toRootTicks`. The path to the root clock is only worked out once.
+
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for this clock.
+        :returns: A :class:`list` of the corresponding tick values of the root clock (or :ref:`nan`). Or a :class:`numpy.ndarray` if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        .. versionadded:: 0.6
+        """
+        ticksSeq = _copyTicks(ticksSeq)
+        for c in self.getAncestry()[:-1]:
+            ticksSeq = c.toParentTicksBatch(ticksSeq)
+        return ticksSeq
+
+    def fromRootTicksBatch(self, ticksSeq):
+        """\
+        Batch equivalent of :func:`fromRootTicks`. The path from the root clock is only worked out once.
+
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for the root clock.
+        :returns: A :class:`list` of the corresponding tick values of this clock. Or a :class:`numpy.ndarray` if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        .. versionadded:: 0.6
+        """
+        ticksSeq = _copyTicks(ticksSeq)
+        for c in reversed(self.getAncestry()[:-1]):
+            ticksSeq = c.fromParentTicksBatch(ticksSeq)
+        return ticksSeq
+
+    def toOtherClockTicksBatch(self, otherClock, ticksSeq):
+        """\
+        Batch equivalent of :func:`toOtherClockTicks`. The path between the clocks is only worked out once.
+
+        :param otherClock: A :class:`~dvbcss.clock` object representing another clock.
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for this clock.
+        :returns: A :class:`list` of the corresponding tick values of `otherClock` (or :ref:`nan`). Or a :class:`numpy.ndarray` if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        :throws NoCommonClock: if there is no common ancestor clock (meaning it is not possible to convert
+
+        .. versionadded:: 0.6
+        """
+        selfPath, otherPath = self._pathTo(otherClock)
+        ticksSeq = _copyTicks(ticksSeq)
+        for c in selfPath:
+            ticksSeq = c.toParentTicksBatch(ticksSeq)
+        for c in otherPath:
+            ticksSeq = c.fromParentTicksBatch(ticksSeq)
+        return ticksSeq
         
         
     def getAncestry(self):
@@ -619,12 +1006,63 @@ class ClockBase(object):
         
         .. versionadded:: 0.4
         """
-        ancestry = [self]
-        for c in ancestry:
-            p=c.getParent()
-            if p is not None:
-                ancestry.append(p)
-        return ancestry
+        ancestry = self._ancestry
+        if ancestry is None:
+            ancestry = [self]
+            for c in ancestry:
+                p=c.getParent()
+                if p is not None:
+                    ancestry.append(p)
+            self._ancestry = ancestry = tuple(ancestry)
+        return list(ancestry)
+
+    def _affineFromParent(self):
+        """\
+        Describe how the ticks of this clock are calculated from the ticks of its parent, if it is a simple
+        linear relationship: `ticks = selfRef + (parentTicks - parentRef) * scale`.
+
+        :returns: tuple (parentRef, selfRef, scale) or None if the relationship cannot be described this way
+            (or if doing so would change the result, e.g. because the clock uses integer maths).
+
+        The default implementation returns None. Subclasses override this.
+
+        .. versionadded:: 0.6
+        """
+        return None
+
+    def _rootTransform(self):
+        """\
+        Get the linear transform from the ticks of the root clock to the ticks of this clock,
+        composed from the :func:`_affineFromParent` of this clock and each of its ancestors.
+
+        The transform is cached until this clock is next notified of a change (see :func:`notify`).
+
+        :returns: tuple (rootClock, rootRef, selfRef, scale) meaning that `ticks = selfRef + (rootClock.ticks - rootRef) * scale`,
+            or an empty tuple if there is no such transform.
+
+        .. versionadded:: 0.6
+        """
+        xform = self._xform
+        if xform is None:
+            epoch = self._xformEpoch
+            xform = self._compileRootTransform()
+            if epoch == self._xformEpoch:
+                self._xform = xform
+        return xform
+
+    def _compileRootTransform(self):
+        parent = self.getParent()
+        link = self._affineFromParent()
+        if parent is None or link is None:
+            return ()
+        selfParentRef, selfRef, scale = link
+        if parent.getParent() is None:
+            return (parent, selfParentRef, selfRef, scale)
+        parentXform = parent._rootTransform()
+        if not parentXform:
+            return ()
+        root, rootRef, parentRef, parentScale = parentXform
+        return (root, rootRef, selfRef + (parentRef - selfParentRef)*scale, parentScale*scale)
         
     def toParentTicks(self, ticks):
         """\
@@ -708,6 +1146,14 @@ class ClockBase(object):
 
         .. versionadded:: 0.4
         """
+        model = self._errorModel()
+        if model:
+            rootRef, selfRef, scale, disp, terms = model
+            r = rootRef + (t - selfRef)/scale
+            for weight, ref in terms:
+                disp += weight*abs(r - ref)
+            return disp
+
         disp = self._errorAtTime(t)
         
         p = self.getParent()
@@ -716,6 +1162,96 @@ class ClockBase(object):
             disp += p.dispersionAtTime(pt)
         
         return disp
+
+    def dispersionAtTimeBatch(self, ticksSeq):
+        """\
+        Batch equivalent of :func:`dispersionAtTime`.
+
+        :param ticksSeq: A sequence (e.g. :class:`list`) or :class:`numpy.ndarray` of tick values for this clock.
+        :returns: A :class:`list` of the dispersions (in seconds) at each of the tick values. Or a :class:`numpy.ndarray` if `ticksSeq` was a :class:`numpy.ndarray`.
+
+        .. versionadded:: 0.6
+        """
+        model = self._errorModel()
+        if not model:
+            return _mapTicks(ticksSeq, self.dispersionAtTime)
+
+        rootRef, selfRef, scale, err, terms = model
+        if _isArray(ticksSeq):
+            r = rootRef + (_asFloatArray(ticksSeq) - selfRef)/scale
+            disp = numpy.full(r.shape, float(err))
+            for weight, ref in terms:
+                disp += weight*numpy.abs(r - ref)
+            return disp
+
+        result = []
+        for t in ticksSeq:
+            r = rootRef + (t - selfRef)/scale
+            disp = err
+            for weight, ref in terms:
+                disp += weight*abs(r - ref)
+            result.append(disp)
+        return result
+
+    def _errorFromParent(self):
+        """\
+        Describe the potential for error arising from this clock (see :func:`_errorAtTime`), if it has
+        the form: `initialError + growthRate * abs(parentTicks - parentRef) / parent.tickRate`.
+
+        A root clock can only describe its error this way if it is constant (growthRate is zero).
+
+        :returns: tuple (initialError, growthRate, parentRef), or `None` if the error cannot be described this way.
+
+        .. versionadded:: 0.6
+        """
+        return None
+
+    def _errorModel(self):
+        """\
+        Get the model used by :func:`dispersionAtTime`: the error contributions of this clock and
+        all its ancestors, combined and expressed in terms of ticks of the root clock.
+
+        The model is cached until this clock is next notified of a change (see :func:`notify`).
+
+        :returns: tuple (rootRef, selfRef, scale, err, terms). For ticks `t` of this clock the root clock time is
+            `r = rootRef + (t - selfRef) / scale` and the dispersion is `err + sum(weight * abs(r - ref) for weight, ref in terms)`.
+            An empty tuple is returned if there is no such model.
+
+        .. versionadded:: 0.6
+        """
+        model = self._errModel
+        if model is None:
+            epoch = self._xformEpoch
+            model = self._compileErrorModel()
+            if epoch == self._xformEpoch:
+                self._errModel = model
+        return model
+
+    def _compileErrorModel(self):
+        cls = type(self)
+        if not issubclass(_definingClass(cls, "_errorFromParent"), _definingClass(cls, "_errorAtTime")):
+            return ()    # a subclass has changed _errorAtTime without describing it
+        link = self._errorFromParent()
+        if link is None:
+            return ()
+        initialError, growthRate, parentRef = link
+        parent = self.getParent()
+        if parent is None:
+            if growthRate:
+                return ()
+            return (0, 0, 1, initialError, ())
+        xform = self._rootTransform()
+        if not xform or xform[3] == 0:
+            return ()
+        parentModel = parent._errorModel()
+        if not parentModel:
+            return ()
+        pRootRef, pRef, pScale, err, terms = parentModel
+        if growthRate:
+            weight = growthRate * abs(pScale) / float(parent.tickRate)
+            terms = terms + ((weight, pRootRef + (parentRef - pRef) / float(pScale)),)
+        _, rootRef, selfRef, scale = xform
+        return (rootRef, selfRef, scale, err + initialError, terms)
     
     def _errorAtTime(self, t):
         """\
@@ -765,11 +1301,16 @@ class SysClock(ClockBase):
     :param tickRate: Optional (default=1000000). The tick rate of this clock (ticks per second).
     :param maxFreqErrorPpm: Optional (default=500). The maximum frequency error (in units of parts-per-million) of the clock, or an educated best-estimate of it.
     
-    The precision is automatically estimated using the :func:`measurePrecision`
-    function when this clock is created. So creating a SysClock, particularly
-    one with a low tickrate, may incur a noticeable delay at initialisation.
+    The precision is the resolution of the :mod:`~dvbcss.monotonic_time` clock, as measured
+    by :func:`dvbcss.calibration.getCalibration`, or the duration of one tick if that is longer.
+    The measurement is made once and then saved, so that creating a SysClock does not
+    usually incur a delay.
     
-    The measured precision is then reported as the dispersion of this clock.
+    The precision is then reported as the dispersion of this clock.
+    
+    .. versionchanged:: 0.6
+       The precision is taken from :func:`dvbcss.calibration.getCalibration` instead
+       of being measured using :func:`measurePrecision` each time a SysClock is created.
     
     It is not permitted to change the :data:`tickRate` or :data:`speed` property of this clock because it directly represents a system clock.
     """
@@ -782,8 +1323,7 @@ class SysClock(ClockBase):
         if tickRate <= 0 or not isinstance(tickRate, numbers.Number):
             raise ValueError("Cannot set tickRate to "+repr(tickRate))
         self._freq = tickRate
-        s = min(10000,max(10,tickRate/10))
-        self._precision = measurePrecision(self, sampleSize=s)
+        self._precision = max(calibration.getCalibration().resolution, 1.0/tickRate)
         self._maxFreqErrorPpm = maxFreqErrorPpm
         
     @property
@@ -823,12 +1363,15 @@ class SysClock(ClockBase):
         """\
         :returns: The precision of the clock
         
-        The precision that is returned was measured using :func:`measurePrecision` during initialisation.
+        The precision that is returned was determined from :func:`dvbcss.calibration.getCalibration` during initialisation.
         
         .. versionadded:: 0.4
         """
         return self._precision
 
+    def _errorFromParent(self):
+        return (self._precision, 0, 0)
+
     def getRootMaxFreqError(self):
         return self._maxFreqErrorPpm
 
@@ -868,7 +1411,13 @@ class Correlation(object):
             childTicks = c[1]
         
     .. versionadded:: 0.4
+
+    .. versionchanged:: 0.6
+       Uses `__slots__`, so instances are smaller and quicker to create.
     """
+
+    __slots__ = ("_parentTicks", "_childTicks", "_initialError", "_errorGrowthRate")
+
     def __init__(self, parentTicks, childTicks, initialError=0, errorGrowthRate=0):
         super(Correlation,self).__init__()
         self._parentTicks = parentTicks 
@@ -935,6 +1484,10 @@ class Correlation(object):
     def __getitem__(self,index):
         return (self._parentTicks, self._childTicks)[index]
 
+    def __reduce__(self):
+        # needed for pickling (and copying), since there is no __dict__
+        return (Correlation, (self._parentTicks, self._childTicks, self._initialError, self._errorGrowthRate))
+
     def __str__(self):
         return "Correlation(%s, %s, %s, %s)" %\
             (str(self._parentTicks), str(self._childTicks), str(self._initialError), str(self._errorGrowthRate))
@@ -958,6 +1511,64 @@ class Correlation(object):
         return not self.__eq__(obj)
         
 
+class ClockSnapshot(object):
+    """\
+    Immutable object holding values read from a clock at a single instant.
+    Returned by :func:`sampleAll` and :func:`ClockBase.snapshot`.
+
+    .. versionadded:: 0.6
+    """
+
+    __slots__ = ("_clock", "_ticks", "_effectiveSpeed", "_available", "_dispersion")
+
+    def __init__(self, clock, ticks, effectiveSpeed, available, dispersion):
+        super(ClockSnapshot,self).__init__()
+        self._clock = clock
+        self._ticks = ticks
+        self._effectiveSpeed = effectiveSpeed
+        self._available = available
+        self._dispersion = dispersion
+
+    @property
+    def clock(self):
+        """\
+        The clock that was read.
+        """
+        return self._clock
+
+    @property
+    def ticks(self):
+        """\
+        The tick value of the clock.
+        """
+        return self._ticks
+
+    @property
+    def effectiveSpeed(self):
+        """\
+        The effective speed of the clock (see :func:`ClockBase.getEffectiveSpeed`).
+        """
+        return self._effectiveSpeed
+
+    @property
+    def available(self):
+        """\
+        True if the clock was available (see :func:`ClockBase.isAvailable`), otherwise False.
+        """
+        return self._available
+
+    @property
+    def dispersion(self):
+        """\
+        The dispersion of the clock (see :func:`ClockBase.dispersionAtTime`), in seconds.
+        """
+        return self._dispersion
+
+    def __repr__(self):
+        return "ClockSnapshot(clock=%s, ticks=%s, effectiveSpeed=%s, available=%s, dispersion=%s)" %\
+            (repr(self._clock), repr(self._ticks), repr(self._effectiveSpeed), repr(self._available), repr(self._dispersion))
+
+
 @dvbcss._inheritDocs(ClockBase)
 class CorrelatedClock(ClockBase):
     r"""\
@@ -1032,6 +1643,11 @@ class CorrelatedClock(ClockBase):
     
     @property
     def ticks(self):
+        xform = self._xform
+        if xform is None:
+            xform = self._rootTransform()
+        if xform:
+            return xform[2] + (xform[0].ticks - xform[1])*xform[3]
         return self._correlation.childTicks + (self._parent.ticks - self._correlation.parentTicks)*self._freq*self.speed/self._parent.tickRate
         
     def __repr__(self):
@@ -1123,6 +1739,33 @@ class CorrelatedClock(ClockBase):
 
     def fromParentTicks(self, ticks):
         return self._correlation.childTicks + (ticks - self._correlation.parentTicks)*self._freq*self.speed/self._parent.tickRate
+
+    def _affineFromParent(self):
+        pt, ct = self._correlation.parentTicks, self._correlation.childTicks
+        speed, freq, parentFreq = self.speed, self._freq, self._parent.tickRate
+        if not _anyFloat(pt, ct, speed, freq, parentFreq):
+            return None    # integer maths, so the result depends on the order of operations
+        return (pt, ct, freq*speed/parentFreq)
+
+    def toParentTicksBatch(self, ticksSeq):
+        pt, ct = self._correlation.parentTicks, self._correlation.childTicks
+        speed, freq, parentFreq = self.speed, self._freq, self._parent.tickRate
+        if _isArray(ticksSeq):
+            ticksSeq = _asFloatArray(ticksSeq)
+            if speed == 0:
+                return numpy.where(ticksSeq == ct, float(pt), float('nan'))
+            return pt + (ticksSeq - ct)*parentFreq/freq/speed
+        elif speed == 0:
+            return _mapTicks(ticksSeq, self.toParentTicks)
+        else:
+            return [ pt + (t - ct)*parentFreq/freq/speed for t in ticksSeq ]
+
+    def fromParentTicksBatch(self, ticksSeq):
+        pt, ct = self._correlation.parentTicks, self._correlation.childTicks
+        speed, freq, parentFreq = self.speed, self._freq, self._parent.tickRate
+        if _isArray(ticksSeq):
+            return ct + (_asFloatArray(ticksSeq) - pt)*freq*speed/parentFreq
+        return [ ct + (t - pt)*freq*speed/parentFreq for t in ticksSeq ]
     
     def getParent(self):
         return self._parent
@@ -1182,6 +1825,10 @@ class CorrelatedClock(ClockBase):
         deltaSecs = abs(pt - self._correlation.parentTicks) / self._parent.tickRate
         return self._correlation.initialError + deltaSecs * self._correlation.errorGrowthRate
 
+    def _errorFromParent(self):
+        c = self._correlation
+        return (c.initialError, c.errorGrowthRate, c.parentTicks)
+
 
 @dvbcss._inheritDocs(CorrelatedClock)
 class TunableClock(CorrelatedClock):
@@ -1318,6 +1965,11 @@ class RangeCorrelatedClock(ClockBase):
     
     @property
     def ticks(self):
+        xform = self._xform
+        if xform is None:
+            xform = self._rootTransform()
+        if xform:
+            return xform[2] + (xform[0].ticks - xform[1])*xform[3]
         return (self._parent.ticks - self._correlation1.parentTicks) * (self._correlation2.childTicks - self._correlation1.childTicks) / (self._correlation2.parentTicks - self._correlation1.parentTicks) + self._correlation1.childTicks
         
     def __repr__(self):
@@ -1377,6 +2029,30 @@ class RangeCorrelatedClock(ClockBase):
 
     def fromParentTicks(self, ticks):
         return (ticks - self._correlation1.parentTicks) / (self._correlation2.parentTicks - self._correlation1.parentTicks) * (self._correlation2.childTicks - self._correlation1.childTicks) + self._correlation1.childTicks
+
+    def _affineFromParent(self):
+        c1, c2 = self._correlation1, self._correlation2
+        c1c, c1p = c1.childTicks, c1.parentTicks
+        childRange, parentRange = c2.childTicks - c1c, c2.parentTicks - c1p
+        if not _anyFloat(c1c, c1p, childRange, parentRange):
+            return None    # integer maths, so the result depends on the order of operations
+        return (c1p, c1c, childRange / parentRange)
+
+    def toParentTicksBatch(self, ticksSeq):
+        c1, c2 = self._correlation1, self._correlation2
+        c1c, c1p = c1.childTicks, c1.parentTicks
+        childRange, parentRange = c2.childTicks - c1c, c2.parentTicks - c1p
+        if _isArray(ticksSeq):
+            return (_asFloatArray(ticksSeq) - c1c) / childRange * parentRange + c1p
+        return [ (t - c1c) / childRange * parentRange + c1p for t in ticksSeq ]
+
+    def fromParentTicksBatch(self, ticksSeq):
+        c1, c2 = self._correlation1, self._correlation2
+        c1c, c1p = c1.childTicks, c1.parentTicks
+        childRange, parentRange = c2.childTicks - c1c, c2.parentTicks - c1p
+        if _isArray(ticksSeq):
+            return (_asFloatArray(ticksSeq) - c1p) / parentRange * childRange + c1c
+        return [ (t - c1p) / parentRange * childRange + c1c for t in ticksSeq ]
         
     def getParent(self):
         return self._parent
@@ -1454,6 +2130,11 @@ class OffsetClock(ClockBase):
 
     @property
     def ticks(self):
+        xform = self._xform
+        if xform is None:
+            xform = self._rootTransform()
+        if xform:
+            return xform[2] + (xform[0].ticks - xform[1])*xform[3]
         return self._parent.ticks + self._offset * self.getEffectiveSpeed() * self.tickRate
         
     def __repr__(self):
@@ -1493,8 +2174,26 @@ class OffsetClock(ClockBase):
     def fromParentTicks(self, ticks):
         return ticks + self._offset * self.getEffectiveSpeed() * self.tickRate
 
+    def _affineFromParent(self):
+        return (0, self._offset * self.getEffectiveSpeed() * self.tickRate, 1)
+
+    def toParentTicksBatch(self, ticksSeq):
+        offset = self._offset * self.getEffectiveSpeed() * self.tickRate
+        if _isArray(ticksSeq):
+            return _asFloatArray(ticksSeq) - offset
+        return [ t - offset for t in ticksSeq ]
+
+    def fromParentTicksBatch(self, ticksSeq):
+        offset = self._offset * self.getEffectiveSpeed() * self.tickRate
+        if _isArray(ticksSeq):
+            return _asFloatArray(ticksSeq) + offset
+        return [ t + offset for t in ticksSeq ]
+
     def _errorAtTime(self, t):
         return 0
+
+    def _errorFromParent(self):
+        return (0, 0, 0)
         
     @property
     def offset(self):
@@ -1518,7 +2217,10 @@ __all__ = [
     "CorrelatedClock",
     "RangeCorrelatedClock",
     "TunableClock",
-    "measurePrecision"
+    "measurePrecision",
+    "batchUpdates",
+    "sampleAll",
+    "ClockSnapshot",
 ]
 
  
@@ -54,6 +54,16 @@ Example use
 	>>> monotonic_time.sleep(0.5)	# sleep 1/2 second
 
 
+Choice of implementation
+------------------------
+
+An operating system specific implementation is used, as described below.
+On Linux, a cffi binding is used in preference to ctypes if the cffi package is installed.
+The :data:`backend` variable names the implementation that was chosen.
+
+.. versionchanged:: 0.6
+   Added the :data:`backend` variable and the use of cffi.
+
 Operating system implementation details
 ---------------------------------------
 
@@ -69,7 +79,7 @@ the cygwin environment.
 
 The :func:`time` function and its variants are based on the 
 `QueryPerformanceCounter() <http://msdn.microsoft.com/en-us/library/windows/desktop/ms644904.aspx>`_
-high resolution timer system call.
+high resolution timer system call, called via a ctypes binding.
 This clock is guaranteed to be monotonic and have 1 microsecond precision or better.
 
 The :func:`sleep` function is based on the
@@ -104,6 +114,15 @@ The :func:`time` function and its variants are based on the
 `clock_gettime() <http://linux.die.net/man/3/clock_gettime>`_
 system call requesting `CLOCK_MONOTONIC`.
 
+The first of the following ways of calling it that is available is used
+(see :data:`backend`):
+
+ * A `cffi <https://cffi.readthedocs.io/>`_ binding (if the cffi package is installed)
+ * A `ctypes <https://docs.python.org/2/library/ctypes.html>`_ binding
+
+The cffi binding is several times faster than ctypes. All are safe to call from
+multiple threads at the same time.
+
 The :func:`sleep` function is based on the
 `nanosleep() <http://linux.die.net/man/3/nanosleep>`_
 system call. It is unclear whether this uses the same underlying counter as `CLOCK_MONOTONIC`.
@@ -117,7 +136,14 @@ from exceptions import RuntimeError
 import os
 import sys
 
-__all__ = ["TimeoutError", "InterruptedException", "time", "timeNanos", "timeMicros", "sleep"]
+__all__ = ["TimeoutError", "InterruptedException", "time", "timeNanos", "timeMicros", "sleep", "backend"]
+
+#: Name of the implementation used for :func:`time`, :func:`timeNanos` and :func:`timeMicros`.
+#: (e.g. "cffi", "ctypes", "mach_absolute_time" or "QueryPerformanceCounter")
+backend = None
+
+# all implementations available on this platform, keyed by backend name. Used for testing and benchmarking.
+_backends = {}
 
 def _expose(func):
 	global __all__
@@ -223,6 +249,10 @@ def _Darwin_init():
 	
 	def timeMicros():
 		return mach_absolute_time() / dividerMicros
+	
+	candidates = [
+		("mach_absolute_time", (time, timeNanos, timeMicros)),
+	]
 		
 	def sleep(t):
 		if t<=0:
@@ -234,7 +264,103 @@ def _Darwin_init():
 		if retval:
 			raise InterruptedException("Signal interrupted sleep")
 	
-	_bind(time, timeNanos, timeMicros, sleep)
+	_bindTimeFuncs(candidates)
+	_bind(sleep)
+
+
+
+def _Linux_cffiTimeFuncs(CLOCK):
+	"""\
+	Returns implementations of time(), timeNanos() and timeMicros() that call
+	clock_gettime() through a `cffi <https://cffi.readthedocs.io/>`_ binding,
+	if the cffi package is installed.
+	
+	:returns: tuple (backend name, (time, timeNanos, timeMicros)) or None if not available.
+	"""
+	try:
+		import cffi
+	except ImportError:
+		return None
+	
+	ffi = cffi.FFI()
+	ffi.cdef("""
+		struct timespec { long tv_sec; long tv_nsec; };
+		int clock_gettime(int clk_id, struct timespec *tp);
+	""")
+	try:
+		librt = ffi.dlopen("librt.so.1")
+	except OSError:
+		librt = ffi.dlopen(None)
+	clock_gettime = librt.clock_gettime
+	new = ffi.new
+	
+	def _error():
+		errno_ = ffi.errno
+		return OSError(errno_, os.strerror(errno_))
+	
+	# storage for the result is allocated on every call, so concurrent calls
+	# from different threads cannot overwrite each other's result
+	
+	def time():
+		ts = new("struct timespec *")
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec + ts.tv_nsec * 1e-9
+		raise _error()
+	
+	def timeNanos():
+		ts = new("struct timespec *")
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec * 1000000000 + ts.tv_nsec
+		raise _error()
+	
+	def timeMicros():
+		ts = new("struct timespec *")
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec * 1000000 + ts.tv_nsec // 1000
+		raise _error()
+	
+	return "cffi", (time, timeNanos, timeMicros)
+
+
+
+def _Linux_ctypesTimeFuncs(librt, timespec, CLOCK):
+	"""\
+	Returns implementations of time(), timeNanos() and timeMicros() that call
+	clock_gettime() through ctypes.
+	
+	:returns: tuple (backend name, (time, timeNanos, timeMicros))
+	"""
+	import ctypes
+	
+	clock_gettime = librt.clock_gettime
+	clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+	
+	def _error():
+		errno_ = ctypes.get_errno()
+		return OSError(errno_, os.strerror(errno_))
+	
+	# storage for the result is allocated on every call, so concurrent calls
+	# from different threads cannot overwrite each other's result
+	
+	def time():
+		ts = timespec()
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec + ts.tv_nsec * 1e-9
+		raise _error()
+	
+	def timeNanos():
+		ts = timespec()
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec * 1000000000 + ts.tv_nsec
+		raise _error()
+	
+	def timeMicros():
+		ts = timespec()
+		if clock_gettime(CLOCK, ts) == 0:
+			return ts.tv_sec * 1000000 + ts.tv_nsec // 1000
+		raise _error()
+	
+	return "ctypes", (time, timeNanos, timeMicros)
 
 
 
@@ -244,6 +370,9 @@ def _Linux_init(raw=False):
 	
 	For Linux this is based on clock_gettime (CLOCK_MONOTONIC)
 	or CLOCK_MONOTONIC_RAW if argument raw=True
+	
+	The first available of the following is used to call clock_gettime:
+	a cffi binding, or ctypes.
 	"""
 	import ctypes
 	
@@ -259,39 +388,18 @@ def _Linux_init(raw=False):
 		librt = ctypes.CDLL('librt.so.1', use_errno=True)
 	except OSError:
 		librt = ctypes.CDLL('libc.so', use_errno=True)
-	clock_gettime = librt.clock_gettime
 	clock_nanosleep = librt.clock_nanosleep
 
 	class timespec(ctypes.Structure):
 		_fields_ = [ ('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long) ]
 
-	# set argument types of clock_gettime)
-	clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+	# set argument types of clock_nanosleep
 	clock_nanosleep.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(timespec), ctypes.POINTER(timespec)]
 	
-	ts = timespec()
-	tsp = ctypes.pointer(ts)
-	
-	def time():
-		if clock_gettime(CLOCK, tsp) == 0:
-			return ts.tv_sec + ts.tv_nsec * 1e-9
-		else:
-			errno_ = ctypes.get_errno()
-			raise OSError(errno_, os.strerror(errno_))
-	
-	def timeNanos():
-		if clock_gettime(CLOCK, tsp) == 0:
-			return ts.tv_sec * 1000000000 + ts.tv_nsec
-		else:
-			errno_ = ctypes.get_errno()
-			raise OSError(errno_, os.strerror(errno_))
-	
-	def timeMicros():
-		if clock_gettime(CLOCK, tsp) == 0:
-			return ts.tv_sec * 1000000 + ts.tv_nsec / 1000
-		else:
-			errno_ = ctypes.get_errno()
-			raise OSError(errno_, os.strerror(errno_))
+	candidates = [
+		_Linux_cffiTimeFuncs(CLOCK),
+		_Linux_ctypesTimeFuncs(librt, timespec, CLOCK),
+	]
 	
 	def sleep(t):
 		if t<=0:
@@ -304,7 +412,8 @@ def _Linux_init(raw=False):
 			raise OSError(retval, os.strerror(retval))
 			raise InterruptedException("Signal interrupted sleep")
 	
-	_bind(time, timeNanos, timeMicros, sleep)
+	_bindTimeFuncs(candidates)
+	_bind(sleep)
 
 
 
@@ -388,6 +497,10 @@ def _Windows_init():
 		qpc(ctypes.pointer(v))
 		return int((1000000 * v.value) / freq.value)
 	
+	candidates = [
+		("QueryPerformanceCounter", (time, timeNanos, timeMicros)),
+	]
+	
 	def sleep(t):
 		if t<=0:
 			return
@@ -414,7 +527,8 @@ def _Windows_init():
 				raise RuntimeError("Unknown error codde from WaitForSingleObject(): "+str(retval))
 		
 	
-	_bind(time, timeNanos, timeMicros, sleep)
+	_bindTimeFuncs(candidates)
+	_bind(sleep)
 
 
 def _bind(*funcs):
@@ -430,6 +544,23 @@ def _bind(*funcs):
 		func.__doc__ = original.__doc__
 		
 		globals()[name]=func
+
+
+def _bindTimeFuncs(candidates):
+	"""\
+	Bind the first available implementation of time(), timeNanos() and timeMicros()
+	to be the module functions, and record which was chosen in :data:`backend`.
+	
+	All available implementations are recorded in :data:`_backends`.
+	
+	:param candidates: list of (backend name, (time, timeNanos, timeMicros)) tuples, in order of preference. Unavailable ones are None.
+	"""
+	global backend
+	candidates = [c for c in candidates if c is not None]
+	for name, funcs in candidates:
+		_backends[name] = funcs
+	backend, funcs = candidates[0]
+	_bind(*funcs)
 	
 	
 import platform
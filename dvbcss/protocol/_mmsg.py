@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+Internal module providing batched sending and receiving of UDP datagrams
+for IPv4 (AF_INET) sockets.
+
+On Linux this is based on the
+`recvmmsg() <http://man7.org/linux/man-pages/man2/recvmmsg.2.html>`_ and
+`sendmmsg() <http://man7.org/linux/man-pages/man2/sendmmsg.2.html>`_
+system calls (accessed via :mod:`ctypes`) so that many datagrams can be moved
+with a single system call.
+
+On other platforms, or if the system calls cannot be found, a fallback is used
+that handles a single datagram per call of :func:`BatchReceiver.recv` and one
+datagram per system call in :func:`BatchSender.send`.
+
+On Linux it can also retrieve the time at which the kernel received each datagram
+(using the `SO_TIMESTAMPNS <http://man7.org/linux/man-pages/man7/socket.7.html>`_
+socket option). These times are converted to the timescale of
+:func:`dvbcss.monotonic_time.timeNanos`.
+
+This is an internal module. It is used by :class:`dvbcss.protocol.server.wc.UdpRequestServer`
+and :class:`dvbcss.protocol.client.wc.UdpRequestResponseClient`.
+"""
+
+import errno
+import socket
+import struct
+import platform
+
+import dvbcss.monotonic_time as time
+
+
+MSG_DONTWAIT = 0x40
+SO_TIMESTAMPNS = 35
+SCM_TIMESTAMPNS = SO_TIMESTAMPNS
+_CONTROL_SIZE = 64    # enough for one SCM_TIMESTAMPNS message
+
+
+def _Linux_init():
+    """\
+    Binds ctypes declarations for recvmmsg() and sendmmsg().
+
+    :returns: tuple (ctypes, recvmmsg, sendmmsg, realtimeNanos, sockaddr_in, iovec, mmsghdr, cmsghdr, timespec) of ctypes module, functions and structures
+    """
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    recvmmsg = libc.recvmmsg
+    sendmmsg = libc.sendmmsg
+
+    class sockaddr_in(ctypes.Structure):
+        _fields_ = [ ('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_ushort), ('sin_addr', ctypes.c_uint32), ('sin_zero', ctypes.c_char * 8) ]
+
+    class iovec(ctypes.Structure):
+        _fields_ = [ ('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t) ]
+
+    class msghdr(ctypes.Structure):
+        _fields_ = [ ('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                     ('msg_iov', ctypes.POINTER(iovec)), ('msg_iovlen', ctypes.c_size_t),
+                     ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                     ('msg_flags', ctypes.c_int) ]
+
+    class mmsghdr(ctypes.Structure):
+        _fields_ = [ ('msg_hdr', msghdr), ('msg_len', ctypes.c_uint) ]
+
+    class cmsghdr(ctypes.Structure):
+        _fields_ = [ ('cmsg_len', ctypes.c_size_t), ('cmsg_level', ctypes.c_int), ('cmsg_type', ctypes.c_int) ]
+
+    class timespec(ctypes.Structure):
+        _fields_ = [ ('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long) ]
+
+    recvmmsg.argtypes = [ ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p ]
+    sendmmsg.argtypes = [ ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint, ctypes.c_int ]
+
+    CLOCK_REALTIME = 0
+    clock_gettime = libc.clock_gettime
+    clock_gettime.argtypes = [ ctypes.c_int, ctypes.POINTER(timespec) ]
+
+    def realtimeNanos():
+        ts = timespec()
+        clock_gettime(CLOCK_REALTIME, ctypes.byref(ts))
+        return ts.tv_sec * 1000000000 + ts.tv_nsec
+
+    return ctypes, recvmmsg, sendmmsg, realtimeNanos, sockaddr_in, iovec, mmsghdr, cmsghdr, timespec
+
+
+try:
+    if platform.system() == "Linux":
+        _ctypes, _recvmmsg, _sendmmsg, _realtimeNanos, _sockaddr_in, _iovec, _mmsghdr, _cmsghdr, _timespec = _Linux_init()
+        available = True   #: True if batched system calls (and kernel receive timestamps) are available on this platform
+    else:
+        available = False
+except (OSError, AttributeError, ImportError):
+    available = False
+
+
+def enableTimestamps(sock):
+    """\
+    Ask the kernel to record the time at which each datagram is received by a socket.
+
+    :param sock: The :class:`socket.socket` to enable timestamps for.
+    :throws NotImplementedError: if not supported on this platform.
+
+    The kernel may take a moment to start timestamping if no other socket has
+    timestamps enabled. Datagrams that arrive before then are given the time at
+    which they are read instead.
+    """
+    if not available:
+        raise NotImplementedError("Kernel receive timestamps are not supported on this platform.")
+    sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+
+
+def _cmsgAlign(n):
+    align = _ctypes.sizeof(_ctypes.c_size_t)
+    return (n + align - 1) & ~(align - 1)
+
+
+
+class BatchReceiver(object):
+    """\
+    Receives up to `maxCount` datagrams, each of up to `maxMsgSize` bytes, in a single system call.
+
+    Buffers are allocated once, at initialisation, and reused for every call of :func:`recv`.
+
+    If `timestamps` is True then the kernel receive time of each datagram is also returned.
+    The socket must have had timestamps enabled by calling :func:`enableTimestamps`.
+    """
+    def __init__(self, maxMsgSize, maxCount, timestamps=False):
+        super(BatchReceiver,self).__init__()
+        if timestamps and not available:
+            raise NotImplementedError("Kernel receive timestamps are not supported on this platform.")
+        self.maxMsgSize = maxMsgSize
+        self.maxCount = maxCount if available else 1
+        self.timestamps = timestamps
+
+        if available:
+            ctypes = _ctypes
+            self._bufs  = (ctypes.c_char * (maxMsgSize * maxCount))()
+            self._addrs = (_sockaddr_in * maxCount)()
+            self._iovs  = (_iovec * maxCount)()
+            self._msgs  = (_mmsghdr * maxCount)()
+            baseAddr = ctypes.addressof(self._bufs)
+            for i in range(0, maxCount):
+                self._iovs[i].iov_base = baseAddr + i * maxMsgSize
+                self._iovs[i].iov_len  = maxMsgSize
+                hdr = self._msgs[i].msg_hdr
+                hdr.msg_name = ctypes.addressof(self._addrs[i])
+                hdr.msg_iov = ctypes.pointer(self._iovs[i])
+                hdr.msg_iovlen = 1
+
+            if timestamps:
+                self._controls = (ctypes.c_char * (_CONTROL_SIZE * maxCount))()
+                baseAddr = ctypes.addressof(self._controls)
+                for i in range(0, maxCount):
+                    self._msgs[i].msg_hdr.msg_control = baseAddr + i * _CONTROL_SIZE
+
+    def recv(self, sock):
+        """\
+        Receive whatever datagrams are waiting on the socket, without blocking.
+
+        :param sock: The :class:`socket.socket` to receive from. It should already be known to be readable (e.g. using :func:`select.select`).
+        :returns: list of tuples (data, (host, port)), or (data, (host, port), rxNanos) if `timestamps` is True. The list may be empty.
+
+        `rxNanos` is the time at which the kernel received the datagram, in the timescale of :func:`dvbcss.monotonic_time.timeNanos`,
+        or :class:`None` if the kernel did not provide it.
+        """
+        if not available:
+            try:
+                return [ sock.recvfrom(self.maxMsgSize) ]
+            except socket.timeout:
+                return []
+
+        namelen = _ctypes.sizeof(_sockaddr_in)
+        for i in range(0, self.maxCount):
+            self._msgs[i].msg_hdr.msg_namelen = namelen
+            if self.timestamps:
+                self._msgs[i].msg_hdr.msg_controllen = _CONTROL_SIZE
+
+        n = _recvmmsg(sock.fileno(), self._msgs, self.maxCount, MSG_DONTWAIT, None)
+        if n < 0:
+            errno_ = _ctypes.get_errno()
+            if errno_ in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise socket.error(errno_, "recvmmsg failed")
+
+        if self.timestamps:
+            # kernel timestamps are CLOCK_REALTIME. Map them onto the monotonic clock
+            # using the difference between the two clocks now
+            realBefore = _realtimeNanos()
+            monotonic = time.timeNanos()
+            realAfter = _realtimeNanos()
+            realToMonotonic = monotonic - (realBefore + realAfter) / 2
+
+        raw = self._bufs.raw
+        size = self.maxMsgSize
+        received = []
+        for i in range(0, n):
+            addr = self._addrs[i]
+            host = socket.inet_ntoa(struct.pack("=I", addr.sin_addr))
+            port = socket.ntohs(addr.sin_port)
+            start = i*size
+            if self.timestamps:
+                rxNanos = self._timestampOf(i)
+                if rxNanos is not None:
+                    rxNanos += realToMonotonic
+                received.append( (raw[start:start+self._msgs[i].msg_len], (host, port), rxNanos) )
+            else:
+                received.append( (raw[start:start+self._msgs[i].msg_len], (host, port)) )
+        return received
+
+    def _timestampOf(self, i):
+        """\
+        :returns: The SCM_TIMESTAMPNS time (in nanoseconds) from the control messages received with the i'th datagram, or None if there is not one.
+        """
+        ctypes = _ctypes
+        hdr = self._msgs[i].msg_hdr
+        base = hdr.msg_control
+        offset = 0
+        hdrSize = ctypes.sizeof(_cmsghdr)
+        while offset + hdrSize <= hdr.msg_controllen:
+            cmsg = _cmsghdr.from_address(base + offset)
+            if cmsg.cmsg_len < hdrSize:
+                break
+            if cmsg.cmsg_level == socket.SOL_SOCKET and cmsg.cmsg_type == SCM_TIMESTAMPNS:
+                ts = _timespec.from_address(base + offset + _cmsgAlign(hdrSize))
+                return ts.tv_sec * 1000000000 + ts.tv_nsec
+            offset += _cmsgAlign(cmsg.cmsg_len)
+        return None
+
+
+
+class BatchSender(object):
+    """\
+    Sends a list of datagrams using as few system calls as possible.
+    """
+    def __init__(self, maxCount):
+        super(BatchSender,self).__init__()
+        self.maxCount = maxCount
+        if available:
+            self._addrs = (_sockaddr_in * maxCount)()
+            self._iovs  = (_iovec * maxCount)()
+            self._msgs  = (_mmsghdr * maxCount)()
+            for i in range(0, maxCount):
+                hdr = self._msgs[i].msg_hdr
+                hdr.msg_name = _ctypes.addressof(self._addrs[i])
+                hdr.msg_namelen = _ctypes.sizeof(_sockaddr_in)
+                hdr.msg_iov = _ctypes.pointer(self._iovs[i])
+                hdr.msg_iovlen = 1
+                self._addrs[i].sin_family = socket.AF_INET
+
+    def send(self, sock, packets):
+        """\
+        Send datagrams.
+
+        :param sock: The :class:`socket.socket` to send from.
+        :param packets: list of tuples (payload, (host, port)). Each payload must be a :class:`str` or :class:`bytearray`.
+        """
+        if not available:
+            for payload, dest in packets:
+                sock.sendto(payload, dest)
+            return
+
+        ctypes = _ctypes
+        fd = sock.fileno()
+
+        for first in range(0, len(packets), self.maxCount):
+            chunk = packets[first:first+self.maxCount]
+            keepAlive = []
+            for i, (payload, (host, port)) in enumerate(chunk):
+                if isinstance(payload, bytearray):
+                    buf = (ctypes.c_char * len(payload)).from_buffer(payload)
+                    self._iovs[i].iov_base = ctypes.addressof(buf)
+                else:
+                    buf = ctypes.c_char_p(payload)
+                    self._iovs[i].iov_base = ctypes.cast(buf, ctypes.c_void_p).value
+                keepAlive.append(buf)
+                self._iovs[i].iov_len = len(payload)
+                self._addrs[i].sin_port = socket.htons(port)
+                self._addrs[i].sin_addr = struct.unpack("=I", socket.inet_aton(host))[0]
+
+            sent = 0
+            while sent < len(chunk):
+                n = _sendmmsg(fd, ctypes.byref(self._msgs[sent]), len(chunk)-sent, 0)
+                if n < 0:
+                    errno_ = ctypes.get_errno()
+                    if errno_ == errno.EINTR:
+                        continue
+                    elif errno_ == errno.EAGAIN:  # fall back to blocking sendto for the remainder
+                        for payload, dest in chunk[sent:]:
+                            sock.sendto(payload, dest)
+                        break
+                    raise socket.error(errno_, "sendmmsg failed")
+                sent += n
+            del keepAlive
@@ -166,7 +166,7 @@ from dvbcss.protocol.ts import SetupData
 from dvbcss.protocol.ts import ControlTimestamp, AptEptLpt, Timestamp
 from dvbcss.protocol.client import WrappedWebSocket
 from dvbcss.protocol.client import ConnectionError
-from dvbcss.clock import CorrelatedClock, Correlation
+from dvbcss.clock import CorrelatedClock, Correlation, sampleAll
 
 
 
@@ -549,9 +549,13 @@ class TSClientClockController(object):
         :param includeApt: (:class:`bool`) Set to False if the Actual Presentation Timestamp is *not* to be included in the message (default=True)
         """
         ael = AptEptLpt()
-        now = self.timelineClock.ticks
 
-        if self.earliestClock is not None and self.earliestClock.isAvailable():
+        # read all the clocks at the same instant, so their availability is consistent with 'now'
+        clocks = [ c for c in (self.timelineClock, self.earliestClock, self.latestClock) if c is not None ]
+        snapshots = dict((snap.clock, snap) for snap in sampleAll(clocks))
+        now = snapshots[self.timelineClock].ticks
+
+        if self.earliestClock is not None and snapshots[self.earliestClock].available:
             ael.earliest = Timestamp( \
                 contentTime   = self.earliestClock.correlation.childTicks,
                 wallClockTime = self.earliestClock.correlation.parentTicks \
@@ -559,7 +563,7 @@ class TSClientClockController(object):
         else:
             ael.earliest = Timestamp(contentTime = now, wallClockTime = float("-inf"))
         
-        if self.latestClock is not None and self.earliestClock.isAvailable():
+        if self.latestClock is not None and snapshots[self.latestClock].available:
             ael.latest = Timestamp( \
                 contentTime   = self.latestClock.correlation.childTicks,
                 wallClockTime = self.latestClock.correlation.parentTicks \
@@ -567,7 +571,7 @@ class TSClientClockController(object):
         else:
             ael.latest = Timestamp(contentTime = now, wallClockTime = float("+inf"))
     
-        if includeApt and self.timelineClock.isAvailable():
+        if includeApt and snapshots[self.timelineClock].available:
             ael.actual = Timestamp( \
                 contentTime   = self.timelineClock.correlation.childTicks,
                 wallClockTime = self.timelineClock.correlation.parentTicks \
@@ -581,9 +585,10 @@ class TSClientClockController(object):
         """
         if self.latestCt is None:
             return "Nothing received from TV yet."
+        snapshot = self.timelineClock.snapshot()
         speed = self.timelineClock.speed
-        pos = float(self.timelineClock.ticks) / float(self.timelineClock.tickRate)
-        available = self.timelineClock.isAvailable()
+        pos = float(snapshot.ticks) / float(self.timelineClock.tickRate)
+        available = snapshot.available
         text="Status: "
         if available:
             text += "AVAILABLE.    "
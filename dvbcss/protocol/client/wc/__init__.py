@@ -81,10 +81,14 @@ ticking at this rate.
 
 import threading
 import socket
+import select
 import logging
 import dvbcss.monotonic_time as time
 
 from dvbcss.protocol.wc import WCMessage, Candidate
+from dvbcss.protocol.eventloop import Waker
+from dvbcss.protocol import _mmsg
+from dvbcss.clock import SysClock
 
 import algorithm
 
@@ -94,8 +98,12 @@ class UdpRequestResponseClient(object):
     
     After creating, call start() to kick off the thread.
 
-    stop() will stop the thread the next time the handler asks to
-    send a request.
+    stop() will stop the thread immediately, even if it is waiting for a
+    response.
+
+    If an :class:`~dvbcss.protocol.eventloop.EventLoop` is provided, then
+    no thread is used. Instead the event loop runs the handler, and the handler
+    must not block.
     
     You provide a handler to implement the protocol specifics.
     It should be a python generator function.
@@ -116,10 +124,14 @@ class UdpRequestResponseClient(object):
     The yield statement will return a tuple:
       (None, None) ... if timeout happened, otherwise...
       (reply, (srcaddr, srcport))
+    or, if the `timestamps` argument is True:
+      (reply, (srcaddr, srcport), rxNanos)
       
     reply = the bytes received, as a string   
     srcaddr = the IP address it came from, as a string
     srcport = the port number it came from, as a number
+    rxNanos = the time the kernel received it, in the timescale of
+              dvbcss.monotonic_time.timeNanos() ... or None if unknown
     
     
     e.g. a simple handler that sends a request every second(ish),
@@ -139,33 +151,62 @@ class UdpRequestResponseClient(object):
             print "Will wait 1 second before trying again"
             time.sleep(1.0)
     """
-    def __init__(self, socket, handlerIterator, maxMsgSize, **kwargs):
+    def __init__(self, socket, handlerIterator, maxMsgSize, loop=None, timestamps=False, **kwargs):
         """\
         :param socket:  (udp socket) Bound socket ready to receive (and send) UDP packets
         :param handlerIterator: (generator) Handler for initiating and receiving results of request-response interactions
         :param maxMsgSize: (int) Maximum anticipated message size in bytes.
+        :param loop: Optional. An :class:`~dvbcss.protocol.eventloop.EventLoop` to run the client, instead of it having a thread of its own.
+        :param timestamps: Optional (default=False). If True, the time at which the kernel received each reply is also passed to the handler. Only supported on Linux.
         """
         super(UdpRequestResponseClient,self).__init__(**kwargs)
         self.log=logging.getLogger("dvbcss.protocol.client.wc.UdpRequestResponseClient")
         self.socket = socket
         self.handler=handlerIterator
         self.maxMsgSize=maxMsgSize
+        self.loop=loop
         self.thread=None
+        self._running=False
+        self._timer=None
+        if timestamps:
+            _mmsg.enableTimestamps(socket)
+            self._receiver=_mmsg.BatchReceiver(maxMsgSize, 1, timestamps=True)
+        else:
+            self._receiver=None
+
+    def _receive(self):
+        """\
+        Internal method - receive a reply from the socket, which is known to be readable.
+
+        :returns: tuple (reply, src) or (reply, src, rxNanos) ready to be passed to the handler. Or :class:`None` if nothing was received.
+        """
+        if self._receiver is None:
+            return self.socket.recvfrom(self.maxMsgSize)
+        received = self._receiver.recv(self.socket)
+        if received:
+            return received[0]
+        else:
+            return None
 
     def start(self):
         """\
         Call this method to start the client running. This function call returns immediately
-        and the client proceeds to run in a thread in the background.
+        and the client proceeds to run in a thread in the background (or is run by the event loop).
         
         Does nothing if the client is already running.
         """
-        if self.thread is not None:
+        if self._running:
             return
+        self._running=True
         self._pleaseStop=False
-        self.thread = threading.Thread(target=self.run)
-        self.thread.daemon=True
         self.log.debug("Starting")
-        self.thread.start()
+        if self.loop is not None:
+            self.loop.callSoon(self._step, None)
+        else:
+            self._waker = Waker()
+            self.thread = threading.Thread(target=self.run)
+            self.thread.daemon=True
+            self.thread.start()
         
     def stop(self):
         """\
@@ -173,11 +214,20 @@ class UdpRequestResponseClient(object):
         
         If the client is not running then nothing happens and this call returns immediately.
         """
-        if self.thread is None:
+        if not self._running:
             return
         self._pleaseStop=True
         self.log.debug("Stopping")
-        self.thread.join()
+        if self.loop is not None:
+            self.loop.removeReader(self.socket)
+            if self._timer is not None:
+                self._timer.cancel()
+        else:
+            self._waker.wake()
+            self.thread.join()
+            self.thread=None
+            self._waker.close()
+        self._running=False
         self.log.debug("Stopped")
         
     def run(self):
@@ -187,15 +237,62 @@ class UdpRequestResponseClient(object):
                 if sendRequest is not None:
                     sendPayload,sendDest = sendRequest
                     self.socket.sendto(sendPayload,sendDest)
-                self.socket.settimeout(waitTimeSecs)
-                try:
-                    reply,src=self.socket.recvfrom(self.maxMsgSize)
-                    sendRequest, waitTimeSecs = self.handler.send((reply,src))
-                except socket.timeout:
+                waitUntil = time.time() + waitTimeSecs
+                result = None
+                while result is None:
+                    readable, _, _ = select.select([self.socket, self._waker], [], [], max(0, waitUntil - time.time()))
+                    if self._pleaseStop or self.socket not in readable:
+                        break
+                    # nothing may be received after all (e.g. if the datagram was discarded), in which case keep waiting
+                    result = self._receive()
+                    if result is None and time.time() >= waitUntil:
+                        break
+                if self._pleaseStop:
+                    break
+                if result is not None:
+                    sendRequest, waitTimeSecs = self.handler.send(result)
+                else:
                     sendRequest, waitTimeSecs = self.handler.send((None,None))
         except StopIteration:
             pass
 
+    def _step(self, result):
+        """\
+        Internal method - used when run by an event loop. Passes the result of waiting
+        to the handler, then carries out what it next asks for.
+
+        :param result: None if this is the first step, otherwise a tuple (reply, src) or (None, None) as is to be passed to the handler.
+        """
+        if self._pleaseStop:
+            return
+        try:
+            if result is None:
+                sendRequest, waitTimeSecs = self.handler.next()
+            else:
+                sendRequest, waitTimeSecs = self.handler.send(result)
+        except StopIteration:
+            self.loop.removeReader(self.socket)
+            return
+        if self._pleaseStop:
+            return
+        if sendRequest is not None:
+            sendPayload,sendDest = sendRequest
+            self.socket.sendto(sendPayload,sendDest)
+        self._timer = self.loop.callLater(waitTimeSecs, self._onTimeout)
+        self.loop.addReader(self.socket, self._onReadable)
+
+    def _onReadable(self, sock):
+        result = self._receive()
+        if result is None:
+            return
+        self._timer.cancel()
+        self.loop.removeReader(self.socket)
+        self._step(result)
+
+    def _onTimeout(self):
+        self.loop.removeReader(self.socket)
+        self._step((None,None))
+
 
 def _createUdpSocket((bindaddr, bindport)):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -221,7 +318,7 @@ class WallClockClient(UdpRequestResponseClient):
         
     It is recommended to use the :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionCandidate` algorithm.
     """
-    def __init__(self, (bindaddr,bindport), (dstaddr,dstport), wallClock, wcAlgorithm):
+    def __init__(self, (bindaddr,bindport), (dstaddr,dstport), wallClock, wcAlgorithm, loop=None, kernelTimestamps=False):
         """\
         **Initialisation takes the following parameters:**
         
@@ -229,6 +326,8 @@ class WallClockClient(UdpRequestResponseClient):
         :param (dstaddr,dstport): (:class:`str`, :class:`int`) A tuple containing the IP address (as a string) and port (as an int) of the Wall Clock server
         :param wallClock: (:mod:`~dvbcss.clock`) The local clock that will be controlled to be a Wall Clock. Measurements will be taken from its parent and candidates provided to the algorithm will represent the relationship between that (parent) clock and the server's wall clock.
         :param wcAlgorithm: (:ref:`algorithm <algorithms>`) The algorithm for the client to use to update the clock.
+        :param loop: (:class:`~dvbcss.protocol.eventloop.EventLoop`) Optional. Event loop to run the client, instead of it having a thread of its own.
+        :param kernelTimestamps: (bool) Optional. Set to True to use the time at which the kernel received each response as its receive time (`t4`). Only supported on Linux, and requires that the root of the clock is a :class:`~dvbcss.clock.SysClock`.
         
         .. versionchanged: 0.4
         
@@ -236,13 +335,74 @@ class WallClockClient(UdpRequestResponseClient):
            :class:`~dvbcss.clock.TunableClock` should still work becuase it is a subclass of
            :class:`~dvbcss.clock.CorrelatedClock`.
         """
+        if kernelTimestamps and not isinstance(wallClock.getRoot(), SysClock):
+            raise ValueError("kernelTimestamps requires the root of the clock to be a SysClock")
         self.algorithm = wcAlgorithm #: (read only) The :ref:`algorithm <algorithms>` object being used with this WallClockClient
         algGenerator = self.algorithm.algorithm()
         socket=_createUdpSocket((bindaddr,bindport))
         msgSize=WCMessage.MSG_SIZE
         handler = algorithm.algorithmWrapper((dstaddr,dstport), wallClock.getParent(), algGenerator)
-        super(WallClockClient, self).__init__(socket, handler, msgSize)
+        super(WallClockClient, self).__init__(socket, handler, msgSize, loop, kernelTimestamps)
+
+
+
+class MultiServerWallClockClient(UdpRequestResponseClient):
+    """\
+    Client side of the CSS-WC protocol that takes measurements from several (e.g. redundant)
+    Wall Clock servers at once.
+
+    Each time the algorithm asks for a measurement to be taken, a request is sent to every
+    server, one straight after the other, from the same socket. The responses are collected
+    separately for each server, and the algorithm is given a :class:`~dvbcss.protocol.wc.Candidate`
+    (or :class:`None`) for each server (see :func:`~dvbcss.protocol.client.wc.algorithm.multiServerAlgorithmWrapper`).
+
+    It is recommended to use the :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionServer` algorithm,
+    which follows whichever server gives the lowest dispersion, and fails over to another server
+    if that one stops responding.
+
+    .. code-block:: python
+
+        from dvbcss.clock import SysClock, CorrelatedClock
+        from dvbcss.protocol.client.wc import MultiServerWallClockClient
+        from dvbcss.protocol.client.wc.algorithm import LowestDispersionServer
+
+        sysClock=SysClock()
+        wallClock=CorrelatedClock(sysClock,tickRate=1000000000)
+
+        algorithm = LowestDispersionServer(wallClock,repeatSecs=1,timeoutSecs=0.5)
+
+        bind = ("0.0.0.0", 6677)
+        servers = [ ("192.168.0.115", 6677), ("192.168.0.116", 6677) ]
+
+        wc_client=MultiServerWallClockClient(bind, servers, wallClock, algorithm)
+        wc_client.start()
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, (bindaddr,bindport), servers, wallClock, wcAlgorithm, loop=None, kernelTimestamps=False):
+        """\
+        **Initialisation takes the following parameters:**
+
+        :param (bindaddr,bindport): (:class:`str`, :class:`int`) A tuple containing the IP address (as a string) and port (as an int) to bind to to listen for incoming packets
+        :param servers: A list of (:class:`str`, :class:`int`) tuples, each containing the IP address (as a string) and port (as an int) of a Wall Clock server
+        :param wallClock: (:mod:`~dvbcss.clock`) The local clock that will be controlled to be a Wall Clock. Measurements will be taken from its parent.
+        :param wcAlgorithm: The algorithm for the client to use to update the clock. It must accept the results from several servers (e.g. :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionServer`).
+        :param loop: (:class:`~dvbcss.protocol.eventloop.EventLoop`) Optional. Event loop to run the client, instead of it having a thread of its own.
+        :param kernelTimestamps: (bool) Optional. Set to True to use the time at which the kernel received each response as its receive time (`t4`). Only supported on Linux, and requires that the root of the clock is a :class:`~dvbcss.clock.SysClock`.
+        """
+        servers = list(servers)
+        if len(servers) == 0:
+            raise ValueError("At least one server must be specified")
+        if kernelTimestamps and not isinstance(wallClock.getRoot(), SysClock):
+            raise ValueError("kernelTimestamps requires the root of the clock to be a SysClock")
+        self.algorithm = wcAlgorithm #: (read only) The algorithm object being used with this MultiServerWallClockClient
+        self.servers = servers       #: (read only) List of the ("<ip-addr>",port) of the servers
+        algGenerator = self.algorithm.algorithm()
+        socket=_createUdpSocket((bindaddr,bindport))
+        msgSize=WCMessage.MSG_SIZE
+        handler = algorithm.multiServerAlgorithmWrapper(servers, wallClock.getParent(), algGenerator)
+        super(MultiServerWallClockClient, self).__init__(socket, handler, msgSize, loop, kernelTimestamps)
 
 
 
-__all__ = [ "WallClockClient", "algorithm" ]
+__all__ = [ "WallClockClient", "MultiServerWallClockClient", "algorithm" ]
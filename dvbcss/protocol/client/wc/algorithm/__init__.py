@@ -28,6 +28,26 @@ The :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionCandidate` algo
 It uses the candidate with the lowest dispersion.
 
 
+Multiple server algorithm
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+The :class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionServer` algorithm is for use
+with a :class:`~dvbcss.protocol.client.wc.MultiServerWallClockClient`. It follows whichever of
+several servers currently gives the lowest dispersion, and fails over to another server
+if the one it is following stops responding.
+
+
+Kalman filter algorithm
+~~~~~~~~~~~~~~~~~~~~~~~
+
+The :class:`~dvbcss.protocol.client.wc.algorithm.KalmanFilterAdaptivePoll` algorithm tracks both the
+offset and the frequency difference between the local clock and the server's Wall Clock, and compensates
+for the frequency difference. It sends requests frequently while the estimate is uncertain,
+and increasingly rarely as it settles, which greatly reduces the number of requests once synchronised.
+The dispersion it reports grows between requests, so is larger than that of
+:class:`~dvbcss.protocol.client.wc.algorithm.LowestDispersionCandidate` when requests are infrequent.
+
+
 Simple algorithm
 ~~~~~~~~~~~~~~~~
 
@@ -60,6 +80,27 @@ An algorithm is an object that has the following method:
     The algorithm can then use the Candidate object in its algorithm for estimating the wall clock (and in
     the case of most practical implementations: adjusting a :mod:`~dvbcss.clock` object).
 
+    To wait (without sending a request) the generator yields a :class:`Sleep` object:
+
+    .. code-block:: python
+
+        yield Sleep(waitSecs)
+
+    The yield statement will return :class:`None` once the time has passed. Algorithms should wait
+    this way, rather than by calling :func:`time.sleep`, so that they do not block other work
+    if the Wall Clock client is being run by an :class:`~dvbcss.protocol.eventloop.EventLoop`.
+
+    To send several requests without waiting for the response to each one before sending the next,
+    the generator yields a :class:`Burst` object:
+
+    .. code-block:: python
+
+        candidates = yield Burst(count, intervalSecs, timeoutSecs)
+
+    The yield statement will return a list of :class:`~dvbcss.protocol.wc.Candidate` objects,
+    one for each response received. This can be used to reach a low dispersion more quickly,
+    for example when first synchronising.
+
     
 Here is an example of a simple naive algorithm that adjusts a :class:`~dvbcss.clock.CorrelatedClock` object
 using the most recent measurement, irrespective of influencing factors such as previous measurements or
@@ -78,16 +119,20 @@ for responses of 0.5 seconds:
                 candidate=(yield 0.5)
                 if candidate is not None:
                     self.clock.correlation = candidate.calcCorrelationFor(self.clock)
-                    time.sleep(1.0)
+                    yield Sleep(1.0)
 
     
 """
 
 from dvbcss.protocol.wc import WCMessage, Candidate
 
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
+from dvbcss.protocol.client.wc.algorithm._burst import Burst
 from dvbcss.protocol.client.wc.algorithm._dispersion import LowestDispersionCandidate
+from dvbcss.protocol.client.wc.algorithm._multiserver import LowestDispersionServer
+from dvbcss.protocol.client.wc.algorithm._kalman import KalmanFilterAdaptivePoll
 from dvbcss.protocol.client.wc.algorithm._simple import MostRecent
-from dvbcss.protocol.client.wc.algorithm._filterpredict import FilterAndPredict, PredictSimple, FilterRttThreshold, FilterLowestDispersionCandidate
+from dvbcss.protocol.client.wc.algorithm._filterpredict import FilterAndPredict, PredictSimple, PredictLinearRegression, FilterRttThreshold, FilterRttPercentile, FilterOffsetMedian, FilterLowestDispersionCandidate
 
 import dvbcss.monotonic_time as time
 
@@ -107,11 +152,19 @@ def algorithmWrapper(dest,measureClock,algorithm):
     
     :param dest: ("<ip-addr>",port) The destination address of the server (to which the requests should be sent)
     :param measureClock: The :mod:`~dvbcss:Clock` from which the readings are taken (being `t1` and `t4` in the resulting candidate)
+
+    If the :class:`~dvbcss.protocol.client.wc.UdpRequestResponseClient` passes back a third item, being the
+    time at which the response was received by the kernel (see its `timestamps` argument), then this is used
+    for `t4` instead of reading `measureClock` when the generator resumes. This requires that the root
+    of `measureClock` is a :class:`~dvbcss.clock.SysClock`.
     :param algorithm: A generator that yields to request a WallClock request be sent, and acts on the responses.
     
     The generator function you provide, should use `yield` as follows:
     * to pass the timeout for waiting for a response as the yield value
     * to receive a :class:`~dvbcss.protocol.wc.Candidate` object representing the response.
+    * or to pass a :class:`Sleep` object to wait without sending a request.
+    * or to pass a :class:`Burst` object to send several requests without waiting for each response,
+      and receive a list of :class:`~dvbcss.protocol.wc.Candidate` objects.
                 
     Example algorithm:
     
@@ -126,7 +179,7 @@ def algorithmWrapper(dest,measureClock,algorithm):
               else:
                   print "Timeout"
               print "Now waiting 1 second"
-              time.sleep(1)
+              yield Sleep(1)
               
        sysClock = SysClock()
        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
@@ -139,6 +192,24 @@ def algorithmWrapper(dest,measureClock,algorithm):
         # return and supply the timeout for waiting for a response
         timeoutSecs = algorithm.next()
         while True:
+            if isinstance(timeoutSecs, Sleep):
+                for action in _sleep(timeoutSecs):
+                    yield action
+                timeoutSecs = algorithm.send(None)
+                continue
+
+            if isinstance(timeoutSecs, Burst):
+                candidates = {}
+                burst = _burst([dest], measureClock, timeoutSecs, candidates)
+                try:
+                    action = burst.next()
+                    while True:
+                        action = burst.send((yield action))
+                except StopIteration:
+                    pass
+                timeoutSecs = algorithm.send(candidates[dest])
+                continue
+
             # assemble a request
             reqMsg=WCMessage(WCMessage.TYPE_REQUEST, 0, 0, measureClock.nanos, 0, 0)
             toSend=reqMsg.pack(), dest
@@ -162,11 +233,12 @@ def algorithmWrapper(dest,measureClock,algorithm):
 
             while responseQuality < 3 and remainingTime > 0:
                 # wait for a response. if first time round, send the request too
-                latestResponse,src = (yield toSend,remainingTime)
+                result = (yield toSend,remainingTime)
                 toSend=None      
                 
-                # note when response was received
-                latestResponseNanos=measureClock.nanos
+                # note when response was received (using the kernel receive time, if provided)
+                latestResponse,src = result[0], result[1]
+                latestResponseNanos=_receiveNanos(measureClock, result)
                 
                 
                 # did we get a response? did it come from the server we sent
@@ -198,6 +270,228 @@ def algorithmWrapper(dest,measureClock,algorithm):
         pass
 
 
+def multiServerAlgorithmWrapper(dests,measureClock,algorithm):
+    """\
+    UdpRequestResponseClient handler function, like :func:`algorithmWrapper`, but that sends
+    requests to several servers at once and passes the results from all of them to the algorithm.
+
+    Each time the algorithm asks for a measurement to be taken, a request is sent to each server
+    in turn, one straight after the other, from the same socket. Responses from all servers are then
+    collected until either a response (or follow-up response) has been received from every
+    server, or the timeout expires. Responses are matched to servers by the address they came from,
+    so a slow or missing response from one server does not affect the results from the others.
+
+    :param dests: list of ("<ip-addr>",port) destination addresses of the servers
+    :param measureClock: The :mod:`~dvbcss:Clock` from which the readings are taken (being `t1` and `t4` in the resulting candidates)
+    :param algorithm: A generator that yields to request that measurements be taken, and acts on the results.
+
+    The generator function you provide should use `yield` in the same way as for :func:`algorithmWrapper`,
+    except that the yield statement returns a :class:`dict` mapping each server's ("<ip-addr>",port) to
+    either a :class:`~dvbcss.protocol.wc.Candidate` object or :class:`None` if no response was received from it.
+
+    If the algorithm yields a :class:`Burst`, then each round of the burst sends a request to each server in turn,
+    and the yield statement returns a :class:`dict` mapping each server's ("<ip-addr>",port) to a :class:`list`
+    of :class:`~dvbcss.protocol.wc.Candidate` objects (in the order the requests were sent, and possibly empty)
+    for the responses received from it.
+
+    .. versionadded:: 0.6
+    """
+    dests = list(dests)
+    try:
+        timeoutSecs = algorithm.next()
+        while True:
+            if isinstance(timeoutSecs, Sleep):
+                for action in _sleep(timeoutSecs):
+                    yield action
+                timeoutSecs = algorithm.send(None)
+                continue
+
+            if isinstance(timeoutSecs, Burst):
+                candidates = {}
+                burst = _burst(dests, measureClock, timeoutSecs, candidates)
+                try:
+                    action = burst.next()
+                    while True:
+                        action = burst.send((yield action))
+                except StopIteration:
+                    pass
+                timeoutSecs = algorithm.send(candidates)
+                continue
+
+            timeoutBy = time.time() + timeoutSecs
+
+            requests  = {}    # dest -> request message
+            responses = {}    # dest -> (quality, response message, receive time)
+
+            # send a request to each server in turn, without waiting. Each yield also
+            # collects any response that has already arrived
+            for dest in dests:
+                reqMsg = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, measureClock.nanos, 0, 0)
+                requests[dest] = reqMsg
+                result = (yield (reqMsg.pack(), dest), 0)
+                _collectResponse(measureClock, requests, responses, result)
+
+            # then wait for the best response from each, until timeout or all have a
+            # response for which no follow-up is expected
+            remainingTime = timeoutBy - time.time()
+            while remainingTime > 0 and not _allResponsesFinal(dests, responses):
+                result = (yield None, remainingTime)
+                _collectResponse(measureClock, requests, responses, result)
+                remainingTime = timeoutBy - time.time()
+
+            candidates = {}
+            for dest in dests:
+                if dest in responses:
+                    _, responseMsg, responseRecvNanos = responses[dest]
+                    candidates[dest] = Candidate(responseMsg, responseRecvNanos)
+                else:
+                    candidates[dest] = None
+
+            timeoutSecs = algorithm.send(candidates)
+    except StopIteration:
+        pass
+
+
+def _sleep(sleep):
+    """\
+    Internal generator - used by the UdpRequestResponseClient handler functions to wait for the time
+    given by a :class:`Sleep` without sending a request. Any packets received in the meantime are ignored.
+    """
+    wakeBy = time.time() + sleep.secs
+    remainingTime = sleep.secs
+    while remainingTime > 0:
+        yield None, remainingTime
+        remainingTime = wakeBy - time.time()
+
+
+def _burst(dests, measureClock, burst, candidates):
+    """\
+    Internal generator - used by the UdpRequestResponseClient handler functions to send the requests
+    for a :class:`Burst`, pipelined without waiting for responses, and collect the responses to all of them.
+
+    Each round of the burst sends a request to each server in turn. The last request of each round is sent
+    as the wait until the next round (or for the responses) begins.
+
+    :param dests: list of ("<ip-addr>",port) destination addresses of the servers
+    :param measureClock: The :mod:`~dvbcss:Clock` from which the readings are taken
+    :param burst: The :class:`Burst`
+    :param candidates: :class:`dict` that, when the generator finishes, will map each server's ("<ip-addr>",port)
+                       to a :class:`list` of :class:`~dvbcss.protocol.wc.Candidate` objects, in the order the requests were sent.
+    """
+    requests  = {}    # (dest, originateNanos) -> request message
+    responses = {}    # (dest, originateNanos) -> (quality, response message, receive time)
+    order     = []    # (dest, originateNanos) of requests, in the order sent
+    rounds    = 0
+    originate  = None
+    nextSendAt = time.time()
+    timeoutBy  = None
+    while True:
+        toSend = None
+        if rounds < burst.count and time.time() >= nextSendAt:
+            for i, dest in enumerate(dests):
+                prev, originate = originate, measureClock.nanos
+                if prev is not None and originate <= prev:
+                    # clock has not moved on since the previous request (e.g. it has a low tick rate), but
+                    # each request must have a different originate time so that responses can be matched
+                    originate = prev + 1
+                reqMsg = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, originate, 0, 0)
+                requests[(dest, originate)] = reqMsg
+                order.append((dest, originate))
+                toSend = reqMsg.pack(), dest
+                if i < len(dests)-1:
+                    result = (yield toSend, 0)
+                    _collectBurstResponse(measureClock, requests, responses, result)
+            rounds += 1
+            nextSendAt = time.time() + burst.intervalSecs
+            if rounds == burst.count:
+                timeoutBy = time.time() + burst.timeoutSecs
+
+        if timeoutBy is None:
+            waitSecs = max(0, nextSendAt - time.time())
+        elif _allResponsesFinal(order, responses):
+            break
+        else:
+            waitSecs = timeoutBy - time.time()
+            if waitSecs <= 0 and toSend is None:
+                break
+
+        result = (yield toSend, max(0, waitSecs))
+        _collectBurstResponse(measureClock, requests, responses, result)
+
+    for dest in dests:
+        candidates[dest] = []
+    for key in order:
+        if key in responses:
+            _, responseMsg, responseRecvNanos = responses[key]
+            candidates[key[0]].append(Candidate(responseMsg, responseRecvNanos))
+
+
+def _collectResponse(measureClock, requests, responses, result):
+    """\
+    Internal function - if a result from the UdpRequestResponseClient is a response from one of the
+    servers requests were sent to, and is better than the best response from that server so far,
+    then record it in `responses`.
+    """
+    response, src = result[0], result[1]
+    if response is None or src not in requests:
+        return
+    recvNanos = _receiveNanos(measureClock, result)
+    responseMsg = WCMessage.unpack(response)
+    quality = calcQuality(requests[src], responseMsg)
+    if src not in responses or quality >= responses[src][0]:
+        responses[src] = quality, responseMsg, recvNanos
+
+
+def _collectBurstResponse(measureClock, requests, responses, result):
+    """\
+    Internal function - like :func:`_collectResponse`, but for requests (and responses) keyed by both the
+    server they were sent to, and their originate time.
+    """
+    response, src = result[0], result[1]
+    if response is None:
+        return
+    recvNanos = _receiveNanos(measureClock, result)
+    responseMsg = WCMessage.unpack(response)
+    key = src, responseMsg.originateNanos
+    if key not in requests:
+        return
+    quality = calcQuality(requests[key], responseMsg)
+    if key not in responses or quality >= responses[key][0]:
+        responses[key] = quality, responseMsg, recvNanos
+
+
+def _allResponsesFinal(keys, responses):
+    """\
+    :returns: True if a response, for which no follow-up is expected, has been received for every key (e.g. server, or request)
+    """
+    for key in keys:
+        if key not in responses or responses[key][0] < 3:
+            return False
+    return True
+
+
+def _receiveNanos(measureClock, result):
+    """\
+    :returns: The time (in nanoseconds of `measureClock`) at which a result from the UdpRequestResponseClient
+              was received. Uses the kernel receive time, if provided, otherwise reads the clock now.
+    """
+    if len(result) > 2 and result[2] is not None:
+        return _monotonicNanosToClockNanos(measureClock, result[2])
+    else:
+        return measureClock.nanos
+
+
+def _monotonicNanosToClockNanos(clock, monotonicNanos):
+    """\
+    :returns: The time of the clock (in nanoseconds) corresponding to a time from :func:`dvbcss.monotonic_time.timeNanos`.
+
+    The root of the clock must be a :class:`~dvbcss.clock.SysClock`.
+    """
+    root = clock.getRoot()
+    ticks = clock.fromRootTicks(monotonicNanos * root.tickRate / 1000000000)
+    return ticks * 1000000000 / clock.tickRate
+
+
 def calcQuality(reqMsg,respMsg):
     """\
     Generate measure of how good the response was. Quality < 0 means response
@@ -227,10 +521,18 @@ def calcQuality(reqMsg,respMsg):
 
 __all__ = [
     "algorithmWrapper",
+    "multiServerAlgorithmWrapper",
+    "Sleep",
+    "Burst",
     "LowestDispersionCandidate",
+    "LowestDispersionServer",
+    "KalmanFilterAdaptivePoll",
     "MostRecent",
     "PredictSimple",
+    "PredictLinearRegression",
     "FilterRttThreshold",
+    "FilterRttPercentile",
+    "FilterOffsetMedian",
     "FilterAndPredict",
     "FilterLowestDispersionCandidate",
 ]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+class Burst(object):
+    """\
+    An algorithm yields an instance of this class to have a burst of several requests
+    sent, without waiting for the response to each before sending the next.
+
+    .. code-block:: python
+
+        candidates = yield Burst(8, 0.01, 0.2)
+
+    The requests are sent `intervalSecs` apart. Responses are matched to requests by
+    their originate timestamp, so they can arrive in any order. The yield statement returns
+    once a response has been received for every request, or `timeoutSecs` after the last
+    request was sent. It returns a list of :class:`~dvbcss.protocol.wc.Candidate` objects,
+    one for each request that was responded to, in the order the requests were sent.
+
+    Supported by :func:`~dvbcss.protocol.client.wc.algorithm.algorithmWrapper`
+    (as used by :class:`~dvbcss.protocol.client.wc.WallClockClient`) and by
+    :func:`~dvbcss.protocol.client.wc.algorithm.multiServerAlgorithmWrapper`
+    (as used by :class:`~dvbcss.protocol.client.wc.MultiServerWallClockClient`),
+    where each round of the burst sends a request to every server.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, count, intervalSecs, timeoutSecs):
+        """\
+        :param count: (:class:`int`) The number of requests to send.
+        :param intervalSecs: (:class:`float`) The time between sending each request (in seconds).
+        :param timeoutSecs: (:class:`float`) The time to wait for responses after the last request is sent (in seconds).
+        """
+        super(Burst,self).__init__()
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        self.count = count
+        self.intervalSecs = intervalSecs
+        self.timeoutSecs = timeoutSecs
+
+    def __repr__(self):
+        return "Burst(%d, %s, %s)" % (self.count, repr(self.intervalSecs), repr(self.timeoutSecs))
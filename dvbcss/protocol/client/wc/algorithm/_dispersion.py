@@ -15,7 +15,8 @@
 # limitations under the License.
 
 
-import dvbcss.monotonic_time as time
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
+from dvbcss.protocol.client.wc.algorithm._burst import Burst
 import logging
 
 from dvbcss.clock import Correlation, CorrelatedClock
@@ -49,8 +50,23 @@ class LowestDispersionCandidate(object):
     the adjustment took place and what adjustment was made. It also reports the dispersion
     before and after the adjustment and gives information needed to extrapolate future
     dispersions. You can use this, for example, to record the clock dispersion over time. 
+    
+    By default, one request is sent at a time, and the algorithm waits for its response (or for the timeout)
+    before deciding when to send the next. To reach a low dispersion more quickly when first synchronising,
+    set `burstSize` to more than 1. While the dispersion is above `targetDispersionSecs`, requests are then
+    sent in bursts of `burstSize` (see :class:`Burst`), one every `burstIntervalSecs`, without waiting for
+    the responses in between. Once the dispersion falls below the target, it backs off to sending one
+    request every `repeatSecs`. It returns to sending bursts if the dispersion rises above the target again.
+
+    The target may not be reachable (e.g. if half the round-trip time is longer than it). So bursts stop
+    being sent if a burst does not improve the dispersion, or once `maxAcquireBursts` bursts have been sent
+    without reaching the target. The algorithm then waits `repeatSecs` and sends one request at a time, until
+    the dispersion has fallen below the target.
+    
+    .. versionchanged:: 0.6
+       Added the `burstSize`, `burstIntervalSecs`, `targetDispersionSecs` and `maxAcquireBursts` arguments.
     """
-    def __init__(self,clock,repeatSecs=1.0,timeoutSecs=0.2,localMaxFreqErrorPpm=None):
+    def __init__(self,clock,repeatSecs=1.0,timeoutSecs=0.2,localMaxFreqErrorPpm=None,burstSize=1,burstIntervalSecs=0.01,targetDispersionSecs=0.001,maxAcquireBursts=8):
         """\
         *Initialisation takes the following parameters:*
         
@@ -58,6 +74,10 @@ class LowestDispersionCandidate(object):
         :param repeatSecs: (:class:`float`) The rate at which Wall Clock protocol requests are to be sent (in seconds).
         :param timeoutSecs: (:class:`float`) The timeout on waiting for responses to requests (in seconds).
         :param localMaxFreqErrorPpm: Optional. Override using the :func:`~dvbcss.clock.ClockBase.getRootMaxFreqError` of the clock as the max freq error of the local clock, and instead use this value. It is the clock maximum frequency error in parts-per-million
+        :param burstSize: (:class:`int`) Optional (default=1). Number of requests to send in each burst while dispersion is above `targetDispersionSecs`. 1 means bursts are not used.
+        :param burstIntervalSecs: (:class:`float`) Optional (default=0.01). Time between requests within a burst (in seconds).
+        :param targetDispersionSecs: (:class:`float`) Optional (default=0.001). Dispersion (in seconds) below which bursts stop being sent.
+        :param maxAcquireBursts: (:class:`int`) Optional (default=8). Maximum number of bursts to send while trying to reach `targetDispersionSecs`.
         """
         super(LowestDispersionCandidate,self).__init__()
         self.log=logging.getLogger("dvbcss.protocol.client.wc.algorithm.BestCandidateByDispersion")
@@ -65,6 +85,12 @@ class LowestDispersionCandidate(object):
         self.repeatSecs = repeatSecs
         self.timeoutSecs = timeoutSecs
         self.localMaxFreqErrorPpm = localMaxFreqErrorPpm
+        self.burstSize = burstSize
+        self.burstIntervalSecs = burstIntervalSecs
+        self.targetDispersionSecs = targetDispersionSecs
+        self.maxAcquireBursts = maxAcquireBursts
+        self._numAcquireBursts = 0      # bursts sent since the dispersion was last below the target
+        self._acquireStalled = False    # True if bursts stopped being sent because the target was not being reached
         
         # force clock to register infinite dispersion initially
         self.clock.correlation = self.clock.correlation.butWith(initialError = float("+inf"))
@@ -94,24 +120,46 @@ class LowestDispersionCandidate(object):
         """
         return self.clock.dispersionAtTime(self.clock.ticks)*1000000000
     
+    def _aboveTarget(self):
+        """\
+        :returns: True if the dispersion is above the target
+        """
+        return self.clock.dispersionAtTime(self.clock.ticks) > self.targetDispersionSecs
+
+    def _acquiring(self):
+        """\
+        :returns: True if requests should be sent in bursts, because the dispersion is above the target (and the target is still being approached)
+        """
+        return self.burstSize > 1 and not self._acquireStalled and self._aboveTarget()
+
     def algorithm(self):
         candidateClock = CorrelatedClock(self.clock.getParent(), tickRate=self.clock.tickRate, correlation=self.clock.correlation)
 
         while True:
             update = False
             cumulativeOffset = None
-            candidate=(yield self.timeoutSecs)
+            if not self._aboveTarget():
+                self._numAcquireBursts = 0
+                self._acquireStalled = False
+            bursting = self._acquiring()
+            if bursting:
+                self._numAcquireBursts += 1
+                candidates=(yield Burst(self.burstSize, self.burstIntervalSecs, self.timeoutSecs))
+            else:
+                candidate=(yield self.timeoutSecs)
+                candidates=[candidate] if candidate is not None else []
     
             t = self.clock.ticks
             currentDispersion = self.clock.dispersionAtTime(t)
 
-            if candidate is not None:
+            for candidate in candidates:
 
                 candidateClock.correlation = candidate.calcCorrelationFor(self.clock, self.localMaxFreqErrorPpm)
                 candidateDispersion = candidateClock.dispersionAtTime(t)
                 
-                update = candidateDispersion < currentDispersion
-                if update:
+                better = candidateDispersion < currentDispersion
+                if better:
+                    update = True
                     pt = self.clock.toParentTicks(t)
                     adjustment = candidateClock.fromParentTicks(pt) - t
                     if cumulativeOffset is None:
@@ -129,14 +177,29 @@ class LowestDispersionCandidate(object):
                 self.worstDispersion = max(self.worstDispersion, currentDispersion, candidateDispersion)
 
                 co = cumulativeOffset or 0 # convert None to 0
-                self.log.info("Old / New dispersion (millis) is %.5f / %.5f ... offset=%20d  new best candidate? %s\n" % (1000*currentDispersion, 1000*candidateDispersion, co, str(update)))
-            else:
+                self.log.info("Old / New dispersion (millis) is %.5f / %.5f ... offset=%20d  new best candidate? %s\n" % (1000*currentDispersion, 1000*candidateDispersion, co, str(better)))
+
+                if better:
+                    currentDispersion = candidateDispersion
+
+            if not candidates:
                 self.log.info("Timeout.  Dispersion (millis) is %.5f\n" % (1000*currentDispersion,))
+
+            if bursting and self._aboveTarget():
+                if (candidates and not update) or self._numAcquireBursts >= self.maxAcquireBursts:
+                    # target is not being reached, so stop sending bursts and fall back to the normal rate
+                    self.log.warning("Target dispersion not reached after %d bursts. Dispersion (millis) is %.5f. Sending single requests instead.\n" % (self._numAcquireBursts, 1000*currentDispersion))
+                    self._acquireStalled = True
+                    yield Sleep(self.repeatSecs)
+                    continue
+                if candidates:
+                    # still approaching the target, so send the next burst straight away
+                    continue
             # retry more quickly if we didn't get an improved candidate
-            if update:
-                time.sleep(self.repeatSecs)
+            if update and not self._acquiring():
+                yield Sleep(self.repeatSecs)
             else:
-                time.sleep(self.timeoutSecs)
+                yield Sleep(self.timeoutSecs)
 
 
     def getWorstDispersion(self):
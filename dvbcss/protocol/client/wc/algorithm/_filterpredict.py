@@ -70,6 +70,19 @@ Round-trip time threshold Filter
 The :class:`~dvbcss.protocol.client.wc.algorithm.FilterRttThreshold` class implements a filter that eliminates any candidate
 where the round-trip time exceeds a threshold.
 
+Round-trip time percentile Filter
+^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+The :class:`~dvbcss.protocol.client.wc.algorithm.FilterRttPercentile` class implements a filter that eliminates any candidate
+where the round-trip time is above a percentile of the round-trip times of the candidates seen so far. Unlike a fixed
+threshold, this adapts to the network that is being used.
+
+Offset median Filter
+^^^^^^^^^^^^^^^^^^^^
+
+The :class:`~dvbcss.protocol.client.wc.algorithm.FilterOffsetMedian` class implements a filter that eliminates any candidate
+whose measured offset is an outlier compared to the median offset measured by recent candidates.
+
 Lowest dispersion candidate filter
 ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
@@ -84,6 +97,26 @@ The :class:`~dvbcss.protocol.client.wc.algorithm.PredictSimple` class is a simpl
 most recently provided to it and directly transforms that into a :class:`dvbcss.clock.Correlation`.
 
 
+Linear regression Predictor
+^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+The :class:`~dvbcss.protocol.client.wc.algorithm.PredictLinearRegression` class is a predictor that
+fits a straight line to the offsets measured by the most recent candidates provided to it. The slope of
+the line is the difference in frequency between the local clock and the server's Wall Clock. The
+predictor sets the speed of the clock to compensate for it, and so reports a lower rate of growth of
+dispersion than the maximum frequency errors of the two clocks would otherwise imply.
+
+Here is an example that uses it, with a filter to keep candidates with long round-trip times out
+of the fit:
+
+.. code-block:: python
+
+    filters = [ FilterRttThreshold(thresholdMillis=10.0) ]
+    predictor = PredictLinearRegression(wallClock, windowSize=32)
+
+    algorithm = FilterAndPredict(wallClock, repeatSecs, timeoutSecs, filters, predictor)
+
+
 Writing your own Filter
 ^^^^^^^^^^^^^^^^^^^^^^^
 
@@ -119,12 +152,24 @@ You can write your own Predictor by creating a class with the following methods
       server's Wall Clock. This must be in the correct units (tick rate)
       for the clock and its parent.
 
+The Predictor can optionally also have the following method defined:
+
+  .. method:: .predictSpeed(self)
+
+      :return: The speed (:class:`float`) that the clock is to be set to, along with the correlation returned by :func:`predictCorrelation`.
+
+      If a Predictor does not have this method, then the speed of the clock is not changed.
+
+      .. versionadded:: 0.6
+
 
 
 """
 
 import logging
-import dvbcss.monotonic_time as time
+import math
+from collections import deque
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
 
 from dvbcss.clock import CorrelatedClock, Correlation
 
@@ -144,7 +189,142 @@ class PredictSimple(object):
         self.correlation = candidate.calcCorrelationFor(self.clock)
     def predictCorrelation(self):
         return self.correlation
-        
+
+
+class PredictLinearRegression(object):
+    """\
+    Predictor that estimates the frequency difference between the local clock and the server's Wall Clock
+    from the most recent candidates, and sets the speed of the clock to compensate for it.
+
+    The most recent `windowSize` candidates are kept. A straight line is fitted (by weighted least squares)
+    to the offsets between the clocks that they measured. Each candidate is weighted by the inverse square
+    of its error bound, so candidates with short round-trip times count for the most. The slope of
+    the line is the frequency difference, and determines the speed (see :func:`predictSpeed`).
+    The correlation is anchored at the time of the most recent candidate, using whichever of the
+    fitted line and the offset measured by that candidate has the lower error bound.
+
+    The error bounds of the candidates in the window bound the error in the slope. If this is lower than
+    the maximum frequency errors of the two clocks (the rate of growth of dispersion reported by
+    :class:`PredictSimple`) then it is reported as the rate of growth of dispersion instead. Until then
+    (e.g. when there are too few candidates, or they span too short a period of time) this predictor
+    behaves in the same way as :class:`PredictSimple` and the speed is 1.0.
+
+    The fit assumes that the frequency difference does not change during the period spanned by the window.
+    A larger window averages out more measurement noise, but is slower to follow changes in frequency (e.g.
+    as equipment warms up).
+
+    Running sums are updated as candidates enter and leave the window, so adding a candidate takes
+    the same amount of time regardless of the size of the window.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, clock, windowSize=16, localMaxFreqErrorPpm=None):
+        """\
+        :param clock: The :class:`~dvbcss.clock.CorrelatedClock` that is to be set.
+        :param windowSize: (:class:`int`) Optional (default=16). The number of most recent candidates to fit the line to. Must be at least 2.
+        :param localMaxFreqErrorPpm: Optional. Override using the :func:`~dvbcss.clock.ClockBase.getRootMaxFreqError` of the clock as the max freq error of the local clock, and instead use this value. It is the clock maximum frequency error in parts-per-million
+
+        Note that this predictor does not actually set the clock. It just needs it in order to calculate the correct correlation and speed for it.
+        """
+        if windowSize < 2:
+            raise ValueError("windowSize must be at least 2")
+        self.clock = clock
+        self.windowSize = windowSize
+        self.localMaxFreqErrorPpm = localMaxFreqErrorPpm
+        self.correlation = Correlation(0,0,0,float("+inf"))
+        self.speed = 1.0
+
+        self._window = deque(maxlen=windowSize)    # (parentTicks, childTicks, error) of each candidate
+        self._ref = None                            # (parentTicks, childTicks) that the sums are relative to
+        self._numAdded = 0
+        self._resetSums()
+
+    def _resetSums(self):
+        # weighted sums, where x is the local time and y the offset (both in seconds, relative to self._ref)
+        self._sw = 0.0
+        self._swx = 0.0
+        self._swy = 0.0
+        self._swxx = 0.0
+        self._swxy = 0.0
+        self._swe = 0.0
+
+    def _xy(self, parentTicks, childTicks):
+        x = (parentTicks - self._ref[0]) / float(self.clock.getParent().tickRate)
+        y = (childTicks - self._ref[1]) / float(self.clock.tickRate) - x
+        return x, y
+
+    def _accumulate(self, entry, sign):
+        parentTicks, childTicks, error = entry
+        x, y = self._xy(parentTicks, childTicks)
+        w = sign / (error*error)
+        self._sw += w
+        self._swx += w*x
+        self._swy += w*y
+        self._swxx += w*x*x
+        self._swxy += w*x*y
+        self._swe += w*error
+
+    def _recalculate(self):
+        # recalculate the sums from scratch, relative to the oldest candidate, so that
+        # rounding errors from adding and removing candidates do not build up.
+        # This is done once every windowSize candidates, so is still constant time on average.
+        self._ref = self._window[0][:2]
+        self._resetSums()
+        for entry in self._window:
+            self._accumulate(entry, +1)
+
+    def addCandidate(self, candidate):
+        latest = candidate.calcCorrelationFor(self.clock, self.localMaxFreqErrorPpm)
+        entry = (latest.parentTicks, latest.childTicks, max(latest.initialError, 1e-9))
+
+        if self._ref is None:
+            self._ref = entry[:2]
+        if len(self._window) == self.windowSize:
+            self._accumulate(self._window[0], -1)   # about to be discarded by the deque
+        self._window.append(entry)
+        self._numAdded += 1
+        if self._numAdded % self.windowSize == 0:
+            self._recalculate()
+        else:
+            self._accumulate(entry, +1)
+
+        self._predict(latest)
+
+    def _predict(self, latest):
+        self.correlation = latest
+        self.speed = 1.0
+
+        n = len(self._window)
+        sw = self._sw
+        sxx = self._swxx - self._swx*self._swx/sw
+        if n < 2 or not sxx > 0:
+            return
+
+        # the worst case error in the slope, given the error bounds of the candidates
+        slopeError = math.sqrt(n / sxx)
+        if not slopeError < latest.errorGrowthRate:
+            return
+
+        slope = (self._swxy - self._swx*self._swy/sw) / sxx
+        xMean = self._swx / sw
+        x, y = self._xy(latest.parentTicks, latest.childTicks)
+        fittedY = self._swy/sw + slope*(x - xMean)
+        fittedError = self._swe/sw + abs(x - xMean)*slopeError
+
+        if fittedError < latest.initialError:
+            childTicks = latest.childTicks + (fittedY - y)*self.clock.tickRate
+            self.correlation = latest.butWith(childTicks=childTicks, initialError=fittedError, errorGrowthRate=slopeError)
+        else:
+            self.correlation = latest.butWith(errorGrowthRate=slopeError)
+        self.speed = 1.0 + slope
+
+    def predictCorrelation(self):
+        return self.correlation
+
+    def predictSpeed(self):
+        return self.speed
+
+
 class FilterRttThreshold(object):
     """\
     Simple filter that rejects all candidates where round trip time exceeds a specified threshold.
@@ -153,11 +333,165 @@ class FilterRttThreshold(object):
         """\
         :param thresholdMillis: (:class:`float`) The threshold to use (in milliseconds)
         """
-        self.thresholdSecs = thresholdMillis/1000
+        self.thresholdSecs = thresholdMillis/1000.0
     def checkCandidate(self, candidate):
-        return candidate.rtt <= self.thresholdSecs
+        return candidate.rtt <= self.thresholdSecs*1000000000   # rtt is in nanoseconds
             
 
+class _P2Quantile(object):
+    """\
+    Estimates a quantile of a stream of values, without storing them, using the P-squared
+    algorithm (R. Jain and I. Chlamtac, "The P2 algorithm for dynamic calculation of quantiles and
+    histograms without storing observations", Communications of the ACM, 1985).
+
+    Five markers are kept, whose heights estimate the minimum, the maximum, the quantile and the
+    quantiles half way between it and the minimum and maximum. Adding a value adjusts them using
+    piecewise-parabolic interpolation.
+    """
+    def __init__(self, p):
+        """\
+        :param p: The quantile to estimate, as a fraction between 0 and 1.
+        """
+        self.p = p
+        self._heights = []
+        self._positions = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self._desired = [0.0, 2*p, 4*p, 2+2*p, 4.0]
+        self._increments = [0.0, p/2, p, (1+p)/2, 1.0]
+
+    def add(self, x):
+        q = self._heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self._positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k+1]:
+                k += 1
+
+        for i in range(k+1, 5):
+            n[i] += 1
+        for i in range(0, 5):
+            self._desired[i] += self._increments[i]
+
+        # move the middle markers towards their desired positions, if they are at least one away
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i+1] - n[i] > 1) or (d <= -1 and n[i-1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i+1] - n[i-1]) * (
+                    (n[i] - n[i-1] + d) * (q[i+1] - q[i]) / (n[i+1] - n[i]) +
+                    (n[i+1] - n[i] - d) * (q[i] - q[i-1]) / (n[i] - n[i-1])
+                )
+                if not q[i-1] < height < q[i+1]:
+                    height = q[i] + d * (q[i+d] - q[i]) / (n[i+d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self):
+        """\
+        The estimate of the quantile, or None if no values have been added.
+        """
+        q = self._heights
+        if len(q) < 5:
+            if not q:
+                return None
+            return q[int(round(self.p * (len(q)-1)))]
+        return q[2]
+
+
+class FilterRttPercentile(object):
+    """\
+    Filter that rejects candidates where the round trip time is above a percentile of the round trip times
+    of all candidates seen by this filter so far (including ones rejected by this or other filters,
+    since :func:`FilterAndPredict` gives every candidate to every filter).
+
+    The percentile is estimated using a fixed amount of memory and a fixed amount of work per candidate,
+    regardless of how many candidates there have been, using the P-squared algorithm.
+    Candidates are not rejected until `minCandidates` have been seen.
+
+    Because it considers all candidates seen so far, the estimate follows lasting changes in round trip times
+    (e.g. a change of network route) slowly.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, percentile=50, minCandidates=5):
+        """\
+        :param percentile: (:class:`float`) Optional (default=50). The percentile (greater than 0 and less than 100) above which candidates are rejected.
+        :param minCandidates: (:class:`int`) Optional (default=5). The number of candidates to see before starting to reject any.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be greater than 0 and less than 100")
+        self.percentile = percentile
+        self.minCandidates = minCandidates
+        self._estimator = _P2Quantile(percentile / 100.0)
+        self._count = 0
+
+    def getThresholdMillis(self):
+        """\
+        :returns: The current estimate of the percentile of round trip times (in milliseconds), or None if there have not yet been any candidates.
+        """
+        value = self._estimator.value
+        if value is None:
+            return None
+        return value / 1000000.0
+
+    def checkCandidate(self, candidate):
+        self._estimator.add(candidate.rtt)
+        self._count += 1
+        return self._count < self.minCandidates or candidate.rtt <= self._estimator.value
+
+
+class FilterOffsetMedian(object):
+    """\
+    Filter that rejects candidates whose measured offset is an outlier compared to the offsets measured by recent candidates.
+
+    The offsets measured by the most recent `windowSize` candidates seen by this filter (including ones
+    rejected by this or other filters, since :func:`FilterAndPredict` gives every candidate to every filter) are kept. A candidate is rejected if its offset differs from their median by more than
+    `thresholdFactor` times their median absolute deviation from the median, and by more than `minThresholdMillis`.
+    Candidates are not rejected until the window is full.
+
+    Because rejected candidates are also kept, if the server's Wall Clock jumps, then candidates start being
+    accepted again once more than half of those in the window come from after the jump.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, windowSize=9, thresholdFactor=3.0, minThresholdMillis=1.0):
+        """\
+        :param windowSize: (:class:`int`) Optional (default=9). The number of most recent candidates to compare against. Must be at least 3.
+        :param thresholdFactor: (:class:`float`) Optional (default=3.0). Multiple of the median absolute deviation that an offset must differ from the median by to be rejected.
+        :param minThresholdMillis: (:class:`float`) Optional (default=1.0). Amount (in milliseconds) that an offset must differ from the median by to be rejected.
+        """
+        if windowSize < 3:
+            raise ValueError("windowSize must be at least 3")
+        self.windowSize = windowSize
+        self.thresholdFactor = thresholdFactor
+        self.minThresholdMillis = minThresholdMillis
+        self._offsets = deque(maxlen=windowSize)
+
+    def checkCandidate(self, candidate):
+        self._offsets.append(candidate.offset)
+        if len(self._offsets) < self.windowSize:
+            return True
+
+        offsets = sorted(self._offsets)
+        median = offsets[len(offsets)//2]
+        deviations = sorted(abs(o - median) for o in offsets)
+        mad = deviations[len(deviations)//2]
+
+        threshold = max(self.thresholdFactor * mad, self.minThresholdMillis * 1000000)
+        return abs(candidate.offset - median) <= threshold
+
+
 class FilterLowestDispersionCandidate(object):
     """\
     Simple filter that will reject a candidate unless its dispersion is lower than that currently
@@ -193,7 +527,12 @@ class FilterAndPredict(object):
     
     This algorithm controls the :class:`~dvbcss.clock.CorrelatedClock` object by settings its
     :data:`~dvbcss.clock.CorrelatedClock.correlation` property to that provided by the
-    predictor.
+    predictor. If the predictor also provides a speed, then the
+    :data:`~dvbcss.clock.CorrelatedClock.speed` property is set at the same time.
+
+    .. versionchanged:: 0.6
+       Sets the speed of the clock if the predictor has a `predictSpeed` method.
+       Candidates are now rejected if any filter rejects them. Every filter is still given every candidate.
     
     The parent of this `clock` is the clock used by the :class:`~dvbcss.protocol.client.wc.WallClockClient`
     in generating the measurement candidates. So the job of the predictor is always to estimate the 
@@ -256,20 +595,25 @@ class FilterAndPredict(object):
             if candidate is not None:
                 
                 # apply filters
-                if None in [f.checkCandidate(candidate) for f in self.filters]:
+                # every filter sees every candidate, even if an earlier one rejects it, because filters may keep state
+                results = [f.checkCandidate(candidate) for f in self.filters]
+                if not all(results):
                     self.log.debug("Candidate filtered out\n")
-                    time.sleep(self.repeatSecs)
+                    yield Sleep(self.repeatSecs)
                 else:
                     
                     # filters passed, so now feed the candidate into the predictor
                     # and retrieve a new estimate of the correlation
                     self.predictor.addCandidate(candidate)
-                    self.clock.correlation = self.predictor.predictCorrelation()
+                    if hasattr(self.predictor, "predictSpeed"):
+                        self.clock.setCorrelationAndSpeed(self.predictor.predictCorrelation(), self.predictor.predictSpeed())
+                    else:
+                        self.clock.correlation = self.predictor.predictCorrelation()
 
                     # act on it
-                    self.log.debug("Candidate accepted. New Correlation = ", self.clock.correlation)
+                    self.log.debug("Candidate accepted. New Correlation = %s, speed = %f\n" % (str(self.clock.correlation), self.clock.speed))
 
-                    time.sleep(self.repeatSecs)
+                    yield Sleep(self.repeatSecs)
             else:
                 self.log.debug("Response timeout\n")
                 
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
+import logging
+import math
+
+from dvbcss.clock import CorrelatedClock
+
+
+class KalmanFilterAdaptivePoll(object):
+    """\
+    Algorithm that tracks the offset and the frequency difference ("skew") between the local clock
+    and the server's Wall Clock using a Kalman filter, and adapts how often it sends requests to
+    how quickly the dispersion grows.
+
+    Each candidate (request-response measurement result) is treated as a measurement of the offset,
+    with a variance derived from its error bounds (see :func:`~dvbcss.protocol.wc.Candidate.calcCorrelationFor`).
+    The skew is assumed to wander slowly (as a random walk), by `frequencyWanderPpm` parts-per-million
+    per square root of a second. The clock is set to the estimated offset, and its speed is set
+    to compensate for the estimated skew.
+
+    The dispersion reported by the clock is a strict bound on its error, as for :class:`LowestDispersionCandidate`.
+    It is based on the candidate with the lowest dispersion since the filter was (re)started,
+    plus the difference between the estimate and that candidate.
+
+    The estimated error (see :func:`getEstimatedError`) is a statistical estimate: three standard deviations
+    of the estimated offset, growing at three standard deviations of the estimated skew (but never faster than
+    the maximum frequency errors of the two clocks plus the estimated skew). It can be much smaller than
+    the dispersion once many candidates have been combined. The reported dispersion is never less than it.
+
+    After each candidate, the time until the next request is chosen so that the estimated error will
+    just reach `targetEstimatedErrorSecs` by then, within the range `minRepeatSecs` to `maxRepeatSecs`,
+    and at most double the previous time. So requests are sent every `minRepeatSecs` while the estimate is
+    uncertain, and become less frequent as the skew estimate settles.
+
+    The reported dispersion is *not* kept below `targetEstimatedErrorSecs`. Between requests it grows at
+    (at least) the sum of the maximum frequency errors of the local clock and the server. So once requests
+    are sent every `maxRepeatSecs`, the dispersion just before each request is about
+    `maxRepeatSecs` x (local + server max freq error). For example: 64 seconds x (500 + 50) ppm = 35 ms.
+    If a tighter bound on dispersion is needed, reduce `maxRepeatSecs`, at the cost of sending more requests.
+    If there is no response, the request is repeated after `timeoutSecs`.
+
+    If a candidate is inconsistent with the current estimate (the offset it measured is further from
+    the estimate than can be explained by the error bounds of both), then it is assumed that
+    the server's Wall Clock has jumped. The filter is restarted from that candidate, and the time between
+    requests starts again from `minRepeatSecs`.
+
+     .. note:: The Clock object must be the same one that is provided to the WallClockClient, otherwise
+               this algorithm will not synchronise correctly.
+
+    There is a stub callback function provided that you can override (e.g. by subclassing)
+    that will be called whenever the clock is adjusted:
+
+    * :func:`onClockAdjusted`
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self,clock,minRepeatSecs=1.0,maxRepeatSecs=64.0,timeoutSecs=0.2,targetEstimatedErrorSecs=0.001,localMaxFreqErrorPpm=None,frequencyWanderPpm=0.1):
+        """\
+        *Initialisation takes the following parameters:*
+
+        :param clock: A :class:`~dvbcss.clock.CorrelatedClock` object that will be adjusted to match the Wall Clock.
+        :param minRepeatSecs: (:class:`float`) Optional (default=1.0). The shortest time between Wall Clock protocol requests (in seconds).
+        :param maxRepeatSecs: (:class:`float`) Optional (default=64.0). The longest time between Wall Clock protocol requests (in seconds).
+        :param timeoutSecs: (:class:`float`) Optional (default=0.2). The timeout on waiting for responses to requests (in seconds).
+        :param targetEstimatedErrorSecs: (:class:`float`) Optional (default=0.001). The estimated error (in seconds) that the time between requests is chosen to keep below. This does not limit the dispersion.
+        :param localMaxFreqErrorPpm: Optional. Override using the :func:`~dvbcss.clock.ClockBase.getRootMaxFreqError` of the clock as the max freq error of the local clock, and instead use this value. It is the clock maximum frequency error in parts-per-million
+        :param frequencyWanderPpm: (:class:`float`) Optional (default=0.1). How quickly the skew between the clocks is expected to change, in parts-per-million per square root of a second.
+        """
+        super(KalmanFilterAdaptivePoll,self).__init__()
+        if not 0 < minRepeatSecs <= maxRepeatSecs:
+            raise ValueError("minRepeatSecs must be greater than zero, and no more than maxRepeatSecs")
+        self.log=logging.getLogger("dvbcss.protocol.client.wc.algorithm.KalmanFilterAdaptivePoll")
+        self.clock = clock
+        self.minRepeatSecs = minRepeatSecs
+        self.maxRepeatSecs = maxRepeatSecs
+        self.timeoutSecs = timeoutSecs
+        self.targetEstimatedErrorSecs = targetEstimatedErrorSecs
+        self.localMaxFreqErrorPpm = localMaxFreqErrorPpm
+        self.frequencyWanderPpm = frequencyWanderPpm
+        self.repeatSecs = minRepeatSecs  #: (read only) The time (in seconds) that will be waited after the most recent response before sending the next request.
+
+        self._ref = None    # (parentTicks, childTicks) of the candidate the filter was started from
+        self._best = None   # correlation of the candidate with the lowest dispersion since then
+        self._estimatedError = (0, float("+inf"), 0.0)   # (parentTicks, initialError, errorGrowthRate) of the statistical estimate
+        self._candidateClock = CorrelatedClock(self.clock.getParent(), tickRate=self.clock.tickRate, correlation=self.clock.correlation)
+
+        # force clock to register infinite dispersion initially
+        self.clock.correlation = self.clock.correlation.butWith(initialError = float("+inf"))
+
+    def onClockAdjusted(self, timeAfterAdjustment, adjustment, oldDispersionNanos, newDispersionNanos, dispersionGrowthRate):
+        """\
+        This method is called immediately after a clock adjustment has been made,
+        and gives details on how the clock was changed and the effect on the dispersion.
+
+        The arguments are the same as for :func:`LowestDispersionCandidate.onClockAdjusted`.
+
+        |stub-method|
+        """
+        pass
+
+    def getCurrentDispersion(self):
+        """\
+        :returns: Current dispersion at this moment in time in units of nanoseconds.
+        """
+        return self.clock.dispersionAtTime(self.clock.ticks)*1000000000
+
+    def getEstimatedError(self):
+        """\
+        :returns: Statistical estimate (three standard deviations) of the error of the clock at this moment in time in units of nanoseconds.
+
+        Unlike :func:`getCurrentDispersion`, this is not a strict bound on the error.
+        """
+        pt, initialError, growthRate = self._estimatedError
+        secs = (self.clock.getParent().ticks - pt) / float(self.clock.getParent().tickRate)
+        return (initialError + growthRate * secs)*1000000000
+
+    def _dispersionOf(self, correlation, parentTicks):
+        """\
+        :returns: The dispersion (in seconds) at `parentTicks` of a correlation for a clock running at speed 1.
+        """
+        return correlation.initialError + correlation.errorGrowthRate * (parentTicks - correlation.parentTicks) / float(self.clock.getParent().tickRate)
+
+    def _measurement(self, correlation):
+        """\
+        :returns: tuple (time, offset) in seconds, relative to the candidate the filter was started from
+        """
+        x = (correlation.parentTicks - self._ref[0]) / float(self.clock.getParent().tickRate)
+        z = (correlation.childTicks - self._ref[1]) / float(self.clock.tickRate) - x
+        return x, z
+
+    def _restart(self, correlation):
+        self._ref = (correlation.parentTicks, correlation.childTicks)
+        self._time = 0.0
+        self._offset = 0.0
+        self._skew = 0.0
+        # offset within +/- initialError, and skew within +/- errorGrowthRate, treated as uniformly distributed
+        self._p00 = correlation.initialError**2 / 3
+        self._p01 = 0.0
+        self._p11 = correlation.errorGrowthRate**2 / 3
+
+    def _filter(self, correlation):
+        """\
+        Update the estimated offset and skew with a measurement.
+
+        :returns: False if the measurement was inconsistent with the estimate, so the filter must be restarted.
+        """
+        x, z = self._measurement(correlation)
+
+        # predict forward to the time of the measurement
+        dt = x - self._time
+        q = (self.frequencyWanderPpm / 1000000.0)**2
+        self._time = x
+        self._offset += self._skew * dt
+        self._p00 += 2*dt*self._p01 + dt*dt*self._p11 + q*dt*dt*dt/3
+        self._p01 += dt*self._p11 + q*dt*dt/2
+        self._p11 += q*dt
+
+        innovation = z - self._offset
+        if abs(innovation) > correlation.initialError + 3*math.sqrt(self._p00):
+            return False
+
+        s = self._p00 + correlation.initialError**2 / 3
+        k0 = self._p00 / s
+        k1 = self._p01 / s
+        self._offset += k0 * innovation
+        self._skew += k1 * innovation
+        self._p11 -= k1 * self._p01
+        self._p00 *= (1 - k0)
+        self._p01 *= (1 - k0)
+        return True
+
+    def _update(self, candidate):
+        """\
+        Update the estimate with a candidate, then adjust the clock to match it.
+        """
+        correlation = candidate.calcCorrelationFor(self.clock, self.localMaxFreqErrorPpm)
+        pt = correlation.parentTicks
+
+        if self._ref is not None and self._filter(correlation):
+            x, z = self._measurement(correlation)
+            estimated = correlation.butWith(
+                childTicks = correlation.childTicks + (self._offset - z)*self.clock.tickRate,
+                initialError = 3*math.sqrt(self._p00),
+                errorGrowthRate = min(3*math.sqrt(max(self._p11, 0.0)), correlation.errorGrowthRate + abs(self._skew))
+            )
+            if self._dispersionOf(correlation, pt) < self._dispersionOf(self._best, pt):
+                self._best = correlation
+            # strict bound: the error of the best candidate, plus how far the estimate is from it
+            best = self._best
+            bestChildTicks = best.childTicks + (pt - best.parentTicks) * self.clock.tickRate / float(self.clock.getParent().tickRate)
+            estimate = estimated.butWith(
+                initialError = max(estimated.initialError, self._dispersionOf(best, pt) + abs(estimated.childTicks - bestChildTicks) / float(self.clock.tickRate)),
+                errorGrowthRate = max(estimated.errorGrowthRate, best.errorGrowthRate + abs(self._skew))
+            )
+        else:
+            if self._ref is not None:
+                self.log.warning("Candidate inconsistent with estimate of Wall Clock. Assuming it has jumped, and starting again.\n")
+                self.repeatSecs = self.minRepeatSecs
+            # nothing to combine it with yet, so use the candidate as it is
+            self._restart(correlation)
+            self._best = correlation
+            estimated = estimate = correlation
+        self._estimatedError = (pt, estimated.initialError, estimated.errorGrowthRate)
+        self._candidateClock.setCorrelationAndSpeed(estimate, 1.0 + self._skew)
+
+        t = self.clock.ticks
+        currentDispersion = self.clock.dispersionAtTime(t)
+        pt = self.clock.toParentTicks(t)
+        adjustment = self._candidateClock.fromParentTicks(pt) - t
+        self.clock.setCorrelationAndSpeed(estimate, 1.0 + self._skew)
+        t = self.clock.ticks
+        newDispersion = self.clock.dispersionAtTime(t)
+        self.onClockAdjusted(t, adjustment, 1000000000*currentDispersion, 1000000000*newDispersion, estimate.errorGrowthRate)
+
+        # wait until estimated error is expected to reach the target
+        estimatedError = self.getEstimatedError() / 1000000000
+        growthRate = estimated.errorGrowthRate
+        if growthRate > 0:
+            repeatSecs = (self.targetEstimatedErrorSecs - estimatedError) / growthRate
+        else:
+            repeatSecs = self.maxRepeatSecs
+        self.repeatSecs = max(self.minRepeatSecs, min(repeatSecs, 2*self.repeatSecs, self.maxRepeatSecs))
+
+        self.log.info("Dispersion (millis) is %.5f, estimated error (millis) is %.5f, skew (ppm) is %.3f +/- %.3f ... next request in %.1f secs\n" % (1000*newDispersion, 1000*estimatedError, self._skew*1000000, growthRate*1000000, self.repeatSecs))
+
+    def algorithm(self):
+        while True:
+            candidate=(yield self.timeoutSecs)
+            if candidate is None:
+                self.log.info("Timeout.  Dispersion (millis) is %.5f\n" % (self.getCurrentDispersion()/1000000.0,))
+                yield Sleep(self.timeoutSecs)
+            else:
+                self._update(candidate)
+                yield Sleep(self.repeatSecs)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
+import logging
+
+from dvbcss.clock import CorrelatedClock
+
+
+class LowestDispersionServer(object):
+    """\
+    Algorithm for use with a :class:`~dvbcss.protocol.client.wc.MultiServerWallClockClient`
+    that follows whichever server currently gives the lowest dispersion.
+
+    For each server, it keeps the candidate (request-response measurement result) with the
+    lowest dispersion, in the same way as the :class:`LowestDispersionCandidate` algorithm does
+    for a single server. After each round of requests, the clock is adjusted to match the
+    server whose best candidate now has the lowest dispersion, if that is lower than the
+    current dispersion of the clock.
+
+    If the server being followed fails to respond to `failoverTimeouts` consecutive requests,
+    then it is no longer trusted: its best candidate is discarded, and the clock is immediately
+    adjusted to match whichever other server has the lowest dispersion, even if that is
+    higher than the current dispersion of the clock. It will be trusted again once it responds.
+
+     .. note:: The Clock object must be the same one that is provided to the MultiServerWallClockClient, otherwise
+               this algorithm will not synchronise correctly.
+
+    There are stub callback functions provided that you can override (e.g. by subclassing):
+
+    * :func:`onClockAdjusted` is called whenever the clock is adjusted
+    * :func:`onServerChanged` is called whenever a different server starts being followed
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self,clock,repeatSecs=1.0,timeoutSecs=0.2,localMaxFreqErrorPpm=None,failoverTimeouts=3):
+        """\
+        *Initialisation takes the following parameters:*
+
+        :param clock: A :class:`~dvbcss.clock.CorrelatedClock` object that will be adjusted to match the Wall Clock.
+        :param repeatSecs: (:class:`float`) The rate at which rounds of Wall Clock protocol requests are to be sent (in seconds).
+        :param timeoutSecs: (:class:`float`) The timeout on waiting for responses to requests (in seconds).
+        :param localMaxFreqErrorPpm: Optional. Override using the :func:`~dvbcss.clock.ClockBase.getRootMaxFreqError` of the clock as the max freq error of the local clock, and instead use this value. It is the clock maximum frequency error in parts-per-million
+        :param failoverTimeouts: (:class:`int`) Optional (default=3). Number of consecutive requests that the server being followed must fail to respond to before failing over to another server.
+        """
+        super(LowestDispersionServer,self).__init__()
+        self.log=logging.getLogger("dvbcss.protocol.client.wc.algorithm.LowestDispersionServer")
+        self.clock = clock
+        self.repeatSecs = repeatSecs
+        self.timeoutSecs = timeoutSecs
+        self.localMaxFreqErrorPpm = localMaxFreqErrorPpm
+        self.failoverTimeouts = failoverTimeouts
+        self.server = None  #: (read only) The ("<ip-addr>",port) of the server currently being followed, or None if none yet.
+
+        self._serverClocks = {}     # server -> CorrelatedClock representing the best candidate from that server
+        self._candidateClock = CorrelatedClock(self.clock.getParent(), tickRate=self.clock.tickRate, correlation=self.clock.correlation)
+        self._timeouts = {}         # server -> number of consecutive requests with no response
+
+        # force clock to register infinite dispersion initially
+        self.clock.correlation = self.clock.correlation.butWith(initialError = float("+inf"))
+
+    def onClockAdjusted(self, timeAfterAdjustment, adjustment, oldDispersionNanos, newDispersionNanos, dispersionGrowthRate):
+        """\
+        This method is called immediately after a clock adjustment has been made,
+        and gives details on how the clock was changed and the effect on the dispersion.
+
+        The arguments are the same as for :func:`LowestDispersionCandidate.onClockAdjusted`.
+
+        |stub-method|
+        """
+        pass
+
+    def onServerChanged(self, oldServer, newServer):
+        """\
+        This method is called when the clock is adjusted to match a different server
+        to the one it previously matched.
+
+        :param oldServer: The ("<ip-addr>",port) of the server previously followed, or None if there was none.
+        :param newServer: The ("<ip-addr>",port) of the server now being followed.
+
+        |stub-method|
+        """
+        pass
+
+    def getCurrentDispersion(self):
+        """\
+        :returns: Current dispersion at this moment in time in units of nanoseconds.
+        """
+        return self.clock.dispersionAtTime(self.clock.ticks)*1000000000
+
+    def getServerDispersions(self):
+        """\
+        :returns: :class:`dict` mapping each server's ("<ip-addr>",port) to the dispersion (in nanoseconds) at this moment in time of its best candidate. Servers that are not trusted have infinite dispersion.
+        """
+        t = self.clock.ticks
+        return dict((server, serverClock.dispersionAtTime(t)*1000000000) for server, serverClock in self._serverClocks.items())
+
+    def _serverClock(self, server):
+        """\
+        :returns: The clock representing the best candidate from the server, creating it if necessary
+        """
+        serverClock = self._serverClocks.get(server)
+        if serverClock is None:
+            correlation = self.clock.correlation.butWith(initialError = float("+inf"))
+            serverClock = CorrelatedClock(self.clock.getParent(), tickRate=self.clock.tickRate, correlation=correlation)
+            self._serverClocks[server] = serverClock
+            self._timeouts[server] = 0
+        return serverClock
+
+    def _update(self, candidates):
+        """\
+        Update the best candidate for each server from the results of a round of requests,
+        then adjust the clock to match the best server.
+
+        :returns: True if the clock was adjusted
+        """
+        t = self.clock.ticks
+
+        for server, candidate in candidates.items():
+            serverClock = self._serverClock(server)
+            if candidate is None:
+                self._timeouts[server] += 1
+                if self._timeouts[server] == self.failoverTimeouts:
+                    self.log.info("No response from server %s to %d requests. No longer trusting it.\n" % (str(server), self.failoverTimeouts))
+                    serverClock.correlation = serverClock.correlation.butWith(initialError = float("+inf"))
+            else:
+                self._timeouts[server] = 0
+                self._candidateClock.correlation = candidate.calcCorrelationFor(self.clock, self.localMaxFreqErrorPpm)
+                if self._candidateClock.dispersionAtTime(t) < serverClock.dispersionAtTime(t):
+                    serverClock.correlation = self._candidateClock.correlation
+
+        if not self._serverClocks:
+            return False
+
+        best = min(self._serverClocks, key=lambda server : self._serverClocks[server].dispersionAtTime(t))
+        bestDispersion = self._serverClocks[best].dispersionAtTime(t)
+
+        currentDispersion = self.clock.dispersionAtTime(t)
+
+        # if the server being followed has stopped responding, switch to any other that is trusted
+        failover = self.server is not None and self._timeouts[self.server] >= self.failoverTimeouts \
+            and best != self.server and bestDispersion < float("+inf")
+
+        if not (bestDispersion < currentDispersion or failover):
+            return False
+
+        pt = self.clock.toParentTicks(t)
+        adjustment = self._serverClocks[best].fromParentTicks(pt) - t
+        self.clock.correlation = self._serverClocks[best].correlation
+        self.onClockAdjusted(self.clock.ticks, adjustment, 1000000000*currentDispersion, 1000000000*bestDispersion, self.clock.correlation.errorGrowthRate)
+        if best != self.server:
+            oldServer, self.server = self.server, best
+            self.log.info("Now following server %s (was %s)\n" % (str(best), str(oldServer)))
+            self.onServerChanged(oldServer, best)
+        return True
+
+    def algorithm(self):
+        while True:
+            candidates=(yield self.timeoutSecs)
+            update = self._update(candidates)
+            self.log.info("Dispersion (millis) is %.5f ... following server %s\n" % (self.getCurrentDispersion()/1000000.0, str(self.server)))
+            # retry more quickly if we didn't get an improved candidate
+            if update:
+                yield Sleep(self.repeatSecs)
+            else:
+                yield Sleep(self.timeoutSecs)
@@ -15,7 +15,7 @@
 # limitations under the License.
 
 import logging
-import dvbcss.monotonic_time as time
+from dvbcss.protocol.client.wc.algorithm._sleep import Sleep
 
 class MostRecent(object):
     """\
@@ -50,7 +50,7 @@ class MostRecent(object):
             if candidate is not None:
                 self.log.info("Candidate: "+str(candidate)+"\n")
                 self.clock.correlation = candidate.calcCorrelationFor(self.clock, 500) # guess as to local max freq error
-                time.sleep(self.repeatSecs)
+                yield Sleep(self.repeatSecs)
             else:
                 self.log.debug("Response timeout\n")
                 
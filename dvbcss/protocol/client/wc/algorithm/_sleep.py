@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+class Sleep(object):
+    """\
+    An algorithm yields an instance of this class to wait, without sending a request.
+
+    .. code-block:: python
+
+        yield Sleep(1.0)
+
+    The yield statement returns :class:`None` once the time has passed.
+    """
+    def __init__(self, secs):
+        """\
+        :param secs: (:class:`float`) The time to wait for (in seconds).
+        """
+        super(Sleep,self).__init__()
+        self.secs = secs
+
+    def __repr__(self):
+        return "Sleep(%s)" % repr(self.secs)
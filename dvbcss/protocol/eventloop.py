@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+The :class:`EventLoop` class runs many UDP sockets and timers on a single thread.
+
+By default, each :class:`~dvbcss.protocol.server.wc.WallClockServer` and
+:class:`~dvbcss.protocol.client.wc.WallClockClient` runs on its own thread. If
+you pass the same :class:`EventLoop` object to several of them (using the `loop`
+argument) they will instead all share the single thread of the event loop.
+
+.. code-block:: python
+
+    from dvbcss.protocol.eventloop import EventLoop
+    from dvbcss.protocol.server.wc import WallClockServer
+    from dvbcss.protocol.client.wc import WallClockClient
+
+    loop = EventLoop()
+    loop.start()
+
+    wcServer = WallClockServer(wallClock, loop=loop)
+    wcServer.start()
+
+    for dest in servers:
+        wcClient = WallClockClient(("0.0.0.0",0), dest, clock, algorithm, loop=loop)
+        wcClient.start()
+
+Code run by the event loop (i.e. the request handlers and algorithms) must not
+block, otherwise everything else sharing the event loop will be held up.
+:ref:`Algorithms <algorithms>` for the Wall Clock client should therefore wait
+by yielding a :class:`~dvbcss.protocol.client.wc.algorithm.Sleep` object rather than
+by calling :func:`time.sleep`.
+
+The CSS-CII and CSS-TS servers and clients are built on
+`cherrypy <http://www.cherrypy.org/>`_ and `ws4py <https://ws4py.readthedocs.org>`_,
+which manage their own threads, so they cannot be run by this event loop.
+
+Each pass ("tick") of the event loop runs the callbacks for all sockets that are
+readable and all timers that are due within a single
+:func:`dvbcss.clock.batchUpdates` block. If those callbacks adjust clocks (e.g.
+a Wall Clock client updating its clock estimate) then each dependent of those
+clocks is notified at most once per tick, once all the callbacks have run.
+Pass ``batchClockUpdates=False`` when creating the event loop to disable this.
+"""
+
+import heapq
+import itertools
+import logging
+import select
+import socket
+import threading
+
+import dvbcss.monotonic_time as time
+from dvbcss.clock import batchUpdates
+
+
+
+def _udpSocketPair():
+    """\
+    :returns: tuple (recv, send) of UDP sockets, bound to the loopback interface and connected to each other.
+    """
+    recv = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    send = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        recv.bind(("127.0.0.1", 0))
+        send.bind(("127.0.0.1", 0))
+        send.connect(recv.getsockname())
+        recv.connect(send.getsockname())
+    except socket.error:
+        recv.close()
+        send.close()
+        raise
+    return recv, send
+
+
+def _socketPair():
+    """\
+    :returns: tuple (recv, send) of connected sockets. Uses :func:`socket.socketpair` if the platform has it
+              (it does not on Windows), otherwise a pair of UDP sockets on the loopback interface.
+    """
+    if hasattr(socket, "socketpair"):
+        return socket.socketpair()
+    else:
+        return _udpSocketPair()
+
+
+
+class Waker(object):
+    """\
+    A socket pair that can be used to wake up a thread blocked in :func:`select.select`.
+
+    Include this object in the list of sockets passed to :func:`select.select`, and call
+    :func:`wake` from another thread to cause it to become readable.
+    """
+    def __init__(self):
+        super(Waker,self).__init__()
+        self._recv, self._send = _socketPair()
+        self._recv.setblocking(False)
+        self._send.setblocking(False)
+
+    def fileno(self):
+        return self._recv.fileno()
+
+    def wake(self):
+        """\
+        Make this object readable, waking any thread waiting for it.
+        """
+        try:
+            self._send.send("x")
+        except socket.error:
+            pass  # buffer full, so it is already readable
+
+    def drain(self):
+        """\
+        Consume any pending wake-ups, so this object is no longer readable.
+        """
+        try:
+            while self._recv.recv(4096):
+                pass
+        except socket.error:
+            pass
+
+    def close(self):
+        self._recv.close()
+        self._send.close()
+
+
+
+class Timer(object):
+    """\
+    Handle for a callback scheduled using :func:`EventLoop.callLater`.
+    """
+    def __init__(self, when, callback, args):
+        super(Timer,self).__init__()
+        self.when = when            #: The time (in seconds of :func:`dvbcss.monotonic_time.time`) when the callback is due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False      #: True if :func:`cancel` has been called
+
+    def cancel(self):
+        """\
+        Cancel the callback. Does nothing if it has already been called.
+        """
+        self.cancelled = True
+
+
+
+class EventLoop(object):
+    """\
+    Single threaded event loop for UDP sockets and timers, based on :func:`select.select`.
+
+    Call :func:`start` to run the event loop in its own thread, or call :func:`run` to
+    run it on the calling thread.
+
+    All methods may be called from any thread.
+
+    :param batchClockUpdates: (bool, default=True) If True, clock change notifications caused by the callbacks run in a single pass of the event loop are coalesced using :func:`dvbcss.clock.batchUpdates`.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, batchClockUpdates=True):
+        super(EventLoop,self).__init__()
+        self.batchClockUpdates = batchClockUpdates
+        self.log = logging.getLogger("dvbcss.protocol.eventloop.EventLoop")
+        self._lock = threading.Lock()
+        self._readers = {}
+        self._timers = []
+        self._seq = itertools.count()
+        self._waker = None
+        self._pleaseStop = False
+        self._loopThread = None
+        self.thread = None
+
+    def addReader(self, sock, callback):
+        """\
+        Start watching a socket.
+
+        :param sock: The :class:`~socket.socket` to watch.
+        :param callback: Function that will be called, with the socket as its argument, whenever the socket is readable.
+        """
+        with self._lock:
+            self._readers[sock] = callback
+        self._wake()
+
+    def removeReader(self, sock):
+        """\
+        Stop watching a socket. Does nothing if the socket is not being watched.
+        """
+        with self._lock:
+            self._readers.pop(sock, None)
+        self._wake()
+
+    def callLater(self, delaySecs, callback, *args):
+        """\
+        Schedule a function to be called after a delay.
+
+        :param delaySecs: Time to wait (in seconds) before calling the function.
+        :param callback: The function to be called.
+        :param args: Any arguments to pass to the function.
+
+        :returns: A :class:`Timer` object that can be used to cancel the call.
+        """
+        timer = Timer(time.time() + delaySecs, callback, args)
+        with self._lock:
+            heapq.heappush(self._timers, (timer.when, self._seq.next(), timer))
+        self._wake()
+        return timer
+
+    def callSoon(self, callback, *args):
+        """\
+        Schedule a function to be called as soon as possible by the event loop.
+
+        :returns: A :class:`Timer` object that can be used to cancel the call.
+        """
+        return self.callLater(0, callback, *args)
+
+    def inLoopThread(self):
+        """\
+        :returns: True if called from code being run by the event loop.
+        """
+        return threading.current_thread() is self._loopThread
+
+    def _wake(self):
+        waker = self._waker
+        if waker is not None and not self.inLoopThread():
+            waker.wake()
+
+    def start(self):
+        """\
+        Start the event loop running in a thread in the background.
+        Does nothing if it is already running.
+        """
+        if self.thread is not None:
+            return
+        self._pleaseStop = False
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.log.debug("Starting")
+        self.thread.start()
+
+    def stop(self):
+        """\
+        Stop the event loop. If it was started by calling :func:`start` then this
+        does not return until the thread has terminated.
+
+        Sockets and timers remain registered, so the event loop can be restarted.
+        """
+        self._pleaseStop = True
+        self._wake()
+        if self.thread is not None and not self.inLoopThread():
+            self.thread.join()
+            self.thread = None
+            self.log.debug("Stopped")
+
+    def run(self):
+        """\
+        Run the event loop on the calling thread. Does not return until :func:`stop` is called.
+        """
+        self._pleaseStop = False
+        self._run()
+
+    def _run(self):
+        self._loopThread = threading.current_thread()
+        self._waker = Waker()
+        try:
+            while not self._pleaseStop:
+                self._runOnce()
+        finally:
+            self._loopThread = None
+            waker, self._waker = self._waker, None
+            waker.close()
+
+    def _runOnce(self):
+        with self._lock:
+            readers = self._readers.keys()
+            timers = self._timers
+            while timers and timers[0][2].cancelled:
+                heapq.heappop(timers)
+            if timers:
+                timeout = max(0, timers[0][0] - time.time())
+            else:
+                timeout = None
+
+        try:
+            readable, _, _ = select.select(readers + [self._waker], [], [], timeout)
+        except (select.error, socket.error, ValueError), e:
+            self._removeBadReaders(readers, e)
+            return
+
+        if self.batchClockUpdates:
+            # exceptions raised by dependents when the batch ends are logged, like those of callbacks
+            self._call(self._dispatchBatched, readable)
+        else:
+            self._dispatch(readable)
+
+    def _removeBadReaders(self, readers, error):
+        """\
+        Stop watching any of the sockets that can no longer be passed to :func:`select.select` (e.g. because
+        they were closed without being removed first).
+        """
+        for sock in readers:
+            try:
+                select.select([sock], [], [], 0)
+            except (select.error, socket.error, ValueError):
+                self.log.error("Stopped watching socket %s because it cannot be selected: %s" % (repr(sock), str(error)))
+                with self._lock:
+                    self._readers.pop(sock, None)
+
+    def _dispatchBatched(self, readable):
+        with batchUpdates():
+            self._dispatch(readable)
+
+    def _dispatch(self, readable):
+        for sock in readable:
+            if sock is self._waker:
+                self._waker.drain()
+            else:
+                callback = self._readers.get(sock, None)
+                if callback is not None:
+                    self._call(callback, sock)
+
+        now = time.time()
+        due = []
+        with self._lock:
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers)[2])
+        for timer in due:
+            if not timer.cancelled:
+                self._call(timer.callback, *timer.args)
+
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            self.log.exception("Exception in event loop callback")
+
+
+
+__all__ = [
+    "EventLoop",
+]
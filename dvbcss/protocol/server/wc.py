@@ -46,7 +46,8 @@ precision of the clock. Fortunately the SysClock already estimates this and it
 is passed through any dependent clocks.
 
 Fortunately the SysClock internally estimates the measurement precision automatically
-when it is created. It also defaults to assuming the maximum frequency error is
+when it is created (using the measurements of the system clock made by
+:func:`dvbcss.calibration.getCalibration`). It also defaults to assuming the maximum frequency error is
 500ppm, unless you specify otherwise.
 
 Maximum frequency error will depend on oscillator accuracy in the hardware the
@@ -69,10 +70,17 @@ So next we create and start the wall clock server.
 """
 
 import socket
+import select
+import struct
 import logging
+import platform
 import threading
+import multiprocessing
 
 from dvbcss.protocol.wc import WCMessage as WCMessage
+from dvbcss.protocol import _mmsg
+from dvbcss.protocol.eventloop import Waker
+from dvbcss.clock import SysClock
 
 
 class UdpRequestServer(object):
@@ -82,77 +90,139 @@ class UdpRequestServer(object):
     Pass it an open UDP socket object that blocks on receive,
     and it will call your handler, passing the socket, plus the received data.
     
-    This all happens in a separate thread.
+    This all happens in a separate thread, or is run by an
+    :class:`~dvbcss.protocol.eventloop.EventLoop` if one is provided.
     
     Use start() and stop() methods to start and stop the handling thread.
     
     Socket must have set blocking and a timeout.
-    
-    
-    
+
+    If a `batchSize` greater than 1 is specified, then the server instead
+    receives up to that many waiting packets at a time (using a single `recvmmsg`
+    system call on Linux) and passes them together to the :func:`handleBatch`
+    method of the handler.
+
+    If `timestamps` is True, then the time at which the kernel received each packet
+    is also passed to the :func:`handleBatch` method of the handler (even if `batchSize` is 1).
+
     """
-    def __init__(self, socket, handler, maxMsgSize):
+    def __init__(self, socket, handler, maxMsgSize, batchSize=1, loop=None, timestamps=False):
         """\
         :param socket: Bound socket ready to receive (and send) UDP packets
         :type socket: :class:`socket.socket`
-        :param handler: (object) Object providing a :func:`handle` method.
+        :param handler: (object) Object providing a :func:`handle` method (and a :func:`handleBatch` method if `batchSize` is greater than 1).
         :param int maxMsgSize: The maximum message size (sets the UDP receive buffer size)
-        
+        :param int batchSize: Optional (default=1). The maximum number of packets to receive and pass to the handler at once.
+        :param loop: Optional. An :class:`~dvbcss.protocol.eventloop.EventLoop` to run the server, instead of it having a thread of its own.
+        :param bool timestamps: Optional (default=False). If True, kernel receive timestamps are enabled on the socket and passed to the handler. Only supported on Linux.
+
         The `handler` object must have a method with the following signature:
-        
+
             .. py:function:: handle(socket, received_data, src_addr)
-            
+
                :param socket: The :class:`~socket.socket` object for the connection on which the packet was received.
                :param str received_data: The received UDP packet payload
                :param src_addr: The source address. For an AF_INET connection this will be a tuple (:class:`str` host, :class:`int` port)
+
+        If `batchSize` is greater than 1, or `timestamps` is True, the `handler` object must also have a method with the following signature:
+
+            .. py:function:: handleBatch(socket, packets)
+
+               :param socket: The :class:`~socket.socket` object for the connection on which the packets were received.
+               :param packets: A :class:`list` of one or more tuples (received_data, src_addr) in the order they were received.
+                   If `timestamps` is True, each tuple also has a third item: the time at which the packet was received
+                   by the kernel in the timescale of :func:`dvbcss.monotonic_time.timeNanos`, or :class:`None` if unknown.
         """
         super(UdpRequestServer,self).__init__()
         self.log=logging.getLogger("dvscss.protocol.server.wc.UdpRequestServer")
         self.socket = socket
         self.handler=handler
         self.maxMsgSize=maxMsgSize
+        if batchSize < 1:
+            raise ValueError("batchSize must be 1 or greater")
+        if (batchSize > 1 or timestamps) and not hasattr(handler, "handleBatch"):
+            raise ValueError("Handler must provide a handleBatch() method if batchSize is greater than 1 or timestamps are used")
+        if timestamps:
+            _mmsg.enableTimestamps(socket)
+        self.batchSize=batchSize
+        self.timestamps=timestamps
+        self.loop=loop
         self.thread=None
+        self._running=False
 
     def start(self):
         r"""\
-        Starts the wall clock server running. It runs in a thread in the background.
+        Starts the wall clock server running. It runs in a thread in the background, or is run by the event loop.
         """
-        if self.thread is not None:
+        if self._running:
             return
+        self._running=True
         self._pleaseStop=False
-        self.thread = threading.Thread(target=self.run)
-        self.thread.daemon=True
         self.log.debug("Starting")
-        self.thread.start()
+        if self.batchSize > 1 or self.timestamps:
+            receiver = _mmsg.BatchReceiver(self.maxMsgSize, self.batchSize, self.timestamps)
+            readHandler = lambda sock : self._receiveBatch(receiver)
+        else:
+            readHandler = lambda sock : self._receive()
+        if self.loop is not None:
+            self.loop.addReader(self.socket, readHandler)
+        else:
+            self._waker = Waker()
+            self.thread = threading.Thread(target=self.run, args=(readHandler,))
+            self.thread.daemon=True
+            self.thread.start()
         
     def stop(self):
         r"""\
         Stops the wall clock server running. Does not return until the thread has terminated.
         """
-        if self.thread is None:
+        if not self._running:
             return
         self._pleaseStop=True
         self.log.debug("Stopping")
-        self.thread.join()
+        if self.loop is not None:
+            self.loop.removeReader(self.socket)
+        else:
+            self._waker.wake()
+            self.thread.join()
+            self.thread=None
+            self._waker.close()
+        self._running=False
         self.log.debug("Stopped")
         
-    def run(self):
+    def run(self, readHandler):
         """\
         Internal method - the main runloop of the thread.
         
         Runs in a loop calling the :func:`handle` method of the object assigned to the :data:`handler` property
-        whenever a UDP packet is received. 
+        whenever a UDP packet is received (or :func:`handleBatch` if `batchSize` is greater than 1).
         
         Does not return until the _pleaseStop attribute of the object has been set to True
         """
         while not self._pleaseStop:
-            try:
-                data,srcaddr=self.socket.recvfrom(self.maxMsgSize)
-                self.handler.handle(self.socket, data, srcaddr)
-                
-            except socket.timeout:
-                self.log.debug("Socket timeout.")
-                pass
+            readable, _, _ = select.select([self.socket, self._waker], [], [])
+            if self.socket in readable and not self._pleaseStop:
+                readHandler(self.socket)
+
+    def _receive(self):
+        """\
+        Internal method - receives a single packet, and passes it to the :func:`handle` method of the handler.
+        """
+        try:
+            data,srcaddr=self.socket.recvfrom(self.maxMsgSize)
+        except socket.timeout:
+            self.log.debug("Socket timeout.")
+            return
+        self.handler.handle(self.socket, data, srcaddr)
+
+    def _receiveBatch(self, receiver):
+        """\
+        Internal method - receives up to `batchSize` waiting packets and passes them all
+        to the :func:`handleBatch` method of the handler.
+        """
+        packets = receiver.recv(self.socket)
+        if packets:
+            self.handler.handleBatch(self.socket, packets)
 
 
 
@@ -161,8 +231,27 @@ class WallClockServerHandler(object):
     Simple Wall Clock Server Handler function.
     
     Provides a handle() method. Designed to be used with :class:`UdpRequestServer`
-    
+
+    Responses are built by copying the received request into a preallocated
+    buffer and overwriting only the fields that differ in the response. The
+    encoded precision and maximum frequency error are cached. The cache is
+    invalidated whenever the wall clock (or any clock it depends on) notifies
+    of a change, and in any case after :data:`precisionCacheSecs` seconds.
+    So that the precision reported is never less than the dispersion of the wall clock
+    when a request is received, the cached value is the dispersion at the end of the period
+    for which it is reused.
+
+    The handler binds to the wall clock (see :func:`~dvbcss.clock.ClockBase.bind`) when it is created,
+    to follow changes to it. It stays bound, and so is referenced by the clock, until :func:`close`
+    is called. :class:`WallClockServer` does this when it is stopped. If you pass a handler
+    to :class:`UdpRequestServer` yourself, then call :func:`close` when you have finished with it.
     """
+
+    precisionCacheSecs = 1.0  #: Maximum time (in seconds of the wall clock) for which the encoded precision is reused before it is recalculated
+
+    _HEADER = struct.Struct(">BBbBL")      # version, msgtype, precision, reserved, maxFreqError
+    _TIMEVALUES = struct.Struct(">LLLL")   # receive seconds & nanos, transmit seconds & nanos
+    _TIMEVALUES_OFFSET = 16
     
     def __init__(self, wallClock, precisionSecs=None, maxFreqErrorPpm=None, followup=False, **kwargs):
         """\
@@ -171,6 +260,8 @@ class WallClockServerHandler(object):
         :param precisionSecs:   (float) Optional. Override using the precision of the provided clock and instead use this value. It is the precision (in seconds) to be reported for the clock in protocol interactions
         :param maxFreqErrorPpm: (float or None) Optional. Override using the :func:`~dvbcss.clock.ClockBase.getRootMaxFreqError` of the clock and instead use this value. It is the clock maximum frequency error in parts-per-million
         :param bool followup: Set to True if the Wall Clock Server should send follow-up responses
+
+        The handler is bound to `wallClock` until :func:`close` is called.
         """
         super(WallClockServerHandler,self).__init__(**kwargs)
         self.log=logging.getLogger("dvbcss.protocol.server.wc.WallClockServerHandler")
@@ -178,42 +269,203 @@ class WallClockServerHandler(object):
         self.precision=precisionSecs
         self.maxFreqErrorPpm=maxFreqErrorPpm
         self.followup=followup
-        
+        self._sender=_mmsg.BatchSender(64)
+
+        self._replyBuf = bytearray(WCMessage.MSG_SIZE)
+        self._followupBuf = bytearray(WCMessage.MSG_SIZE)
+        self._batchBufs = []
+        self._encodedAtTicks = None
+        self._bound = False
+        self._bindClock()
+
+    def _bindClock(self):
+        """\
+        Start following changes to the wall clock (if not already doing so).
+        """
+        if not self._bound:
+            self.clock.bind(self)
+            self._bound = True
+            self._encodedAtTicks = None
+
+    def close(self):
+        """\
+        Stop following changes to the wall clock, so that this handler is no longer
+        referenced by the clock. The handler should not then be used again.
+
+        :class:`WallClockServer` does this when it is stopped.
+
+        .. versionadded:: 0.6
+        """
+        if self._bound:
+            self.clock.unbind(self)
+            self._bound = False
+
+    def notify(self, cause):
+        """\
+        Called when the wall clock (or a clock it depends on) changes. Invalidates
+        the cached encoding of the precision and maximum frequency error.
+        """
+        self._encodedAtTicks = None
+
+    def _encodedPrecisionAndMfe(self, recv_ticks):
+        """\
+        :returns: tuple (precision, maxFreqError) encoded ready for packing into a response to a request received at `recv_ticks`.
+        """
+        at = self._encodedAtTicks
+        if at is None or not at <= recv_ticks <= at + self.clock.tickRate * self.precisionCacheSecs:
+            if self.precision is not None:
+                precision = self.precision
+            else:
+                # dispersion only grows with time, so use the worst case for the period the cached value is used for
+                until = recv_ticks + self.clock.tickRate * self.precisionCacheSecs
+                precision = max(self.clock.dispersionAtTime(recv_ticks), self.clock.dispersionAtTime(until))
+            mfe = self.maxFreqErrorPpm if self.maxFreqErrorPpm is not None else self.clock.getRootMaxFreqError()
+            self._encoded = WCMessage.encodePrecision(precision), WCMessage.encodeMaxFreqError(mfe)
+            self._encodedAtTicks = recv_ticks
+        return self._encoded
+
+    def _isRequest(self, data):
+        """\
+        :returns: True if the data has the size, version number and message type of a request.
+        """
+        return len(data) == WCMessage.MSG_SIZE and data[0] == "\x00" and data[1] == "\x00"
+
+    def _nanos(self, ticks, tickrate):
+        """\
+        :returns: tuple (seconds, nanoseconds) representing the time of the wall clock (in ticks) as a timevalue.
+        """
+        return divmod(int(ticks * 1000000000 / tickrate), 1000000000)
+
     def handle(self, socket, data, srcaddr):
         recv_ticks, tickrate=self.clock.ticks, self.clock.tickRate
-        
-        msg=WCMessage.unpack(data)
-        reply=msg.copy()
-        if msg.msgtype==WCMessage.TYPE_REQUEST:
-            reply.receiveNanos = recv_ticks * 1000000000 / tickrate
-        
-            if self.followup:
-                reply.msgtype = WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP
-            else:
-                reply.msgtype = WCMessage.TYPE_RESPONSE
-            reply.setPrecision(self.precision if self.precision is not None else self.clock.dispersionAtTime(recv_ticks))
-            reply.setMaxFreqError(self.maxFreqErrorPpm if self.maxFreqErrorPpm is not None else self.clock.getRootMaxFreqError())
-            reply.transmitNanos = self.clock.ticks * 1000000000 / tickrate
-            socket.sendto(reply.pack(), srcaddr)
-            
-            if self.followup:
-                followupReply = reply.copy()
-                followupReply.transmitNanos = self.clock.ticks * 1000000000 / tickrate
-                followupReply.msgtype = WCMessage.TYPE_FOLLOWUP
-                socket.sendto(followupReply.pack(), srcaddr)
-            
+
+        if not self._isRequest(data):
+            WCMessage.unpack(data)  # raises ValueError if malformed
+            raise ValueError("Wall clock server received non request message")
+
+        precision, mfe = self._encodedPrecisionAndMfe(recv_ticks)
+        msgtype = WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP if self.followup else WCMessage.TYPE_RESPONSE
+        rs, rn = self._nanos(recv_ticks, tickrate)
+
+        reply = self._replyBuf
+        reply[:] = data
+        self._HEADER.pack_into(reply, 0, 0, msgtype, precision, 0, mfe)
+        ts, tn = self._nanos(self.clock.ticks, tickrate)
+        self._TIMEVALUES.pack_into(reply, self._TIMEVALUES_OFFSET, rs, rn, ts, tn)
+        socket.sendto(reply, srcaddr)
+
+        if self.followup:
+            followupReply = self._followupBuf
+            followupReply[:] = reply
+            ts, tn = self._nanos(self.clock.ticks, tickrate)
+            self._HEADER.pack_into(followupReply, 0, 0, WCMessage.TYPE_FOLLOWUP, precision, 0, mfe)
+            self._TIMEVALUES.pack_into(followupReply, self._TIMEVALUES_OFFSET, rs, rn, ts, tn)
+            socket.sendto(followupReply, srcaddr)
+
+        if self.log.isEnabledFor(logging.INFO):
+            msg=WCMessage.unpack(data)
             self.log.debug("Received :"+str(msg)+"\n")
             self.log.info("Responding to request from %s port %d with originate time=%20d ns" % (srcaddr[0], srcaddr[1], msg.originateNanos))
-            self.log.debug("Response :"+str(reply)+"\n")
+            self.log.debug("Response :"+str(WCMessage.unpack(str(reply)))+"\n")
             if self.followup:
-                self.log.debug("Followed by:"+str(followupReply)+"\n")
-        else:
-            raise ValueError("Wall clock server received non request message")
+                self.log.debug("Followed by:"+str(WCMessage.unpack(str(followupReply)))+"\n")
+
+    def handleBatch(self, socket, packets):
+        """\
+        Handle several requests that were received together. Replies are sent together too.
+
+        :param socket: The :class:`~socket.socket` on which the requests were received.
+        :param packets: A :class:`list` of tuples (received_data, src_addr) or (received_data, src_addr, rx_nanos).
+
+        If a packet includes `rx_nanos` (that is not :class:`None`) then this is used as
+        its receive time. It is the time at which the request was received
+        (in the timescale of :func:`dvbcss.monotonic_time.timeNanos`), for example as
+        recorded by the kernel. This requires that the root of the wall clock is a
+        :class:`~dvbcss.clock.SysClock`.
+
+        Otherwise, the request was already waiting to be received at the
+        moment the batch was read from the socket. All such requests are given
+        the same receive time, read once immediately after the batch was received.
+        The transmit time is read once, immediately before the replies are sent.
+
+        Any packet in the batch that is not a valid request is logged and ignored.
+        """
+        recv_ticks, tickrate = self.clock.ticks, self.clock.tickRate
+        precision, mfe = self._encodedPrecisionAndMfe(recv_ticks)
+        msgtype = WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP if self.followup else WCMessage.TYPE_RESPONSE
+        batchReceiveTime = self._nanos(recv_ticks, tickrate)
+
+        bufs = self._batchBufs
+        while len(bufs) < len(packets):
+            bufs.append(bytearray(WCMessage.MSG_SIZE))
+
+        replies = []
+        receiveTimes = []
+        for packet in packets:
+            data, srcaddr = packet[0], packet[1]
+            if not self._isRequest(data):
+                try:
+                    WCMessage.unpack(data)
+                    self.log.warn("Ignoring non request message from %s port %d" % (srcaddr[0], srcaddr[1]))
+                except ValueError, e:
+                    self.log.warn("Ignoring malformed message from %s port %d : %s" % (srcaddr[0], srcaddr[1], str(e)))
+                continue
+            reply = bufs[len(replies)]
+            reply[:] = data
+            replies.append((reply, srcaddr))
+            if len(packet) > 2 and packet[2] is not None:
+                receiveTimes.append(self._nanos(self._monotonicNanosToTicks(packet[2]), tickrate))
+            else:
+                receiveTimes.append(batchReceiveTime)
+
+        if not replies:
+            return
+
+        self._sendBatch(socket, replies, receiveTimes, msgtype, precision, mfe)
+        if self.followup:
+            self._sendBatch(socket, replies, receiveTimes, WCMessage.TYPE_FOLLOWUP, precision, mfe)
+
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info("Responded to batch of %d requests" % len(replies))
+
+    def _sendBatch(self, socket, replies, receiveTimes, msgtype, precision, mfe):
+        """\
+        Fill in the header and time values of a batch of replies, then send them.
+        """
+        header = self._HEADER.pack(0, msgtype, precision, 0, mfe)
+        ts, tn = self._nanos(self.clock.ticks, self.clock.tickRate)
+        pack_into = self._TIMEVALUES.pack_into
+        for (reply, _), (rs, rn) in zip(replies, receiveTimes):
+            reply[0:8] = header
+            pack_into(reply, self._TIMEVALUES_OFFSET, rs, rn, ts, tn)
+        self._sender.send(socket, replies)
+
+    def _monotonicNanosToTicks(self, nanos):
+        """\
+        :returns: The time of the wall clock (in ticks) corresponding to a time from :func:`dvbcss.monotonic_time.timeNanos`
+        """
+        root = self.clock.getRoot()
+        return self.clock.fromRootTicks(nanos * root.tickRate / 1000000000)
 
 
-def _createUdpSocket((bindaddr, bindport)):
+def _reusePortOption():
+    """\
+    :returns: The value of the SO_REUSEPORT socket option for this platform.
+    :throws NotImplementedError: if this platform does not support SO_REUSEPORT
+    """
+    if hasattr(socket, "SO_REUSEPORT"):
+        return socket.SO_REUSEPORT
+    elif platform.system() == "Linux":
+        return 15   # not defined by the socket module in older versions of python
+    else:
+        raise NotImplementedError("SO_REUSEPORT is not supported on this platform.")
+
+
+def _createUdpSocket((bindaddr, bindport), reusePort=False):
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reusePort:
+        s.setsockopt(socket.SOL_SOCKET, _reusePortOption(), 1)
     s.settimeout(1.0)
     s.bind((bindaddr,bindport))
     return s
@@ -227,14 +479,29 @@ class WallClockServer(UdpRequestServer):
     Pass it a :mod:`~dvbcss.clock` object and information on clock precision and frequency stability,
     and tell it which network interface to listen on.
     
-    Call start() and stop() to start and stop the server. It runs in its own separate thread in the background.
+    Call start() and stop() to start and stop the server. It runs in its own separate thread in the background,
+    unless an :class:`~dvbcss.protocol.eventloop.EventLoop` is provided, in which case it is run by that event loop.
     
     You can optionally ask this server to operate in a mode where it will send *follow-up* responses. Note, however, that
     in this implementation the transmit-timevalue reported in the follow-up response is not guaranteed to be more accurate.
     This option exists primarily to check whether a Wall Clock Client has implemennted handling of *follow-up*
     responses at all.
+
+    For servers handling requests from a large number of clients, set `batchSize` to a value greater than 1 (e.g. 64).
+    The server will then receive and reply to requests in batches, reducing the number of system calls per request.
+    All requests in a batch share the same transmit timevalue.
+
+    Set `kernelTimestamps` to True to use, as the receive timevalue, the time at which the kernel received
+    the request (instead of the time at which this server got to read it from the socket). This avoids
+    including delays caused by thread scheduling in the measurement. By default, this is done if `batchSize`
+    is greater than 1 and it is supported (on Linux, with a :class:`~dvbcss.clock.SysClock` at the root of
+    the wall clock). Otherwise all requests in a batch share the same receive timevalue: the time at which
+    the batch was read from the socket.
+
+    Set `reusePort` to True to allow several servers (e.g. in different processes) to bind to the same port.
+    The operating system will then share incoming requests between them. See :class:`WallClockServerPool`.
     """
-    def __init__(self, wallClock, precision=None, maxFreqError=None, bindaddr="0.0.0.0", bindport=6677, followup=False):
+    def __init__(self, wallClock, precision=None, maxFreqError=None, bindaddr="0.0.0.0", bindport=6677, followup=False, batchSize=1, reusePort=False, loop=None, kernelTimestamps=None):
         """\
         :param wallClock:       (:class:dvbcss.clock.ClockBase) The clock to be used as the wall clock for protocol interactions
         :param precisionSecs:   (float) Optional. Override using the precision of the provided clock and instead use this value. It is the precision (in seconds) to be reported for the clock in protocol interactions
@@ -242,14 +509,162 @@ class WallClockServer(UdpRequestServer):
         :param bindaddr:        (str, ip address) The ip address of the network interface to bind to, e.g. "127.0.0.1". Defaults to "0.0.0.0" which binds to all interfaces.
         :param bindport:        (int) The port number to bind to (defaults to 6677)
         :param followup:        (bool) Set to True if the Wall Clock Server should send follow-up responses. Defaults to False.
+        :param batchSize:       (int) The maximum number of requests to receive, and reply to, at once. Defaults to 1 (no batching).
+        :param reusePort:       (bool) Set to True to bind with the SO_REUSEPORT socket option. Defaults to False.
+        :param loop:            (:class:`~dvbcss.protocol.eventloop.EventLoop`) Optional. Event loop to run the server, instead of it having a thread of its own.
+        :param kernelTimestamps: (bool) Set to True to use the time at which the kernel received each request as its receive timevalue, or False to not do so. Only supported on Linux, and requires that the root of the wall clock is a :class:`~dvbcss.clock.SysClock`. Defaults to doing so only if `batchSize` is greater than 1 and it is supported.
         """
-        socket=_createUdpSocket((bindaddr,bindport))
+        if kernelTimestamps is None:
+            kernelTimestamps = batchSize > 1 and _mmsg.available and isinstance(wallClock.getRoot(), SysClock)
+        elif kernelTimestamps and not isinstance(wallClock.getRoot(), SysClock):
+            raise ValueError("kernelTimestamps requires the root of the wall clock to be a SysClock")
+        socket=_createUdpSocket((bindaddr,bindport), reusePort)
         handler=WallClockServerHandler(wallClock, precision, maxFreqError, followup)
-        super(WallClockServer,self).__init__(socket, handler, WCMessage.MSG_SIZE)
+        super(WallClockServer,self).__init__(socket, handler, WCMessage.MSG_SIZE, batchSize, loop, kernelTimestamps)
         self.log = logging.getLogger("dvbcss.protocol.server.wc.WallClockServer")
 
+    def start(self):
+        """\
+        Starts the wall clock server running. It runs in a thread in the background, or is run by the event loop.
+        """
+        self.handler._bindClock()
+        super(WallClockServer,self).start()
+
+    def stop(self):
+        """\
+        Stops the wall clock server running. Does not return until the thread has terminated.
+
+        The server stops following changes to the wall clock, so that it is no longer referenced by it.
+        It follows them again if it is restarted.
+        """
+        super(WallClockServer,self).stop()
+        self.handler.close()
+
+
+
+def _defaultWallClockFactory():
+    return SysClock(tickRate=1000000000)
+
+
+def _poolWorker(wallClockFactory, serverArgs, readyQueue, stopEvent):
+    """\
+    Internal function - the body of a worker process of a :class:`WallClockServerPool`.
+    """
+    try:
+        server = WallClockServer(wallClockFactory(), reusePort=True, **serverArgs)
+        server.start()
+    except Exception, e:
+        readyQueue.put(e)
+        return
+    readyQueue.put(server.socket.getsockname()[1])
+    stopEvent.wait()
+    server.stop()
+    server.socket.close()
+
+
+
+class WallClockServerPool(object):
+    """\
+    A CSS-WC server that uses several worker processes to handle requests.
+
+    Each worker process runs its own :class:`WallClockServer` bound to the same port
+    using the SO_REUSEPORT socket option. The operating system shares incoming
+    requests between the workers, so requests can be handled on several CPU cores
+    at once. This option is only supported on platforms that support SO_REUSEPORT
+    (e.g. Linux 3.9 or later).
+
+    Each worker creates its own wall clock by calling `wallClockFactory`. The
+    default creates a :class:`~dvbcss.clock.SysClock` with a tick rate of 1e9
+    ticks per second. A :class:`~dvbcss.clock.SysClock` is based on the
+    system's monotonic clock, which is the same for all processes. The wall clocks
+    of all workers are therefore the same, provided the factory creates the same
+    arrangement of clocks each time it is called.
+
+    Call start() and stop() to start and stop the server.
+
+    .. code-block:: python
+
+        from dvbcss.clock import SysClock
+        from dvbcss.protocol.server.wc import WallClockServerPool
+
+        def makeWallClock():
+            return SysClock(tickRate=1000000000, maxFreqErrorPpm=45)
+
+        pool = WallClockServerPool(4, makeWallClock, bindport=6677, batchSize=64)
+        pool.start()
+    """
+    def __init__(self, numWorkers, wallClockFactory=None, precision=None, maxFreqError=None, bindaddr="0.0.0.0", bindport=6677, followup=False, batchSize=1, kernelTimestamps=None):
+        """\
+        :param numWorkers:       (int) The number of worker processes.
+        :param wallClockFactory: (callable) Optional. Called, with no arguments, in each worker process to create the clock to be used as the wall clock. Defaults to creating a :class:`~dvbcss.clock.SysClock` with tick rate 1e9.
+        :param precision:        (float) Optional. Override using the precision of the wall clock and instead use this value. It is the precision (in seconds) to be reported for the clock in protocol interactions
+        :param maxFreqError:     (float) Optional. Override using the :func:`~dvbcss.clock.ClockBase.rootMaxFreqError` of the wall clock and instead use this value. It is the clock maximum frequency error in parts-per-million
+        :param bindaddr:         (str, ip address) The ip address of the network interface to bind to. Defaults to "0.0.0.0" which binds to all interfaces.
+        :param bindport:         (int) The port number to bind to (defaults to 6677). If 0, then a free port is chosen when the server is started. See :data:`bindport`.
+        :param followup:         (bool) Set to True if the Wall Clock Server should send follow-up responses. Defaults to False.
+        :param batchSize:        (int) The maximum number of requests each worker receives, and replies to, at once. Defaults to 1 (no batching).
+        :param kernelTimestamps: (bool) Set to True to use kernel receive timestamps, or False to not do so. See :class:`WallClockServer`. Defaults to using them only if `batchSize` is greater than 1 and they are supported.
+        """
+        super(WallClockServerPool,self).__init__()
+        if numWorkers < 1:
+            raise ValueError("Number of workers must be at least 1.")
+        _reusePortOption()
+        self.log = logging.getLogger("dvbcss.protocol.server.wc.WallClockServerPool")
+        self.numWorkers = numWorkers
+        self.wallClockFactory = wallClockFactory if wallClockFactory is not None else _defaultWallClockFactory
+        self.bindport = bindport  #: The port number the server is bound to. If 0 was requested, this is set to the actual port number once started.
+        self._serverArgs = {
+            "precision"    : precision,
+            "maxFreqError" : maxFreqError,
+            "bindaddr"     : bindaddr,
+            "followup"     : followup,
+            "batchSize"    : batchSize,
+            "kernelTimestamps" : kernelTimestamps,
+        }
+        self._workers = []
+        self._stopEvent = None
+
+    def _startWorker(self, readyQueue):
+        args = dict(self._serverArgs)
+        args["bindport"] = self.bindport
+        worker = multiprocessing.Process(target=_poolWorker, args=(self.wallClockFactory, args, readyQueue, self._stopEvent))
+        worker.daemon = True
+        worker.start()
+        self._workers.append(worker)
+        result = readyQueue.get()
+        if isinstance(result, Exception):
+            self.stop()
+            raise result
+        return result
+
+    def start(self):
+        """\
+        Starts the worker processes. Does not return until all workers are ready to receive requests.
+        """
+        if self._workers:
+            raise RuntimeError("Cannot start: already running.")
+        self._stopEvent = multiprocessing.Event()
+        readyQueue = multiprocessing.Queue()
+        # the first worker chooses the port, if it was not specified
+        self.bindport = self._startWorker(readyQueue)
+        for i in range(1, self.numWorkers):
+            self._startWorker(readyQueue)
+        self.log.info("Started %d workers on port %d" % (self.numWorkers, self.bindport))
+
+    def stop(self):
+        """\
+        Stops the worker processes. Does not return until they have all terminated.
+        """
+        if not self._workers:
+            raise RuntimeError("Cannot stop: not running.")
+        self._stopEvent.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
 
 __all__ = [
     "WallClockServer",
     "WallClockServerHandler",
+    "WallClockServerPool",
 ]
@@ -206,6 +206,10 @@ class SetupData(object):
 
 class Timestamp(object):
 
+    __slots__ = ("contentTime", "wallClockTime")
+
+    log = logging.getLogger("dvbcss.protocol.ts.Timestamp")
+
     def __init__(self, contentTime, wallClockTime):
         """\
         Object representing a Timestamp part(s) of a :class:`ControlTimestamp` or :class:`AptEptLpt` object.
@@ -226,11 +230,13 @@ class Timestamp(object):
         * :data:`wallClockTime`
             
         Converting to and from JSON representation is performed using the :func:`pack` method and :func:`unpack` class method.
+
+        .. versionchanged:: 0.6
+           Uses `__slots__`, so instances are smaller and quicker to create. Attributes other than those listed above cannot be added.
         """
         super(Timestamp,self).__init__()
         self.contentTime=contentTime    #: (read/write :obj:`None` or large :class:`int`) The content time part of a timestamp
         self.wallClockTime=wallClockTime #: (read/write large :class:`int` or :class:`float("+inf")` or :class:`float("-inf")` ) The wall clock time part of a timestamp 
-        self.log = logging.getLogger("dvbcss.protocol.ts.Timestamp")
 
     def __str__(self):
         return self.__repr__()
@@ -241,8 +247,17 @@ class Timestamp(object):
     def copy(self):
         return Timestamp(self.contentTime, self.wallClockTime)
 
+    def __reduce__(self):
+        # needed for pickling, since there is no __dict__
+        return (Timestamp, (self.contentTime, self.wallClockTime))
+
 
 class ControlTimestamp(object):
+
+    __slots__ = ("timestamp", "timelineSpeedMultiplier")
+
+    log = logging.getLogger("dvbcss.protocol.ts.ControlTimestamp")
+
     def __init__(self, timestamp, timelineSpeedMultiplier):
         """\
         Object representing a CSS-TS Control Timestamp message.
@@ -259,11 +274,13 @@ class ControlTimestamp(object):
         * :data:`timelineSpeedMultiplier`
             
         Converting to and from JSON representation is performed using the :func:`pack` method and :func:`unpack` class method.
+
+        .. versionchanged:: 0.6
+           Uses `__slots__`, so instances are smaller and quicker to create. Attributes other than those listed above cannot be added.
         """
         super(ControlTimestamp,self).__init__()
         self.timestamp = timestamp #: (read/write :class:`Timestamp`) :class:`Timestamp` object representing the contentTime and wallClockTime parts of the timestamp)
         self.timelineSpeedMultiplier = timelineSpeedMultiplier #: (read/write :class:`float` or :obj:`None`) Timeline speed. For example: 1 = normal, 0 = pause, -0.5 = half speed reverse. Use `None` only when the Control Timestamp is supposed to indicate that the timeline is unavailable.
-        self.log = logging.getLogger("dvbcss.protocol.ts.ControlTimestamp")
         
     def pack(self):
         """\
@@ -304,6 +321,10 @@ class ControlTimestamp(object):
         """:returns: a deep copy of this Control Timestamp object"""
         return ControlTimestamp(self.timestamp.copy(), self.timelineSpeedMultiplier)
 
+    def __reduce__(self):
+        # needed for pickling, since there is no __dict__
+        return (ControlTimestamp, (self.timestamp, self.timelineSpeedMultiplier))
+
 
 class AptEptLpt(object):
     
@@ -89,6 +89,10 @@ class WCMessage(object):
     STRUCT_FMT=">BBbBLLLLLLL"
     
     MSG_SIZE=32
+
+    __slots__ = ("msgtype", "precision", "maxFreqError", "originateNanos", "receiveNanos", "transmitNanos", "originalOriginate")
+
+    log = logging.getLogger("dvbcss.protocol.wc.WCMessage")
     
     def __init__(self, msgtype,precision,maxFreqError,originateNanos,receiveNanos,transmitNanos,originalOriginate=None):
         r"""\
@@ -109,9 +113,11 @@ class WCMessage(object):
         
         Convert to and from a string containing the binary encoding of this message
         using the :func:`pack` method and :func:`unpack` class method.
+
+        .. versionchanged:: 0.6
+           Uses `__slots__`, so instances are smaller and quicker to create. Attributes other than those listed below cannot be added.
         """
         super(WCMessage,self).__init__()
-        self.log = logging.getLogger("dvbcss.protocol.wc.WCMessage")
 
         self.msgtype = msgtype #: (read/write :class:`int`) Type of message. 0=request, 1=response, 2=response-with-followup, 3=followup
         self.precision = precision #: (read/write :class:`int`) Precision encoded in log base 2 seconds between -128 and +127 inclusive. For example: -10 encodes a precision value of roughly 0.001 seconds.
@@ -167,6 +173,10 @@ class WCMessage(object):
         "Duplicate this wallclock message object"
         return WCMessage(self.msgtype, self.precision, self.maxFreqError, self.originateNanos, self.receiveNanos, self.transmitNanos, self.originalOriginate)
 
+    def __reduce__(self):
+        # needed for pickling, since there is no __dict__
+        return (WCMessage, (self.msgtype, self.precision, self.maxFreqError, self.originateNanos, self.receiveNanos, self.transmitNanos, self.originalOriginate))
+
     def getPrecision(self):
         "Get precision value in fractions of a second"
         return self.decodePrecision(self.precision)
@@ -245,11 +255,17 @@ class Candidate(object):
     A helper function :func:`calcCorrelationFor` makes it easy to calculate the
     :class:`~dvbcss.clock.Correlation` needed to take this measurment candidate
     and use it to control a :class:`~dvbcss.clock.CorrelatedClock`.
+
+    .. versionchanged:: 0.6
+       Uses `__slots__`, so instances are smaller and quicker to create.
     """
+
+    __slots__ = ("t1", "t2", "t3", "t4", "offset", "rtt", "precision", "maxFreqError", "msg")
+
+    log = logging.getLogger("dvbcss.protocol.wc.Candidate")
     
     def __init__(self, msg, nanosRx):
         super(Candidate,self).__init__()
-        self.log=logging.getLogger("dvbcss.protocol.wc.Candidate")
         if msg.msgtype not in WCMessage.TYPE_ANY_RESPONSE:
             raise ValueError("Cannot create a candidate from a non-response message")
         self.t1 = msg.originateNanos #: (read only) The time "t1" at which the request was sent in the request-response measurement (nanoseconds)
@@ -265,6 +281,10 @@ class Candidate(object):
     def __str__(self):
         return "Candidate: offset=%20d, rtt=%20d, t1=%20d, t2=%20d, t3=%20d, t4=%20d" % (self.offset, self.rtt, self.t1, self.t2, self.t3, self.t4)
 
+    def __reduce__(self):
+        # needed for pickling (and copying), since there is no __dict__
+        return (Candidate, (self.msg, self.t4))
+
     def calcCorrelationFor(self, clock, localMaxFreqErrorPpm=None):
         r"""\
         Calculates and returns the :class:`~dvbcss.clock.Correlation` for a
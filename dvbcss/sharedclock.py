@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""\
+The dvbcss.sharedclock module lets several processes on the same machine share a single
+:class:`~dvbcss.clock.CorrelatedClock` (e.g. an estimate of a TV's Wall Clock) without each
+of them having to run its own Wall Clock client.
+
+One process runs the Wall Clock client as usual, and uses a :class:`SharedClockPublisher`
+to publish the correlation, speed, tick rate and availability of its clock into a small
+memory mapped file. Whenever the clock changes, the new values are published.
+
+Other processes create a :class:`SharedClock` that reads from the same file. It behaves
+like a :class:`~dvbcss.clock.CorrelatedClock` that cannot be adjusted, and always reflects
+the most recently published values. Reading it involves no network traffic or messages
+between processes, just a check of a sequence number in the shared memory.
+
+Both processes must use a :class:`~dvbcss.clock.SysClock` as the parent of the clock, and so
+must be on the same machine. The :mod:`dvbcss.monotonic_time` time source it uses is the same
+for all processes.
+
+Example
+-------
+
+In the process running the Wall Clock client:
+
+.. code-block:: python
+
+    from dvbcss.clock import SysClock, CorrelatedClock
+    from dvbcss.sharedclock import SharedClockPublisher
+
+    sysClock = SysClock()
+    wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+
+    ... create and start a WallClockClient that controls wallClock ...
+
+    publisher = SharedClockPublisher(wallClock, "/dev/shm/wallclock")
+
+In the other processes:
+
+.. code-block:: python
+
+    from dvbcss.clock import SysClock
+    from dvbcss.sharedclock import SharedClock
+
+    sysClock = SysClock()
+    wallClock = SharedClock(sysClock, "/dev/shm/wallclock")
+
+    print wallClock.ticks
+
+The values are protected by a sequence lock: the publisher makes the sequence number odd
+while it is writing, and readers retry if the sequence number was odd or changed while
+they were reading.
+
+A :class:`SharedClock` checks for newly published values whenever it is read, and notifies
+its dependents (see :func:`~dvbcss.clock.ClockBase.bind`) if they have changed. If nothing
+reads the clock for a while (e.g. it is only being used to schedule tasks with :mod:`dvbcss.task`)
+then call :func:`SharedClock.poll` periodically so that dependents still find out about changes.
+
+.. versionadded:: 0.6
+"""
+
+import mmap
+import os
+import struct
+import threading
+
+import dvbcss
+from dvbcss.clock import CorrelatedClock, Correlation
+
+
+_MAGIC = "DVBC"
+_VERSION = 1
+
+_SEQ = struct.Struct("<Q")          # sequence number, at offset 0. Odd while being written.
+_HEADER = struct.Struct("<4sI")     # magic, version, at offset 8
+_PAYLOAD = struct.Struct("<7dB")    # parentTickRate, tickRate, parentTicks, childTicks, initialError, errorGrowthRate, speed, available
+
+_HEADER_OFFSET = _SEQ.size
+_PAYLOAD_OFFSET = _HEADER_OFFSET + _HEADER.size
+_REGION_SIZE = _PAYLOAD_OFFSET + _PAYLOAD.size
+
+_MAX_READ_ATTEMPTS = 100000
+
+
+class SharedClockPublisher(object):
+    """\
+    Publishes the state of a :class:`~dvbcss.clock.CorrelatedClock` into a memory mapped file,
+    so that it can be used by :class:`SharedClock` objects in other processes.
+
+    The state is published immediately, and again every time the clock changes.
+
+    :param clock: The :class:`~dvbcss.clock.CorrelatedClock` to publish. Its parent must be a :class:`~dvbcss.clock.SysClock`.
+    :param path: Path of the file to use. It is created if it does not exist. (On Linux, use a file in `/dev/shm` to avoid it being written to disk)
+
+    .. versionadded:: 0.6
+    """
+
+    def __init__(self, clock, path):
+        super(SharedClockPublisher,self).__init__()
+        if clock.getParent() is None or clock.getParent().getParent() is not None:
+            raise ValueError("Clock to be published must have a root clock (e.g. SysClock) as its parent")
+        self.clock = clock  #: The clock being published
+        self.path = path    #: Path of the memory mapped file
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0644)
+        if os.fstat(self._fd).st_size < _REGION_SIZE:
+            os.ftruncate(self._fd, _REGION_SIZE)
+        self._map = mmap.mmap(self._fd, _REGION_SIZE)
+        _HEADER.pack_into(self._map, _HEADER_OFFSET, _MAGIC, _VERSION)
+        clock.bind(self)
+        self.publish()
+
+    def notify(self, cause):
+        """\
+        Called when the clock being published changes. Publishes the new state.
+        """
+        self.publish()
+
+    def publish(self):
+        """\
+        Write the current state of the clock into the memory mapped file.
+
+        This is done automatically whenever the clock changes, so you do not normally need to call this.
+        """
+        clock = self.clock
+        c = clock.correlation
+        payload = (
+            clock.getParent().tickRate,
+            clock.tickRate,
+            c.parentTicks,
+            c.childTicks,
+            c.initialError,
+            c.errorGrowthRate,
+            clock.speed,
+            clock.isAvailable()
+        )
+        with self._lock:
+            seq, = _SEQ.unpack_from(self._map, 0)
+            seq = (seq + 1) | 1    # odd, so readers will retry until finished
+            _SEQ.pack_into(self._map, 0, seq)
+            _PAYLOAD.pack_into(self._map, _PAYLOAD_OFFSET, *payload)
+            _SEQ.pack_into(self._map, 0, seq+1)
+
+    def close(self):
+        """\
+        Stop publishing. The values most recently published remain in the file.
+        """
+        self.clock.unbind(self)
+        self._map.close()
+        os.close(self._fd)
+
+
+def _readRegion(buf):
+    """\
+    Read the published values from the shared memory, retrying if they were being written at the same time.
+
+    :returns: tuple (seq, payload values)
+    """
+    for _ in xrange(_MAX_READ_ATTEMPTS):
+        seq, = _SEQ.unpack_from(buf, 0)
+        if not seq & 1:
+            values = _PAYLOAD.unpack_from(buf, _PAYLOAD_OFFSET)
+            if _SEQ.unpack_from(buf, 0)[0] == seq:
+                return seq, values
+    raise RuntimeError("Shared clock values are being written continuously, or the publisher has stopped part way through writing them.")
+
+
+@dvbcss._inheritDocs(CorrelatedClock)
+class SharedClock(CorrelatedClock):
+    """\
+    A read only :class:`~dvbcss.clock.CorrelatedClock` whose correlation, speed, tick rate
+    and availability are those published by a :class:`SharedClockPublisher` (normally in another process).
+
+    :param parentClock: The parent clock for this clock. Must be a :class:`~dvbcss.clock.SysClock`, but need not have the same tick rate as the parent of the published clock.
+    :param path: Path of the file that the :class:`SharedClockPublisher` is publishing to.
+
+    :throws ValueError: if the file does not contain values published by a :class:`SharedClockPublisher`.
+
+    Attempting to change the correlation, speed, tick rate or availability will raise :class:`NotImplementedError`.
+
+    Published values are stored as floating point numbers, so this clock always uses floating point maths.
+
+    .. versionadded:: 0.6
+    """
+
+    def __init__(self, parentClock, path, **kwargs):
+        self.path = path    #: Path of the memory mapped file
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _REGION_SIZE:
+                raise ValueError("File does not contain a published shared clock: "+path)
+            self._map = mmap.mmap(f.fileno(), _REGION_SIZE, access=mmap.ACCESS_READ)
+        magic, version = _HEADER.unpack_from(self._map, _HEADER_OFFSET)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("File does not contain a published shared clock: "+path)
+        self._seq, values = _readRegion(self._map)
+        parentTickRate, tickRate, correlation, speed, available = self._convert(parentClock, values)
+        super(SharedClock,self).__init__(parentClock, tickRate, correlation, speed, **kwargs)
+        self._availability = available
+
+    @staticmethod
+    def _convert(parentClock, values):
+        parentTickRate, tickRate, parentTicks, childTicks, initialError, errorGrowthRate, speed, available = values
+        if parentClock.tickRate != parentTickRate:
+            parentTicks = parentTicks * parentClock.tickRate / parentTickRate
+        return parentTickRate, tickRate, Correlation(parentTicks, childTicks, initialError, errorGrowthRate), speed, bool(available)
+
+    def poll(self):
+        """\
+        Check for newly published values. If there are any, then this clock takes them on and notifies its dependents.
+
+        This is done automatically whenever the :data:`ticks`, :data:`correlation` or :func:`calcWhen`,
+        :func:`dispersionAtTime` or :func:`isAvailable` are used.
+
+        :returns: True if there were newly published values, otherwise False (including if :func:`close` has been called).
+        """
+        if self._seq is None or _SEQ.unpack_from(self._map, 0)[0] == self._seq:
+            return False
+        self._seq, values = _readRegion(self._map)
+        _, self._freq, self._correlation, self._speed, self._availability = self._convert(self._parent, values)
+        self.notify(self)
+        return True
+
+    def close(self):
+        """\
+        Stop reading from the memory mapped file. The clock will keep the values it most recently read.
+        """
+        self._seq = None
+        self._map.close()
+
+    @property
+    def ticks(self):
+        # inlined check of the sequence number (see poll) because this is read often
+        if self._seq is not None and _SEQ.unpack_from(self._map, 0)[0] != self._seq:
+            self.poll()
+        xform = self._xform
+        if xform is None:
+            xform = self._rootTransform()
+        if xform:
+            return xform[2] + (xform[0].ticks - xform[1])*xform[3]
+        return CorrelatedClock.ticks.fget(self)
+
+    @property
+    def correlation(self):
+        self.poll()
+        return self._correlation
+
+    @correlation.setter
+    def correlation(self, newCorrelation):
+        raise NotImplementedError("SharedClock is read only.")
+
+    @property
+    def tickRate(self):
+        return self._freq
+
+    @tickRate.setter
+    def tickRate(self, value):
+        raise NotImplementedError("SharedClock is read only.")
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, newSpeed):
+        raise NotImplementedError("SharedClock is read only.")
+
+    def setCorrelationAndSpeed(self, newCorrelation, newSpeed):
+        raise NotImplementedError("SharedClock is read only.")
+
+    def setAvailability(self, availability):
+        raise NotImplementedError("SharedClock is read only.")
+
+    def isAvailable(self):
+        self.poll()
+        return super(SharedClock,self).isAvailable()
+
+    def calcWhen(self, ticksWhen):
+        self.poll()
+        return super(SharedClock,self).calcWhen(ticksWhen)
+
+    def dispersionAtTime(self, t):
+        self.poll()
+        return super(SharedClock,self).dispersionAtTime(t)
+
+    def __repr__(self):
+        return "SharedClock(t=%d, freq=%f, correlation=%s, path=%s) at speed=%f" % (self.ticks, self._freq, str(self._correlation), repr(self.path), self.speed)
+
+
+__all__ = [
+    "SharedClockPublisher",
+    "SharedClock",
+]
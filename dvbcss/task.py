@@ -23,6 +23,16 @@ tick count value.
 To use this module, just import it and directly call the functions :func:`sleepFor`, :func:`sleepUntil`,
 :func:`scheduleEvent` or :func:`runAt`.
 
+By default, all tasks are run by a single default :class:`Scheduler`, whose thread is started when the first task is scheduled.
+If you have several independent groups of clocks (e.g. for several independent synchronisation sessions), you can
+create a :class:`Scheduler` for each, so that a busy group does not delay the tasks of the others. Either pass the
+scheduler to the functions of this module (`scheduler` argument), or pin clocks to the scheduler (see :func:`Scheduler.pin`).
+Tasks for a clock that is pinned, or whose parent (or grandparent etc) is pinned, automatically go to that scheduler.
+
+:func:`scheduleEvent` and :func:`runAt` return a :class:`TaskHandle` that can be used to cancel the task
+before it happens. :func:`cancelAll` cancels all tasks scheduled against a clock (e.g. when the timeline it
+represents is no longer available).
+
 .. note::
 
     Scheduling happens on a single thread, so if you use the :func:`runAt` function, try to keep the callback code
@@ -31,48 +41,59 @@ To use this module, just import it and directly call the functions :func:`sleepF
 
 
 import dvbcss.monotonic_time as time
+import bisect
 import heapq
+import itertools
+import math
 import threading
 import logging
+import weakref
 
 
 
-def sleepUntil(clock, whenTicks):
+def sleepUntil(clock, whenTicks, scheduler=None):
     r"""\
     Sleep until the specified :mod:`~dvbcss.clock` reaches the specified tick value.
     
     :param clock: (:class:`dvbcss.clock.ClockBase`) Clock to sleep against the ticks of.
     :param whenTicks: (int) The tick value of the clock at which this function returns.
+    :param scheduler: (:class:`Scheduler`) Optional. The scheduler to use. If not specified, the scheduler the clock is pinned to is used (or the default scheduler).
     
     Returns after the specified tick value is reached.
     """
     event = threading.Event()
-    scheduleEvent(clock, whenTicks, event)
+    scheduleEvent(clock, whenTicks, event, scheduler)
     event.wait()
     
-def sleepFor(clock, numTicks):
+def sleepFor(clock, numTicks, scheduler=None):
     r"""\
     Sleep for the number of ticks of the specified clock.
     
     :param clock: (:class:`dvbcss.clock.ClockBase`) Clock to sleep against the ticks of.
     :param numTicks: (int) The number of ticks to sleep for.
+    :param scheduler: (:class:`Scheduler`) Optional. The scheduler to use. If not specified, the scheduler the clock is pinned to is used (or the default scheduler).
     
     Returns after the elapsed number of ticks of the specified clock have passed.
     """
-    event = threading.Event()
-    scheduleEvent(clock, numTicks + clock.ticks, event)
+    sleepUntil(clock, numTicks + clock.ticks, scheduler)
     
-def scheduleEvent(clock, whenTicks, event):
+def scheduleEvent(clock, whenTicks, event, scheduler=None):
     r"""\
     Schedule the :class:`threading.Event` to be called when the specified clock reaches (or passes) the specified tick value.
     
     :param clock: (:class:`dvbcss.clock.ClockBase`) Clock to schedule the event against
     :param whenTicks: (int) The tick value of the clock at which the event is to be triggered.
     :param event: (:class:`threading.Event`) python Event object that the :method:threading.Event.set method will be called on at the scheduled time
+    :param scheduler: (:class:`Scheduler`) Optional. The scheduler to use. If not specified, the scheduler the clock is pinned to is used (or the default scheduler).
+
+    :returns: A :class:`TaskHandle` that can be used to cancel the event.
+
+    .. versionchanged:: 0.6
+       Returns a :class:`TaskHandle`. Added `scheduler` argument.
     """
-    scheduler.schedule(clock, whenTicks, event.set, (), {})
+    return _schedulerFor(clock, scheduler).schedule(clock, whenTicks, event.set, (), {})
 
-def runAt(clock, whenTicks, callBack, args=None, kwargs=None):
+def runAt(clock, whenTicks, callBack, args=None, kwargs=None, scheduler=None):
     r"""\
     Call the specified callback function when the specified clock reaches (or passes) the specified tick value.
     
@@ -84,6 +105,12 @@ def runAt(clock, whenTicks, callBack, args=None, kwargs=None):
     :param callback: (callable) Function to be called
     :param args: A :class:`list` of positional arguments to be passed to the callback function when it is called.
     :param kwargs: A :class:`dict` of keyword arguments to be pased to the callback function when it is called. 
+    :param scheduler: (:class:`Scheduler`) Optional. The scheduler to use. If not specified, the scheduler the clock is pinned to is used (or the default scheduler).
+
+    :returns: A :class:`TaskHandle` that can be used to cancel the callback.
+
+    .. versionchanged:: 0.6
+       Returns a :class:`TaskHandle`. Added `scheduler` argument.
     """
     if args is None:
         args = []
@@ -93,41 +120,382 @@ def runAt(clock, whenTicks, callBack, args=None, kwargs=None):
         kwargs = {}
     elif not isinstance(kwargs, dict):
         raise ValueError("runAt: 'kwargs' argument must be a dict.")
-    scheduler.schedule(clock, whenTicks, callBack, args, kwargs)
+    return _schedulerFor(clock, scheduler).schedule(clock, whenTicks, callBack, args, kwargs)
+
+def setExecutor(executor):
+    r"""\
+    Set how the callbacks for scheduled tasks are called by the default scheduler.
+    Use :data:`Scheduler.executor` for other schedulers.
+
+    By default callbacks are called, one at a time, on the single thread used by the scheduling system. This means
+    a slow callback will delay other callbacks that are due. Setting an executor (such as a :class:`CallbackThreadPool`)
+    means callbacks are run by the executor instead, so that they can run concurrently.
+
+    :param executor: An object with a `submit(fn, *args)` method, such as a :class:`CallbackThreadPool` or a :class:`concurrent.futures.Executor`.
+        Or None to call callbacks on the scheduling thread.
+
+    .. versionadded:: 0.6
+    """
+    scheduler.executor = executor
+
+def setPreciseWait(preciseWaitSecs, spinSecs=0):
+    r"""\
+    Set how precisely the default scheduler waits for tasks to become due.
+    Use :data:`Scheduler.preciseWaitSecs` and :data:`Scheduler.spinSecs` for other schedulers.
+
+    By default, the scheduling thread waits using :func:`threading.Event.wait`, which can wake up several milliseconds late.
+    If `preciseWaitSecs` is not zero, then the scheduling thread only waits this way until `preciseWaitSecs`
+    before the next task is due. It then waits the rest of the time using :func:`dvbcss.monotonic_time.sleep`, spinning
+    (busy-waiting) for the last `spinSecs` of that time.
+
+    During a precise wait, the scheduling thread cannot respond to new tasks being scheduled or clocks being adjusted,
+    so `preciseWaitSecs` should be small (a few milliseconds). Spinning uses 100% of a CPU core while it lasts,
+    and holds up other python threads, so `spinSecs` should be smaller still (e.g. half a millisecond).
+
+    :param preciseWaitSecs: Duration (in seconds) of the precise wait before each task is due. Or 0 to not use a precise wait.
+    :param spinSecs: Duration (in seconds) at the end of the precise wait to spin for. Or 0 to not spin.
+
+    .. versionadded:: 0.6
+    """
+    scheduler.preciseWaitSecs = preciseWaitSecs
+    scheduler.spinSecs = spinSecs
+
+def getLatenessHistograms():
+    r"""\
+    Get histograms of how late tasks run by the default scheduler have been happening.
+    Use :data:`Scheduler.dispatchLateness` and :data:`Scheduler.callbackLateness` for other schedulers.
+
+    :returns: tuple `(dispatchLateness, callbackLateness)` of :class:`LatenessHistogram` objects. `dispatchLateness` measures
+        how late the scheduling thread was in dispatching tasks. `callbackLateness` measures how late callbacks were called.
+        If an executor is being used (see :func:`setExecutor`), this includes any time spent waiting for the executor.
+
+    .. versionadded:: 0.6
+    """
+    return scheduler.dispatchLateness, scheduler.callbackLateness
+
+def cancelAll(clock, scheduler=None):
+    r"""\
+    Cancel all tasks (callbacks and events) that are scheduled against the specified clock and have not yet happened.
+
+    :param clock: (:class:`dvbcss.clock.ClockBase`) Clock that the tasks were scheduled against.
+    :param scheduler: (:class:`Scheduler`) Optional. The scheduler the tasks were scheduled with. If not specified, the scheduler the clock is pinned to is used (or the default scheduler).
+
+    Tasks scheduled against other clocks (including clocks that are children of this clock) are not affected.
+
+    .. versionadded:: 0.6
+    """
+    _schedulerFor(clock, scheduler).cancelAll(clock)
+
+
+_pinned = weakref.WeakKeyDictionary()
+
+def _schedulerFor(clock, explicitScheduler=None):
+    """\
+    :returns: The explicitly specified scheduler, or (if None) the scheduler that the clock (or its closest ancestor) is pinned to,
+        or (if none are pinned) the default scheduler.
+    """
+    if explicitScheduler is not None:
+        return explicitScheduler
+    while clock is not None:
+        pinnedTo = _pinned.get(clock, None)
+        if pinnedTo is not None:
+            return pinnedTo
+        clock = clock.getParent()
+    return scheduler
+
+
+
+class TaskHandle(object):
+    r"""\
+    Handle for a task scheduled using :func:`runAt` or :func:`scheduleEvent`.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, scheduler, task):
+        super(TaskHandle, self).__init__()
+        self._scheduler = scheduler
+        self._task = task
+
+    def cancel(self):
+        """\
+        Cancel the task. Does nothing if the callback has already started, or the task has already been cancelled.
+
+        Once this method has returned, the callback is guaranteed not to be called (unless it has already started).
+        This is so even if the task has already been passed to an executor (see :func:`setExecutor`) that has
+        not yet called the callback.
+        """
+        self._scheduler.cancel(self._task)
+
+    @property
+    def cancelled(self):
+        """\
+        (read only) True if :func:`cancel` (or :func:`cancelAll`) has been called for this task before its callback started.
+        """
+        return self._task.cancelled
+
+    @property
+    def done(self):
+        """\
+        (read only) True if the task has happened: its callback has been called and has returned.
+        """
+        return self._task.finished
     
 
 
 import Queue
 
-class _Scheduler(object):
+
+class LatenessHistogram(object):
+    r"""\
+    Histogram of how late tasks happened (in seconds), compared to the time they were scheduled to happen.
+
+    The histogram is made up of bins. Each bin counts the tasks that were late by more than the upper edge of the previous
+    bin, and up to and including its own upper edge. The last bin has an upper edge of +infinity. Tasks that happened early
+    (negative lateness) are counted in the first bin.
+
+    :param binEdges: Optional. Ascending list of upper edges (in seconds) of the bins, not including the last bin.
+
+    .. versionadded:: 0.6
+    """
+
+    DEFAULT_BIN_EDGES = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+    def __init__(self, binEdges=DEFAULT_BIN_EDGES):
+        super(LatenessHistogram, self).__init__()
+        self._edges = list(binEdges) + [float("inf")]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """\
+        Clear the histogram.
+        """
+        with self._lock:
+            self._counts = [0] * len(self._edges)
+            self._count = 0
+            self._total = 0.0
+            self._max = float("nan")
+
+    def record(self, latenessSecs):
+        """\
+        Add a measurement to the histogram.
+
+        :param latenessSecs: How late (in seconds) the task happened.
+        """
+        i = bisect.bisect_left(self._edges, latenessSecs)
+        with self._lock:
+            self._counts[i] += 1
+            self._count += 1
+            self._total += latenessSecs
+            if not self._max >= latenessSecs:
+                self._max = latenessSecs
+
+    @property
+    def count(self):
+        """\
+        (read only) The number of measurements.
+        """
+        return self._count
+
+    @property
+    def mean(self):
+        """\
+        (read only) The mean lateness (in seconds), or :ref:`nan` if there are no measurements.
+        """
+        with self._lock:
+            if self._count == 0:
+                return float("nan")
+            return self._total / self._count
+
+    @property
+    def max(self):
+        """\
+        (read only) The greatest lateness (in seconds), or :ref:`nan` if there are no measurements.
+        """
+        return self._max
+
+    def bins(self):
+        """\
+        :returns: list of tuples `(upperEdgeSecs, count)` for each bin, in order.
+        """
+        with self._lock:
+            return zip(self._edges, self._counts)
+
+    def percentile(self, pc):
+        """\
+        :param pc: The percentile (0 to 100)
+        :returns: The upper edge (in seconds) of the bin containing the specified percentile (or the greatest lateness, if that is smaller),
+            or :ref:`nan` if there are no measurements.
+        """
+        with self._lock:
+            if self._count == 0:
+                return float("nan")
+            target = self._count * pc / 100.0
+            total = 0
+            for edge, count in zip(self._edges, self._counts):
+                total += count
+                if total >= target and count > 0:
+                    return min(edge, self._max)
+            return self._max
+
+    def __repr__(self):
+        return "LatenessHistogram(count=%d, mean=%f, max=%f)" % (self.count, self.mean, self.max)
+
+
+
+class CallbackThreadPool(object):
     r"""\
-    Task scheduler. Starts an internal :class:`threading.Thread` with :data:`theading.Thread.daemon` set to True.
+    A pool of threads that can be used by the task scheduler to call callbacks (see :func:`setExecutor`),
+    so that a slow callback does not delay other callbacks that are due.
+
+    It has :func:`submit` and :func:`shutdown` methods like a :class:`concurrent.futures.Executor`,
+    but :func:`submit` does not return a future.
+
+    Callbacks are run in the order they are submitted, but callbacks may run concurrently, and so may finish in any order.
+
+    :param numThreads: Optional (default=4). Number of threads in the pool.
+
+    .. versionadded:: 0.6
+    """
+    def __init__(self, numThreads=4):
+        super(CallbackThreadPool, self).__init__()
+        self.log=logging.getLogger("dvbcss.task.CallbackThreadPool")
+        self._queue = Queue.Queue()
+        self._threads = []
+        for i in range(0, numThreads):
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        """\
+        Queue up a function to be called by one of the threads in the pool.
+        """
+        self._queue.put((fn, args, kwargs))
+
+    def shutdown(self, wait=True):
+        """\
+        Stop the threads once they have called all functions already submitted.
+
+        :param wait: If True, then do not return until the threads have stopped.
+        """
+        for thread in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs = item
+            try:
+                fn(*args, **kwargs)
+            except Exception, e:
+                self.log.error("Exception in callback thread pool: " + str(e))
+
+
+
+class Scheduler(object):
+    r"""\
+    Task scheduler. Runs tasks using an internal :class:`threading.Thread` with :data:`theading.Thread.daemon` set to True.
+    The thread is started when the first task is scheduled (or when :func:`start` is called).
+
+    For normal use, you do not need to create a scheduler, as the functions of this module use a default scheduler.
+    Create schedulers if you want independent groups of clocks to have their tasks run by separate threads.
+
+    :param clocks: Optional. List of clocks to :func:`pin` to this scheduler.
+
+    :param horizonSecs: (float or None) When a clock is adjusted, only tasks due within this many seconds are rescheduled
+        immediately. Tasks further in the future are rescheduled later, as they come within this horizon. If None, then all tasks
+        are rescheduled immediately.
+    :param executor: None, or an object with a `submit(fn, *args)` method that will be used to call the callbacks for tasks,
+        such as a :class:`CallbackThreadPool` or a :class:`concurrent.futures.Executor`. If None, then callbacks are called on the scheduler thread.
     
-    This is an internal of the Task module. For normal use you should not need to access it.
+    :param preciseWaitSecs: (float) Wait on the update event until this many seconds before the next task is due, then
+        wait the rest of the time precisely (using :func:`dvbcss.monotonic_time.sleep` and then spinning). If 0, then
+        wait only on the update event.
+    :param spinSecs: (float) Busy-wait (spin) for this many seconds at the end of a precise wait, instead of sleeping.
     
-    :ivar taskheap: the priority queue of tasks
-    :ivar addQueue: threadsafe queue of tasks to be added to the priority queue
+    :ivar executor: the executor, or None
+    :ivar preciseWaitSecs: see the `preciseWaitSecs` parameter
+    :ivar spinSecs: see the `spinSecs` parameter
+    :ivar dispatchLateness: :class:`LatenessHistogram` of how late tasks were when the scheduler thread dispatched them
+    :ivar callbackLateness: :class:`LatenessHistogram` of how late tasks were when their callback was called
+    :ivar taskheap: the priority queue. Each entry is a list `[when, seq, item]`. `item` is a :class:`_Task`, or a :class:`_ClockTasks`
+        (meaning that the tasks for that clock need to be checked), or None if the entry has been removed.
+    :ivar requestQueue: threadsafe queue of requests (tuples `(method, arg)`) for the scheduler thread to add or cancel tasks, processed in order
     :ivar rescheduleQueue: thereadsafe queue of clocks that have been adjusted and therefore which need to trigger rescheduling of tasks
-    :ivar updateEvent: :class:`theading.Event` used to wake the scheduler thread whenever there is work pending (items added to addQueue or rescheduleQueue)
-    :ivar clock_Tasks: mapping of clocks to takss that depend on them
+    :ivar updateEvent: :class:`theading.Event` used to wake the scheduler thread whenever there is work pending (items added to requestQueue or rescheduleQueue)
+    :ivar clock_Tasks: mapping of clocks to the :class:`_ClockTasks` holding the tasks that depend on them
+    :ivar numRemoved: number of entries in the priority queue that have been removed (but not yet discarded)
     """
-    def __init__(self, *args, **kwargs):
-        """\
-        Starts the scheduler thread at initialisation.
-        """
-        super(_Scheduler, self).__init__(*args, **kwargs)
-        self.log=logging.getLogger("dvbcss.task._Scheduler")
+    def __init__(self, horizonSecs=1.0, executor=None, preciseWaitSecs=0, spinSecs=0, clocks=(), *args, **kwargs):
+        super(Scheduler, self).__init__(*args, **kwargs)
+        self.log=logging.getLogger("dvbcss.task.Scheduler")
 
+        self.horizonSecs = horizonSecs
+        self.executor = executor
+        self.preciseWaitSecs = preciseWaitSecs
+        self.spinSecs = spinSecs
+        self.dispatchLateness = LatenessHistogram()
+        self.callbackLateness = LatenessHistogram()
         self.taskheap = []
-        self.addQueue = Queue.Queue()
+        self.numRemoved = 0
+        self._seq = itertools.count()
+        self.requestQueue = Queue.Queue()
         self.rescheduleQueue = Queue.Queue()
         self.updateEvent = threading.Event()
         self.clock_Tasks = {}
 
-        self.thread = threading.Thread(target=self.run)
-        self.thread.daemon = True
-        self.running=True
-        self.thread.start()
+        self.thread = None
+        self.running = False
+        self._threadLock = threading.Lock()
+        self._taskStateLock = threading.Lock()    # guards the cancelled and started flags of tasks
+
+        for clock in clocks:
+            self.pin(clock)
+
+    def start(self):
+        """\
+        Start the scheduler thread, if it is not already running.
+        This happens automatically when a task is first scheduled.
+
+        .. versionadded:: 0.6
+        """
+        with self._threadLock:
+            if self.thread is None:
+                self.running = True
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def pin(self, clock):
+        """\
+        Pin a clock to this scheduler. Tasks for this clock, or for any of its descendants, are then run by this
+        scheduler (unless a different scheduler is explicitly specified, or the descendant is pinned to a different scheduler).
+
+        A clock can only be pinned to one scheduler at a time.
+
+        :param clock: (:class:`dvbcss.clock.ClockBase`) The clock to pin
+
+        .. versionadded:: 0.6
+        """
+        _pinned[clock] = self
+
+    def unpin(self, clock):
+        """\
+        Unpin a clock from this scheduler. Tasks already scheduled are unaffected.
+
+        :param clock: (:class:`dvbcss.clock.ClockBase`) The clock to unpin
+
+        .. versionadded:: 0.6
+        """
+        if _pinned.get(clock, None) is self:
+            del _pinned[clock]
         
 
     def run(self):
@@ -143,64 +511,303 @@ class _Scheduler(object):
           
           2. Checks any queued requests to reschedule tasks (due to clock adjustments)
             
-             The existing task in the scheduler priority queue is "deprecated"
-             And a new task is scheduled with the revised time of execution
+             The time of execution of tasks depending on the clock is recalculated.
+             See :func:`_reschedule`.
           
           3. checks any tasks that need to now be executed
             
-            Dequeues them and executes them, or ignores them if they are marked as deprecated
+            Dequeues them and executes them, or discards them if they have been removed.
+            If a task has not been rescheduled since its clock was last adjusted, it is
+            rescheduled instead of being executed (unless it is still due).
         """
         while self.running:
             self.updateEvent.clear()
             
-            # check for tasks to add to the scheduler
-            while not self.addQueue.empty():
-                clock, whenTicks, callBack, args, kwargs = self.addQueue.get_nowait()
-                task = _Task(clock, whenTicks, callBack, args, kwargs)
-                if not math.isnan(task.when):
-                    heapq.heappush(self.taskheap, (task.when, task))
-
-                if clock not in self.clock_Tasks:
-                    self.clock_Tasks[clock] = { task:True }
-                    clock.bind(self)
-                else:
-                    self.clock_Tasks[clock][task] = True
+            # check for tasks to add to the scheduler, or to cancel
+            while not self.requestQueue.empty():
+                method, arg = self.requestQueue.get_nowait()
+                method(arg)
             
             # check if there are any requests to reschedule tasks (due to changes in clocks)
+            # a clock that has been adjusted several times only needs rescheduling once
+            clocks = set()
             while not self.rescheduleQueue.empty():
-                clock = self.rescheduleQueue.get_nowait()
-                tasksMap=self.clock_Tasks.get(clock, {})
-                for task in tasksMap.keys():
-                    newTask=task.regenerateAndDeprecate()
-                    if not math.isnan(newtask.when):
-                        heapq.heappush(self.taskheap,(newTask.when, newTask))
-                    tasksMap[newTask] = True
-                    del tasksMap[task]
- 
+                clocks.add(self.rescheduleQueue.get_nowait())
+            for clock in clocks:
+                self._reschedule(clock)
                     
             # process pending tasks
-            while self.taskheap and (self.taskheap[0][1].deleted or time.time() >= self.taskheap[0][0]):
-                (_,task) = heapq.heappop(self.taskheap)
+            heap = self.taskheap
+            while heap and (heap[0][2] is None or time.time() >= heap[0][0]):
+                _, _, item = heapq.heappop(heap)
+
+                if item is None:
+                    self.numRemoved -= 1
+                    continue
+                if isinstance(item, _ClockTasks):
+                    item.checkpoint = None
+                    self._advance(item)
+                    continue
 
-                if not task.deleted:
+                task = item
+                task.entry = None
+                clockTasks = self.clock_Tasks[task.clock]
+                if task.cancelled:
+                    task.deleted = True
+                    self._discard(task)
+                    continue
+                if task.gen != clockTasks.gen:
+                    # clock has been adjusted since this task was scheduled
+                    task.gen = clockTasks.gen
+                    clockTasks.numStale -= 1
+                    task.recalculate()
+                    if not time.time() >= task.when:
+                        self._push(task)
+                        continue
+
+                task.deleted = True
+                self.dispatchLateness.record(time.time() - task.when)
+                executor = self.executor
+                if executor is None:
+                    self._runTask(task)
+                else:
                     try:
-                        task.callBack(*task.args, **task.kwargs)
+                        executor.submit(self._runTask, task)
                     except Exception, e:
-                        self.log.error("Exception in scheduling thread: " + str(e))
+                        self.log.error("Exception submitting task to executor: " + str(e))
 
-                    # remove from list of tasks that clock notification may need to reschedule    
-                    del self.clock_Tasks[task.clock][task]
-                    if not self.clock_Tasks[task.clock]:
-                        task.clock.unbind(self)
-                        del self.clock_Tasks[task.clock]
+                self._discard(task)
                     
             # wait for next tasks's scheduled time, or to be woken by the update event
             # due to new tasks being scheduled or a rescheduling of a clock
             if self.taskheap:
-                self.updateEvent.wait(self.taskheap[0][0] - time.time())
+                when = self.taskheap[0][0]
+                timeout = when - time.time()
+                if timeout > self.preciseWaitSecs:
+                    self.updateEvent.wait(timeout - self.preciseWaitSecs)
+                elif timeout > 0:
+                    self._preciseWait(when)
             else:
                 self.updateEvent.wait()
-                       
+
+    def _preciseWait(self, when):
+        """\
+        Wait until the specified time using :func:`dvbcss.monotonic_time.sleep`, and then
+        spinning for the last :data:`spinSecs`. Does not wake up if the update event is set.
+        """
+        remaining = when - self.spinSecs - time.time()
+        if remaining > 0:
+            try:
+                time.sleep(remaining)
+            except Exception:
+                pass    # interrupted, so spin for the rest of the time instead
+        while time.time() < when:
+            pass
+
+    def _runTask(self, task):
+        """\
+        Call the callback for a task, unless it has been cancelled. Called on the scheduler thread, or by the executor.
+        """
+        with self._taskStateLock:
+            if task.cancelled:
+                return
+            task.started = True
+        self.callbackLateness.record(time.time() - task.when)
+        try:
+            task.callBack(*task.args, **task.kwargs)
+        except Exception, e:
+            self.log.error("Exception in scheduling thread: " + str(e))
+        finally:
+            task.finished = True
+
+    def _add(self, task):
+        """\
+        Add a task to the scheduler. Called by the scheduler thread.
+        """
+        if task.cancelled:
+            return
+        clock = task.clock
+        clockTasks = self.clock_Tasks.get(clock, None)
+        if clockTasks is None:
+            clockTasks = _ClockTasks(clock)
+            self.clock_Tasks[clock] = clockTasks
+            clock.bind(self)
+        task.gen = clockTasks.gen
+        task.recalculate()
+        clockTasks.add(task)
+        self._push(task)
+
+    def _discard(self, task):
+        """\
+        Remove a task from the list of tasks that clock notification may need to reschedule,
+        and from the priority queue. Stops tracking the clock if it no longer has any tasks.
+        """
+        self._remove(task)
+        clockTasks = self.clock_Tasks.get(task.clock, None)
+        if clockTasks is None:
+            return
+        clockTasks.discard(task)
+        if not clockTasks:
+            self._removeEntry(clockTasks.checkpoint)
+            task.clock.unbind(self)
+            del self.clock_Tasks[task.clock]
+
+    def _cancel(self, task):
+        """\
+        Remove a cancelled task. Called by the scheduler thread.
+        """
+        if not task.deleted:
+            task.deleted = True
+            self._discard(task)
+            self._compactIfNeeded()
+
+    def _cancelAll(self, clock):
+        """\
+        Remove all tasks for a clock. Called by the scheduler thread.
+        """
+        clockTasks = self.clock_Tasks.pop(clock, None)
+        if clockTasks is None:
+            return
+        for _, _, task in clockTasks.byTicks:
+            task.cancelled = True
+            task.deleted = True
+            self._remove(task)
+        self._removeEntry(clockTasks.checkpoint)
+        clock.unbind(self)
+        self._compactIfNeeded()
+
+    def _push(self, task):
+        """\
+        Add a task to the priority queue, unless its time of execution cannot currently be calculated (is :ref:`nan`).
+        """
+        if not math.isnan(task.when):
+            task.entry = [task.when, self._seq.next(), task]
+            heapq.heappush(self.taskheap, task.entry)
+
+    def _removeEntry(self, entry):
+        """\
+        Mark an entry in the priority queue as removed. It remains in the queue until it is discarded
+        when it reaches the head of the queue, or when the queue is compacted.
+        """
+        if entry is not None and entry[2] is not None:
+            entry[2] = None
+            self.numRemoved += 1
+
+    def _remove(self, task):
+        """\
+        Remove a task from the priority queue (if it is in it).
+        """
+        self._removeEntry(task.entry)
+        task.entry = None
+
+    def _horizonTicks(self, clock):
+        """\
+        :returns: The tick value that the clock will reach after :data:`horizonSecs`, or None if tasks for this clock
+            must all be rescheduled immediately (because there is no horizon, or the clock is stopped or running backwards)
+        """
+        if self.horizonSecs is None:
+            return None
+        speed = clock.getEffectiveSpeed()
+        if not speed > 0:
+            return None
+        return clock.ticks + self.horizonSecs * clock.tickRate * speed
+
+    def _reschedule(self, clock):
+        """\
+        Recalculate the time of execution of tasks depending on the specified clock, after it has been adjusted.
+
+        Only tasks due within :data:`horizonSecs` are recalculated immediately. Adjusting a clock does not change
+        the order in which its tasks are due, so the remaining tasks are all due after these. They are left in the
+        priority queue at their old times, and an entry is added to the priority queue for when the
+        next of them will come within the horizon (see :func:`_advance`).
+        """
+        clockTasks = self.clock_Tasks.get(clock, None)
+        if not clockTasks:
+            return
+
+        clockTasks.gen += 1
+        self._removeEntry(clockTasks.checkpoint)
+        clockTasks.checkpoint = None
+
+        limitTicks = self._horizonTicks(clock)
+        if limitTicks is None:
+            clockTasks.numStale = len(clockTasks)
+            self._refresh(clockTasks, clockTasks.tasksUpTo(None))
+        else:
+            tasks = clockTasks.tasksUpTo(limitTicks)
+            clockTasks.numStale = len(clockTasks)
+            self._refresh(clockTasks, tasks)
+            self._setCheckpoint(clockTasks, len(tasks))
+
+        self._compactIfNeeded()
+
+    def _advance(self, clockTasks):
+        """\
+        Recalculate the time of execution of tasks that have come within :data:`horizonSecs`,
+        but have not been rescheduled since the clock was last adjusted.
+        """
+        limitTicks = self._horizonTicks(clockTasks.clock)
+        tasks = clockTasks.tasksUpTo(limitTicks)
+        self._refresh(clockTasks, [ task for task in tasks if task.gen != clockTasks.gen ])
+        if limitTicks is not None:
+            self._setCheckpoint(clockTasks, len(tasks))
+
+    def _setCheckpoint(self, clockTasks, index):
+        """\
+        If any tasks for the clock still need rescheduling, add an entry to the priority queue for
+        when the task at the specified index (in order of tick value) will come within the horizon.
+        """
+        if clockTasks.numStale > 0 and index < len(clockTasks):
+            when = clockTasks.clock.calcWhen(clockTasks.byTicks[index][0]) - self.horizonSecs
+            if not math.isnan(when):
+                clockTasks.checkpoint = [when, self._seq.next(), clockTasks]
+                heapq.heappush(self.taskheap, clockTasks.checkpoint)
+
+    def _refresh(self, clockTasks, tasks):
+        """\
+        Recalculate the time of execution of the specified tasks.
+
+        If the tasks make up a large proportion of the priority queue, then their entries in the queue are
+        updated in place and the queue is re-sorted in one go. Otherwise, the old entries are marked as removed
+        and new entries are added. The queue is then compacted if more than half of it consists of removed entries.
+        """
+        heap = self.taskheap
+        gen = clockTasks.gen
+        if len(tasks) * 4 >= len(heap):
+            for task in tasks:
+                if task.gen != gen:
+                    task.gen = gen
+                    clockTasks.numStale -= 1
+                task.recalculate()
+                if math.isnan(task.when):
+                    self._remove(task)
+                elif task.entry is not None:
+                    task.entry[0] = task.when
+                else:
+                    task.entry = [task.when, self._seq.next(), task]
+                    heap.append(task.entry)
+            heapq.heapify(heap)
+        else:
+            for task in tasks:
+                if task.gen != gen:
+                    task.gen = gen
+                    clockTasks.numStale -= 1
+                self._remove(task)
+                task.recalculate()
+                self._push(task)
+
+    def _compactIfNeeded(self):
+        if self.numRemoved * 2 > len(self.taskheap):
+            self._compact()
+
+    def _compact(self):
+        """\
+        Discard all entries in the priority queue that have been marked as removed.
+        """
+        self.taskheap[:] = [ entry for entry in self.taskheap if entry[2] is not None ]
+        heapq.heapify(self.taskheap)
+        self.numRemoved = 0
+
     def schedule(self, clock, whenTicks, callBack, args, kwargs):
         r"""\
         Queue up a task for scheduling
@@ -210,8 +817,41 @@ class _Scheduler(object):
         :param callback: (func) The function (the task) that will be called at the scheduled time
         :param args: (list) List of arguments to be passed to the function when it is invoked
         :param kwargs: (dict) Dictionary of keyword arguments to be passed to the function when it is invoked
+
+        :returns: A :class:`TaskHandle` for the task
         """
-        self.addQueue.put((clock, whenTicks, callBack, args, kwargs))
+        if self.thread is None:
+            self.start()
+        task = _Task(clock, whenTicks, callBack, args, kwargs)
+        self.requestQueue.put((self._add, task))
+        self.updateEvent.set()
+        return TaskHandle(self, task)
+
+    def cancel(self, task):
+        r"""\
+        Cancel a task.
+
+        The task is immediately flagged as cancelled, so it will not be executed, unless its callback has
+        already started. If it has not yet been dispatched, it is then removed by the scheduler thread.
+
+        :param task: (:class:`_Task`) The task to cancel.
+        """
+        with self._taskStateLock:
+            if task.cancelled or task.started:
+                return
+            task.cancelled = True
+            dispatched = task.deleted
+        if not dispatched:
+            self.requestQueue.put((self._cancel, task))
+            self.updateEvent.set()
+
+    def cancelAll(self, clock):
+        r"""\
+        Cancel all tasks scheduled against a clock (including tasks queued up for scheduling but not yet added).
+
+        :param clock: (:class:`dvbcss.clock.ClockBase`) The clock.
+        """
+        self.requestQueue.put((self._cancelAll, clock))
         self.updateEvent.set()
         
     def notify(self, causeClock):
@@ -225,11 +865,56 @@ class _Scheduler(object):
         
     def stop(self):
         """\
-        Stops the scheduler if it is running.
+        Stops the scheduler if it is running. Tasks that have not yet happened remain scheduled,
+        and will happen if the scheduler is started again.
         """
-        self.running=False
-        self.updateEvent.set()
-        self.thread.join()
+        with self._threadLock:
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                self.running=False
+                self.updateEvent.set()
+                thread.join()
+
+
+
+class _ClockTasks(object):
+    r"""\
+    The tasks scheduled against a single clock, in order of the tick value at which they are due.
+    This is an internal of the Task module.
+
+    :ivar clock: the clock
+    :ivar byTicks: sorted list of tuples `(whenTicks, seq, task)`
+    :ivar gen: Generation count. Incremented whenever the clock is adjusted. Tasks with an older generation count need rescheduling.
+    :ivar numStale: number of tasks needing rescheduling
+    :ivar checkpoint: entry in the scheduler's priority queue for when tasks next need rescheduling, or None
+    """
+    def __init__(self, clock):
+        super(_ClockTasks, self).__init__()
+        self.clock = clock
+        self.byTicks = []
+        self.gen = 0
+        self.numStale = 0
+        self.checkpoint = None
+
+    def __len__(self):
+        return len(self.byTicks)
+
+    def add(self, task):
+        bisect.insort(self.byTicks, (task.whenTicks, task.seq, task))
+
+    def discard(self, task):
+        i = bisect.bisect_left(self.byTicks, (task.whenTicks, task.seq, task))
+        if i < len(self.byTicks) and self.byTicks[i][2] is task:
+            del self.byTicks[i]
+
+    def tasksUpTo(self, limitTicks):
+        """\
+        :returns: list of the tasks due at or before the specified tick value, or all tasks if it is None.
+        """
+        if limitTicks is None:
+            return [ task for _, _, task in self.byTicks ]
+        i = bisect.bisect_right(self.byTicks, (limitTicks, float("inf")))
+        return [ task for _, _, task in self.byTicks[:i] ]
 
 
 
@@ -238,7 +923,9 @@ class _Task(object):
     Representation of a scheduled task. This is an internal of the Task module. For normal use you should
     not need to acess it.
     """
-    def __init__(self, clock, whenTicks, callBack, args, kwargs, n=0):
+    _seqCounter = itertools.count()
+
+    def __init__(self, clock, whenTicks, callBack, args, kwargs):
         r"""\
         Initialiser
         
@@ -247,7 +934,6 @@ class _Task(object):
         :param callback: (func) The function (the task) that will be called at the scheduled time
         :param args: (list) List of arguments to be passed to the function when it is invoked
         :param kwargs: (dict) Dictionary of keyword arguments to be passed to the function when it is invoked
-        :param n: (int) Generation count. Incremented whenever the task is based on a previous task (i.e. it is a rescheduled task)
         """
         super(_Task, self).__init__()
         self.when=clock.calcWhen(whenTicks)
@@ -256,31 +942,26 @@ class _Task(object):
         self.callBack = callBack
         self.args = args
         self.kwargs = kwargs
-        self.n = n
+        self.seq = _Task._seqCounter.next()
+        self.gen = 0
+        self.entry = None
         self.deleted=False
+        self.cancelled=False
+        self.started=False
+        self.finished=False
 
-    def __cmp__(self, other):
-        """\
-        Sorting handler, for when inserted into a priority queue
-        
-        Sorts by time when the task is scheduled to be executed; but if two tasks have the same scheduled time, then discriminates
-        by the generation count.
-        """
-        if self.when == other.when:
-            return self.n - other.n
-        else:
-            return self.when - other.when
-    
-    def regenerateAndDeprecate(self):
-        """Sets the deleted flag of this task to True, and returns a new task the same as this one
-        but not deleted and with the scheduled time 'when' recalculated from the clock"""
-        self.deleted=True
-        return _Task(self.clock,self.whenTicks,self.callBack,self.args,self.kwargs, self.n+1)
+    def recalculate(self):
+        """Recalculate the scheduled time 'when' from the clock"""
+        self.when = self.clock.calcWhen(self.whenTicks)
     
     def __repr__(self):
         return "_Task(%s,%f,%s,%d,%s,%s)" % (str(self.deleted),self.when, self.clock.__class__.__name__, self.whenTicks, str(self.args),str(self.kwargs))
 
 
-scheduler = _Scheduler()
+# name used before Scheduler became public
+_Scheduler = Scheduler
+
+scheduler = Scheduler()
     
-__all__ = [ "sleepUntil", "sleepFor", "scheduleEvent", "runAt" ]
+__all__ = [ "sleepUntil", "sleepFor", "scheduleEvent", "runAt", "cancelAll", "setExecutor", "setPreciseWait", "getLatenessHistograms",
+            "Scheduler", "TaskHandle", "LatenessHistogram", "CallbackThreadPool" ]
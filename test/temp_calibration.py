@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import _useDvbCssUninstalled
+
+import os
+import shutil
+import tempfile
+
+
+class TempCalibrationFile(object):
+    """\
+    Points the `DVBCSS_CALIBRATION_FILE` environment variable at a file in a
+    temporary directory, so that creating a :class:`~dvbcss.clock.SysClock` in
+    a test does not save clock calibration measurements in the home directory.
+
+    Use :func:`install` and :func:`uninstall` to plug it in, e.g. from the
+    `setUpModule` and `tearDownModule` functions of a test module.
+    """
+
+    def __init__(self):
+        super(TempCalibrationFile,self).__init__()
+        self.dir = None
+        self.oldValue = None
+
+    def install(self):
+        self.dir = tempfile.mkdtemp()
+        self.oldValue = os.environ.get("DVBCSS_CALIBRATION_FILE")
+        os.environ["DVBCSS_CALIBRATION_FILE"] = os.path.join(self.dir, "calibration.json")
+
+    def uninstall(self):
+        if self.oldValue is None:
+            del os.environ["DVBCSS_CALIBRATION_FILE"]
+        else:
+            os.environ["DVBCSS_CALIBRATION_FILE"] = self.oldValue
+        shutil.rmtree(self.dir)
+        self.dir = None
@@ -16,15 +16,35 @@
 
 import unittest
 import math
+import copy
+import logging
+import pickle
 
 import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
 
 import dvbcss.monotonic_time as time
 
 from dvbcss.clock import ClockBase, SysClock, CorrelatedClock, OffsetClock, TunableClock, NoCommonClock, RangeCorrelatedClock, Correlation
+from dvbcss.clock import batchUpdates, sampleAll, ClockSnapshot
+from dvbcss.calibration import getCalibration
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from mock_time import MockTime
 from mock_dependent import MockDependent
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
 
 class Test_SysClock(unittest.TestCase):
 
@@ -98,11 +118,13 @@ class Test_SysClock(unittest.TestCase):
         """Dispersion should equal precision irrespective of time value"""
         sysClock = self.newSysClock(tickRate=1000000000)
         
+        precision = max(getCalibration().resolution, 1e-9)
+
         now = sysClock.ticks
-        self.assertAlmostEquals(0.000001, sysClock.dispersionAtTime(now), delta=0.0000001)
+        self.assertEquals(precision, sysClock.dispersionAtTime(now))
 
         newNow = now + sysClock.tickRate * 1000
-        self.assertAlmostEquals(0.000001, sysClock.dispersionAtTime(newNow), delta=0.0000001)
+        self.assertEquals(precision, sysClock.dispersionAtTime(newNow))
 
     def test_cannotSetParent(self):
         sysClock = self.newSysClock(tickRate=1000000000)
@@ -195,6 +217,14 @@ class Test_Correlation(unittest.TestCase):
         self.assertFalse(Correlation(1,2,3,4) != Correlation(1,2,3,4))
         self.assertTrue(Correlation(1,2,3,4) == Correlation(1,2,3,4))
         
+    def test_pickleAndCopy(self):
+        """Correlations can be pickled and copied, despite having no __dict__"""
+        c = Correlation(1,2,3,4)
+        self.assertEqual(c, pickle.loads(pickle.dumps(c)))
+        self.assertEqual(c, pickle.loads(pickle.dumps(c, pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(c, copy.deepcopy(c))
+        self.assertFalse(hasattr(c, "__dict__"))
+
     def test_tupleEquivEquality(self):
         """Correlations can be compared with 2-tuples for equality of the parentTicks and childTicks"""
         self.assertEqual(Correlation(1,2,3,4), (1,2))
@@ -1057,5 +1087,486 @@ class Test_HierarchyTickConversions(unittest.TestCase):
         c.speed = 1.01
         self.assertEquals(float('inf'), b.clockDiff(c))
         
+class Test_BatchTickConversions(unittest.TestCase):
+    """\
+    Tests for the batch tick conversion functions
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sys = SysClock(tickRate=1000000)
+        self.mockTime.disableAutoIncrement()
+
+        self.a1 = CorrelatedClock(self.sys, tickRate=100, correlation=Correlation(50,0))
+        self.a2 = CorrelatedClock(self.a1, tickRate=78, correlation=Correlation(28,999), speed=1.5)
+        self.a3 = OffsetClock(self.a2, offset=0.25)
+        self.a4 = RangeCorrelatedClock(self.a3, 1000, Correlation(5,0), Correlation(15005,5000))
+        self.b2 = CorrelatedClock(self.a1, tickRate=1000, correlation=Correlation(10,20), speed=0.5)
+        self.values = [ -1000, 0, 5, 999, 1234567, 98765.4321 ]
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def assertSequenceAlmostEquals(self, expected, actual, places=5):
+        self.assertEquals(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            if math.isnan(e):
+                self.assertTrue(math.isnan(a))
+            else:
+                self.assertAlmostEquals(e, a, places=places)
+
+    def test_parentConversionsMatchSingleValue(self):
+        for clock in [ self.a1, self.a2, self.a3, self.a4, self.b2 ]:
+            result = clock.toParentTicksBatch(self.values)
+            self.assertIsInstance(result, list)
+            self.assertEquals([ clock.toParentTicks(t) for t in self.values ], result)
+            result = clock.fromParentTicksBatch(self.values)
+            self.assertEquals([ clock.fromParentTicks(t) for t in self.values ], result)
+
+    def test_rootConversionsMatchSingleValue(self):
+        for clock in [ self.sys, self.a1, self.a2, self.a3, self.a4, self.b2 ]:
+            self.assertEquals([ clock.toRootTicks(t) for t in self.values ], clock.toRootTicksBatch(self.values))
+            self.assertEquals([ clock.fromRootTicks(t) for t in self.values ], clock.fromRootTicksBatch(self.values))
+
+    def test_otherClockConversionMatchesSingleValue(self):
+        self.assertEquals([ self.a4.toOtherClockTicks(self.b2, t) for t in self.values ], self.a4.toOtherClockTicksBatch(self.b2, self.values))
+        self.assertEquals([ self.b2.toOtherClockTicks(self.a4, t) for t in self.values ], self.b2.toOtherClockTicksBatch(self.a4, self.values))
+        self.assertEquals(self.values, self.a2.toOtherClockTicksBatch(self.a2, self.values))
+
+    def test_acceptsAnySequence(self):
+        self.assertEquals([ self.a2.toRootTicks(t) for t in self.values ], self.a2.toRootTicksBatch(tuple(self.values)))
+        self.assertEquals([ self.a2.toRootTicks(t) for t in self.values ], self.a2.toRootTicksBatch(iter(self.values)))
+        self.assertEquals([], self.a2.toRootTicksBatch([]))
+
+    def test_zeroSpeed(self):
+        self.a2.speed = 0
+        values = [ 998, 999, 1000 ]
+        result = self.a2.toParentTicksBatch(values)
+        self.assertTrue(math.isnan(result[0]))
+        self.assertEquals(28, result[1])
+        self.assertTrue(math.isnan(result[2]))
+        self.assertSequenceAlmostEquals([ self.a3.toOtherClockTicks(self.b2, t) for t in values ], self.a3.toOtherClockTicksBatch(self.b2, values))
+
+    def test_noCommonAncestor(self):
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        other = CorrelatedClock(SysClock(), tickRate=1000)
+        self.mockTime.disableAutoIncrement()
+        self.assertRaises(NoCommonClock, self.a2.toOtherClockTicksBatch, other, self.values)
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_numpyArrays(self):
+        values = numpy.array(self.values)
+        for clock in [ self.a1, self.a2, self.a3, self.a4, self.b2 ]:
+            result = clock.toRootTicksBatch(values)
+            self.assertIsInstance(result, numpy.ndarray)
+            self.assertSequenceAlmostEquals([ clock.toRootTicks(float(t)) for t in self.values ], result)
+            result = clock.fromRootTicksBatch(values)
+            self.assertIsInstance(result, numpy.ndarray)
+            self.assertSequenceAlmostEquals([ clock.fromRootTicks(float(t)) for t in self.values ], result)
+        result = self.a4.toOtherClockTicksBatch(self.b2, values)
+        self.assertIsInstance(result, numpy.ndarray)
+        self.assertSequenceAlmostEquals([ self.a4.toOtherClockTicks(self.b2, float(t)) for t in self.values ], result)
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_numpyZeroSpeed(self):
+        self.a2.speed = 0
+        result = self.a2.toParentTicksBatch(numpy.array([ 998, 999, 1000 ]))
+        self.assertTrue(math.isnan(result[0]))
+        self.assertEquals(28, result[1])
+        self.assertTrue(math.isnan(result[2]))
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_numpyLargeIntegersDoNotOverflow(self):
+        values = numpy.array([ 2**62, 2**62+1000000 ], dtype=numpy.int64)
+        clock = CorrelatedClock(self.sys, tickRate=1000000000)
+        self.assertSequenceAlmostEquals([ clock.fromParentTicks(float(t)) for t in values ], clock.fromParentTicksBatch(values), places=-6)
+
+
+
+class Test_CachedRootTransform(unittest.TestCase):
+    """\
+    Tests that reading ticks via the cached root transform gives the same results as
+    walking the hierarchy, and that the cache is invalidated by changes.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sys = SysClock(tickRate=1000000)
+        self.mockTime.disableAutoIncrement()
+        self.mockTime.timeNow = 5020.8
+
+        self.a1 = CorrelatedClock(self.sys, tickRate=100, correlation=Correlation(50,0))
+        self.a2 = CorrelatedClock(self.a1, tickRate=78, correlation=Correlation(28,999), speed=1.5)
+        self.a3 = OffsetClock(self.a2, offset=0.25)
+        self.a4 = RangeCorrelatedClock(self.a3, 1000, Correlation(5,0), Correlation(15005,5000))
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def uncachedTicks(self, clock):
+        return clock.fromRootTicks(self.sys.ticks)
+
+    def test_ticksMatchHierarchy(self):
+        for clock in [ self.a1, self.a2, self.a3, self.a4 ]:
+            self.assertAlmostEquals(self.uncachedTicks(clock), clock.ticks, places=5)
+        self.mockTime.timeNow = 6000.123
+        for clock in [ self.a1, self.a2, self.a3, self.a4 ]:
+            self.assertAlmostEquals(self.uncachedTicks(clock), clock.ticks, places=5)
+
+    def test_ancestorChangeInvalidates(self):
+        before = self.a4.ticks
+        self.a1.correlation = Correlation(50, 1000)
+        self.assertNotAlmostEquals(before, self.a4.ticks, places=3)
+        self.assertAlmostEquals(self.uncachedTicks(self.a4), self.a4.ticks, places=5)
+
+        self.a2.speed = 0.5
+        self.assertAlmostEquals(self.uncachedTicks(self.a3), self.a3.ticks, places=5)
+        self.assertAlmostEquals(self.uncachedTicks(self.a4), self.a4.ticks, places=5)
+
+        self.a3.offset = -1.0
+        self.assertAlmostEquals(self.uncachedTicks(self.a4), self.a4.ticks, places=5)
+
+    def test_descendantUpToDateWhenNotified(self):
+        """A dependent of a clock that reads a descendant clock when notified sees the change"""
+        a1, a4 = self.a1, self.a4
+        uncachedTicks = self.uncachedTicks
+        seen = []
+        class Dependent(object):
+            def notify(self, cause):
+                seen.append((uncachedTicks(a4), a4.ticks))
+        # several dependents, so that some are notified before the child clock is
+        deps = [ Dependent() for i in range(20) ]
+        for dep in deps:
+            a1.bind(dep)
+        a4.ticks
+        a1.correlation = Correlation(50, 1000)
+        self.assertEquals(len(deps), len(seen))
+        for uncached, ticks in seen:
+            self.assertAlmostEquals(uncached, ticks, places=5)
+
+    def test_invalidatedOncePerChange(self):
+        """A change to the top of a deep chain invalidates each clock below it only once"""
+        chain = [ self.sys ]
+        for i in range(0, 32):
+            chain.append(CorrelatedClock(chain[-1], tickRate=1000, correlation=Correlation(i,0)))
+        chain[-1].ticks
+
+        calls = []
+        original = ClockBase._invalidate
+        def counting(clock):
+            calls.append(clock)
+            original(clock)
+        ClockBase._invalidate = counting
+        try:
+            chain[1].speed = 2.0
+        finally:
+            ClockBase._invalidate = original
+        self.assertEquals(chain[1:], calls)
+        self.assertAlmostEquals(self.uncachedTicks(chain[-1]), chain[-1].ticks, places=5)
+
+    def test_setParentInvalidates(self):
+        self.a4.ticks
+        self.a2.setParent(self.sys)
+        self.assertEquals([self.a4, self.a3, self.a2, self.sys], self.a4.getAncestry())
+        self.assertAlmostEquals(self.uncachedTicks(self.a4), self.a4.ticks, places=5)
+
+    def test_integerMathsUnchanged(self):
+        c = CorrelatedClock(self.sys, tickRate=1000, correlation=Correlation(0,0), speed=1)
+        d = CorrelatedClock(c, tickRate=7, correlation=Correlation(3,0), speed=1)
+        self.assertEquals((self.sys.ticks - 0)*1000*1/1000000, c.ticks)
+        self.assertEquals((c.ticks - 3)*7*1/1000, d.ticks)
+        self.assertIsInstance(d.ticks, (int, long))
+
+
+class Test_BatchUpdates(unittest.TestCase):
+    """\
+    Tests for coalescing of change notifications using batchUpdates()
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sys = SysClock(tickRate=1000000)
+        self.mockTime.disableAutoIncrement()
+        self.mockTime.timeNow = 5020.8
+
+        self.timeline = CorrelatedClock(self.sys, tickRate=1000, correlation=Correlation(0,0))
+        self.offsets = [ OffsetClock(self.timeline, offset=0.01*i) for i in range(0,5) ]
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def test_unbatchedNotifiesPerChange(self):
+        d = MockDependent()
+        self.offsets[0].bind(d)
+        self.timeline.correlation = Correlation(1,2)
+        self.timeline.speed = 2.0
+        d.assertNotificationsEqual([self.offsets[0], self.offsets[0]])
+
+    def test_oneNotificationPerDependent(self):
+        deps = []
+        for clock in [self.timeline] + self.offsets:
+            d = MockDependent()
+            clock.bind(d)
+            deps.append((clock, d))
+
+        with self.timeline.batchUpdates():
+            self.timeline.correlation = Correlation(1,2)
+            self.timeline.speed = 2.0
+            self.timeline.setAvailability(False)
+            self.offsets[2].offset = 0.5
+            for _, d in deps:
+                d.assertNotNotified()
+
+        for clock, d in deps:
+            d.assertNotificationsEqual([clock])
+
+    def test_diamondDeduplicated(self):
+        """A dependent bound to a clock and to its descendant gets one notification per clock it is bound to."""
+        d = MockDependent()
+        child = self.offsets[1]
+        grandChild = OffsetClock(child, offset=0.1)
+        self.timeline.bind(d)
+        grandChild.bind(d)
+
+        with batchUpdates():
+            self.timeline.speed = 0.5
+            child.offset = 0.2
+            grandChild.offset = 0.3
+            self.timeline.speed = 1.5
+
+        self.assertEquals(2, len(d.notifications))
+        self.assertEquals(set([self.timeline, grandChild]), set(d.notifications))
+
+    def test_childChangedBeforeParent(self):
+        """A clock changed before its parent within the batch passes on the change only once."""
+        d = MockDependent()
+        child = self.offsets[1]
+        grandChild = OffsetClock(child, offset=0.1)
+        child.bind(d)
+        grandChild.bind(d)
+
+        with batchUpdates():
+            grandChild.offset = 0.3
+            child.offset = 0.2
+            self.timeline.speed = 0.5
+
+        self.assertEquals(2, len(d.notifications))
+        self.assertEquals(set([child, grandChild]), set(d.notifications))
+
+    def test_dependentExceptionDoesNotStopFlush(self):
+        class Failing(object):
+            def notify(self, cause):
+                raise RuntimeError("failed")
+        d = MockDependent()
+        self.timeline.bind(Failing())
+        self.offsets[0].bind(Failing())
+        self.offsets[4].bind(d)
+
+        logger = logging.getLogger("dvbcss.clock")
+        logger.disabled = True
+        try:
+            with batchUpdates():
+                self.timeline.speed = 0.5
+        finally:
+            logger.disabled = False
+
+        d.assertNotificationsEqual([self.offsets[4]])
+
+    def test_ticksUpToDateWithinBatch(self):
+        clock = self.offsets[3]
+        before = clock.ticks
+        with batchUpdates():
+            self.timeline.correlation = Correlation(self.sys.ticks, 5000000)
+            self.assertAlmostEquals(clock.fromRootTicks(self.sys.ticks), clock.ticks, places=5)
+            self.assertNotAlmostEquals(before, clock.ticks, places=3)
+
+    def test_nested(self):
+        d = MockDependent()
+        self.offsets[0].bind(d)
+        with batchUpdates():
+            with batchUpdates():
+                self.timeline.speed = 0.5
+            d.assertNotNotified()
+            self.timeline.speed = 0.25
+        d.assertNotificationsEqual([self.offsets[0]])
+
+    def test_notifiedOnException(self):
+        d = MockDependent()
+        self.timeline.bind(d)
+        try:
+            with batchUpdates():
+                self.timeline.speed = 0.5
+                raise ValueError()
+        except ValueError:
+            pass
+        d.assertNotificationsEqual([self.timeline])
+        self.timeline.speed = 0.25
+        d.assertNotificationsEqual([self.timeline])
+
+    def test_changeDuringFlushDelivered(self):
+        """Changes made by a dependent while being notified at the end of a batch are also delivered."""
+        other = CorrelatedClock(self.sys, tickRate=1000)
+        d = MockDependent()
+        other.bind(d)
+        class Follower(object):
+            def notify(self, cause):
+                other.speed = cause.speed
+        self.timeline.bind(Follower())
+
+        with batchUpdates():
+            self.timeline.speed = 3.0
+
+        self.assertEquals(3.0, other.speed)
+        d.assertNotificationsEqual([other])
+
+
+class Test_CachedErrorModel(unittest.TestCase):
+    """\
+    Tests that dispersion calculated using the cached error model matches the
+    dispersion calculated by walking the hierarchy.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sys = SysClock(tickRate=1000000, maxFreqErrorPpm=50)
+        self.mockTime.disableAutoIncrement()
+        self.mockTime.timeNow = 5020.8
+
+        self.a1 = CorrelatedClock(self.sys, tickRate=1000000000, correlation=Correlation(5020800000, 1000.0, 0.001, 0.00005))
+        self.a2 = CorrelatedClock(self.a1, tickRate=90000, correlation=Correlation(28, 999.0, 0.002, 0.0001), speed=-1.5)
+        self.a3 = OffsetClock(self.a2, offset=0.25)
+        self.a4 = CorrelatedClock(self.a3, tickRate=25, correlation=Correlation(5000, 7.0, 0.0, 0.001))
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def walkedDispersion(self, clock, t):
+        disp = clock._errorAtTime(t)
+        if clock.getParent() is not None:
+            disp += self.walkedDispersion(clock.getParent(), clock.toParentTicks(t))
+        return disp
+
+    def assertDispersionsMatch(self, clock):
+        now = clock.ticks
+        for t in [ now, now - 12345.6, now + 98765, -5000 ]:
+            expected = self.walkedDispersion(clock, t)
+            if math.isnan(expected):
+                self.assertTrue(math.isnan(clock.dispersionAtTime(t)))
+            else:
+                self.assertAlmostEquals(expected, clock.dispersionAtTime(t), places=9)
+
+    def test_matchesHierarchy(self):
+        for clock in [ self.sys, self.a1, self.a2, self.a3, self.a4 ]:
+            self.assertDispersionsMatch(clock)
+            self.assertTrue(clock._errorModel())
+
+    def test_changeInvalidates(self):
+        self.a4.dispersionAtTime(self.a4.ticks)
+        self.a1.correlation = Correlation(5020800000, 5000.0, 0.5, 0.001)
+        self.assertDispersionsMatch(self.a4)
+        self.a2.speed = 0.5
+        self.assertDispersionsMatch(self.a4)
+        self.a4.correlation = self.a4.correlation.butWith(errorGrowthRate=0.1)
+        self.assertDispersionsMatch(self.a4)
+
+    def test_batch(self):
+        now = self.a4.ticks
+        times = [ now, now - 12345.6, now + 98765, -5000 ]
+        expected = [ self.a4.dispersionAtTime(t) for t in times ]
+        for e, d in zip(expected, self.a4.dispersionAtTimeBatch(times)):
+            self.assertAlmostEquals(e, d, places=9)
+        if numpy is not None:
+            result = self.a4.dispersionAtTimeBatch(numpy.array(times))
+            self.assertIsInstance(result, numpy.ndarray)
+            for e, d in zip(expected, result):
+                self.assertAlmostEquals(e, d, places=9)
+
+    def test_fallbackWithoutModel(self):
+        """Clocks using integer maths, RangeCorrelatedClocks and speed zero use the hierarchy."""
+        intClock = CorrelatedClock(self.sys, tickRate=1000, correlation=Correlation(50, 20, 0.01, 0.001), speed=1)
+        rangeClock = RangeCorrelatedClock(self.a1, 1000, Correlation(5, 0, 0.01, 0.001), Correlation(15005, 5000, 0.02, 0.001))
+        for clock in [ intClock, rangeClock ]:
+            self.assertEquals([ clock.dispersionAtTime(5) ], clock.dispersionAtTimeBatch([5]))
+        self.a2.speed = 0
+        for clock in [ intClock, rangeClock, self.a4 ]:
+            self.assertFalse(clock._errorModel())
+            self.assertDispersionsMatch(clock)
+
+    def test_subclassOverridingErrorFallsBack(self):
+        class PessimisticClock(CorrelatedClock):
+            def _errorAtTime(self, t):
+                return 1.0
+        clock = PessimisticClock(self.a1, tickRate=1000, correlation=Correlation(50, 20.0, 0.01, 0.001))
+        self.assertFalse(clock._errorModel())
+        self.assertAlmostEquals(1.0 + self.a1.dispersionAtTime(clock.toParentTicks(7)), clock.dispersionAtTime(7), places=9)
+
+
+class Test_Snapshot(unittest.TestCase):
+    """\
+    Tests for reading several clocks at the same instant using sampleAll() and snapshot()
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sys = SysClock(tickRate=1000000)
+        self.sys2 = SysClock(tickRate=1000)
+        self.mockTime.disableAutoIncrement()
+        self.mockTime.timeNow = 5020.8
+
+        self.wall = CorrelatedClock(self.sys, tickRate=1000000000, correlation=Correlation(5020800000, 1000.0, 0.001, 0.00005))
+        self.timeline = CorrelatedClock(self.wall, tickRate=90000, correlation=Correlation(28, 999, 0.002), speed=0.5)
+        self.offset = OffsetClock(self.timeline, offset=0.1)
+        self.intClock = CorrelatedClock(self.sys2, tickRate=25, correlation=Correlation(5, 7), speed=1)
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def test_consistentInstant(self):
+        """Every read of the root clock moves time on, but all snapshots are for the same instant"""
+        self.mockTime.enableAutoIncrementBy(0.001, numReadsBetweenIncrements=1)
+        wallSnap, timelineSnap, offsetSnap, sysSnap = sampleAll([self.wall, self.timeline, self.offset, self.sys])
+        self.assertAlmostEquals(self.wall.fromParentTicks(sysSnap.ticks), wallSnap.ticks, delta=0.01)
+        self.assertAlmostEquals(self.timeline.fromParentTicks(wallSnap.ticks), timelineSnap.ticks, delta=0.01)
+        self.assertAlmostEquals(self.offset.fromParentTicks(timelineSnap.ticks), offsetSnap.ticks, delta=0.01)
+
+    def test_matchesSeparateReads(self):
+        self.timeline.setAvailability(False)
+        clocks = [self.sys, self.wall, self.timeline, self.offset, self.intClock]
+        for clock, snap in zip(clocks, sampleAll(clocks)):
+            self.assertIsInstance(snap, ClockSnapshot)
+            self.assertIs(clock, snap.clock)
+            self.assertEquals(clock.ticks, snap.ticks)
+            self.assertAlmostEquals(clock.getEffectiveSpeed(), snap.effectiveSpeed, places=12)
+            self.assertEquals(clock.isAvailable(), snap.available)
+            self.assertAlmostEquals(clock.dispersionAtTime(clock.ticks), snap.dispersion, places=12)
+        self.assertFalse(self.offset.snapshot().available)
+        self.assertTrue(self.wall.snapshot().available)
+
+    def test_effectiveSpeedFollowsChanges(self):
+        self.assertEquals(0.5, self.offset.snapshot().effectiveSpeed)
+        self.wall.speed = 3.0
+        self.assertEquals(1.5, self.offset.snapshot().effectiveSpeed)
+        self.assertEquals(1.5, self.offset.getEffectiveSpeed())
+
+    def test_integerMaths(self):
+        snap = self.intClock.snapshot()
+        self.assertEquals(self.intClock.ticks, snap.ticks)
+        self.assertIsInstance(snap.ticks, (int, long))
+
+    def test_immutable(self):
+        snap = self.wall.snapshot()
+        self.assertRaises(AttributeError, setattr, snap, "ticks", 5)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -18,13 +18,487 @@ import unittest
 
 import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
 
-class Test(unittest.TestCase):
+import math
+import os
+import subprocess
+import sys
+import threading
 
+import dvbcss.monotonic_time as time
 
-    def testName(self):
-        pass
+from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+import dvbcss.task
+from dvbcss.task import Scheduler, TaskHandle, runAt, cancelAll, sleepFor, LatenessHistogram, CallbackThreadPool
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
+
+class Test_Scheduler(unittest.TestCase):
+    """\
+    Tests of the task scheduler, using a private instance of the scheduler.
+    """
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.sysClock = SysClock(tickRate=1000000)
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def sync(self):
+        """\
+        Wait until the scheduler has processed everything queued so far.
+        """
+        done = threading.Event()
+        self.scheduler.schedule(self.sysClock, 0, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+
+    def test_callsBackInOrder(self):
+        calls = []
+        done = threading.Event()
+        now = self.clock.ticks
+        self.scheduler.schedule(self.clock, now+40, calls.append, (2,), {})
+        self.scheduler.schedule(self.clock, now+20, calls.append, (1,), {})
+        self.scheduler.schedule(self.clock, now+60, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([1,2], calls)
+        self.assertEquals({}, self.scheduler.clock_Tasks)
+
+    def test_clockAdjustmentReschedules(self):
+        done = threading.Event()
+        self.scheduler.schedule(self.clock, self.clock.ticks + 100000, done.set, (), {})
+        self.sync()
+        self.assertFalse(done.is_set())
+        self.clock.correlation = self.clock.correlation.butWith(childTicks=200000)
+        self.assertTrue(done.wait(2.0))
+
+    def test_zeroSpeedPostponesUntilSpeedRestored(self):
+        done = threading.Event()
+        self.clock.speed = 0
+        self.scheduler.schedule(self.clock, self.clock.ticks + 10, done.set, (), {})
+        self.sync()
+        self.assertEquals([], [ e for e in self.scheduler.taskheap if e[2] is not None and e[2].clock is self.clock ])
+        self.clock.speed = 1
+        self.assertTrue(done.wait(2.0))
+
+    def test_repeatedAdjustmentDoesNotGrowQueue(self):
+        self.scheduler.stop()
+        self.scheduler = Scheduler(horizonSecs=None)
+        other = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+        for i in range(0, 100):
+            self.scheduler.schedule(other, other.ticks + 1000000 + i, lambda : None, (), {})
+        for i in range(0, 10):
+            self.scheduler.schedule(self.clock, self.clock.ticks + 1000000 + i, lambda : None, (), {})
+        self.sync()
+        for i in range(0, 50):
+            self.clock.correlation = self.clock.correlation.butWith(childTicks=i)
+            self.sync()
+        self.assertLessEqual(len(self.scheduler.taskheap), 2 * 110)
+        live = sorted(e for e in self.scheduler.taskheap if e[2] is not None)
+        self.assertEquals(110, len(live))
+        for when, _, task in live:
+            self.assertEquals(task.clock.calcWhen(task.whenTicks), when)
+
+    def test_manyTasksRescheduledInPlace(self):
+        calls = []
+        done = threading.Event()
+        now = self.clock.ticks
+        for i in range(0, 50):
+            self.scheduler.schedule(self.clock, now + 100000 + i, calls.append, (i,), {})
+        self.scheduler.schedule(self.clock, now + 100050, done.set, (), {})
+        self.sync()
+        self.clock.correlation = self.clock.correlation.butWith(childTicks=100000)
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals(range(0,50), calls)
+        self.assertEquals(0, self.scheduler.numRemoved)
+
+
+    def test_scheduleReturnsHandle(self):
+        done = threading.Event()
+        handle = self.scheduler.schedule(self.clock, self.clock.ticks + 10, done.set, (), {})
+        self.assertIsInstance(handle, TaskHandle)
+        self.assertFalse(handle.done)
+        self.assertTrue(done.wait(2.0))
+        self.sync()
+        self.assertTrue(handle.done)
+        self.assertFalse(handle.cancelled)
+        handle.cancel()
+        self.assertFalse(handle.cancelled)
+
+    def test_cancel(self):
+        calls = []
+        now = self.clock.ticks
+        handle = self.scheduler.schedule(self.clock, now + 20, calls.append, (1,), {})
+        self.scheduler.schedule(self.clock, now + 20, calls.append, (2,), {})
+        handle.cancel()
+        self.assertTrue(handle.cancelled)
+        time.sleep(0.05)
+        self.sync()
+        self.assertEquals([2], calls)
+        self.assertFalse(handle.done)
+        self.assertEquals({}, self.scheduler.clock_Tasks)
+
+    def test_cancelAfterAdded(self):
+        now = self.clock.ticks
+        handles = [ self.scheduler.schedule(self.clock, now + 100000 + i, lambda : None, (), {}) for i in range(0, 100) ]
+        self.sync()
+        self.assertEquals(100, len(self.scheduler.clock_Tasks[self.clock]))
+        for handle in handles[:60]:
+            handle.cancel()
+        self.sync()
+        self.assertEquals(40, len(self.scheduler.clock_Tasks[self.clock]))
+        live = [ e for e in self.scheduler.taskheap if e[2] is not None and e[2] is not self.scheduler.clock_Tasks[self.clock] ]
+        self.assertEquals(40, len(live))
+        self.assertLess(len(self.scheduler.taskheap), 100)
+
+    def test_cancelAll(self):
+        calls = []
+        other = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+        handles = [ self.scheduler.schedule(self.clock, self.clock.ticks + 20 + i, calls.append, (i,), {}) for i in range(0, 10) ]
+        self.scheduler.schedule(other, other.ticks + 20, calls.append, ("other",), {})
+        self.scheduler.cancelAll(self.clock)
+        time.sleep(0.06)
+        self.sync()
+        self.assertEquals(["other"], calls)
+        self.assertNotIn(self.clock, self.scheduler.clock_Tasks)
+        self.assertNotIn(self.scheduler, self.clock.dependents)
+        for handle in handles:
+            self.assertTrue(handle.cancelled)
+
+
+
+class Test_SchedulerHorizon(unittest.TestCase):
+    """\
+    Tests of lazy rescheduling of tasks beyond the horizon of the scheduler.
+    """
+
+    def setUp(self):
+        self.scheduler = Scheduler(horizonSecs=0.1)
+        self.sysClock = SysClock(tickRate=1000000)
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def sync(self):
+        done = threading.Event()
+        self.scheduler.schedule(self.sysClock, 0, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+
+    def tasksFor(self, clock):
+        return [ task for _, _, task in self.scheduler.clock_Tasks[clock].byTicks ]
+
+    def test_onlyNearTasksRecalculated(self):
+        now = self.clock.ticks
+        self.scheduler.schedule(self.clock, now + 50, lambda : None, (), {})
+        for i in range(0, 100):
+            self.scheduler.schedule(self.clock, now + 1000000 + i, lambda : None, (), {})
+        self.sync()
+        self.clock.correlation = self.clock.correlation.butWith(childTicks=-5)
+        self.sync()
+
+        tasks = self.tasksFor(self.clock)
+        self.assertEquals(self.clock.calcWhen(tasks[0].whenTicks), tasks[0].when)
+        for task in tasks[1:]:
+            self.assertNotEquals(self.clock.calcWhen(task.whenTicks), task.when)
+        self.assertEquals(100, self.scheduler.clock_Tasks[self.clock].numStale)
+
+    def test_farTaskBroughtForwardRunsOnTime(self):
+        done = threading.Event()
+        self.scheduler.schedule(self.clock, self.clock.ticks + 1000000, done.set, (), {})
+        self.sync()
+        # adjust so that the task is now due in 0.3 seconds: beyond the horizon
+        self.clock.correlation = self.clock.correlation.butWith(childTicks=1000000 - 300)
+        due = self.clock.calcWhen(self.tasksFor(self.clock)[0].whenTicks)
+        self.assertTrue(done.wait(2.0))
+        self.assertAlmostEquals(due, time.time(), delta=0.05)
+
+    def test_nearTaskPushedBackDoesNotRunEarly(self):
+        ran = []
+        done = threading.Event()
+        def callback():
+            ran.append(time.time())
+            done.set()
+        self.scheduler.schedule(self.clock, self.clock.ticks + 200, callback, (), {})
+        self.sync()
+        # adjust so that the task is now due in 0.5 seconds: beyond the horizon
+        self.clock.correlation = self.clock.correlation.butWith(childTicks=-300)
+        due = self.clock.calcWhen(self.tasksFor(self.clock)[0].whenTicks)
+        self.assertTrue(done.wait(2.0))
+        self.assertGreaterEqual(ran[0], due)
+        self.assertAlmostEquals(due, ran[0], delta=0.05)
+
+
+
+class Test_LatenessHistogram(unittest.TestCase):
+
+    def test_empty(self):
+        h = LatenessHistogram()
+        self.assertEquals(0, h.count)
+        self.assertTrue(math.isnan(h.mean))
+        self.assertTrue(math.isnan(h.max))
+        self.assertTrue(math.isnan(h.percentile(50)))
+
+    def test_bins(self):
+        h = LatenessHistogram(binEdges=[0.001, 0.01])
+        for lateness in [ -0.5, 0.0005, 0.001, 0.005, 0.02, 3.0 ]:
+            h.record(lateness)
+        self.assertEquals([ (0.001, 3), (0.01, 1), (float("inf"), 2) ], h.bins())
+        self.assertEquals(6, h.count)
+        self.assertEquals(3.0, h.max)
+        self.assertAlmostEquals((-0.5+0.0005+0.001+0.005+0.02+3.0)/6, h.mean)
+        self.assertEquals(0.001, h.percentile(50))
+        self.assertEquals(0.01, h.percentile(60))
+        self.assertEquals(3.0, h.percentile(99))
+        h.reset()
+        self.assertEquals(0, h.count)
+        self.assertEquals([0,0,0], [ count for _, count in h.bins() ])
+
+
+class Test_SchedulerExecutor(unittest.TestCase):
+    """\
+    Tests of the task scheduler calling callbacks using an executor.
+    """
+
+    def setUp(self):
+        self.pool = CallbackThreadPool(numThreads=2)
+        self.scheduler = Scheduler(executor=self.pool)
+        self.sysClock = SysClock(tickRate=1000000)
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.pool.shutdown()
+
+    def test_slowCallbackDoesNotDelayOthers(self):
+        done = threading.Event()
+        ran = []
+        now = self.clock.ticks
+        self.scheduler.schedule(self.clock, now + 20, time.sleep, (0.5,), {})
+        self.scheduler.schedule(self.clock, now + 40, lambda : (ran.append(time.time()), done.set()), (), {})
+        due = self.clock.calcWhen(now + 40)
+        self.assertTrue(done.wait(2.0))
+        self.assertAlmostEquals(due, ran[0], delta=0.1)
+
+    def test_latenessRecorded(self):
+        done = threading.Event()
+        now = self.clock.ticks
+        for i in range(0, 5):
+            self.scheduler.schedule(self.clock, now + 10 + i, lambda : None, (), {})
+        self.scheduler.schedule(self.clock, now + 20, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+        time.sleep(0.05)
+        self.assertEquals(6, self.scheduler.dispatchLateness.count)
+        self.assertEquals(6, self.scheduler.callbackLateness.count)
+        self.assertGreaterEqual(self.scheduler.dispatchLateness.max, 0)
+        self.assertLess(self.scheduler.dispatchLateness.max, 0.5)
+        self.assertGreaterEqual(self.scheduler.callbackLateness.max, self.scheduler.dispatchLateness.max - 0.001)
+
+    def waitUntil(self, condition):
+        deadline = time.time() + 2.0
+        while not condition() and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(condition())
+
+    def test_cancelAfterDispatchBeforeCallback(self):
+        self.pool.shutdown()
+        self.pool = CallbackThreadPool(numThreads=1)
+        self.scheduler.executor = self.pool
+        release = threading.Event()
+        calls = []
+        now = self.clock.ticks
+        self.scheduler.schedule(self.clock, now + 10, release.wait, (2.0,), {})
+        handle = self.scheduler.schedule(self.clock, now + 20, calls.append, (1,), {})
+
+        # the only thread in the pool is busy, so the second task is dispatched but its callback is not called
+        self.waitUntil(lambda : self.scheduler.dispatchLateness.count == 2)
+        self.assertFalse(handle.done)
+        handle.cancel()
+        self.assertTrue(handle.cancelled)
+        release.set()
+        self.pool.shutdown()
+        self.assertEquals([], calls)
+        self.assertFalse(handle.done)
+
+    def test_doneWhenCallbackReturns(self):
+        started = threading.Event()
+        release = threading.Event()
+        def callback():
+            started.set()
+            release.wait(2.0)
+        handle = self.scheduler.schedule(self.clock, self.clock.ticks + 10, callback, (), {})
+        self.assertTrue(started.wait(2.0))
+        self.assertFalse(handle.done)
+        handle.cancel()
+        self.assertFalse(handle.cancelled)
+        release.set()
+        self.waitUntil(lambda : handle.done)
+        self.assertFalse(handle.cancelled)
+
+
+
+class Test_SchedulerPreciseWait(unittest.TestCase):
+    """\
+    Tests of the task scheduler waiting precisely for tasks to become due.
+    """
+
+    def setUp(self):
+        self.sysClock = SysClock(tickRate=1000000)
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000000, correlation=Correlation(self.sysClock.ticks, 0))
+
+    def runCues(self, scheduler):
+        errors = []
+        done = threading.Event()
+        def callback(due):
+            errors.append(time.time() - due)
+        now = self.clock.ticks
+        for i in range(0, 20):
+            whenTicks = now + 20000 + i*7000
+            scheduler.schedule(self.clock, whenTicks, callback, (self.clock.calcWhen(whenTicks),), {})
+        scheduler.schedule(self.clock, now + 20000 + 20*7000, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+        return errors
+
+    def test_neverEarly(self):
+        for preciseWaitSecs, spinSecs in [ (0.005, 0), (0.005, 0.001), (0.005, 0.005) ]:
+            scheduler = Scheduler(preciseWaitSecs=preciseWaitSecs, spinSecs=spinSecs)
+            try:
+                errors = self.runCues(scheduler)
+            finally:
+                scheduler.stop()
+            self.assertEquals(20, len(errors))
+            for error in errors:
+                self.assertGreaterEqual(error, 0)
+                self.assertLess(error, 0.1)
+
+    def test_newTaskDuringPreciseWait(self):
+        scheduler = Scheduler(preciseWaitSecs=0.02)
+        try:
+            done = threading.Event()
+            scheduler.schedule(self.clock, self.clock.ticks + 15000, lambda : None, (), {})
+            time.sleep(0.005)
+            scheduler.schedule(self.clock, self.clock.ticks + 1000, done.set, (), {})
+            self.assertTrue(done.wait(2.0))
+        finally:
+            scheduler.stop()
+
+
+
+class Test_runAt(unittest.TestCase):
+    """\
+    Tests of the module level functions, which use the module's scheduler.
+    """
+
+    def setUp(self):
+        self.sysClock = SysClock(tickRate=1000000)
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000, correlation=Correlation(self.sysClock.ticks, 0))
+
+    def test_runAtCancel(self):
+        calls = []
+        done = threading.Event()
+        handle = runAt(self.clock, self.clock.ticks + 20, calls.append, (1,))
+        runAt(self.clock, self.clock.ticks + 40, done.set)
+        handle.cancel()
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([], calls)
+
+    def test_cancelAll(self):
+        calls = []
+        done = threading.Event()
+        for i in range(0, 5):
+            runAt(self.clock, self.clock.ticks + 20, calls.append, (i,))
+        cancelAll(self.clock)
+        runAt(self.sysClock, self.sysClock.ticks + 40000, done.set)
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([], calls)
+
+
+
+class Test_SchedulerInstances(unittest.TestCase):
+    """\
+    Tests of using several schedulers.
+    """
+
+    def setUp(self):
+        self.sysClock = SysClock(tickRate=1000000)
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000, correlation=Correlation(self.sysClock.ticks, 0))
+        self.clock = CorrelatedClock(self.wallClock, tickRate=1000, correlation=Correlation(self.wallClock.ticks, 0))
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            scheduler.stop()
+
+    def newScheduler(self, **kwargs):
+        scheduler = Scheduler(**kwargs)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def test_importDoesNotStartThread(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(dvbcss.__file__)))
+        code = "import threading, dvbcss.task; print threading.active_count()"
+        output = subprocess.check_output([sys.executable, "-c", code], env=env)
+        self.assertEquals("1", output.strip())
+
+    def test_threadStartedWhenTaskScheduled(self):
+        scheduler = self.newScheduler()
+        self.assertEquals(None, scheduler.thread)
+        done = threading.Event()
+        scheduler.schedule(self.clock, self.clock.ticks, done.set, (), {})
+        self.assertNotEquals(None, scheduler.thread)
+        self.assertTrue(done.wait(2.0))
+
+    def test_restart(self):
+        scheduler = self.newScheduler()
+        done = threading.Event()
+        scheduler.start()
+        scheduler.stop()
+        scheduler.schedule(self.clock, self.clock.ticks, done.set, (), {})
+        self.assertTrue(done.wait(2.0))
+
+    def test_pinnedAncestorRoutesTasks(self):
+        scheduler = self.newScheduler(clocks=[self.wallClock])
+        done = threading.Event()
+        handle = runAt(self.clock, self.clock.ticks + 10, done.set)
+        self.assertIs(scheduler, handle._scheduler)
+        self.assertTrue(done.wait(2.0))
+
+        scheduler.unpin(self.wallClock)
+        handle = runAt(self.clock, self.clock.ticks, lambda : None)
+        self.assertIs(dvbcss.task.scheduler, handle._scheduler)
+
+    def test_explicitScheduler(self):
+        scheduler = self.newScheduler()
+        handle = runAt(self.clock, self.clock.ticks, lambda : None, scheduler=scheduler)
+        self.assertIs(scheduler, handle._scheduler)
+
+    def test_sleepFor(self):
+        scheduler = self.newScheduler(clocks=[self.clock])
+        t = time.time()
+        sleepFor(self.clock, 100)
+        self.assertAlmostEquals(0.1, time.time() - t, delta=0.05)
+
+    def test_busySchedulerDoesNotDelayOther(self):
+        busy = self.newScheduler()
+        other = self.newScheduler()
+        ran = []
+        done = threading.Event()
+        now = self.clock.ticks
+        busy.schedule(self.clock, now + 10, time.sleep, (0.5,), {})
+        other.schedule(self.clock, now + 50, lambda : (ran.append(time.time()), done.set()), (), {})
+        due = self.clock.calcWhen(now + 50)
+        self.assertTrue(done.wait(2.0))
+        self.assertAlmostEquals(due, ran[0], delta=0.1)
 
 
 if __name__ == "__main__":
-    #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import dvbcss.calibration as calibration
+import dvbcss.monotonic_time as monotonic_time
+from dvbcss.calibration import Calibration, measure, getCalibration
+from dvbcss.clock import SysClock
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
+
+class Test_measure(unittest.TestCase):
+
+    def test_plausibleValues(self):
+        cal = measure(sampleSize=1000)
+        self.assertEquals(monotonic_time.backend, cal.backend)
+        self.assertGreater(cal.resolution, 0)
+        self.assertGreater(cal.readCost, 0)
+        self.assertGreaterEqual(cal.jitter, 0)
+        self.assertLess(cal.readCost, 0.01)
+        self.assertLess(cal.resolution, 0.1)
+
+    def test_sampleSizeTooSmall(self):
+        self.assertRaises(ValueError, measure, sampleSize=1)
+
+    def test_immutableAndPicklable(self):
+        cal = Calibration("ctypes", 1e-6, 2e-7, 3e-8)
+        self.assertRaises(AttributeError, setattr, cal, "resolution", 5)
+        self.assertEquals(cal, pickle.loads(pickle.dumps(cal)))
+
+
+class Test_getCalibration(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "sub", "calibration.json")
+        self.origMeasure = calibration.measure
+        self.numMeasurements = 0
+        def countingMeasure(sampleSize=10000):
+            self.numMeasurements += 1
+            return self.origMeasure(100)
+        calibration.measure = countingMeasure
+
+    def tearDown(self):
+        calibration.measure = self.origMeasure
+        calibration._calibrations.pop(self.path, None)
+        shutil.rmtree(self.dir)
+
+    def forgetInProcess(self):
+        calibration._calibrations.pop(self.path, None)
+
+    def test_measuresOnceAndSaves(self):
+        cal = getCalibration(self.path)
+        self.assertEquals(1, self.numMeasurements)
+        self.assertTrue(getCalibration(self.path) is cal)
+        self.assertEquals(1, self.numMeasurements)
+
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.assertEquals({ calibration._cacheKey() : cal._toDict() }, saved)
+
+    def test_usesSavedMeasurements(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({ calibration._cacheKey() : { "readCost" : 1e-3, "resolution" : 2e-3, "jitter" : 3e-3 } }, f)
+        cal = getCalibration(self.path)
+        self.assertEquals(0, self.numMeasurements)
+        self.assertEquals(Calibration(monotonic_time.backend, 1e-3, 2e-3, 3e-3), cal)
+
+    def test_ignoresOtherHostsAndBackends(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({ "otherhost Linux 1.0 ctypes" : { "readCost" : 1e-3, "resolution" : 2e-3, "jitter" : 3e-3 } }, f)
+        getCalibration(self.path)
+        self.assertEquals(1, self.numMeasurements)
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.assertEquals(set(["otherhost Linux 1.0 ctypes", calibration._cacheKey()]), set(saved.keys()))
+
+    def test_corruptFileReplaced(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{ not json")
+        cal = getCalibration(self.path)
+        self.assertEquals(1, self.numMeasurements)
+        self.forgetInProcess()
+        self.assertEquals(cal, getCalibration(self.path))
+        self.assertEquals(1, self.numMeasurements)
+
+    def test_recalibrate(self):
+        getCalibration(self.path)
+        getCalibration(self.path, recalibrate=True)
+        self.assertEquals(2, self.numMeasurements)
+
+    def test_unwritableLocationStillMeasures(self):
+        path = os.path.join(self.dir, "file", "calibration.json")
+        with open(os.path.join(self.dir, "file"), "w") as f:
+            f.write("in the way")
+        try:
+            cal = getCalibration(path)
+            self.assertGreater(cal.resolution, 0)
+        finally:
+            calibration._calibrations.pop(path, None)
+
+
+    def test_emptyPathMeansNoFile(self):
+        origCwd = os.getcwd()
+        os.chdir(self.dir)
+        try:
+            cal = getCalibration("")
+            self.assertEquals(1, self.numMeasurements)
+            self.assertTrue(getCalibration("") is cal)
+            self.assertEquals(1, self.numMeasurements)
+            self.assertEquals([], os.listdir(self.dir))
+        finally:
+            os.chdir(origCwd)
+            calibration._calibrations.pop("", None)
+
+
+class Test_SysClockPrecision(unittest.TestCase):
+
+    def test_precisionFromCalibration(self):
+        resolution = getCalibration().resolution
+        fast = SysClock(tickRate=1000000000)
+        slow = SysClock(tickRate=10)
+        self.assertEquals(max(resolution, 1e-9), fast.dispersionAtTime(fast.ticks))
+        self.assertEquals(0.1, slow.dispersionAtTime(slow.ticks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+import select
+import socket
+import threading
+
+import dvbcss.monotonic_time as time
+
+import dvbcss.protocol.eventloop as eventloop
+from dvbcss.protocol.eventloop import EventLoop, Waker
+from dvbcss.protocol.wc import WCMessage
+from dvbcss.protocol.server.wc import WallClockServer
+from dvbcss.protocol.client.wc import WallClockClient
+from dvbcss.protocol.client.wc.algorithm import MostRecent, Sleep, algorithmWrapper
+from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
+
+class Test_EventLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = EventLoop()
+        self.loop.start()
+
+    def tearDown(self):
+        self.loop.stop()
+
+    def test_callLater(self):
+        done = threading.Event()
+        calls = []
+        self.loop.callLater(0.05, calls.append, 2)
+        self.loop.callLater(0.01, calls.append, 1)
+        self.loop.callLater(0.1, done.set)
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([1,2], calls)
+
+    def test_cancel(self):
+        done = threading.Event()
+        calls = []
+        timer = self.loop.callLater(0.02, calls.append, 1)
+        timer.cancel()
+        self.loop.callLater(0.05, done.set)
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([], calls)
+
+    def test_reader(self):
+        received = []
+        done = threading.Event()
+        def onReadable(sock):
+            received.append(sock.recvfrom(100)[0])
+            done.set()
+
+        a = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        b = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            a.bind(("127.0.0.1", 0))
+            self.loop.addReader(a, onReadable)
+            b.sendto("hello", a.getsockname())
+            self.assertTrue(done.wait(2.0))
+            self.assertEquals(["hello"], received)
+        finally:
+            self.loop.removeReader(a)
+            a.close()
+            b.close()
+
+    def test_closedReaderIsDropped(self):
+        """Check a socket closed without being removed does not stop the loop."""
+        a = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        a.bind(("127.0.0.1", 0))
+        self.loop.addReader(a, lambda sock: None)
+        a.close()
+
+        done = threading.Event()
+        self.loop.callLater(0.05, done.set)
+        self.assertTrue(done.wait(2.0))
+        self.assertFalse(a in self.loop._readers)
+
+    def test_clockUpdatesBatchedPerTick(self):
+        clock = CorrelatedClock(SysClock(tickRate=1000000000), tickRate=1000)
+        notified = []
+        done = threading.Event()
+        class Dependent(object):
+            def notify(self, cause):
+                notified.append(cause)
+                done.set()
+        clock.bind(Dependent())
+
+        def adjust():
+            clock.speed = 2.0
+            clock.correlation = Correlation(5,6)
+            self.assertEquals([], notified)
+        self.loop.callSoon(adjust)
+        self.assertTrue(done.wait(2.0))
+        self.assertEquals([clock], notified)
+
+    def test_stopIsPrompt(self):
+        self.loop.callLater(60, lambda : None)
+        t = time.time()
+        self.loop.stop()
+        self.assertLess(time.time()-t, 0.5)
+
+
+class Test_Waker(unittest.TestCase):
+
+    def _checkWaker(self, waker):
+        try:
+            self.assertEquals([], select.select([waker], [], [], 0)[0])
+            waker.wake()
+            self.assertEquals([waker], select.select([waker], [], [], 1.0)[0])
+            waker.drain()
+            self.assertEquals([], select.select([waker], [], [], 0)[0])
+        finally:
+            waker.close()
+
+    def test_wake(self):
+        self._checkWaker(Waker())
+
+    def test_wakeWithoutSocketPair(self):
+        """Check the loopback UDP pair used where socket.socketpair is not available (e.g. Windows)."""
+        original = eventloop._socketPair
+        eventloop._socketPair = eventloop._udpSocketPair
+        try:
+            waker = Waker()
+        finally:
+            eventloop._socketPair = original
+        self._checkWaker(waker)
+
+
+class Test_WallClockOnEventLoop(unittest.TestCase):
+    """\
+    Wall clock server and client sharing a single event loop.
+    """
+
+    def setUp(self):
+        self.loop = EventLoop()
+        self.loop.start()
+        self.sysClock = SysClock(tickRate=1000000000)
+
+    def tearDown(self):
+        self.loop.stop()
+
+    def test_clientsSyncToServer(self):
+        serverClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+        serverClock.setCorrelationAndSpeed(serverClock.correlation.butWith(childTicks=serverClock.ticks + 5000000000), 1.0)
+        server = WallClockServer(serverClock, bindaddr="127.0.0.1", bindport=0, loop=self.loop)
+        server.start()
+        dest = server.socket.getsockname()
+
+        clients = []
+        for i in range(0,3):
+            wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+            client = WallClockClient(("127.0.0.1", 0), dest, wallClock, MostRecent(wallClock, repeatSecs=0.05, timeoutSecs=0.2), loop=self.loop)
+            client.start()
+            clients.append((client, wallClock))
+
+        time.sleep(0.5)
+
+        for client, wallClock in clients:
+            client.stop()
+            self.assertAlmostEquals(serverClock.ticks / 1.0e9, wallClock.ticks / 1.0e9, delta=0.01)
+        server.stop()
+        for client, _ in clients:
+            client.socket.close()
+        server.socket.close()
+
+
+class Test_PromptStop(unittest.TestCase):
+    """\
+    Threaded servers and clients stop without waiting for a timeout.
+    """
+
+    def test_serverStop(self):
+        server = WallClockServer(SysClock(tickRate=1000000000), bindaddr="127.0.0.1", bindport=0)
+        server.start()
+        t = time.time()
+        server.stop()
+        self.assertLess(time.time()-t, 0.5)
+        server.socket.close()
+
+    def test_clientStop(self):
+        wallClock = CorrelatedClock(SysClock(tickRate=1000000000), tickRate=1000000000)
+        client = WallClockClient(("127.0.0.1", 0), ("127.0.0.1", 1), wallClock, MostRecent(wallClock, timeoutSecs=10))
+        client.start()
+        time.sleep(0.05)
+        t = time.time()
+        client.stop()
+        self.assertLess(time.time()-t, 0.5)
+        client.socket.close()
+
+
+class Test_algorithmWrapperSleep(unittest.TestCase):
+
+    def test_sleepDoesNotSendRequest(self):
+        def alg():
+            result = yield Sleep(0.05)
+            self.assertEquals(None, result)
+            yield 0.1
+
+        wrapper = algorithmWrapper(("127.0.0.1", 1), SysClock(tickRate=1000000000), alg())
+        toSend, waitSecs = wrapper.next()
+        self.assertEquals(None, toSend)
+        self.assertAlmostEquals(0.05, waitSecs, delta=0.01)
+
+        time.sleep(0.06)
+        toSend, waitSecs = wrapper.send((None, None))
+        self.assertNotEquals(None, toSend)
+        self.assertEquals(WCMessage.TYPE_REQUEST, WCMessage.unpack(toSend[0]).msgtype)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,6 +18,9 @@ import unittest
 
 import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
 
+import sys
+import threading
+
 
 class Test_monotonic_time(unittest.TestCase):
 
@@ -60,5 +63,58 @@ class Test_monotonic_time(unittest.TestCase):
 
         self.assertLess(abs(5.0-diff_t), 0.05, "Sleep was correct to within 1%")
 
+
+
+class Test_monotonic_time_backends(unittest.TestCase):
+
+    def setUp(self):
+        import dvbcss.monotonic_time as m
+        self.m=m
+
+    def test_backendChosen(self):
+        """Check the backend in use is recorded, and is one of those available"""
+        m=self.m
+        self.assertTrue(m.backend in m._backends)
+        self.assertEquals((m.time, m.timeNanos, m.timeMicros), m._backends[m.backend])
+
+    def test_backendsAgree(self):
+        """Check all available backends report the same time in each unit"""
+        for name, (time, timeNanos, timeMicros) in self.m._backends.items():
+            a = self.m.timeNanos()
+            n = timeNanos()
+            u = timeMicros()
+            s = time()
+            b = self.m.timeNanos()
+            self.assertTrue(a <= n <= b, name)
+            self.assertTrue(a // 1000 <= u <= b // 1000 + 1, name)
+            self.assertAlmostEquals(s, n / 1e9, delta=0.001, msg=name)
+
+    def test_concurrentReadsNeverTear(self):
+        """Check many threads reading the time at once always see it increase, for every backend"""
+        NUM_THREADS = 8
+        NUM_READS = 20000
+
+        oldInterval = sys.getcheckinterval()
+        sys.setcheckinterval(1)   # switch threads as often as possible
+        try:
+            for name, (_, timeNanos, _) in self.m._backends.items():
+                failures = []
+                def reader():
+                    prev = timeNanos()
+                    for _ in xrange(NUM_READS):
+                        now = timeNanos()
+                        if now < prev or now - prev > 1000000000:
+                            failures.append((prev, now))
+                        prev = now
+                threads = [threading.Thread(target=reader) for _ in range(NUM_THREADS)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                self.assertEquals([], failures, "Backend "+name+" returned torn reads")
+        finally:
+            sys.setcheckinterval(oldInterval)
+
+
 if __name__ == "__main__":
     unittest.main()
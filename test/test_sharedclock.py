@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+#
+# Copyright 2015 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from dvbcss.clock import SysClock, CorrelatedClock, Correlation
+from dvbcss.sharedclock import SharedClockPublisher, SharedClock
+
+from mock_time import MockTime
+from mock_dependent import MockDependent
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
+
+class Test_SharedClock(unittest.TestCase):
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.readerSysClock = SysClock(tickRate=1000000)
+        self.mockTime.disableAutoIncrement()
+        self.mockTime.timeNow = 5020.8
+
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "wallclock")
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000, correlation=Correlation(5020000000000, 1000.0, 0.01, 0.0001))
+        self.publisher = SharedClockPublisher(self.wallClock, self.path)
+
+    def tearDown(self):
+        self.publisher.close()
+        self.mockTime.uninstall()
+        shutil.rmtree(self.dir)
+
+    def test_readsPublishedClock(self):
+        shared = SharedClock(self.sysClock, self.path)
+        self.assertEquals(self.wallClock.correlation, shared.correlation)
+        self.assertEquals(self.wallClock.tickRate, shared.tickRate)
+        self.assertEquals(self.wallClock.speed, shared.speed)
+        self.assertAlmostEquals(self.wallClock.ticks, shared.ticks, delta=1)
+        self.assertAlmostEquals(self.wallClock.dispersionAtTime(self.wallClock.ticks), shared.dispersionAtTime(shared.ticks), places=9)
+
+    def test_differentParentTickRate(self):
+        shared = SharedClock(self.readerSysClock, self.path)
+        self.assertAlmostEquals(self.wallClock.ticks, shared.ticks, delta=1)
+        self.mockTime.timeNow += 2.5
+        self.assertAlmostEquals(self.wallClock.ticks, shared.ticks, delta=1)
+
+    def test_followsChanges(self):
+        shared = SharedClock(self.sysClock, self.path)
+        dep = MockDependent()
+        shared.bind(dep)
+
+        self.assertFalse(shared.poll())
+        dep.assertNotNotified()
+
+        self.wallClock.setCorrelationAndSpeed(Correlation(5020800000000, 0.0), 2.0)
+        self.assertTrue(shared.poll())
+        dep.assertNotificationsEqual([shared])
+        self.assertEquals(2.0, shared.speed)
+        self.assertAlmostEquals(self.wallClock.ticks, shared.ticks, delta=1)
+
+        self.wallClock.setAvailability(False)
+        self.assertFalse(shared.isAvailable())
+        dep.assertNotificationsEqual([shared])
+
+    def test_readOnly(self):
+        shared = SharedClock(self.sysClock, self.path)
+        self.assertRaises(NotImplementedError, setattr, shared, "speed", 2.0)
+        self.assertRaises(NotImplementedError, setattr, shared, "tickRate", 1000)
+        self.assertRaises(NotImplementedError, setattr, shared, "correlation", Correlation(0,0))
+        self.assertRaises(NotImplementedError, shared.setCorrelationAndSpeed, Correlation(0,0), 1.0)
+        self.assertRaises(NotImplementedError, shared.setAvailability, False)
+
+    def test_close(self):
+        shared = SharedClock(self.sysClock, self.path)
+        shared.close()
+        self.wallClock.speed = 0.5
+        self.assertFalse(shared.poll())
+        self.assertEquals(1.0, shared.speed)
+
+    def test_notPublished(self):
+        path = os.path.join(self.dir, "other")
+        with open(path, "wb") as f:
+            f.write("x" * 200)
+        self.assertRaises(ValueError, SharedClock, self.sysClock, path)
+
+    def test_publishedClockMustBeChildOfRoot(self):
+        grandChild = CorrelatedClock(self.wallClock, tickRate=1000)
+        self.assertRaises(ValueError, SharedClockPublisher, grandChild, os.path.join(self.dir, "other"))
+
+
+class Test_SharedClockBetweenProcesses(unittest.TestCase):
+
+    def test_otherProcessReads(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "wallclock")
+            sysClock = SysClock(tickRate=1000000000)
+            wallClock = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(sysClock.ticks, 123456789000.0))
+            publisher = SharedClockPublisher(wallClock, path)
+
+            code = "\n".join([
+                "from dvbcss.clock import SysClock",
+                "from dvbcss.sharedclock import SharedClock",
+                "c = SharedClock(SysClock(tickRate=1000000000), %s)" % repr(path),
+                "print c.ticks",
+            ])
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+            before = wallClock.ticks
+            output = subprocess.check_output([sys.executable, "-c", code], env=env)
+            after = wallClock.ticks
+            self.assertTrue(before <= float(output) <= after)
+            publisher.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,7 @@ from dvbcss.protocol.ts import Timestamp
 from dvbcss.protocol.transformers import OMIT
 
 import json
+import pickle
 
 class Test_SetupData(unittest.TestCase):
 
@@ -138,6 +139,13 @@ class Test_ControlTimestamp(unittest.TestCase):
         self.assertEquals(c.timestamp.contentTime, None)
         self.assertEquals(c.timestamp.wallClockTime, 9238756389456238756498237645289)
         self.assertEquals(c.timelineSpeedMultiplier, None)
+
+    def test_pickle(self):
+        c=ControlTimestamp(Timestamp(12345678901234567890, 1234567890123590002), -1.005)
+        c2=pickle.loads(pickle.dumps(c))
+        self.assertEquals(c.pack(), c2.pack())
+        self.assertFalse(hasattr(c, "__dict__"))
+        self.assertFalse(hasattr(c.timestamp, "__dict__"))
         
 
 
@@ -18,7 +18,40 @@ import unittest
 
 import _useDvbCssUninstalled  # Enable to run when dvbcss not yet installed ... @UnusedImport
 
+import socket
+import pickle
+import random
+
 from dvbcss.protocol.wc import WCMessage as WCMessage
+from dvbcss.protocol.wc import Candidate
+from dvbcss.protocol.server.wc import WallClockServer
+from dvbcss.protocol.server.wc import WallClockServerHandler
+from dvbcss.protocol.server.wc import WallClockServerPool
+from dvbcss.protocol import _mmsg
+from dvbcss.clock import SysClock
+from dvbcss.clock import CorrelatedClock
+from dvbcss.clock import Correlation
+
+from dvbcss.protocol.client.wc import MultiServerWallClockClient, UdpRequestResponseClient
+from dvbcss.protocol.client.wc.algorithm import algorithmWrapper, multiServerAlgorithmWrapper
+from dvbcss.protocol.client.wc.algorithm import LowestDispersionServer, LowestDispersionCandidate, Sleep, Burst
+from dvbcss.protocol.client.wc.algorithm import KalmanFilterAdaptivePoll
+from dvbcss.protocol.client.wc.algorithm import FilterAndPredict, FilterRttThreshold, PredictSimple, PredictLinearRegression
+from dvbcss.protocol.client.wc.algorithm import FilterRttPercentile, FilterOffsetMedian
+from dvbcss.protocol.client.wc.algorithm._filterpredict import _P2Quantile
+import dvbcss.monotonic_time as monotonic_time
+
+from mock_time import MockTime
+from temp_calibration import TempCalibrationFile
+
+_calibrationFile = TempCalibrationFile()
+
+def setUpModule():
+    _calibrationFile.install()
+
+def tearDownModule():
+    _calibrationFile.uninstall()
+
 
 class Test(unittest.TestCase):
 
@@ -63,6 +96,23 @@ class Test(unittest.TestCase):
         self.assertEquals(m.receiveNanos, 2000)
         self.assertEquals(m.transmitNanos, 3000)
 
+    def test_slots(self):
+        m=WCMessage(WCMessage.TYPE_RESPONSE, 5, 7680, 1000, 2000, 3000)
+        self.assertFalse(hasattr(m, "__dict__"))
+        self.assertRaises(AttributeError, setattr, m, "notAField", 1)
+        m.precision = -10
+        self.assertEqual(-10, m.precision)
+
+    def test_pickle(self):
+        m=WCMessage(WCMessage.TYPE_RESPONSE, 5, 12160, 1000, 2000, 3000, (0xaabbccdd, 0xeeff1122))
+        m2=pickle.loads(pickle.dumps(m))
+        self.assertEqual(m.pack(), m2.pack())
+
+        c=Candidate(m, 4000)
+        c2=pickle.loads(pickle.dumps(c))
+        self.assertEqual((c.t1, c.t2, c.t3, c.t4, c.rtt, c.offset), (c2.t1, c2.t2, c2.t3, c2.t4, c2.rtt, c2.offset))
+        self.assertFalse(hasattr(c, "__dict__"))
+
     def test_encodePrecision(self):
         self.assertEquals(WCMessage.encodePrecision(2**-128), -128)
         self.assertEquals(WCMessage.encodePrecision(0.00001), -16 )
@@ -93,6 +143,1214 @@ class Test(unittest.TestCase):
         self.assertEquals(WCMessage.decodeMaxFreqError(25600000), 100000    )
         self.assertEquals(WCMessage.decodeMaxFreqError(0),        0         )
 
+
+class FakeSocket(object):
+    """\
+    Records datagrams sent using sendto()
+    """
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, dest):
+        self.sent.append((str(data), dest))
+
+
+class Test_WallClockServerHandler(unittest.TestCase):
+    """\
+    Tests of the responses constructed by the wall clock server handler.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.clock = CorrelatedClock(self.sysClock, tickRate=1000000000, correlation=Correlation(self.sysClock.ticks, 1234567890, initialError=0.001, errorGrowthRate=0.0001))
+        self.socket = FakeSocket()
+        self.src = ("1.2.3.4", 5678)
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def expectedReply(self, request, msgtype, precisionSecs, maxFreqErrorPpm):
+        """\
+        Builds the expected reply using WCMessage
+        """
+        nanos = self.clock.ticks * 1000000000 / self.clock.tickRate
+        reply = request.copy()
+        reply.msgtype = msgtype
+        reply.receiveNanos = nanos
+        reply.transmitNanos = nanos
+        reply.setPrecision(precisionSecs)
+        reply.setMaxFreqError(maxFreqErrorPpm)
+        return reply.pack()
+
+    def test_responseMatchesWCMessage(self):
+        handler = WallClockServerHandler(self.clock, precisionSecs=0.0005, maxFreqErrorPpm=75)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 0, 0, 0, originalOriginate=(0x12345678, 0x9abcdef0))
+        handler.handle(self.socket, request.pack(), self.src)
+
+        self.assertEquals(1, len(self.socket.sent))
+        data, dest = self.socket.sent[0]
+        self.assertEquals(self.src, dest)
+        self.assertEquals(self.expectedReply(request, WCMessage.TYPE_RESPONSE, 0.0005, 75), data)
+
+    def test_followupMatchesWCMessage(self):
+        handler = WallClockServerHandler(self.clock, precisionSecs=0.0005, maxFreqErrorPpm=75, followup=True)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 9876543210, 0, 0)
+        handler.handle(self.socket, request.pack(), self.src)
+
+        self.assertEquals(2, len(self.socket.sent))
+        self.assertEquals(self.expectedReply(request, WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP, 0.0005, 75), self.socket.sent[0][0])
+        self.assertEquals(self.expectedReply(request, WCMessage.TYPE_FOLLOWUP, 0.0005, 75), self.socket.sent[1][0])
+
+    def test_batchMatchesWCMessage(self):
+        handler = WallClockServerHandler(self.clock, precisionSecs=0.0005, maxFreqErrorPpm=75)
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        client.bind(("127.0.0.1", 0))
+        client.settimeout(2.0)
+        try:
+            requests = [ WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 1000+i, 0, 0) for i in range(0,3) ]
+            handler.handleBatch(server, [ (r.pack(), client.getsockname()) for r in requests ])
+            for r in requests:
+                data, _ = client.recvfrom(WCMessage.MSG_SIZE)
+                self.assertEquals(self.expectedReply(r, WCMessage.TYPE_RESPONSE, 0.0005, 75), data)
+        finally:
+            server.close()
+            client.close()
+
+    def test_nonRequestRejected(self):
+        handler = WallClockServerHandler(self.clock)
+        response = WCMessage(WCMessage.TYPE_RESPONSE, 0, 0, 0, 0, 0)
+        self.assertRaises(ValueError, handler.handle, self.socket, response.pack(), self.src)
+        self.assertRaises(ValueError, handler.handle, self.socket, "\x00\x00", self.src)
+        self.assertEquals([], self.socket.sent)
+
+    def test_precisionFromClock(self):
+        handler = WallClockServerHandler(self.clock)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 0, 0, 0)
+        handler.handle(self.socket, request.pack(), self.src)
+        reply = WCMessage.unpack(self.socket.sent[0][0])
+        self.assertGreaterEqual(reply.getPrecision(), self.clock.dispersionAtTime(self.clock.ticks))
+        self.assertEquals(WCMessage.encodeMaxFreqError(self.clock.getRootMaxFreqError()), reply.maxFreqError)
+
+    def test_precisionCacheInvalidatedWhenClockChanges(self):
+        handler = WallClockServerHandler(self.clock)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 0, 0, 0)
+        handler.handle(self.socket, request.pack(), self.src)
+        before = WCMessage.unpack(self.socket.sent[0][0]).getPrecision()
+
+        self.clock.correlation = self.clock.correlation.butWith(initialError=0.5)
+        handler.handle(self.socket, request.pack(), self.src)
+        after = WCMessage.unpack(self.socket.sent[1][0]).getPrecision()
+
+        self.assertLess(before, 0.5)
+        self.assertGreaterEqual(after, 0.5)
+
+    def test_precisionCacheExpires(self):
+        handler = WallClockServerHandler(self.clock)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 0, 0, 0)
+        handler.handle(self.socket, request.pack(), self.src)
+        before = WCMessage.unpack(self.socket.sent[0][0]).getPrecision()
+
+        self.mockTime.timeNow += 10000
+        handler.handle(self.socket, request.pack(), self.src)
+        after = WCMessage.unpack(self.socket.sent[1][0]).getPrecision()
+
+        self.assertGreaterEqual(after, self.clock.dispersionAtTime(self.clock.ticks))
+        self.assertGreater(after, before)
+
+    def test_cachedPrecisionNotLessThanDispersionAtReceiveTime(self):
+        self.clock.correlation = Correlation(self.sysClock.ticks, 1234567890, initialError=0, errorGrowthRate=0.01)
+        handler = WallClockServerHandler(self.clock)
+        request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 0, 0, 0)
+        for i in range(0, 10):
+            handler.handle(self.socket, request.pack(), self.src)
+            reply = WCMessage.unpack(self.socket.sent[-1][0])
+            self.assertGreaterEqual(reply.getPrecision(), self.clock.dispersionAtTime(self.clock.ticks))
+            self.mockTime.timeNow += handler.precisionCacheSecs / 4
+
+    def test_closeUnbindsFromClock(self):
+        handler = WallClockServerHandler(self.clock)
+        self.assertIn(handler, self.clock.dependents)
+        handler.close()
+        self.assertNotIn(handler, self.clock.dependents)
+        handler.close()
+
+
+class Test_WallClockServerBatched(unittest.TestCase):
+    """\
+    Tests of the wall clock server when receiving and replying in batches.
+    """
+
+    def setUp(self):
+        self.clock = SysClock(tickRate=1000000000)
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.bind(("127.0.0.1", 0))
+        self.client.settimeout(2.0)
+
+    def tearDown(self):
+        self.client.close()
+
+    def startServer(self, **kwargs):
+        server = WallClockServer(self.clock, precision=0.001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0, **kwargs)
+        server.start()
+        return server, server.socket.getsockname()
+
+    def test_batchedRepliesToAllRequests(self):
+        server, dest = self.startServer(batchSize=16)
+        try:
+            originates = [ 1000000000 + i for i in range(0, 10) ]
+            for o in originates:
+                self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, o, 0, 0).pack(), dest)
+            replies = [ WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0]) for o in originates ]
+        finally:
+            server.stop()
+            server.socket.close()
+
+        self.assertEquals(sorted([r.originateNanos for r in replies]), originates)
+        for r in replies:
+            self.assertEquals(r.msgtype, WCMessage.TYPE_RESPONSE)
+            self.assertEquals(r.precision, WCMessage.encodePrecision(0.001))
+            self.assertEquals(r.maxFreqError, WCMessage.encodeMaxFreqError(50))
+            self.assertTrue(0 < r.receiveNanos <= r.transmitNanos)
+
+    def test_batchedIgnoresNonRequests(self):
+        server, dest = self.startServer(batchSize=16)
+        try:
+            self.client.sendto(WCMessage(WCMessage.TYPE_RESPONSE, 0, 0, 5, 0, 0).pack(), dest)
+            self.client.sendto("rubbish", dest)
+            self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 7, 0, 0).pack(), dest)
+            reply = WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0])
+        finally:
+            server.stop()
+            server.socket.close()
+        self.assertEquals(reply.originateNanos, 7)
+
+    def test_batchedFollowup(self):
+        server, dest = self.startServer(batchSize=16, followup=True)
+        try:
+            self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 7, 0, 0).pack(), dest)
+            reply = WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0])
+            followup = WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0])
+        finally:
+            server.stop()
+            server.socket.close()
+        self.assertEquals(reply.msgtype, WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP)
+        self.assertEquals(followup.msgtype, WCMessage.TYPE_FOLLOWUP)
+        self.assertEquals(reply.receiveNanos, followup.receiveNanos)
+        self.assertTrue(reply.transmitNanos <= followup.transmitNanos)
+
+    def test_stopUnbindsFromClock(self):
+        server, dest = self.startServer()
+        try:
+            self.assertIn(server.handler, self.clock.dependents)
+        finally:
+            server.stop()
+        self.assertNotIn(server.handler, self.clock.dependents)
+        server.start()
+        try:
+            self.assertIn(server.handler, self.clock.dependents)
+        finally:
+            server.stop()
+            server.socket.close()
+
+
+class Test_WallClockServerPool(unittest.TestCase):
+    """\
+    Tests of the multi-process wall clock server.
+    """
+
+    def setUp(self):
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.bind(("127.0.0.1", 0))
+        self.client.settimeout(2.0)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_poolReplies(self):
+        pool = WallClockServerPool(2, precision=0.001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0)
+        pool.start()
+        try:
+            self.assertNotEquals(0, pool.bindport)
+            for i in range(0,10):
+                request = WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 1000+i, 0, 0)
+                self.client.sendto(request.pack(), ("127.0.0.1", pool.bindport))
+                reply = WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0])
+                self.assertEquals(WCMessage.TYPE_RESPONSE, reply.msgtype)
+                self.assertEquals(1000+i, reply.originateNanos)
+                self.assertEquals(WCMessage.encodeMaxFreqError(50), reply.maxFreqError)
+        finally:
+            pool.stop()
+
+    def test_invalidNumWorkers(self):
+        self.assertRaises(ValueError, WallClockServerPool, 0)
+
+
+class Test_KernelTimestamps(unittest.TestCase):
+    """\
+    Tests of the use of kernel receive timestamps by the wall clock server and client.
+    """
+
+    def setUp(self):
+        self.clock = SysClock(tickRate=1000000000)
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.bind(("127.0.0.1", 0))
+        self.client.settimeout(2.0)
+
+    def tearDown(self):
+        self.client.close()
+
+    @unittest.skipUnless(_mmsg.available, "Kernel timestamps not supported on this platform")
+    def test_receiverTimestamps(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            server.bind(("127.0.0.1", 0))
+            _mmsg.enableTimestamps(server)
+            receiver = _mmsg.BatchReceiver(WCMessage.MSG_SIZE, 8, timestamps=True)
+            monotonic_time.sleep(0.05)    # let the kernel finish enabling timestamps
+            before = monotonic_time.timeNanos()
+            self.client.sendto("hello", server.getsockname())
+            monotonic_time.sleep(0.05)
+            after = monotonic_time.timeNanos()
+            received = receiver.recv(server)
+            self.assertEquals(1, len(received))
+            data, src, rxNanos = received[0]
+            self.assertEquals("hello", data)
+            self.assertEquals(self.client.getsockname(), src)
+            self.assertGreater(rxNanos, before - 1000000)
+            self.assertLess(rxNanos, after - 40000000)
+        finally:
+            server.close()
+
+    @unittest.skipUnless(_mmsg.available, "Kernel timestamps not supported on this platform")
+    def test_serverUsesKernelTimestamp(self):
+        server = WallClockServer(self.clock, precision=0.001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0, kernelTimestamps=True)
+        monotonic_time.sleep(0.05)    # let the kernel finish enabling timestamps
+        # send the request before the server starts, so it is received by the kernel well before the server reads it
+        t1 = self.clock.nanos
+        self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, t1, 0, 0).pack(), server.socket.getsockname())
+        monotonic_time.sleep(0.1)
+        server.start()
+        try:
+            reply = WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0])
+        finally:
+            server.stop()
+            server.socket.close()
+        self.assertEquals(t1, reply.originateNanos)
+        self.assertLess(reply.receiveNanos - t1, 50000000)
+        self.assertGreater(reply.transmitNanos - reply.receiveNanos, 90000000)
+
+    @unittest.skipUnless(_mmsg.available, "Kernel timestamps not supported on this platform")
+    def test_batchedServerUsesKernelTimestampOfEachRequest(self):
+        server = WallClockServer(self.clock, precision=0.001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0, batchSize=16)
+        self.assertTrue(server.timestamps)
+        monotonic_time.sleep(0.05)    # let the kernel finish enabling timestamps
+        # both requests are waiting when the server starts, so are received in the same batch
+        self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 1, 0, 0).pack(), server.socket.getsockname())
+        monotonic_time.sleep(0.1)
+        self.client.sendto(WCMessage(WCMessage.TYPE_REQUEST, 0, 0, 2, 0, 0).pack(), server.socket.getsockname())
+        monotonic_time.sleep(0.05)
+        server.start()
+        try:
+            replies = [ WCMessage.unpack(self.client.recvfrom(WCMessage.MSG_SIZE)[0]) for i in range(0,2) ]
+        finally:
+            server.stop()
+            server.socket.close()
+        replies.sort(key=lambda r : r.originateNanos)
+        self.assertEquals(replies[0].transmitNanos, replies[1].transmitNanos)
+        self.assertGreater(replies[1].receiveNanos - replies[0].receiveNanos, 90000000)
+
+    def test_batchedServerWithoutSysClockRootDoesNotUseKernelTimestamps(self):
+        class NotSysClock(CorrelatedClock):
+            def getRoot(self):
+                return self
+        clock = NotSysClock(self.clock, tickRate=1000000000)
+        server = WallClockServer(clock, bindaddr="127.0.0.1", bindport=0, batchSize=16)
+        server.socket.close()
+        self.assertFalse(server.timestamps)
+
+    def test_serverRequiresSysClockRoot(self):
+        class NotSysClock(CorrelatedClock):
+            def getRoot(self):
+                return self
+        clock = NotSysClock(self.clock, tickRate=1000000000)
+        self.assertRaises(ValueError, WallClockServer, clock, bindaddr="127.0.0.1", bindport=0, kernelTimestamps=True)
+
+    def test_algorithmWrapperUsesKernelTimestamp(self):
+        dest = ("127.0.0.1", 6677)
+        def alg():
+            self.candidate = yield 1.0
+
+        wrapper = algorithmWrapper(dest, self.clock, alg())
+        (request, _), _ = wrapper.next()
+        response = WCMessage.unpack(request)
+        response.msgtype = WCMessage.TYPE_RESPONSE
+        rxNanos = monotonic_time.timeNanos() - 5000000
+        try:
+            wrapper.send((response.pack(), dest, rxNanos))
+        except StopIteration:
+            pass
+        self.assertAlmostEquals(rxNanos, self.candidate.t4, delta=1000)
+
+
+def respondTo(request, msgtype=WCMessage.TYPE_RESPONSE, offsetNanos=0, precision=0.0001, maxFreqError=50):
+    """\
+    :returns: packed response to a packed request, as if from a server whose clock is ahead by offsetNanos
+    """
+    response = WCMessage.unpack(request)
+    response.msgtype = msgtype
+    response.receiveNanos = response.originateNanos + offsetNanos
+    response.transmitNanos = response.originateNanos + offsetNanos
+    response.setPrecision(precision)
+    response.setMaxFreqError(maxFreqError)
+    return response.pack()
+
+
+class Test_multiServerAlgorithmWrapper(unittest.TestCase):
+    """\
+    Tests of the request-response handler that sends requests to several servers.
+    """
+
+    def setUp(self):
+        self.clock = SysClock(tickRate=1000000000)
+        self.servers = [ ("10.0.0.1", 6677), ("10.0.0.2", 6677) ]
+        self.results = []
+
+    def alg(self):
+        while True:
+            self.results.append((yield 1.0))
+
+    def test_requestsSentToAllServers(self):
+        wrapper = multiServerAlgorithmWrapper(self.servers, self.clock, self.alg())
+        (reqA, destA), waitA = wrapper.next()
+        (reqB, destB), waitB = wrapper.send((None, None))
+        self.assertEquals(self.servers, [destA, destB])
+        self.assertEquals(0, waitA)
+        self.assertEquals(0, waitB)
+        self.assertEquals(WCMessage.TYPE_REQUEST, WCMessage.unpack(reqA).msgtype)
+        self.assertNotEquals(WCMessage.unpack(reqA).originateNanos, WCMessage.unpack(reqB).originateNanos)
+
+        # then waits for responses
+        toSend, wait = wrapper.send((None, None))
+        self.assertEquals(None, toSend)
+        self.assertTrue(0 < wait <= 1.0)
+
+        # responses can arrive in any order. Once all are in, the algorithm is given them
+        wrapper.send((respondTo(reqB, offsetNanos=2000), destB))
+        self.assertEquals([], self.results)
+        (req2, dest2), _ = wrapper.send((respondTo(reqA, offsetNanos=1000), destA))
+        self.assertEquals(1, len(self.results))
+        candidates = self.results[0]
+        self.assertEquals(set(self.servers), set(candidates.keys()))
+        self.assertEquals(WCMessage.unpack(reqA).originateNanos + 1000, candidates[destA].t2)
+        self.assertEquals(WCMessage.unpack(reqB).originateNanos + 2000, candidates[destB].t2)
+
+        # and the next round of requests starts
+        self.assertEquals(destA, dest2)
+
+    def test_responseArrivingWhileSending(self):
+        wrapper = multiServerAlgorithmWrapper(self.servers, self.clock, self.alg())
+        (reqA, destA), _ = wrapper.next()
+        (reqB, destB), _ = wrapper.send((respondTo(reqA), destA))
+        wrapper.send((respondTo(reqB), destB))
+        self.assertEquals(1, len(self.results))
+        self.assertNotEquals(None, self.results[0][destA])
+        self.assertNotEquals(None, self.results[0][destB])
+
+    def test_timeoutForOneServer(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        try:
+            self.mockTime.timeNow = 1000.0
+            wrapper = multiServerAlgorithmWrapper(self.servers, self.clock, self.alg())
+            (reqA, destA), _ = wrapper.next()
+            (reqB, destB), _ = wrapper.send((None, None))
+            wrapper.send((None, None))
+            wrapper.send((respondTo(reqA), destA))
+            self.assertEquals([], self.results)
+            self.mockTime.timeNow += 1.0
+            wrapper.send((None, None))
+            self.assertEquals(1, len(self.results))
+            self.assertNotEquals(None, self.results[0][destA])
+            self.assertEquals(None, self.results[0][destB])
+        finally:
+            self.mockTime.uninstall()
+
+    def test_ignoresOtherSourcesAndWaitsForFollowup(self):
+        wrapper = multiServerAlgorithmWrapper(self.servers[:1], self.clock, self.alg())
+        (reqA, destA), _ = wrapper.next()
+        wrapper.send((None, None))
+        wrapper.send((respondTo(reqA), ("10.0.0.3", 6677)))
+        wrapper.send((respondTo(reqA, msgtype=WCMessage.TYPE_RESPONSE_WITH_FOLLOWUP), destA))
+        self.assertEquals([], self.results)
+        wrapper.send((respondTo(reqA, msgtype=WCMessage.TYPE_FOLLOWUP), destA))
+        self.assertEquals(1, len(self.results))
+        self.assertEquals([destA], self.results[0].keys())
+
+
+class Test_BurstRequests(unittest.TestCase):
+    """\
+    Tests of sending a burst of pipelined requests using the request-response handler.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 1000.0
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.clock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.dest = ("10.0.0.1", 6677)
+        self.results = []
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def alg(self, burst):
+        self.results.append((yield burst))
+        yield Sleep(1.0)
+
+    def test_requestsPipelined(self):
+        wrapper = algorithmWrapper(self.dest, self.clock, self.alg(Burst(3, 0.01, 0.5)))
+        (req1, dest), wait = wrapper.next()
+        self.assertEquals(self.dest, dest)
+        self.assertAlmostEquals(0.01, wait, delta=0.0001)
+
+        # waits for the interval before sending the next, without needing a response
+        toSend, wait = wrapper.send((None, None))
+        self.assertEquals(None, toSend)
+        self.mockTime.timeNow += 0.01
+        (req2, _), _ = wrapper.send((None, None))
+        self.mockTime.timeNow += 0.01
+        (req3, _), wait = wrapper.send((respondTo(req1, offsetNanos=1), self.dest))
+        self.assertAlmostEquals(0.5, wait, delta=0.0001)
+        self.assertEquals(3, len(set(WCMessage.unpack(r).originateNanos for r in (req1, req2, req3))))
+
+        # responses matched by originate timestamp, in any order
+        wrapper.send((respondTo(req3, offsetNanos=3), self.dest))
+        self.assertEquals([], self.results)
+        wrapper.send((respondTo(req2, offsetNanos=2), self.dest))
+        self.assertEquals(1, len(self.results))
+        candidates = self.results[0]
+        self.assertEquals([1, 2, 3], [c.t2 - c.t1 for c in candidates])
+
+    def test_missingResponsesAfterTimeout(self):
+        wrapper = algorithmWrapper(self.dest, self.clock, self.alg(Burst(2, 0.0, 0.5)))
+        (req1, _), _ = wrapper.next()
+        (req2, _), _ = wrapper.send((None, None))
+        wrapper.send((respondTo(req2), self.dest))
+        wrapper.send((respondTo(req2), ("10.0.0.2", 6677)))
+        self.assertEquals([], self.results)
+        self.mockTime.timeNow += 0.5
+        wrapper.send((None, None))
+        self.assertEquals(1, len(self.results))
+        self.assertEquals([WCMessage.unpack(req2).originateNanos], [c.t1 for c in self.results[0]])
+
+    def test_burstToSeveralServers(self):
+        A, B = self.dest, ("10.0.0.2", 6677)
+        wrapper = multiServerAlgorithmWrapper([A, B], self.clock, self.alg(Burst(2, 0.01, 0.5)))
+
+        # each round sends a request to each server
+        (reqA1, dest), wait = wrapper.next()
+        self.assertEquals((A, 0), (dest, wait))
+        (reqB1, dest), wait = wrapper.send((None, None))
+        self.assertEquals(B, dest)
+        self.assertAlmostEquals(0.01, wait, delta=0.0001)
+        toSend, wait = wrapper.send((None, None))
+        self.assertEquals(None, toSend)
+        self.assertAlmostEquals(0.01, wait, delta=0.0001)
+
+        self.mockTime.timeNow += 0.01
+        (reqA2, dest), _ = wrapper.send((respondTo(reqA1, offsetNanos=1), A))
+        self.assertEquals(A, dest)
+        (reqB2, dest), _ = wrapper.send((None, None))
+        self.assertEquals(B, dest)
+        toSend, wait = wrapper.send((None, None))
+        self.assertEquals(None, toSend)
+        self.assertAlmostEquals(0.5, wait, delta=0.0001)
+        self.assertEquals(4, len(set(WCMessage.unpack(r).originateNanos for r in (reqA1, reqB1, reqA2, reqB2))))
+
+        # responses matched by server and originate timestamp
+        wrapper.send((respondTo(reqA2, offsetNanos=99), B))
+        wrapper.send((respondTo(reqB2, offsetNanos=4), B))
+        wrapper.send((respondTo(reqA2, offsetNanos=3), A))
+        self.assertEquals([], self.results)
+        self.mockTime.timeNow += 0.5
+        wrapper.send((None, None))
+        self.assertEquals(1, len(self.results))
+        candidates = self.results[0]
+        self.assertEquals([1, 3], [c.t2 - c.t1 for c in candidates[A]])
+        self.assertEquals([4], [c.t2 - c.t1 for c in candidates[B]])
+
+    def test_invalidBurst(self):
+        self.assertRaises(ValueError, Burst, 0, 0.01, 0.2)
+
+
+class Test_LowestDispersionCandidateBursts(unittest.TestCase):
+    """\
+    Tests of the dispersion algorithm sending bursts until the target dispersion is reached.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def candidate(self, rttNanos):
+        t1 = self.sysClock.ticks - rttNanos
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t1 + rttNanos/2, t1 + rttNanos/2)
+        return Candidate(msg, self.sysClock.ticks)
+
+    def test_noBurstsByDefault(self):
+        gen = LowestDispersionCandidate(self.wallClock).algorithm()
+        self.assertEquals(0.2, gen.next())
+
+    def test_burstsUntilTargetReached(self):
+        alg = LowestDispersionCandidate(self.wallClock, repeatSecs=2.0, timeoutSecs=0.3, burstSize=4, burstIntervalSecs=0.005, targetDispersionSecs=0.002)
+        gen = alg.algorithm()
+        burst = gen.next()
+        self.assertTrue(isinstance(burst, Burst))
+        self.assertEquals((4, 0.005, 0.3), (burst.count, burst.intervalSecs, burst.timeoutSecs))
+
+        # not yet good enough, so another burst straight away
+        burst = gen.send([self.candidate(20000000), self.candidate(10000000)])
+        self.assertTrue(isinstance(burst, Burst))
+        self.assertAlmostEquals(0.005, alg.getCurrentDispersion() / 1e9, delta=0.0001)
+
+        # no responses at all, so wait before trying again
+        sleep = gen.send([])
+        self.assertEquals(0.3, sleep.secs)
+        self.assertTrue(isinstance(gen.next(), Burst))
+
+        # target reached, so back off to the steady rate with single requests
+        sleep = gen.send([self.candidate(8000000), self.candidate(1000000), self.candidate(3000000)])
+        self.assertEquals(2.0, sleep.secs)
+        self.assertLess(alg.getCurrentDispersion(), 2000000)
+        self.assertEquals(0.3, gen.next())
+
+    def test_unreachableTargetFallsBackToNormalRate(self):
+        # half the round-trip time is more than the target, so it can never be reached
+        alg = LowestDispersionCandidate(self.wallClock, repeatSecs=2.0, timeoutSecs=0.3, burstSize=4, burstIntervalSecs=0.005, targetDispersionSecs=0.001, maxAcquireBursts=3)
+        gen = alg.algorithm()
+        bursts = 0
+        action = gen.next()
+        while isinstance(action, Burst):
+            bursts += 1
+            self.assertLessEqual(bursts, 3)
+            self.mockTime.timeNow += 0.02
+            action = gen.send([ self.candidate(10000000) for i in range(0, 4) ])
+        self.assertEquals(3, bursts)
+        self.assertEquals(2.0, action.secs)
+
+        # then single requests at the normal rate
+        for i in range(0, 5):
+            self.mockTime.timeNow += action.secs
+            self.assertEquals(0.3, gen.next())
+            self.mockTime.timeNow += 0.02
+            action = gen.send(self.candidate(10000000))
+            self.assertEquals(2.0, action.secs)
+        self.assertGreater(alg.getCurrentDispersion(), 1000000)
+
+    def test_burstWithoutImprovementStopsBursts(self):
+        alg = LowestDispersionCandidate(self.wallClock, repeatSecs=2.0, timeoutSecs=0.3, burstSize=4, burstIntervalSecs=0.005, targetDispersionSecs=0.001)
+        gen = alg.algorithm()
+        gen.next()
+        self.assertTrue(isinstance(gen.send([self.candidate(10000000)]), Burst))
+        sleep = gen.send([self.candidate(30000000)])
+        self.assertEquals(2.0, sleep.secs)
+        self.assertEquals(0.3, gen.next())
+
+
+class Test_PredictLinearRegression(unittest.TestCase):
+    """\
+    Tests of the predictor that compensates for the frequency difference between the clocks.
+    """
+
+    DRIFT = 0.00004     # server clock runs 40ppm fast
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+        self.start = self.sysClock.ticks
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def serverNanos(self, localNanos):
+        return 123456789000 + int((localNanos - self.start) * (1 + self.DRIFT))
+
+    def candidate(self, secs, rttNanos=1000000):
+        t1 = self.start + int(secs * 1000000000)
+        t2 = self.serverNanos(t1 + rttNanos/2)
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+        return Candidate(msg, t1 + rttNanos)
+
+    def test_invalidWindowSize(self):
+        self.assertRaises(ValueError, PredictLinearRegression, self.wallClock, windowSize=1)
+
+    def test_sameAsSimpleWithOneCandidate(self):
+        predictor = PredictLinearRegression(self.wallClock)
+        c = self.candidate(0)
+        predictor.addCandidate(c)
+        self.assertEquals(c.calcCorrelationFor(self.wallClock), predictor.predictCorrelation())
+        self.assertEquals(1.0, predictor.predictSpeed())
+
+    def test_compensatesForDrift(self):
+        predictor = PredictLinearRegression(self.wallClock, windowSize=16)
+        for i in range(0, 16):
+            c = self.candidate(i)
+            predictor.addCandidate(c)
+        self.assertAlmostEquals(1 + self.DRIFT, predictor.predictSpeed(), delta=0.000001)
+
+        # reports a lower rate of growth of dispersion than the maximum frequency errors of the clocks
+        growthRate = predictor.predictCorrelation().errorGrowthRate
+        self.assertLess(growthRate, c.calcCorrelationFor(self.wallClock).errorGrowthRate / 2)
+
+        # the clock keeps tracking the server long after the last candidate, within its dispersion
+        self.wallClock.setCorrelationAndSpeed(predictor.predictCorrelation(), predictor.predictSpeed())
+        self.mockTime.timeNow += 100
+        error = abs(self.wallClock.ticks - self.serverNanos(self.sysClock.ticks)) / 1000000000.0
+        self.assertLess(error, 0.0002)
+        self.assertLess(error, self.wallClock.dispersionAtTime(self.wallClock.ticks))
+
+        # whereas the simple predictor has drifted further away
+        simple = PredictSimple(self.wallClock)
+        simple.addCandidate(c)
+        self.wallClock.setCorrelationAndSpeed(simple.predictCorrelation(), 1.0)
+        simpleError = abs(self.wallClock.ticks - self.serverNanos(self.sysClock.ticks)) / 1000000000.0
+        self.assertGreater(simpleError, 0.002)
+
+    def test_windowSlides(self):
+        random.seed(1)
+        candidates = [ self.candidate(i, rttNanos=random.randint(500000, 5000000)) for i in range(0, 40) ]
+
+        predictor = PredictLinearRegression(self.wallClock, windowSize=16)
+        for c in candidates:
+            predictor.addCandidate(c)
+        self.assertEquals(16, len(predictor._window))
+
+        # same result as fitting the last 16 candidates from scratch
+        fresh = PredictLinearRegression(self.wallClock, windowSize=16)
+        for c in candidates[-16:]:
+            fresh.addCandidate(c)
+        self.assertAlmostEquals(fresh.predictSpeed(), predictor.predictSpeed(), places=12)
+        a, b = fresh.predictCorrelation(), predictor.predictCorrelation()
+        self.assertEquals(a.parentTicks, b.parentTicks)
+        self.assertAlmostEquals(a.childTicks, b.childTicks, delta=1)
+        self.assertAlmostEquals(a.initialError, b.initialError, places=12)
+        self.assertAlmostEquals(a.errorGrowthRate, b.errorGrowthRate, places=12)
+
+
+class Test_FilterAndPredict(unittest.TestCase):
+    """\
+    Tests of the composable filter and prediction algorithm.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def candidate(self, rttNanos, offsetNanos=1000, drift=0.0):
+        t1 = self.sysClock.ticks - rttNanos
+        t2 = int(t1 * (1 + drift)) + offsetNanos + rttNanos/2
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+        return Candidate(msg, self.sysClock.ticks)
+
+    def test_filterRejects(self):
+        alg = FilterAndPredict(self.wallClock, repeatSecs=1.0, timeoutSecs=0.2, filters=[FilterRttThreshold(thresholdMillis=5)])
+        gen = alg.algorithm()
+        self.assertEquals(0.2, gen.next())
+        before = self.wallClock.correlation
+
+        self.assertEquals(1.0, gen.send(self.candidate(10000000)).secs)
+        self.assertEquals(before, self.wallClock.correlation)
+
+        gen.next()
+        c = self.candidate(2000000)
+        gen.send(c)
+        self.assertEquals(c.calcCorrelationFor(self.wallClock), self.wallClock.correlation)
+
+    def test_allFiltersSeeEveryCandidate(self):
+        class Recorder(object):
+            def __init__(self, result):
+                self.result = result
+                self.seen = []
+            def checkCandidate(self, candidate):
+                self.seen.append(candidate)
+                return self.result
+        filters = [ Recorder(False), Recorder(True) ]
+        gen = FilterAndPredict(self.wallClock, filters=filters).algorithm()
+        before = self.wallClock.correlation
+        gen.next()
+        c = self.candidate(1000000)
+        gen.send(c)
+        self.assertEquals(before, self.wallClock.correlation)
+        self.assertEquals([c], filters[0].seen)
+        self.assertEquals([c], filters[1].seen)
+
+    def test_adaptiveFilters(self):
+        filters = [ FilterRttPercentile(percentile=50, minCandidates=3), FilterOffsetMedian(windowSize=3) ]
+        gen = FilterAndPredict(self.wallClock, repeatSecs=1.0, timeoutSecs=0.2, filters=filters).algorithm()
+        accepted = []
+        for rtt, offset in [(2000000, 0), (4000000, 0), (3000000, 0), (9000000, 0), (1000000, 50000000), (1000000, 100000)]:
+            gen.next()
+            before = self.wallClock.correlation
+            gen.send(self.candidate(rtt, offset))
+            accepted.append(before != self.wallClock.correlation)
+        self.assertEquals([True, True, True, False, False, True], accepted)
+
+    def test_adaptiveFiltersSeeCandidatesRejectedEarlier(self):
+        percentile = FilterRttPercentile(percentile=50, minCandidates=3)
+        median = FilterOffsetMedian(windowSize=3)
+        filters = [ FilterRttThreshold(thresholdMillis=0.1), percentile, median ]
+        gen = FilterAndPredict(self.wallClock, filters=filters).algorithm()
+        for rtt, offset in [(2000000, 0), (4000000, 1000), (3000000, 2000)]:
+            gen.next()
+            gen.send(self.candidate(rtt, offset))
+        self.assertEquals(3.0, percentile.getThresholdMillis())
+        self.assertEquals(3, len(median._offsets))
+
+    def test_setsSpeed(self):
+        predictor = PredictLinearRegression(self.wallClock, windowSize=8)
+        gen = FilterAndPredict(self.wallClock, repeatSecs=1.0, timeoutSecs=0.2, predictor=predictor).algorithm()
+        for _ in range(0, 8):
+            gen.next()
+            gen.send(self.candidate(1000000, drift=-0.00002))
+            self.mockTime.timeNow += 1.0
+        self.assertEquals(predictor.predictCorrelation(), self.wallClock.correlation)
+        self.assertEquals(predictor.predictSpeed(), self.wallClock.speed)
+        self.assertAlmostEquals(1 - 0.00002, self.wallClock.speed, delta=0.000001)
+
+
+def makeCandidate(rttNanos, offsetNanos, t1=5000000000000):
+    t2 = t1 + rttNanos/2 + offsetNanos
+    msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+    return Candidate(msg, t1 + rttNanos)
+
+
+class Test_P2Quantile(unittest.TestCase):
+    """\
+    Tests of the streaming quantile estimator.
+    """
+
+    def test_fewValues(self):
+        q = _P2Quantile(0.5)
+        self.assertEquals(None, q.value)
+        for x in [5, 1, 3]:
+            q.add(x)
+        self.assertEquals(3, q.value)
+
+    def test_accuracy(self):
+        random.seed(1)
+        values = [ random.expovariate(1.0) for _ in range(0, 20000) ]
+        exact = sorted(values)
+        for p in (0.1, 0.5, 0.9, 0.99):
+            q = _P2Quantile(p)
+            for x in values:
+                q.add(x)
+            self.assertAlmostEquals(exact[int(p*len(exact))], q.value, delta=0.05*exact[int(p*len(exact))])
+
+
+class Test_FilterRttPercentile(unittest.TestCase):
+    """\
+    Tests of the filter that rejects candidates with round trip times above a percentile.
+    """
+
+    def test_invalidPercentile(self):
+        self.assertRaises(ValueError, FilterRttPercentile, 0)
+        self.assertRaises(ValueError, FilterRttPercentile, 100)
+
+    def test_acceptsUntilMinCandidates(self):
+        f = FilterRttPercentile(percentile=10, minCandidates=4)
+        self.assertEquals(None, f.getThresholdMillis())
+        self.assertEquals([True]*3, [f.checkCandidate(makeCandidate(rtt, 0)) for rtt in (1000000, 2000000, 3000000)])
+        self.assertFalse(f.checkCandidate(makeCandidate(4000000, 0)))
+
+    def test_rejectsAbovePercentile(self):
+        random.seed(2)
+        f = FilterRttPercentile(percentile=75)
+        accepted = 0
+        for i in range(0, 2000):
+            rtt = random.randint(1000000, 5000000)
+            if random.random() < 0.1:
+                rtt += 100000000    # congestion spike
+                self.assertEquals(i < 4, f.checkCandidate(makeCandidate(rtt, 0)))
+            elif f.checkCandidate(makeCandidate(rtt, 0)):
+                accepted += 1
+                self.assertTrue(i < 4 or rtt <= f.getThresholdMillis() * 1000000)
+        self.assertAlmostEquals(0.75*2000, accepted, delta=100)
+        # 75th percentile of all, when 90% are between 1 and 5 millis
+        self.assertAlmostEquals(1 + 4*0.75/0.9, f.getThresholdMillis(), delta=0.3)
+
+
+class Test_FilterOffsetMedian(unittest.TestCase):
+    """\
+    Tests of the filter that rejects candidates whose offsets are outliers.
+    """
+
+    def test_invalidWindowSize(self):
+        self.assertRaises(ValueError, FilterOffsetMedian, windowSize=2)
+
+    def test_rejectsOutliers(self):
+        f = FilterOffsetMedian(windowSize=5, thresholdFactor=3.0, minThresholdMillis=1.0)
+        results = [ f.checkCandidate(makeCandidate(1000000, offset)) for offset in
+            (0, 900000, 50000000, 300000, 600000, 100000, 20000000, 1500000, -5000000)
+        ]
+        self.assertEquals([True, True, True, True, True, True, False, True, False], results)
+
+    def test_followsJump(self):
+        f = FilterOffsetMedian(windowSize=5)
+        for _ in range(0, 5):
+            self.assertTrue(f.checkCandidate(makeCandidate(1000000, 0)))
+        results = [ f.checkCandidate(makeCandidate(1000000, 80000000)) for _ in range(0, 4) ]
+        self.assertEquals([False, False, True, True], results)
+
+
+class Test_KalmanFilterAdaptivePoll(unittest.TestCase):
+    """\
+    Tests of the Kalman filter algorithm that adapts how often it sends requests.
+    """
+
+    DRIFT = -0.00003     # server clock runs 30ppm slow
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+        self.start = self.sysClock.ticks
+        self.jump = 0
+        random.seed(1)
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def serverNanos(self, localNanos):
+        return 123456789000 + self.jump + int((localNanos - self.start) * (1 + self.DRIFT))
+
+    def candidate(self):
+        rttNanos = random.randint(500000, 2000000)
+        t1 = self.sysClock.ticks - rttNanos
+        t2 = self.serverNanos(t1 + random.randint(0, rttNanos))
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+        return Candidate(msg, self.sysClock.ticks)
+
+    def error(self):
+        return abs(self.wallClock.ticks - self.serverNanos(self.sysClock.ticks)) / 1000000000.0
+
+    def respond(self, gen, numRequests):
+        """\
+        :returns: list of the times waited after each response
+        """
+        waits = []
+        for _ in range(0, numRequests):
+            self.assertEquals(0.2, gen.next())
+            sleep = gen.send(self.candidate())
+            waits.append(sleep.secs)
+            self.mockTime.timeNow += sleep.secs
+        return waits
+
+    def test_invalidRepeatSecs(self):
+        self.assertRaises(ValueError, KalmanFilterAdaptivePoll, self.wallClock, minRepeatSecs=0)
+        self.assertRaises(ValueError, KalmanFilterAdaptivePoll, self.wallClock, minRepeatSecs=2.0, maxRepeatSecs=1.0)
+
+    def test_timeout(self):
+        gen = KalmanFilterAdaptivePoll(self.wallClock, timeoutSecs=0.3).algorithm()
+        self.assertEquals(0.3, gen.next())
+        self.assertEquals(0.3, gen.send(None).secs)
+        self.assertEquals(float("+inf"), self.wallClock.dispersionAtTime(self.wallClock.ticks))
+
+    def test_compensatesSkewAndBacksOff(self):
+        alg = KalmanFilterAdaptivePoll(self.wallClock, minRepeatSecs=1.0, maxRepeatSecs=64.0, targetEstimatedErrorSecs=0.002)
+        adjustments = []
+        alg.onClockAdjusted = lambda *args : adjustments.append(args)
+        waits = self.respond(alg.algorithm(), 40)
+
+        # polls rapidly at first, then backs off gradually to the maximum
+        self.assertTrue(waits[0] <= 2.0)
+        self.assertEquals(64.0, waits[-1])
+        for a, b in zip(waits, waits[1:]):
+            self.assertTrue(b <= 2*a)
+        self.assertEquals(40, len(adjustments))
+
+        self.assertAlmostEquals(1 + self.DRIFT, self.wallClock.speed, delta=0.000002)
+        self.assertLess(self.error(), self.wallClock.dispersionAtTime(self.wallClock.ticks))
+        self.assertLess(alg.getEstimatedError(), 2000000)
+
+    def test_dispersionGrowsToMaxRepeatTimesMaxFreqError(self):
+        alg = KalmanFilterAdaptivePoll(self.wallClock, minRepeatSecs=1.0, maxRepeatSecs=16.0, targetEstimatedErrorSecs=0.001)
+        gen = alg.algorithm()
+        self.respond(gen, 40)
+        self.assertEquals(16.0, alg.repeatSecs)
+
+        # grows by local (500ppm) plus server (50ppm) max freq error, plus the skew being compensated for,
+        # over the time between requests
+        growth = 16.0 * ((500 + 50) / 1000000.0 + abs(self.wallClock.speed - 1))
+        before = self.wallClock.dispersionAtTime(self.wallClock.ticks)
+        self.mockTime.timeNow += alg.repeatSecs
+        after = self.wallClock.dispersionAtTime(self.wallClock.ticks)
+        self.assertAlmostEquals(growth, after - before, delta=growth*0.01)
+
+        # so dispersion exceeds the target, even though the estimated error does not
+        self.assertGreater(after, alg.targetEstimatedErrorSecs)
+        self.assertLessEqual(alg.getEstimatedError() / 1000000000, alg.targetEstimatedErrorSecs)
+
+    def test_dispersionIsStrictBound(self):
+        alg = KalmanFilterAdaptivePoll(self.wallClock, minRepeatSecs=1.0, maxRepeatSecs=1.0)
+        gen = alg.algorithm()
+        for _ in range(0, 200):
+            self.assertEquals(0.2, gen.next())
+            rtt = random.randint(500000, 2000000)
+            t1 = self.sysClock.ticks - rtt
+            # replies always arrive immediately, so the offset is always over-estimated
+            t2 = self.serverNanos(t1)
+            msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.00001), WCMessage.encodeMaxFreqError(50), t1, t2, t2)
+            sleep = gen.send(Candidate(msg, self.sysClock.ticks))
+
+            dispersion = alg.getCurrentDispersion()
+            self.assertGreaterEqual(dispersion, alg.getEstimatedError())
+            self.assertLessEqual(self.error(), dispersion / 1000000000)
+            self.mockTime.timeNow += sleep.secs
+            self.assertLessEqual(self.error(), self.wallClock.dispersionAtTime(self.wallClock.ticks))
+
+    def test_restartsIfServerJumps(self):
+        alg = KalmanFilterAdaptivePoll(self.wallClock)
+        gen = alg.algorithm()
+        self.respond(gen, 30)
+        self.assertTrue(alg.repeatSecs > 1.0)
+
+        # polls rapidly again
+        self.jump = 50000000
+        self.assertTrue(self.respond(gen, 1)[0] <= 2.0)
+        self.assertLess(self.error(), 0.002)
+        self.assertLess(self.error(), self.wallClock.dispersionAtTime(self.wallClock.ticks))
+
+
+class Test_LowestDispersionServer(unittest.TestCase):
+    """\
+    Tests of the algorithm that follows the best of several servers.
+    """
+
+    def setUp(self):
+        self.mockTime = MockTime()
+        self.mockTime.install()
+        self.mockTime.timeNow = 5020.8
+        self.mockTime.enableAutoIncrementBy(0.000001, numReadsBetweenIncrements=1)
+        self.sysClock = SysClock(tickRate=1000000000)
+        self.mockTime.disableAutoIncrement()
+        self.wallClock = CorrelatedClock(self.sysClock, tickRate=1000000000)
+        self.A = ("10.0.0.1", 6677)
+        self.B = ("10.0.0.2", 6677)
+        self.changes = []
+
+    def tearDown(self):
+        self.mockTime.uninstall()
+
+    def candidate(self, offsetNanos, rttNanos):
+        t1 = self.sysClock.ticks - rttNanos
+        t4 = self.sysClock.ticks
+        msg = WCMessage(WCMessage.TYPE_RESPONSE, WCMessage.encodePrecision(0.0001), WCMessage.encodeMaxFreqError(50), t1, t1 + rttNanos/2 + offsetNanos, t1 + rttNanos/2 + offsetNanos)
+        return Candidate(msg, t4)
+
+    def newAlgorithm(self, **kwargs):
+        alg = LowestDispersionServer(self.wallClock, **kwargs)
+        alg.onServerChanged = lambda old, new : self.changes.append((old, new))
+        gen = alg.algorithm()
+        self.assertEquals(alg.timeoutSecs, gen.next())
+        return alg, gen
+
+    def round(self, gen, candidates):
+        sleep = gen.send(candidates)
+        self.assertTrue(isinstance(sleep, Sleep))
+        gen.next()
+        return sleep
+
+    def test_followsLowestDispersion(self):
+        alg, gen = self.newAlgorithm()
+        self.round(gen, { self.A : self.candidate(5000000, 10000000), self.B : self.candidate(7000000, 1000000) })
+        self.assertEquals(self.B, alg.server)
+        self.assertEquals([(None, self.B)], self.changes)
+        self.assertAlmostEquals(self.sysClock.ticks + 7000000, self.wallClock.ticks, delta=1000)
+        dispersions = alg.getServerDispersions()
+        self.assertLess(dispersions[self.B], dispersions[self.A])
+
+        # a better candidate from A switches to it
+        self.round(gen, { self.A : self.candidate(5000000, 100000), self.B : self.candidate(7000000, 1000000) })
+        self.assertEquals(self.A, alg.server)
+        self.assertAlmostEquals(self.sysClock.ticks + 5000000, self.wallClock.ticks, delta=1000)
+
+    def test_failsOverWhenServerStopsResponding(self):
+        alg, gen = self.newAlgorithm(failoverTimeouts=2)
+        self.round(gen, { self.A : self.candidate(5000000, 10000000), self.B : self.candidate(7000000, 1000000) })
+        self.assertEquals(self.B, alg.server)
+
+        # B stops responding. A's candidates are worse than B's old one, but once
+        # B has failed to respond enough times, A is followed instead
+        self.round(gen, { self.A : self.candidate(5000000, 10000000), self.B : None })
+        self.assertEquals(self.B, alg.server)
+        self.round(gen, { self.A : self.candidate(5000000, 10000000), self.B : None })
+        self.assertEquals(self.A, alg.server)
+        self.assertEquals([(None, self.B), (self.B, self.A)], self.changes)
+        self.assertAlmostEquals(self.sysClock.ticks + 5000000, self.wallClock.ticks, delta=1000)
+        self.assertEquals(float("+inf"), alg.getServerDispersions()[self.B])
+
+        # B responds again, and is better, so is followed again
+        self.round(gen, { self.A : None, self.B : self.candidate(7000000, 1000000) })
+        self.assertEquals(self.B, alg.server)
+
+    def test_noFailoverIfNoOtherServer(self):
+        alg, gen = self.newAlgorithm(failoverTimeouts=1)
+        self.round(gen, { self.A : None, self.B : self.candidate(7000000, 1000000) })
+        self.round(gen, { self.A : None, self.B : None })
+        self.assertEquals(self.B, alg.server)
+        self.assertAlmostEquals(self.sysClock.ticks + 7000000, self.wallClock.ticks, delta=1000)
+
+
+class Test_UdpRequestResponseClient(unittest.TestCase):
+    """\
+    Tests of the request-response client framework.
+    """
+
+    def test_nothingReceivedIsNotTimeout(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        peer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        peer.bind(("127.0.0.1", 0))
+        peerAddr = peer.getsockname()
+        results = []
+        def handler():
+            results.append((yield (("hello", peerAddr), 5.0)))
+            yield None, 5.0
+        client = UdpRequestResponseClient(sock, handler(), 100)
+
+        # the first time the socket is readable, nothing is received (e.g. an empty batch from the kernel)
+        receive = client._receive
+        attempts = []
+        def flakyReceive():
+            attempts.append(True)
+            return receive() if len(attempts) > 1 else None
+        client._receive = flakyReceive
+
+        client.start()
+        try:
+            data, src = peer.recvfrom(100)
+            peer.sendto("reply", src)
+            deadline = monotonic_time.time() + 2.0
+            while not results and monotonic_time.time() < deadline:
+                monotonic_time.sleep(0.01)
+        finally:
+            client.stop()
+            sock.close()
+            peer.close()
+        self.assertEquals([("reply", peerAddr)], [r[:2] for r in results])
+        self.assertEquals(2, len(attempts))
+
+
+class Test_MultiServerWallClockClient(unittest.TestCase):
+    """\
+    Tests of the wall clock client with several real servers.
+    """
+
+    def test_synchronisesAndFailsOver(self):
+        sysClock = SysClock(tickRate=1000000000)
+        serverClockA = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(0, 5000000000))
+        serverClockB = CorrelatedClock(sysClock, tickRate=1000000000, correlation=Correlation(0, 5000000000))
+        serverA = WallClockServer(serverClockA, precision=0.001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0)
+        serverB = WallClockServer(serverClockB, precision=0.0001, maxFreqError=50, bindaddr="127.0.0.1", bindport=0)
+        addrA = serverA.socket.getsockname()
+        addrB = serverB.socket.getsockname()
+
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+        alg = LowestDispersionServer(wallClock, repeatSecs=0.02, timeoutSecs=0.05, failoverTimeouts=2)
+        client = MultiServerWallClockClient(("127.0.0.1", 0), [addrA, addrB], wallClock, alg)
+        self.assertEquals([addrA, addrB], client.servers)
+
+        serverA.start()
+        serverB.start()
+        client.start()
+        try:
+            deadline = monotonic_time.time() + 5.0
+            while alg.server != addrB and monotonic_time.time() < deadline:
+                monotonic_time.sleep(0.01)
+            self.assertEquals(addrB, alg.server)
+            self.assertAlmostEquals(serverClockB.ticks, wallClock.ticks, delta=10000000)
+
+            serverB.stop()
+            while alg.server != addrA and monotonic_time.time() < deadline:
+                monotonic_time.sleep(0.01)
+            self.assertEquals(addrA, alg.server)
+            self.assertAlmostEquals(serverClockA.ticks, wallClock.ticks, delta=10000000)
+        finally:
+            client.stop()
+            serverA.stop()
+            serverB.stop()
+            serverA.socket.close()
+            serverB.socket.close()
+
+    def test_requiresServers(self):
+        sysClock = SysClock(tickRate=1000000000)
+        wallClock = CorrelatedClock(sysClock, tickRate=1000000000)
+        self.assertRaises(ValueError, MultiServerWallClockClient, ("127.0.0.1", 0), [], wallClock, LowestDispersionServer(wallClock))
+
+
+class Test_mmsg(unittest.TestCase):
+    """\
+    Tests of the internal batched datagram send/receive support.
+    """
+
+    def test_roundTrip(self):
+        a = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        b = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            a.bind(("127.0.0.1", 0))
+            b.bind(("127.0.0.1", 0))
+            b.settimeout(1.0)
+            srcAddr = a.getsockname()
+            payloads = [ "hello", bytearray("world"), "x"*32 ]
+            _mmsg.BatchSender(2).send(a, [ (p, b.getsockname()) for p in payloads ])
+
+            receiver = _mmsg.BatchReceiver(32, 8)
+            received = []
+            while len(received) < len(payloads):
+                received.extend(receiver.recv(b))
+        finally:
+            a.close()
+            b.close()
+
+        self.assertEquals([ data for data, src in received ], [ str(p) for p in payloads ])
+        for data, src in received:
+            self.assertEquals(src, srcAddr)
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testSmokeTestCreate']
     unittest.main()